@@ -3,6 +3,8 @@ App Factory - DataLab
 Registra todos los features como blueprints.
 La arquitectura hexagonal permite agregar/quitar features sin tocar el core.
 """
+from typing import Optional
+
 from flask import Flask, request
 from flask_login import LoginManager
 from flask_migrate import Migrate
@@ -58,12 +60,21 @@ def _register_template_context_processors(app):
         return _STATUS_LABELS.get(str(status), str(status))
 
 
-def create_app(config_name: str = "development") -> Flask:
-    """Factory de la aplicación Flask."""
+def create_app(config_name: str = "development",
+               config_overrides: Optional[dict] = None) -> Flask:
+    """Factory de la aplicación Flask.
+
+    Args:
+        config_name: development, testing o production
+        config_overrides: Valores que reemplazan a los de la configuración
+            (p. ej. los workers de importación desactivan la precarga)
+    """
     app = Flask(__name__, template_folder="templates")
 
     # Configuración
     _configure_app(app, config_name)
+    if config_overrides:
+        app.config.update(config_overrides)
 
     # Inicializar extensiones
     db.init_app(app)
@@ -72,9 +83,27 @@ def create_app(config_name: str = "development") -> Flask:
     babel.init_app(app, locale_selector=_get_locale)
     mail.init_app(app)
 
-    # Inicializar caché Redis
-    from app.utils.cache import cache
+    # Inicializar caché (memoria local + Redis opcional) e invalidación por tabla
+    from app.utils.cache import cache, register_invalidation_listeners
     cache.init_app(app)
+    register_invalidation_listeners()
+
+    # Mantener sincronizado el índice de búsqueda global
+    from app.services.search_index import SearchIndexService
+    SearchIndexService.register_listeners()
+
+    # Agregados diarios de analytics (rollups) mantenidos desde los modelos
+    from app.services.analytics_rollup import AnalyticsRollupService
+    AnalyticsRollupService.register_listeners()
+
+    # Índice de autocompletado en memoria (eventos + precarga opcional)
+    from app.services.autocomplete_index import AutocompleteIndex
+    AutocompleteIndex.register_listeners()
+    AutocompleteIndex.preload(app)
+
+    # Contadores de notificaciones no leídas en caché
+    from app.services.notification_counter import NotificationCounters
+    NotificationCounters.register_listeners()
 
     # Configurar Flask-Login
     _configure_login_manager(app)
@@ -122,7 +151,11 @@ def _configure_app(app: Flask, config_name: str):
         "testing": "app.config.TestingConfig",
         "production": "app.config.ProductionConfig",
     }
-    app.config.from_object(configs.get(config_name, configs["development"]))
+    if config_name not in configs:
+        config_name = "development"
+    app.config.from_object(configs[config_name])
+    # Nombre de la configuración (los workers de importación crean su propia app)
+    app.config["CONFIG_NAME"] = config_name
 
 
 def _get_locale():
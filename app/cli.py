@@ -383,3 +383,15 @@ def register_cli_commands(app):
     # Phase 4 import commands (Detalles de Ensayos y Utilizado)
     from app.commands.import_phase4 import import_phase4_cli
     app.cli.add_command(import_phase4_cli)
+
+    # Índice de búsqueda global
+    from app.commands.search_cli import search_index_cli
+    app.cli.add_command(search_index_cli)
+
+    # Agregados diarios de analytics
+    from app.commands.analytics_cli import analytics_rollup_cli
+    app.cli.add_command(analytics_rollup_cli)
+
+    # Cola de emails salientes
+    from app.commands.outbox_cli import email_outbox_cli
+    app.cli.add_command(email_outbox_cli)
@@ -0,0 +1,50 @@
+"""Comandos CLI para los agregados diarios (rollups) de analytics.
+
+Subcomandos:
+  flask analytics-rollup rebuild — Recalcular los rollups desde detalles_ensayo/entradas
+  flask analytics-rollup status  — Mostrar filas de rollup y comparar totales con el origen
+"""
+import time
+
+import click
+from flask.cli import with_appcontext
+
+from app.services.analytics_rollup import AnalyticsRollupService
+
+
+@click.group(name='analytics-rollup')
+def analytics_rollup_cli():
+    """Gestionar los agregados diarios de analytics."""
+    pass
+
+
+@analytics_rollup_cli.command()
+@with_appcontext
+def rebuild():
+    """Recalcular los rollups desde las tablas de origen (backfill)."""
+    click.echo('Reconstruyendo agregados diarios...')
+    start = time.perf_counter()
+    counts = AnalyticsRollupService.rebuild()
+    elapsed = time.perf_counter() - start
+
+    for table, count in counts.items():
+        click.echo(f'  ✓ {table}: {count} filas')
+    click.echo(click.style(f'\nRollups reconstruidos en {elapsed:.2f}s', fg='green'))
+
+
+@analytics_rollup_cli.command()
+@with_appcontext
+def status():
+    """Mostrar filas de cada rollup y verificar sus totales contra el origen."""
+    counts = AnalyticsRollupService.row_counts()
+    consistent = True
+    for table, totals in AnalyticsRollupService.verify().items():
+        ok = totals['rollup'] == totals['origen']
+        consistent = consistent and ok
+        mark = click.style('✓', fg='green') if ok else click.style('✗', fg='red')
+        click.echo(f'  {mark} {table}: {counts[table]} filas, '
+                   f'total {totals["rollup"]} (origen {totals["origen"]})')
+    if not consistent:
+        click.echo(click.style(
+            'Totales distintos al origen: ejecutar flask analytics-rollup rebuild', fg='yellow'
+        ))
@@ -1,8 +1,9 @@
 """Comandos CLI para importación de datos."""
-import os
+import json
 import click
 from flask.cli import with_appcontext
 
+from app.services.import_orchestrator import EXECUTORS, KINDS, ImportOrchestrator
 from app.services.import_service import MasterDataImportService
 
 
@@ -67,26 +68,33 @@ def productos(file, dry_run, skip_existing):
 @click.option('--data-dir', default='data/migrations', help='Directorio con CSVs')
 @click.option('--dry-run', is_flag=True, help='Validar sin insertar')
 @click.option('--force', is_flag=True, help='Saltar confirmación')
+@click.option('--workers', type=click.IntRange(min=1), default=None,
+              help='Tablas importadas a la vez (default: CPUs)')
+@click.option('--executor', type=click.Choice(EXECUTORS), default='process', show_default=True,
+              help='Workers en procesos, hilos o en serie')
 @with_appcontext
-def all(data_dir, dry_run, force):
+def all(data_dir, dry_run, force, workers, executor):
     """Importar todos los datos maestros."""
     if not force and not dry_run:
         click.confirm('¿Importar todos los datos maestros?', abort=True)
 
-    service = MasterDataImportService(dry_run=dry_run)
-
-    # Importar en orden correcto (clientes primero para FKs)
-    click.echo("=== Importando clientes ===")
-    result_c = service.import_clientes(os.path.join(data_dir, 'clientes.csv'))
-    click.echo(f"✓ {result_c.imported} clientes")
-
-    click.echo("\n=== Importando fábricas ===")
-    result_f = service.import_fabricas(os.path.join(data_dir, 'fabricas.csv'))
-    click.echo(f"✓ {result_f.imported} fábricas")
+    # Las tablas sin FKs entre sí se importan a la vez (fábricas espera a clientes)
+    orchestrator = ImportOrchestrator(data_dir=data_dir, dry_run=dry_run, workers=workers,
+                                      executor=executor, kinds=('master',))
+    result = orchestrator.run()
+
+    labels = {'clientes': 'clientes', 'fabricas': 'fábricas', 'productos': 'productos'}
+    for name, label in labels.items():
+        step = result.steps.get(f'master:{name}')
+        if step is None:
+            click.echo(f"✗ {label}: archivo no encontrado")
+        elif step['status'] != 'ok':
+            click.echo(f"✗ {label}: {step['error']}")
+        else:
+            click.echo(f"✓ {result.master[name].imported} {label} ({step['seconds']:.1f}s)")
 
-    click.echo("\n=== Importando productos ===")
-    result_p = service.import_productos(os.path.join(data_dir, 'productos.csv'))
-    click.echo(f"✓ {result_p.imported} productos")
+    service = MasterDataImportService(dry_run=dry_run)
+    service.results = list(result.master.values())
 
     # Validar
     click.echo("\n=== Validando ===")
@@ -96,8 +104,7 @@ def all(data_dir, dry_run, force):
     click.echo("\n" + "="*50)
     click.echo("RESUMEN DE IMPORTACIÓN")
     click.echo("="*50)
-    total = result_c.imported + result_f.imported + result_p.imported
-    click.echo(f"Total importados: {total}/729")
+    click.echo(f"Total importados: {result.total_imported}/729")
 
     for table, check in validations.items():
         if table != 'fk_integrity':
@@ -111,6 +118,65 @@ def all(data_dir, dry_run, force):
     click.echo(f"\nReporte guardado: {report_path}")
 
 
+@import_cli.command()
+@click.option('--data-dir', default=None, help='Directorio con CSVs (maestros, Phase 3 y Phase 4)')
+@click.option('--access-db', default=None, help='Archivo Access (.accdb) con las tablas de referencia')
+@click.option('--only', 'kinds', multiple=True, type=click.Choice(KINDS),
+              help='Fuentes a importar (repetible; default: todas)')
+@click.option('--workers', type=click.IntRange(min=1), default=None,
+              help='Tablas importadas a la vez (default: CPUs)')
+@click.option('--executor', type=click.Choice(EXECUTORS), default='process', show_default=True,
+              help='Workers en procesos, hilos o en serie')
+@click.option('--dry-run', is_flag=True, help='Validar sin insertar')
+@click.option('--plan', 'plan_only', is_flag=True, help='Mostrar el plan de dependencias y salir')
+@click.option('--force', is_flag=True, help='Saltar confirmación')
+@click.option('--report', 'report_path', default='import_report.json', show_default=True,
+              help='Archivo JSON con el reporte combinado')
+@with_appcontext
+def run(data_dir, access_db, kinds, workers, executor, dry_run, plan_only, force, report_path):
+    """Importar todas las fuentes en paralelo, respetando las FKs entre tablas."""
+    if not data_dir and not access_db:
+        raise click.UsageError('Indicar --data-dir y/o --access-db')
+
+    orchestrator = ImportOrchestrator(data_dir=data_dir, access_db=access_db, dry_run=dry_run,
+                                      workers=workers, executor=executor, kinds=kinds or KINDS)
+
+    levels = orchestrator.plan()
+    click.echo("=== Plan de importación ===")
+    for number, level in enumerate(levels, start=1):
+        click.echo(f"  Nivel {number}:")
+        for step in level:
+            after = f" (después de {', '.join(step.depends_on)})" if step.depends_on else ''
+            click.echo(f"    {step.name} → {', '.join(step.tables)}{after}")
+    if plan_only:
+        return
+
+    if not force and not dry_run:
+        click.confirm('¿Ejecutar la importación?', abort=True)
+
+    result = orchestrator.run()
+
+    click.echo("\n" + "="*50)
+    click.echo("RESUMEN DE IMPORTACIÓN")
+    click.echo("="*50)
+    click.echo(f"Ejecutor: {result.executor} ({result.workers} workers)")
+    for name, step in result.steps.items():
+        status = {'ok': '✓', 'failed': '✗', 'skipped': '-'}[step['status']]
+        detail = f"{step['seconds']:.1f}s" if step['status'] == 'ok' else step['error']
+        click.echo(f"  {status} {name}: {detail}")
+    click.echo(f"Total importados: {result.total_imported}")
+    click.echo(f"Errores de filas: {result.total_errors}")
+    click.echo(f"Duración: {result.duration_seconds:.1f}s "
+               f"(suma de pasos: {result.steps_seconds:.1f}s)")
+
+    with open(report_path, 'w') as f:
+        json.dump(result.to_dict(), f, indent=2, default=str)
+    click.echo(f"\nReporte guardado: {report_path}")
+
+    if result.failed_steps:
+        raise SystemExit(1)
+
+
 def init_app(app):
     """Registrar comandos en la app Flask."""
     app.cli.add_command(import_cli)
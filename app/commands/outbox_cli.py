@@ -0,0 +1,100 @@
+"""Comandos CLI para la cola de emails salientes (outbox).
+
+Subcomandos:
+  flask email-outbox worker        — Enviar los emails de la cola y generar los resúmenes
+  flask email-outbox status        — Mostrar la profundidad de la cola por estado
+  flask email-outbox retry-failed  — Volver a encolar los emails FALLIDO
+  flask email-outbox purge         — Eliminar emails enviados antiguos
+"""
+import threading
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.services.email_outbox import EmailOutboxService
+from app.services.notification_service import NotificationService
+
+
+@click.group(name='email-outbox')
+def email_outbox_cli():
+    """Gestionar la cola de emails salientes."""
+    pass
+
+
+@email_outbox_cli.command()
+@click.option('--workers', default=1, show_default=True, type=click.IntRange(min=1),
+              help='Hilos que envían en paralelo')
+@click.option('--batch-size', default=EmailOutboxService.BATCH_SIZE, show_default=True,
+              type=click.IntRange(min=1), help='Emails por conexión SMTP')
+@click.option('--poll-interval', default=EmailOutboxService.POLL_INTERVAL, show_default=True,
+              type=float, help='Segundos de espera con la cola vacía')
+@click.option('--once', is_flag=True, help='Vaciar la cola una vez y terminar')
+@click.option('--flush-digests', is_flag=True,
+              help='Con --once: generar todos los resúmenes sin esperar la ventana')
+@with_appcontext
+def worker(workers, batch_size, poll_interval, once, flush_digests):
+    """Enviar los emails de la cola (y generar los resúmenes) hasta CTRL+C."""
+    if once:
+        digests = NotificationService.flush_digests(force=flush_digests)
+        if digests['grupos']:
+            click.echo(f"  ✓ Resúmenes: {digests['grupos']} "
+                       f"({digests['in_app']} in-app, {digests['email']} emails)")
+        totals = EmailOutboxService.drain(batch_size)
+        click.echo(f"  ✓ Enviados: {totals['enviados']}, "
+                   f"reprogramados: {totals['reintentos']}, fallidos: {totals['fallidos']}")
+        return
+
+    click.echo(f'📬 Worker de emails: {workers} hilo(s), lotes de {batch_size}')
+    click.echo('⚡ Press CTRL+C to stop\n')
+    stop_event = threading.Event()
+    app = current_app._get_current_object()
+    thread = threading.Thread(
+        target=EmailOutboxService.run_worker,
+        args=(app, workers, batch_size, poll_interval, stop_event),
+        daemon=True,
+    )
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(timeout=1)
+    except KeyboardInterrupt:
+        click.echo('\nDeteniendo worker (terminando el lote en curso)...')
+        stop_event.set()
+        thread.join()
+
+
+@email_outbox_cli.command()
+@with_appcontext
+def status():
+    """Mostrar la profundidad de la cola por estado."""
+    depth = EmailOutboxService.queue_depth()
+    for estado, count in depth['por_estado'].items():
+        click.echo(f'  {estado}: {count}')
+    click.echo(f"  Listos para enviar: {depth['listos']}")
+    if depth['antiguedad_max'] is not None:
+        click.echo(f"  Pendiente más antiguo: {depth['antiguedad_max']:.0f}s")
+    click.echo(f"  Notificaciones en resumen: {NotificationService.pending_digest_count()}")
+    if depth['por_estado']['FALLIDO']:
+        click.echo(click.style(
+            'Hay emails FALLIDO: revisar SMTP y ejecutar flask email-outbox retry-failed',
+            fg='yellow'
+        ))
+
+
+@email_outbox_cli.command('retry-failed')
+@with_appcontext
+def retry_failed():
+    """Volver a encolar los emails FALLIDO."""
+    count = EmailOutboxService.retry_failed()
+    click.echo(f'  ✓ {count} emails reencolados')
+
+
+@email_outbox_cli.command()
+@click.option('--days', default=30, show_default=True, type=click.IntRange(min=0),
+              help='Antigüedad mínima de los emails enviados a eliminar')
+@with_appcontext
+def purge(days):
+    """Eliminar los emails enviados hace más de --days días."""
+    count = EmailOutboxService.purge_sent(days)
+    click.echo(f'  ✓ {count} emails eliminados')
@@ -0,0 +1,76 @@
+"""Comandos CLI para el índice de búsqueda global.
+
+Subcomandos:
+  flask search-index rebuild — Reconstruir el índice (todas o algunas entidades)
+  flask search-index status  — Mostrar documentos indexados por entidad
+  flask search-index autocomplete — Reconstruir el autocompletado y reportar memoria/tiempo
+"""
+import time
+
+import click
+from flask.cli import with_appcontext
+
+from app.services.autocomplete_index import autocomplete_index
+from app.services.search_index import INDEXED_ENTITIES, SearchIndexService
+
+
+@click.group(name='search-index')
+def search_index_cli():
+    """Gestionar el índice de búsqueda global."""
+    pass
+
+
+@search_index_cli.command()
+@click.option('--entity', '-e', 'entities', multiple=True,
+              type=click.Choice(sorted(INDEXED_ENTITIES.keys())),
+              help='Entidad a reindexar (repetible). Por defecto: todas')
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Filas por lote de inserción')
+@with_appcontext
+def rebuild(entities, batch_size):
+    """Reconstruir el índice de búsqueda desde las tablas de origen."""
+    click.echo('Reconstruyendo índice de búsqueda...')
+    start = time.perf_counter()
+    counts = SearchIndexService.rebuild(entities or None, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    for entity_type, count in counts.items():
+        click.echo(f'  ✓ {entity_type}: {count} documentos')
+    click.echo(click.style(
+        f'\nÍndice reconstruido: {sum(counts.values())} documentos en {elapsed:.2f}s',
+        fg='green'
+    ))
+
+
+@search_index_cli.command()
+@with_appcontext
+def status():
+    """Mostrar documentos indexados por entidad."""
+    counts = SearchIndexService.document_counts()
+    for entity_type in INDEXED_ENTITIES:
+        click.echo(f'  {entity_type}: {counts.get(entity_type, 0)}')
+    click.echo(f'Total: {sum(counts.values())}')
+
+
+@search_index_cli.command()
+@click.option('--lookups', default=1000, show_default=True,
+              help='Consultas de prueba para medir la latencia')
+@with_appcontext
+def autocomplete(lookups):
+    """Reconstruir el índice de autocompletado y reportar memoria y tiempo."""
+    keys = autocomplete_index.build()
+    stats = autocomplete_index.stats()
+
+    for entity_type, count in sorted(stats['entities'].items()):
+        click.echo(f'  {entity_type}: {count} entidades')
+    click.echo(f'Claves: {keys}')
+    click.echo(f'Memoria aproximada: {stats["memory_bytes"] / (1024 * 1024):.2f} MB')
+    click.echo(f'Tiempo de reconstrucción: {stats["build_seconds"]:.3f}s')
+
+    if keys and lookups > 0:
+        prefixes = [key[:3] for key in autocomplete_index.sample_keys(lookups)]
+        start = time.perf_counter()
+        for prefix in prefixes:
+            autocomplete_index.suggest(prefix)
+        elapsed = time.perf_counter() - start
+        click.echo(f'Latencia media: {elapsed / len(prefixes) * 1_000_000:.1f} µs por consulta')
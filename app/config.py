@@ -38,6 +38,32 @@ class BaseConfig:
     MAIL_SUPPRESS_SEND = False
     MAIL_ASCII_ATTACHMENTS = False
 
+    # Modo digest: segundos durante los que se agrupan las notificaciones de
+    # un usuario y tipo en una sola notificación y un solo email (0 = inmediato).
+    # Los resúmenes los genera el worker: flask email-outbox worker
+    NOTIFICATION_DIGEST_WINDOW = int(os.environ.get('NOTIFICATION_DIGEST_WINDOW', 0))
+
+    # Búsqueda global sobre el índice search_documents
+    # (reconstruir con: flask search-index rebuild)
+    SEARCH_INDEX_ENABLED = True
+
+    # Autocompletado en memoria: precarga al arrancar y antigüedad máxima
+    # (segundos) antes de reconstruirlo (flask search-index autocomplete)
+    AUTOCOMPLETE_PRELOAD = False
+    AUTOCOMPLETE_INDEX_MAX_AGE = 900
+
+    # Caché de dos niveles (app.utils.cache): memoria local + Redis opcional.
+    # CACHE_BACKEND: 'tiered', 'memory', 'redis' o 'none'
+    CACHE_BACKEND = "tiered"
+    CACHE_LOCAL_MAX_ENTRIES = 1024
+    # Límite de entradas locales por espacio de nombres (prefijo de la clave)
+    CACHE_NAMESPACE_LIMITS = {"analytics": 256}
+    # TTL máximo del nivel local cuando hay Redis (segundos)
+    CACHE_LOCAL_TTL = 30
+    # Serialización del nivel Redis: 'pickle', 'msgpack' (pip install msgpack) o 'json'
+    CACHE_SERIALIZER = "pickle"
+    CACHE_COMPRESS_MIN_BYTES = 4096
+
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
@@ -55,6 +81,10 @@ class TestingConfig(BaseConfig):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     WTF_CSRF_ENABLED = False
+    # Caché solo en memoria: sin dependencia de un servidor Redis
+    CACHE_BACKEND = "memory"
+    # Sin SMTP: los envíos solo se registran (mail.record_messages())
+    MAIL_SUPPRESS_SEND = True
 
 
 class ProductionConfig(BaseConfig):
@@ -72,3 +102,5 @@ class ProductionConfig(BaseConfig):
     SQLALCHEMY_ECHO = False
     # Redis para caché
     REDIS_URL = os.environ.get("REDIS_URL")
+    # Construir el índice de autocompletado al arrancar cada worker
+    AUTOCOMPLETE_PRELOAD = True
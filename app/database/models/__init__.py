@@ -27,12 +27,15 @@ from .reference import (
 )
 from .user import User, UserRole
 from .audit import AuditLog
-from .notification import Notification
+from .notification import Notification, NotificationDigestItem
 from .notification_preference import NotificationPreference
+from .email_outbox import EmailOutbox, EmailOutboxStatus
 from .status_history import StatusHistory
 from .utilizado import Utilizado, UtilizadoStatus, Factura
 from .detalle_ensayo import DetalleEnsayo, DetalleEnsayoStatus
 from .recent_search import RecentSearch
+from .search_document import SearchDocument, SearchTrigram
+from .analytics_rollup import DetalleEnsayoDiario, DetalleEnsayoEstadoTotal, EntradaDiaria
 
 __all__ = [
     'Cliente',
@@ -66,9 +69,17 @@ __all__ = [
     'UserRole',
     'AuditLog',
     'Notification',
+    'NotificationDigestItem',
     'NotificationPreference',
+    'EmailOutbox',
+    'EmailOutboxStatus',
     'StatusHistory',
     'DetalleEnsayo',
     'DetalleEnsayoStatus',
     'RecentSearch',
+    'SearchDocument',
+    'SearchTrigram',
+    'DetalleEnsayoDiario',
+    'DetalleEnsayoEstadoTotal',
+    'EntradaDiaria',
 ]
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Tablas de agregados diarios (rollups) para AnalyticsService.
+
+Cada fila cuenta cuántos registros de la tabla de origen caen en una
+combinación de día y dimensiones. Los reportes suman estas filas en lugar
+de recorrer todo el historial de ``detalles_ensayo``/``entradas``, así su
+costo depende de los días y dimensiones consultados, no de los años de
+datos acumulados.
+
+``rollup_detalles_estado`` es un contador sin fecha (ensayo × estado) para
+las páginas de cada área: su tamaño depende solo de la cantidad de ensayos.
+
+Las filas se mantienen desde los eventos de los modelos, en la misma
+transacción que el cambio de origen (ver ``app.services.analytics_rollup``),
+y se reconstruyen con ``flask analytics-rollup rebuild``.
+
+El área y el tipo de cliente no se copian: se obtienen uniendo con
+``ensayos`` y ``clientes`` (tablas pequeñas), de modo que reclasificar un
+cliente no deja agregados desactualizados.
+"""
+
+from app import db
+
+
+# Valor de rama_id para entradas sin rama (no hay ramas con id 0)
+SIN_RAMA = 0
+
+
+class DetalleEnsayoDiario(db.Model):
+    """Detalles de ensayo por día × ensayo × cliente × estado.
+
+    Attributes:
+        dia: Fecha de completado del detalle, o de creación si aún no se completó.
+        ensayo_id: Ensayo (el área se obtiene de ``ensayos.area_id``).
+        cliente_id: Cliente de la entrada (tipo en ``clientes.tipo_cliente``).
+        estado: Estado actual del detalle (DetalleEnsayoStatus).
+        cantidad: Detalles en esa combinación.
+    """
+
+    __tablename__ = 'rollup_detalles_diarios'
+    __table_args__ = (
+        db.Index('ix_rollup_detalles_estado_dia', 'estado', 'dia'),
+    )
+
+    dia = db.Column(db.Date, primary_key=True)
+    ensayo_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    cliente_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    estado = db.Column(db.String(20), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (f'<DetalleEnsayoDiario {self.dia} ensayo={self.ensayo_id} '
+                f'cliente={self.cliente_id} {self.estado}: {self.cantidad}>')
+
+
+class EntradaDiaria(db.Model):
+    """Entradas por día × cliente × rama × status × anulado.
+
+    Attributes:
+        dia: Fecha de entrada (``fech_entrada``).
+        cliente_id: Cliente de la entrada.
+        rama_id: Rama de la entrada, ``SIN_RAMA`` si no tiene.
+        status: Estado actual de la entrada (EntradaStatus).
+        anulado: Bandera ``anulado`` de la entrada.
+        cantidad: Entradas en esa combinación.
+    """
+
+    __tablename__ = 'rollup_entradas_diarias'
+    __table_args__ = (
+        db.Index('ix_rollup_entradas_status_dia', 'status', 'dia'),
+    )
+
+    dia = db.Column(db.Date, primary_key=True)
+    cliente_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    rama_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    status = db.Column(db.String(20), primary_key=True)
+    anulado = db.Column(db.Boolean, primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (f'<EntradaDiaria {self.dia} cliente={self.cliente_id} '
+                f'rama={self.rama_id} {self.status}: {self.cantidad}>')
+
+
+class DetalleEnsayoEstadoTotal(db.Model):
+    """Detalles de ensayo por ensayo × estado, sin dimensión de fecha.
+
+    Los totales de un área son la suma de los ensayos del área, por lo que
+    mover un ensayo de área no deja contadores desactualizados.
+
+    Attributes:
+        ensayo_id: Ensayo (el área se obtiene de ``ensayos.area_id``).
+        estado: Estado actual del detalle (DetalleEnsayoStatus).
+        cantidad: Detalles de ese ensayo en ese estado.
+    """
+
+    __tablename__ = 'rollup_detalles_estado'
+
+    ensayo_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    estado = db.Column(db.String(20), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DetalleEnsayoEstadoTotal ensayo={self.ensayo_id} {self.estado}: {self.cantidad}>'
@@ -59,6 +59,8 @@ class DetalleEnsayo(db.Model):
         UniqueConstraint("entrada_id", "ensayo_id", name="uq_detalle_entrada_ensayo"),
         # Índice compuesto para consultas por entrada filtradas por estado
         Index("ix_detalle_entrada_estado", "entrada_id", "estado"),
+        # Paginación por cursor del historial sobre (fecha_completado, id)
+        Index("ix_detalle_fecha_completado_id", "fecha_completado", "id"),
     )
 
     # Clave primaria
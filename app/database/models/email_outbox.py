@@ -0,0 +1,55 @@
+"""Modelo EmailOutbox - Cola transaccional de emails salientes."""
+from datetime import datetime
+
+from app import db
+
+
+class EmailOutboxStatus:
+    """Estados posibles de un email en la cola."""
+    PENDIENTE = 'PENDIENTE'
+    ENVIANDO = 'ENVIANDO'
+    ENVIADO = 'ENVIADO'
+    FALLIDO = 'FALLIDO'
+
+
+class EmailOutbox(db.Model):
+    """
+    Email pendiente de envío (patrón outbox).
+
+    Las filas se insertan en la misma transacción que el cambio que las
+    origina, ya renderizadas, y las envía el worker ``flask email-outbox
+    worker``. Si la transacción se revierte el email no se envía; si el
+    servidor SMTP falla el email se reintenta.
+
+    ``next_attempt_at`` indica cuándo puede tomarse la fila: para PENDIENTE
+    es el próximo intento (con backoff) y para ENVIANDO es el vencimiento
+    de la reserva del worker, de modo que las filas de un worker caído
+    vuelven a tomarse.
+    """
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        # Filas listas para enviar: status IN (...) AND next_attempt_at <= ahora
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Mensaje ya renderizado
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=True)
+    html = db.Column(db.Text, nullable=True)
+    template = db.Column(db.String(50), nullable=True)  # Template que lo generó
+
+    # Entrega
+    status = db.Column(db.String(20), nullable=False, default=EmailOutboxStatus.PENDIENTE)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.recipient} {self.status}>'
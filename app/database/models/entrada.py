@@ -27,6 +27,10 @@ class Entrada(db.Model):
     Formato de lote: X-XXXX (letra-4dígitos)
     """
     __tablename__ = 'entradas'
+    __table_args__ = (
+        # Paginación por cursor sobre (fech_entrada, id)
+        db.Index('ix_entradas_fech_entrada_id', 'fech_entrada', 'id'),
+    )
     
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
@@ -44,3 +44,39 @@ class Notification(db.Model):
             'read': self.read,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+
+class NotificationDigestItem(db.Model):
+    """
+    Notificación pendiente de agrupar en un resumen (modo digest).
+
+    Con ``NOTIFICATION_DIGEST_WINDOW`` > 0 las notificaciones se guardan
+    aquí en lugar de crear una Notification y un email cada una. El worker
+    de la cola de emails agrupa por usuario y tipo las que superan la
+    ventana en una sola Notification y un solo email, y las elimina.
+    """
+    __tablename__ = 'notification_digest_items'
+    __table_args__ = (
+        # Grupos vencidos: GROUP BY user_id, type HAVING MIN(created_at) <= límite
+        db.Index('ix_notification_digest_user_type', 'user_id', 'type', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    # Contenido de la notificación individual
+    type = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    entity_type = db.Column(db.String(50), nullable=True)
+    entity_id = db.Column(db.Integer, nullable=True)
+    data = db.Column(db.JSON, nullable=True)  # Detalle estructurado (p. ej. el cambio de estado)
+
+    # Canales según las preferencias del usuario al momento de notificar
+    in_app = db.Column(db.Boolean, nullable=False, default=True)
+    email = db.Column(db.Boolean, nullable=False, default=True)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<NotificationDigestItem {self.id} user={self.user_id} {self.type}>'
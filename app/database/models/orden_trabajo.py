@@ -19,7 +19,11 @@ class OrdenTrabajo(db.Model):
     Número oficial (NroOfic) se usa para referencia externa.
     """
     __tablename__ = 'ordenes_trabajo'
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # Paginación por cursor sobre (fech_creacion, id)
+        db.Index('ix_ordenes_trabajo_fech_creacion_id', 'fech_creacion', 'id'),
+        {"extend_existing": True},
+    )
     
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
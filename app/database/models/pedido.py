@@ -19,6 +19,10 @@ class Pedido(db.Model):
     Un pedido puede tener múltiples entradas de muestra.
     """
     __tablename__ = 'pedidos'
+    __table_args__ = (
+        # Paginación por cursor sobre (fech_pedido, id)
+        db.Index('ix_pedidos_fech_pedido_id', 'fech_pedido', 'id'),
+    )
     
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
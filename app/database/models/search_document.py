@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Modelo SearchDocument - Índice de búsqueda global.
+
+Cada fila es el documento indexado de una entidad buscable (cliente,
+fábrica, producto, entrada, pedido o informe). El contenido se mantiene
+sincronizado desde los eventos de los modelos (ver
+``app.services.search_index``) y se consulta con un único query rankeado.
+
+Índices según dialecto:
+  - PostgreSQL: GIN sobre ``to_tsvector('simple', content)`` y GIN trigram
+    (pg_trgm) sobre ``content`` (ILIKE) y ``title`` (similitud difusa).
+  - SQLite: tabla virtual FTS5 ``search_documents_fts`` con contenido
+    externo, sincronizada por triggers, y tabla ``search_trigrams`` con los
+    trigramas precalculados del título para la similitud difusa.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import DDL, Index, event, func, literal_column
+
+from app import db
+
+
+FTS_TABLE_NAME = 'search_documents_fts'
+
+# DDL de la tabla FTS5 y sus triggers (patrón "external content" de SQLite)
+SQLITE_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE_NAME} USING fts5(
+        title, content,
+        content='search_documents', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO {FTS_TABLE_NAME}(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE_NAME}(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+]
+
+
+class SearchDocument(db.Model):
+    """Documento del índice de búsqueda global.
+
+    Attributes:
+        id: Clave primaria (rowid de la tabla FTS5 en SQLite).
+        entity_type: Tipo de entidad ('clientes', 'entradas', ...).
+        entity_id: ID de la entidad indexada.
+        title: Campo principal de la entidad (nombre, código, nro oficial).
+        content: Texto concatenado de todos los campos buscables.
+        status: Estado de la entidad, si aplica (para filtros).
+        fecha: Fecha de referencia de la entidad, si aplica (para filtros).
+        updated_at: Momento de la última indexación.
+    """
+
+    __tablename__ = 'search_documents'
+    __table_args__ = (
+        db.UniqueConstraint('entity_type', 'entity_id', name='uq_search_document_entity'),
+        Index('ix_search_documents_type_status', 'entity_type', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(300), nullable=False, default='')
+    content = db.Column(db.Text, nullable=False, default='')
+    status = db.Column(db.String(30), nullable=True)
+    fecha = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<SearchDocument {self.entity_type}:{self.entity_id}>'
+
+    @staticmethod
+    def tsvector_expression(column=None):
+        """Expresión ``to_tsvector`` usada por el índice GIN y por las consultas.
+
+        Debe ser idéntica en ambos lados para que PostgreSQL use el índice.
+        """
+        column = column if column is not None else SearchDocument.__table__.c.content
+        return func.to_tsvector(literal_column("'simple'"), column)
+
+
+class SearchTrigram(db.Model):
+    """Trigrama precalculado del título de un documento del índice.
+
+    Permite calcular la similitud trigram por palabra (como
+    ``word_similarity`` de pg_trgm) con un GROUP BY sobre la clave primaria
+    en bases sin pg_trgm.
+    """
+
+    __tablename__ = 'search_trigrams'
+    __table_args__ = (
+        Index('ix_search_trigrams_entity', 'entity_type', 'entity_id'),
+    )
+
+    trigram = db.Column(db.String(3), primary_key=True)
+    entity_type = db.Column(db.String(20), primary_key=True)
+    entity_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    def __repr__(self):
+        return f'<SearchTrigram {self.trigram!r} {self.entity_type}:{self.entity_id}>'
+
+
+# Índices específicos de PostgreSQL (no se crean en SQLite)
+Index(
+    'ix_search_documents_tsv',
+    SearchDocument.tsvector_expression(),
+    postgresql_using='gin',
+).ddl_if(dialect='postgresql')
+
+Index(
+    'ix_search_documents_content_trgm',
+    SearchDocument.__table__.c.content,
+    postgresql_using='gin',
+    postgresql_ops={'content': 'gin_trgm_ops'},
+).ddl_if(dialect='postgresql')
+
+Index(
+    'ix_search_documents_title_trgm',
+    SearchDocument.__table__.c.title,
+    postgresql_using='gin',
+    postgresql_ops={'title': 'gin_trgm_ops'},
+).ddl_if(dialect='postgresql')
+
+event.listen(
+    SearchDocument.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'),
+)
+
+for _statement in SQLITE_FTS_DDL:
+    event.listen(
+        SearchDocument.__table__,
+        'after_create',
+        DDL(_statement).execute_if(dialect='sqlite'),
+    )
+
+event.listen(
+    SearchDocument.__table__,
+    'before_drop',
+    DDL(f'DROP TABLE IF EXISTS {FTS_TABLE_NAME}').execute_if(dialect='sqlite'),
+)
@@ -10,6 +10,10 @@ class StatusHistory(db.Model):
     Registra quién, cuándo y por qué cambió el estado.
     """
     __tablename__ = 'status_history'
+    __table_args__ = (
+        # Tendencias por rango de fechas (changed_at >= inicio AND changed_at < fin)
+        db.Index('ix_status_history_changed_at', 'changed_at', 'to_status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     entrada_id = db.Column(db.Integer, db.ForeignKey('entradas.id'), nullable=False)
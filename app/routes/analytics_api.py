@@ -3,6 +3,7 @@ from flask import Blueprint, jsonify, request
 from flask_login import login_required
 
 from app.services.analytics_service import AnalyticsService
+from app.utils.cache import cache
 
 analytics_api_bp = Blueprint('analytics_api', __name__, url_prefix='/api/analytics')
 
@@ -207,4 +208,24 @@ def invalidate_cache():
         return jsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+@analytics_api_bp.route('/cache-stats', methods=['GET'])
+@login_required
+def cache_stats():
+    """Estadísticas de la caché: hits/misses/evictions por nivel y espacio de nombres.
+
+    Returns:
+        JSON con niveles activos, contadores y ocupación del nivel local.
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'data': cache.get_stats()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}
+        }), 500
@@ -1,30 +1,32 @@
 """API endpoints para dashboard de DataLab."""
-from datetime import datetime, timedelta
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, make_response, request
 from flask_login import login_required
 
-from app import db
 from app.services.dashboard_service import DashboardService
+from app.utils.timeseries import GRANULARITIES
 
 dashboard_api_bp = Blueprint('dashboard_api', __name__, url_prefix='/api/dashboard')
 
 
-def _orden_trabajo_to_dict_mini(orden):
+def _conditional_json(payload, etag):
     """
-    Convertir orden de trabajo a diccionario resumido.
+    Responder ``payload`` con ETag, o 304 si el cliente ya tiene esa versión.
 
     Args:
-        orden: Instancia de OrdenTrabajo
+        payload: Cuerpo JSON de la respuesta
+        etag: Versión del contenido
 
     Returns:
-        Dict con datos minimos de la orden
+        Respuesta 200 con el JSON o 304 sin cuerpo.
     """
-    return {
-        'id': orden.id,
-        'nro_ofic': orden.nro_ofic,
-        'cliente': orden.cliente.nombre if orden.cliente else None,
-        'status': orden.status
-    }
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    # Revalidar siempre: el navegador reusa su copia solo si recibe 304
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 @dashboard_api_bp.route('/sample-status-counts', methods=['GET'])
@@ -33,21 +35,24 @@ def sample_status_counts():
     """
     Obtener conteos de muestras por estado.
 
+    Servido desde el snapshot cacheado; admite ``If-None-Match``.
+
     Returns:
-        JSON con conteos por estado, total y timestamp.
+        JSON con conteos por estado, total y timestamp (304 si no cambió).
     """
     try:
-        counts = DashboardService.get_sample_status_counts()
+        snapshot = DashboardService.get_snapshot()
+        counts = snapshot['data']['status_counts']
         total = sum(counts.values())
 
-        return jsonify({
+        return _conditional_json({
             'success': True,
             'data': {
                 'status_counts': counts,
                 'total': total,
-                'last_updated': datetime.utcnow().isoformat()
+                'last_updated': snapshot['generated_at']
             }
-        }), 200
+        }, snapshot['etag'])
     except Exception as e:
         return jsonify({
             'success': False,
@@ -67,12 +72,19 @@ def status_trends():
 
     Query params:
         days: Numero de dias a analizar (default: 30)
+        granularity: day, week o month (default: day)
+        rolling: Ventana de media movil en buckets (opcional)
+        cumulative: 1 para la serie acumulada (default: 0)
+        format: plotly para incluir la figura de Plotly (opcional)
 
     Returns:
-        JSON con tendencias diarias y configuracion.
+        JSON con tendencias por bucket y configuracion.
     """
     try:
         days = request.args.get('days', 30, type=int)
+        granularity = request.args.get('granularity', 'day')
+        rolling = request.args.get('rolling', type=int)
+        cumulative = request.args.get('cumulative', 0, type=int) == 1
 
         # Validar rango razonable
         if days < 1 or days > 365:
@@ -85,14 +97,26 @@ def status_trends():
                 }
             }), 400
 
-        trends = DashboardService.get_status_trends(days=days)
+        if granularity not in GRANULARITIES or (rolling is not None and rolling < 1):
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': 'granularity debe ser day, week o month y rolling mayor que 0',
+                    'details': {}
+                }
+            }), 400
+
+        options = {'days': days, 'granularity': granularity,
+                   'rolling': rolling, 'cumulative': cumulative}
+        series = DashboardService.get_status_series(**options)
+        data = {'trends': series.to_records(), **options}
+        if request.args.get('format') == 'plotly':
+            data['figure'] = DashboardService.status_trends_figure(series)
 
         return jsonify({
             'success': True,
-            'data': {
-                'trends': trends,
-                'days': days
-            }
+            'data': data
         }), 200
     except Exception as e:
         return jsonify({
@@ -191,17 +215,19 @@ def full_dashboard():
     Obtener todos los datos del dashboard en una sola llamada.
 
     Combina todas las metricas individuales para el consumo del frontend.
+    Servido desde el snapshot cacheado; con ``If-None-Match`` igual al ETag
+    vigente responde 304 sin cuerpo.
 
     Returns:
-        JSON con datos completos del dashboard.
+        JSON con datos completos del dashboard (304 si no cambió).
     """
     try:
-        data = DashboardService.get_full_dashboard_data()
+        snapshot = DashboardService.get_snapshot()
 
-        return jsonify({
+        return _conditional_json({
             'success': True,
-            'data': data
-        }), 200
+            'data': snapshot['data']
+        }, snapshot['etag'])
     except Exception as e:
         return jsonify({
             'success': False,
@@ -223,74 +249,31 @@ def ordenes_trabajo_estadisticas():
         JSON con estadisticas por status, totales, ordenes recientes
         y ordenes que requieren atencion.
     """
-    from app.database.models.orden_trabajo import OrdenTrabajo, OTStatus
-    from app.database.models.pedido import Pedido, PedidoStatus
     from app.services.orden_trabajo_service import OrdenTrabajoService
 
     try:
-        # Obtener estadisticas base del servicio
-        stats_servicio = OrdenTrabajoService.obtener_estadisticas()
-
-        # Estadisticas por status
-        por_status = {}
-        for status in [OTStatus.PENDIENTE, OTStatus.EN_PROGRESO, OTStatus.COMPLETADA]:
-            por_status[status] = OrdenTrabajo.query.filter_by(status=status).count()
-
-        # Total de ordenes
-        total_ordenes = OrdenTrabajo.query.filter(
-            OrdenTrabajo.status != 'ELIMINADA'
-        ).count()
-
-        # Contar pedidos asociados a ordenes de trabajo
-        total_pedidos_asociados = db.session.query(Pedido).filter(
-            Pedido.orden_trabajo_id.isnot(None)
-        ).count()
-
-        # Completadas este mes
-        hoy = datetime.utcnow()
-        inicio_mes = hoy.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        completadas_este_mes = OrdenTrabajo.query.filter(
-            OrdenTrabajo.status == OTStatus.COMPLETADA,
-            OrdenTrabajo.fech_completado >= inicio_mes
-        ).count()
-
-        # Ordenes recientes (ultimas 5 creadas)
-        recientes = OrdenTrabajo.query.filter(
-            OrdenTrabajo.status != 'ELIMINADA'
-        ).order_by(db.desc(OrdenTrabajo.fech_creacion)).limit(5).all()
-
-        # Ordenes que requieren atencion
-        # OTs EN_PROGRESO con pedidos antiguos (> 30 dias)
-        fecha_limite = hoy - timedelta(days=30)
-
-        # Buscar OTs EN_PROGRESO que tienen pedidos con fech_pedido > 30 dias
-        ordenes_con_pedidos_antiguos = db.session.query(OrdenTrabajo).join(
-            Pedido, OrdenTrabajo.id == Pedido.orden_trabajo_id
-        ).filter(
-            OrdenTrabajo.status == OTStatus.EN_PROGRESO,
-            Pedido.fech_pedido < fecha_limite,
-            Pedido.status != PedidoStatus.COMPLETADO
-        ).distinct().all()
-
-        requieren_atencion = []
-        for orden in ordenes_con_pedidos_antiguos:
-            requieren_atencion.append({
-                'id': orden.id,
-                'nro_ofic': orden.nro_ofic,
-                'motivo': 'Pedidos pendientes > 30 dias'
-            })
+        # Estadisticas agregadas (cacheadas) del servicio
+        stats = OrdenTrabajoService.obtener_estadisticas()
 
         return jsonify({
             'success': True,
             'data': {
-                'por_status': por_status,
+                'por_status': stats['por_estado'],
                 'totales': {
-                    'ordenes': total_ordenes,
-                    'pedidos_asociados': total_pedidos_asociados,
-                    'completadas_este_mes': completadas_este_mes
+                    'ordenes': stats['total'],
+                    'pedidos_asociados': stats['total_pedidos_asociados'],
+                    'completadas_este_mes': stats['completadas_este_mes']
                 },
-                'recientes': [_orden_trabajo_to_dict_mini(o) for o in recientes],
-                'requieren_atencion': requieren_atencion
+                'recientes': [
+                    {
+                        'id': orden['id'],
+                        'nro_ofic': orden['nro_ofic'],
+                        'cliente': orden['cliente'],
+                        'status': orden['status']
+                    }
+                    for orden in stats['ordenes_recientes']
+                ],
+                'requieren_atencion': stats['requieren_atencion']
             }
         }), 200
     except Exception as e:
@@ -80,6 +80,77 @@ def listar_ensayos_catalogo():
         }), 500
 
 
+@ensayos_catalog_bp.route('/detalles-ensayo', methods=['GET'])
+@login_required
+def listar_detalles_paginados():
+    """Listar detalles de ensayo con filtros y paginación.
+
+    Query params:
+        entrada_id, tecnico_id, area_id (int, opcionales): Filtros.
+        estado (str, opcional): Filtrar por estado.
+        page, per_page (int): Paginación por OFFSET (por defecto).
+        after (str, opcional): Cursor de paginación por keyset; presente
+            (aunque vacío) activa el modo cursor.
+        total (str, opcional): 'exact', 'estimate' o 'none'.
+        sort_by, sort_order: Campo y dirección de orden (default: id desc).
+
+    Returns:
+        JSON con la lista de detalles y la metadata de paginación.
+    """
+    try:
+        from app.services.detalle_ensayo_service import DetalleEnsayoService
+        from app.utils.pagination import cursor_args, cursor_meta
+
+        filtros = {
+            'entrada_id': request.args.get('entrada_id', type=int),
+            'tecnico_id': request.args.get('tecnico_id', type=int),
+            'area_id': request.args.get('area_id', type=int),
+            'estado': request.args.get('estado'),
+        }
+        filtros = {k: v for k, v in filtros.items() if v is not None}
+
+        cursor, total = cursor_args(request.args)
+        detalles, meta = DetalleEnsayoService.obtener_detalles_paginados(
+            filtros=filtros,
+            pagina=request.args.get('page', 1, type=int),
+            por_pagina=request.args.get('per_page', 20, type=int),
+            ordenar_por=request.args.get('sort_by', 'id'),
+            orden=request.args.get('sort_order', 'desc'),
+            cursor=cursor,
+            total=total,
+        )
+
+        return jsonify({
+            'success': True,
+            'data': [d.to_dict() for d in detalles],
+            'meta': cursor_meta(meta) if cursor is not None else {
+                'page': meta['pagina'],
+                'per_page': meta['por_pagina'],
+                'total': meta['total'],
+                'total_pages': meta['total_paginas'],
+            },
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': str(e),
+                'details': {}
+            }
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': str(e),
+                'details': {}
+            }
+        }), 500
+
+
 # ---------------------------------------------------------------------------
 # Detalles de ensayo por entrada
 # ---------------------------------------------------------------------------
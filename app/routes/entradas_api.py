@@ -6,6 +6,7 @@ from flask_babel import _
 
 from app.decorators import technician_required
 from app.services.entrada_service import EntradaService
+from app.utils.pagination import cursor_args
 
 entradas_api_bp = Blueprint('entradas_api', __name__, url_prefix='/api/entradas')
 
@@ -63,13 +64,16 @@ def listar_entradas():
         por_pagina = request.args.get('per_page', 20, type=int)
         ordenar_por = request.args.get('sort_by', 'fech_entrada')
         orden = request.args.get('sort_order', 'desc')
+        cursor, total = cursor_args(request.args)
 
         entradas, meta = EntradaService.obtener_entradas_paginadas(
             filtros=filtros,
             pagina=pagina,
             por_pagina=por_pagina,
             ordenar_por=ordenar_por,
-            orden=orden
+            orden=orden,
+            cursor=cursor,
+            total=total
         )
 
         return jsonify({
@@ -79,6 +83,15 @@ def listar_entradas():
                 'pagination': meta
             }
         }), 200
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': str(e),
+                'details': {}
+            }
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -50,8 +50,8 @@ def area_view(area_sigla):
     if area:
         ensayos = Ensayo.query.filter_by(area_id=area.id, activo=True).order_by(Ensayo.nombre_corto).all()
 
-    # Obtener estadísticas de la entrada
-    from app.database.models.detalle_ensayo import DetalleEnsayo, DetalleEnsayoStatus
+    # Obtener estadísticas del área (contador ensayo × estado)
+    from app.services.lab_area_service import LabAreaService
 
     stats = {
         'pendiente': 0,
@@ -62,19 +62,7 @@ def area_view(area_sigla):
     }
 
     if area:
-        # Contar detalles por estado para esta área
-        detalles = DetalleEnsayo.query.join(Ensayo).filter(Ensayo.area_id == area.id).all()
-        for d in detalles:
-            if d.estado == DetalleEnsayoStatus.PENDIENTE.value:
-                stats['pendiente'] += 1
-            elif d.estado == DetalleEnsayoStatus.ASIGNADO.value:
-                stats['asignado'] += 1
-            elif d.estado == DetalleEnsayoStatus.EN_PROCESO.value:
-                stats['en_proceso'] += 1
-            elif d.estado == DetalleEnsayoStatus.COMPLETADO.value:
-                stats['completado'] += 1
-            elif d.estado == DetalleEnsayoStatus.REPORTADO.value:
-                stats['reportado'] += 1
+        stats = LabAreaService.get_area_stats(area.id)
 
     return render_template(
         'lab/area.html',
@@ -96,7 +84,7 @@ def area_stats(area_sigla):
     from flask import jsonify
     from app.database.models.reference import Area
     from app.database.models.ensayo import Ensayo
-    from app.database.models.detalle_ensayo import DetalleEnsayo, DetalleEnsayoStatus
+    from app.services.lab_area_service import LabAreaService
 
     area = Area.query.filter_by(sigla=area_sigla.upper()).first()
     if not area:
@@ -106,16 +94,10 @@ def area_stats(area_sigla):
     total_ensayos = Ensayo.query.filter_by(area_id=area.id, activo=True).count()
 
     # Contar detalles por estado
-    detalles = DetalleEnsayo.query.join(Ensayo).filter(Ensayo.area_id == area.id).all()
-
     stats = {
         'area': area_sigla.upper(),
         'total_ensayos': total_ensayos,
-        'pendiente': sum(1 for d in detalles if d.estado == DetalleEnsayoStatus.PENDIENTE.value),
-        'asignado': sum(1 for d in detalles if d.estado == DetalleEnsayoStatus.ASIGNADO.value),
-        'en_proceso': sum(1 for d in detalles if d.estado == DetalleEnsayoStatus.EN_PROCESO.value),
-        'completado': sum(1 for d in detalles if d.estado == DetalleEnsayoStatus.COMPLETADO.value),
-        'reportado': sum(1 for d in detalles if d.estado == DetalleEnsayoStatus.REPORTADO.value),
+        **LabAreaService.get_area_stats(area.id),
     }
 
     return jsonify(stats)
\ No newline at end of file
@@ -3,16 +3,30 @@
 Endpoints para consultar, marcar como leídas y gestionar preferencias
 de notificaciones del usuario autenticado.
 """
-from flask import Blueprint, request, jsonify
+import json
+import time
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_login import login_required, current_user
 
 from app import db
+from app.services.notification_counter import NotificationCounters
 from app.services.notification_service import NotificationService
 from app.database.models.notification import Notification
 from app.database.models.notification_preference import NotificationPreference
 
 notifications_api_bp = Blueprint('notifications_api', __name__, url_prefix='/api/notifications')
 
+# Long-poll: espera máxima por request (por debajo del timeout de los proxies)
+POLL_DEFAULT_TIMEOUT = 25
+POLL_MAX_TIMEOUT = 55
+
+# SSE: comentario de keep-alive cada N segundos y cierre tras la duración máxima
+# (el navegador reconecta con Last-Event-ID)
+STREAM_HEARTBEAT = 15
+STREAM_MAX_DURATION = 300
+STREAM_RETRY_MS = 3000
+
 
 @notifications_api_bp.route('', methods=['GET'])
 @login_required
@@ -71,13 +85,15 @@ def get_unread_count():
     """Obtener cantidad de notificaciones no leídas del usuario actual.
 
     Returns:
-        JSON con el conteo de notificaciones no leídas.
+        JSON con el conteo de notificaciones no leídas y ``realtime``
+        (si el cliente puede usar SSE/long-poll en lugar de polling).
     """
     try:
         count = NotificationService.get_unread_count(current_user.id)
         return jsonify({
             'success': True,
-            'count': count
+            'count': count,
+            'realtime': NotificationCounters.realtime_available()
         }), 200
 
     except Exception as e:
@@ -91,6 +107,151 @@ def get_unread_count():
         }), 500
 
 
+@notifications_api_bp.route('/poll', methods=['GET'])
+@login_required
+def poll_notifications():
+    """Long-poll: esperar notificaciones nuevas o un cambio en el conteo.
+
+    La espera solo consulta los contadores en caché, no la base. Sin un
+    backend de caché compartido (Redis) no se espera: la respuesta es
+    inmediata, con ``realtime`` en False, y el cliente debe usar polling.
+
+    Query params:
+        since (int): Id de la última notificación que tiene el cliente (default: 0)
+        count (int): Conteo de no leídas que muestra el cliente (opcional)
+        timeout (int): Segundos máximos de espera (default: 25, máx: 55)
+
+    Returns:
+        JSON con changed, unread_count, latest_id y las notificaciones nuevas.
+    """
+    try:
+        user_id = current_user.id
+        since = max(request.args.get('since', 0, type=int), 0)
+        known_count = request.args.get('count', None, type=int)
+        timeout = request.args.get('timeout', POLL_DEFAULT_TIMEOUT, type=int)
+        timeout = min(max(timeout, 0), POLL_MAX_TIMEOUT)
+        realtime = NotificationCounters.realtime_available()
+        if not realtime:
+            # Los contadores son del proceso: esperar no vería cambios de otros
+            timeout = 0
+
+        update = NotificationCounters.wait_for_update(user_id, since, known_count, timeout)
+
+        if update is None:
+            state = NotificationCounters.snapshot(user_id)
+            return jsonify({
+                'success': True,
+                'changed': False,
+                'unread_count': state['unread_count'],
+                'latest_id': state['latest_id'],
+                'notifications': [],
+                'realtime': realtime
+            }), 200
+
+        return jsonify({
+            'success': True,
+            'changed': True,
+            'unread_count': update['unread_count'],
+            'latest_id': update['latest_id'],
+            'notifications': update['notifications'],
+            'realtime': realtime
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': str(e),
+                'details': {}
+            }
+        }), 500
+
+
+def _sse_event(event_name, data, event_id=None):
+    """Formatear un evento Server-Sent Events."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_name}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+@notifications_api_bp.route('/stream', methods=['GET'])
+@login_required
+def stream_notifications():
+    """Server-Sent Events con las notificaciones del usuario actual.
+
+    Emite un evento ``notifications`` al conectar (estado actual) y cada vez
+    que llegan notificaciones nuevas o cambia el conteo de no leídas. El id
+    del evento es el de la última notificación, así una reconexión con
+    ``Last-Event-ID`` recibe lo que se perdió. La conexión se cierra tras
+    STREAM_MAX_DURATION segundos y el navegador reconecta.
+
+    Solo disponible con un backend de caché compartido (Redis); si no,
+    responde 503 y el cliente vuelve al polling por intervalo.
+
+    Query params:
+        since (int): Última notificación conocida si no hay Last-Event-ID
+
+    Returns:
+        Stream ``text/event-stream``, o JSON con error 503.
+    """
+    if not NotificationCounters.realtime_available():
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'REALTIME_UNAVAILABLE',
+                'message': 'Notificaciones en tiempo real no disponibles sin Redis',
+                'details': {}
+            }
+        }), 503
+
+    user_id = current_user.id
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', None, type=int)
+
+    def generate():
+        last_id = since
+        known_count = None
+        deadline = time.monotonic() + STREAM_MAX_DURATION
+
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+
+        # Estado inicial (y lo perdido desde Last-Event-ID, si vino)
+        state = None
+        if last_id is not None:
+            state = NotificationCounters.wait_for_update(user_id, last_id, None, 0)
+        if state is None:
+            state = NotificationCounters.snapshot(user_id)
+            state['notifications'] = []
+        db.session.remove()
+        last_id = state['latest_id']
+        known_count = state['unread_count']
+        yield _sse_event('notifications', state, last_id)
+
+        while time.monotonic() < deadline:
+            wait = min(STREAM_HEARTBEAT, max(deadline - time.monotonic(), 0))
+            update = NotificationCounters.wait_for_update(user_id, last_id, known_count, wait)
+            if update is None:
+                yield ': keep-alive\n\n'
+                continue
+            last_id = max(last_id, update['latest_id'])
+            known_count = update['unread_count']
+            yield _sse_event('notifications', update, last_id)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        }
+    )
+
+
 @notifications_api_bp.route('/<int:id>/read', methods=['POST'])
 @login_required
 def mark_notification_read(id):
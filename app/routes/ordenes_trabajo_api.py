@@ -5,6 +5,7 @@ from flask_babel import _
 
 from app.decorators import technician_required
 from app.services.orden_trabajo_service import OrdenTrabajoService
+from app.utils.pagination import cursor_args, cursor_meta
 
 ordenes_trabajo_api_bp = Blueprint('ordenes_trabajo_api', __name__, url_prefix='/api/ordenes-trabajo')
 clientes_ordenes_api_bp = Blueprint('clientes_ordenes_api', __name__, url_prefix='/api/clientes')
@@ -83,25 +84,37 @@ def listar_ordenes_trabajo():
         por_pagina = request.args.get('per_page', 20, type=int)
         ordenar_por = request.args.get('sort_by', 'fech_creacion')
         orden = request.args.get('sort_order', 'desc')
+        cursor, total = cursor_args(request.args)
 
         ordenes, meta = OrdenTrabajoService.obtener_ordenes_paginadas(
             filtros=filtros,
             pagina=pagina,
             por_pagina=por_pagina,
             ordenar_por=ordenar_por,
-            orden=orden
+            orden=orden,
+            cursor=cursor,
+            total=total
         )
 
         return jsonify({
             'success': True,
             'data': [_orden_trabajo_to_dict(o) for o in ordenes],
-            'meta': {
+            'meta': cursor_meta(meta) if cursor is not None else {
                 'page': meta['pagina'],
                 'per_page': meta['por_pagina'],
                 'total': meta['total'],
                 'total_pages': meta['total_paginas']
             }
         }), 200
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': str(e),
+                'details': {}
+            }
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -399,25 +412,37 @@ def obtener_ordenes_por_cliente(cliente_id):
         por_pagina = request.args.get('per_page', 20, type=int)
         ordenar_por = request.args.get('sort_by', 'fech_creacion')
         orden = request.args.get('sort_order', 'desc')
+        cursor, total = cursor_args(request.args)
 
         ordenes, meta = OrdenTrabajoService.obtener_ordenes_paginadas(
             filtros={'cliente_id': cliente_id},
             pagina=pagina,
             por_pagina=por_pagina,
             ordenar_por=ordenar_por,
-            orden=orden
+            orden=orden,
+            cursor=cursor,
+            total=total
         )
 
         return jsonify({
             'success': True,
             'data': [_orden_trabajo_to_dict(o) for o in ordenes],
-            'meta': {
+            'meta': cursor_meta(meta) if cursor is not None else {
                 'page': meta['pagina'],
                 'per_page': meta['por_pagina'],
                 'total': meta['total'],
                 'total_pages': meta['total_paginas']
             }
         }), 200
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': str(e),
+                'details': {}
+            }
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -5,6 +5,7 @@ from flask_babel import _
 
 from app.decorators import technician_required
 from app.services.pedido_service import PedidoService
+from app.utils.pagination import cursor_args, cursor_meta
 
 pedidos_api_bp = Blueprint('pedidos_api', __name__, url_prefix='/api/pedidos')
 clientes_pedidos_api_bp = Blueprint('clientes_pedidos_api', __name__, url_prefix='/api/clientes')
@@ -86,25 +87,37 @@ def listar_pedidos():
         por_pagina = request.args.get('per_page', 20, type=int)
         ordenar_por = request.args.get('sort_by', 'fech_pedido')
         orden = request.args.get('sort_order', 'desc')
+        cursor, total = cursor_args(request.args)
 
         pedidos, meta = PedidoService.obtener_pedidos_paginados(
             filtros=filtros,
             pagina=pagina,
             por_pagina=por_pagina,
             ordenar_por=ordenar_por,
-            orden=orden
+            orden=orden,
+            cursor=cursor,
+            total=total
         )
 
         return jsonify({
             'success': True,
             'data': [_pedido_to_dict(p) for p in pedidos],
-            'meta': {
+            'meta': cursor_meta(meta) if cursor is not None else {
                 'page': meta['pagina'],
                 'per_page': meta['por_pagina'],
                 'total': meta['total'],
                 'total_pages': meta['total_paginas']
             }
         }), 200
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': str(e),
+                'details': {}
+            }
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -258,25 +271,37 @@ def obtener_pedidos_por_cliente(cliente_id):
         por_pagina = request.args.get('per_page', 20, type=int)
         ordenar_por = request.args.get('sort_by', 'fech_pedido')
         orden = request.args.get('sort_order', 'desc')
+        cursor, total = cursor_args(request.args)
 
         pedidos, meta = PedidoService.obtener_pedidos_paginados(
             filtros={'cliente_id': cliente_id},
             pagina=pagina,
             por_pagina=por_pagina,
             ordenar_por=ordenar_por,
-            orden=orden
+            orden=orden,
+            cursor=cursor,
+            total=total
         )
 
         return jsonify({
             'success': True,
             'data': [_pedido_to_dict(p) for p in pedidos],
-            'meta': {
+            'meta': cursor_meta(meta) if cursor is not None else {
                 'page': meta['pagina'],
                 'per_page': meta['por_pagina'],
                 'total': meta['total'],
                 'total_pages': meta['total_paginas']
             }
         }), 200
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': str(e),
+                'details': {}
+            }
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -2,12 +2,12 @@
 from datetime import datetime
 from flask import Blueprint, render_template, jsonify, request, abort
 from flask_login import current_user, login_required
-from sqlalchemy import func
 
 from app import db
 from app.database.models.detalle_ensayo import DetalleEnsayo, DetalleEnsayoStatus
 from app.database.models.ensayo import Ensayo
 from app.database.models.reference import Area
+from app.services.tecnico_metrics_service import TecnicoMetricsService
 
 tecnico_bp = Blueprint('tecnico', __name__, url_prefix='/tecnico')
 
@@ -22,34 +22,17 @@ def dashboard():
     """Dashboard del técnico con estadísticas y ensayos pendientes."""
     from datetime import timedelta
 
-    # Obtener todos los detalles en estado ASIGNADO o EN_PROCESO para el técnico actual
-    detalles_asignados = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id
-    ).all()
-
-    # Calcular estadísticas
+    # Calcular estadísticas (consultas agrupadas, cacheadas por técnico)
+    metricas = TecnicoMetricsService.get_metrics(current_user.id)
+    por_estado = metricas['por_estado']
     stats = {
-        'asignado': 0,
-        'en_proceso': 0,
-        'completado_hoy': 0,
-        'reportado': 0,
-        'pausado': 0,
+        'asignado': por_estado[DetalleEnsayoStatus.ASIGNADO.value],
+        'en_proceso': por_estado[DetalleEnsayoStatus.EN_PROCESO.value],
+        'completado_hoy': metricas['completados_hoy'],
+        'reportado': por_estado[DetalleEnsayoStatus.REPORTADO.value],
+        'pausado': por_estado[DetalleEnsayoStatus.PAUSADO.value],
     }
 
-    hoy = datetime.utcnow().date()
-    for d in detalles_asignados:
-        if d.estado == DetalleEnsayoStatus.ASIGNADO.value:
-            stats['asignado'] += 1
-        elif d.estado == DetalleEnsayoStatus.EN_PROCESO.value:
-            stats['en_proceso'] += 1
-        elif d.estado == DetalleEnsayoStatus.PAUSADO.value:
-            stats['pausado'] += 1
-        elif d.estado == DetalleEnsayoStatus.COMPLETADO.value:
-            if d.fecha_completado and d.fecha_completado.date() == hoy:
-                stats['completado_hoy'] += 1
-        elif d.estado == DetalleEnsayoStatus.REPORTADO.value:
-            stats['reportado'] += 1
-
     # Obtener ensayos pendientes de ejecución (ASIGNADO, EN_PROCESO o PAUSADO)
     detalles_pendientes = (
         DetalleEnsayo.query
@@ -125,16 +108,14 @@ def dashboard():
 @login_required
 def api_stats():
     """API para obtener estadísticas del técnico."""
-    detalles = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id
-    ).all()
+    por_estado = TecnicoMetricsService.get_metrics(current_user.id)['por_estado']
 
     stats = {
-        'total': len(detalles),
-        'asignado': sum(1 for d in detalles if d.estado == DetalleEnsayoStatus.ASIGNADO.value),
-        'en_proceso': sum(1 for d in detalles if d.estado == DetalleEnsayoStatus.EN_PROCESO.value),
-        'completado': sum(1 for d in detalles if d.estado == DetalleEnsayoStatus.COMPLETADO.value),
-        'reportado': sum(1 for d in detalles if d.estado == DetalleEnsayoStatus.REPORTADO.value),
+        'total': sum(por_estado.values()),
+        'asignado': por_estado[DetalleEnsayoStatus.ASIGNADO.value],
+        'en_proceso': por_estado[DetalleEnsayoStatus.EN_PROCESO.value],
+        'completado': por_estado[DetalleEnsayoStatus.COMPLETADO.value],
+        'reportado': por_estado[DetalleEnsayoStatus.REPORTADO.value],
     }
 
     return jsonify(stats)
@@ -368,18 +349,12 @@ def api_batch_iniciar():
             'error': 'Se requiere una lista de IDs de ensayos'
         }), 400
 
-    resultados = []
-    errores = []
-
-    for detalle_id in detalle_ids:
-        try:
-            detalle = DetalleEnsayoService.iniciar_ensayo(
-                detalle_id=detalle_id,
-                usuario_id=current_user.id
-            )
-            resultados.append({'id': detalle_id, 'success': True})
-        except ValueError as e:
-            errores.append({'id': detalle_id, 'error': str(e)})
+    lote = DetalleEnsayoService.iniciar_ensayos(
+        detalle_ids=detalle_ids,
+        usuario_id=current_user.id
+    )
+    resultados = [{'id': detalle_id, 'success': True} for detalle_id in lote['exitosos']]
+    errores = lote['errores']
 
     return jsonify({
         'success': True,
@@ -407,19 +382,13 @@ def api_batch_completar():
             'error': 'Se requiere una lista de IDs de ensayos'
         }), 400
 
-    resultados = []
-    errores = []
-
-    for detalle_id in detalle_ids:
-        try:
-            detalle = DetalleEnsayoService.completar_ensayo(
-                detalle_id=detalle_id,
-                observaciones=observaciones,
-                usuario_id=current_user.id
-            )
-            resultados.append({'id': detalle_id, 'success': True})
-        except ValueError as e:
-            errores.append({'id': detalle_id, 'error': str(e)})
+    lote = DetalleEnsayoService.completar_ensayos(
+        detalle_ids=detalle_ids,
+        observaciones=observaciones,
+        usuario_id=current_user.id
+    )
+    resultados = [{'id': detalle_id, 'success': True} for detalle_id in lote['exitosos']]
+    errores = lote['errores']
 
     return jsonify({
         'success': True,
@@ -439,169 +408,36 @@ def api_batch_completar():
 @login_required
 def metricas():
     """Dashboard de métricas del técnico."""
-    from datetime import timedelta
-
-    ahora = datetime.utcnow()
-    hoy = ahora.date()
-    inicio_semana = hoy - timedelta(days=hoy.weekday())
-    inicio_mes = hoy.replace(day=1)
-
-    # Tests completados hoy
-    completados_hoy = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id,
-        DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-        func.date(DetalleEnsayo.fecha_completado) == hoy
-    ).count()
-
-    # Tests completados esta semana
-    completados_semana = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id,
-        DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-        func.date(DetalleEnsayo.fecha_completado) >= inicio_semana
-    ).count()
-
-    # Tests completados este mes
-    completados_mes = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id,
-        DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-        func.date(DetalleEnsayo.fecha_completado) >= inicio_mes
-    ).count()
-
-    # Tests por tipo (FQ, MB, ES)
-    tests_por_tipo = {}
-    for area_sigla in ['FQ', 'MB', 'ES']:
-        area = Area.query.filter_by(sigla=area_sigla).first()
-        if area:
-            count = DetalleEnsayo.query.join(Ensayo).filter(
-                DetalleEnsayo.tecnico_asignado_id == current_user.id,
-                DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-                Ensayo.area_id == area.id
-            ).count()
-            tests_por_tipo[area_sigla] = count
-
-    # Eficiencia: completados a tiempo / total completados
-    # Consideramos "a tiempo" si se completaron en menos de 48 horas desde asignación
-    eficiencia = 0
-    total_completados = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id,
-        DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-        DetalleEnsayo.fecha_completado.isnot(None),
-        DetalleEnsayo.fecha_asignacion.isnot(None)
-    ).all()
-
-    if total_completados:
-        a_tiempo = sum(
-            1 for d in total_completados
-            if d.fecha_completado and d.fecha_asignacion
-            and (d.fecha_completado - d.fecha_asignacion).total_seconds() < 48 * 3600
-        )
-        eficiencia = round((a_tiempo / len(total_completados)) * 100, 1)
-
-    # Tendencia semanal (últimos 7 días)
-    tendencia_semanal = []
-    for i in range(6, -1, -1):
-        dia = hoy - timedelta(days=i)
-        count = DetalleEnsayo.query.filter(
-            DetalleEnsayo.tecnico_asignado_id == current_user.id,
-            DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-            func.date(DetalleEnsayo.fecha_completado) == dia
-        ).count()
-        tendencia_semanal.append({
-            'dia': dia.strftime('%a'),
-            'fecha': dia.isoformat(),
-            'count': count
-        })
+    stats = TecnicoMetricsService.get_metrics(current_user.id)
 
-    # Tests en curso
-    en_proceso = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id,
-        DetalleEnsayo.estado == DetalleEnsayoStatus.EN_PROCESO.value
-    ).count()
-
-    pausados = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id,
-        DetalleEnsayo.estado == DetalleEnsayoStatus.PAUSADO.value
-    ).count()
-
-    stats = {
-        'completados_hoy': completados_hoy,
-        'completados_semana': completados_semana,
-        'completados_mes': completados_mes,
-        'tests_por_tipo': tests_por_tipo,
-        'eficiencia': eficiencia,
-        'tendencia_semanal': tendencia_semanal,
-        'en_proceso': en_proceso,
-        'pausados': pausados,
-        'total_completados': len(total_completados),
-    }
-
-    return render_template('tecnico/metricas.html', stats=stats)
+    return render_template(
+        'tecnico/metricas.html',
+        stats=stats,
+        stats_por_tipo=[
+            {'nombre': sigla, 'count': count}
+            for sigla, count in stats['tests_por_tipo'].items()
+        ],
+        evolucion=[
+            {'fecha': dia['fecha'], 'cantidad': dia['count']}
+            for dia in stats['tendencia_semanal']
+        ],
+        rendimiento_por_area=stats['rendimiento_por_area'],
+    )
 
 
 @tecnico_bp.route('/api/metricas')
 @login_required
 def api_metricas():
     """API de métricas en JSON."""
-    from datetime import timedelta
-
-    ahora = datetime.utcnow()
-    hoy = ahora.date()
-    inicio_semana = hoy - timedelta(days=hoy.weekday())
-    inicio_mes = hoy.replace(day=1)
-
-    # Completados por período
-    completados_hoy = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id,
-        DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-        func.date(DetalleEnsayo.fecha_completado) == hoy
-    ).count()
-
-    completados_semana = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id,
-        DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-        func.date(DetalleEnsayo.fecha_completado) >= inicio_semana
-    ).count()
-
-    completados_mes = DetalleEnsayo.query.filter(
-        DetalleEnsayo.tecnico_asignado_id == current_user.id,
-        DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-        func.date(DetalleEnsayo.fecha_completado) >= inicio_mes
-    ).count()
-
-    # Tests por área
-    tests_por_tipo = {}
-    for area_sigla in ['FQ', 'MB', 'ES']:
-        area = Area.query.filter_by(sigla=area_sigla).first()
-        if area:
-            count = DetalleEnsayo.query.join(Ensayo).filter(
-                DetalleEnsayo.tecnico_asignado_id == current_user.id,
-                DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-                Ensayo.area_id == area.id
-            ).count()
-            tests_por_tipo[area_sigla] = count
-
-    # Tendencia semanal
-    tendencia_semanal = []
-    for i in range(6, -1, -1):
-        dia = hoy - timedelta(days=i)
-        count = DetalleEnsayo.query.filter(
-            DetalleEnsayo.tecnico_asignado_id == current_user.id,
-            DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-            func.date(DetalleEnsayo.fecha_completado) == dia
-        ).count()
-        tendencia_semanal.append({
-            'dia': dia.strftime('%a'),
-            'fecha': dia.isoformat(),
-            'count': count
-        })
+    metricas = TecnicoMetricsService.get_metrics(current_user.id)
 
     return jsonify({
         'success': True,
         'data': {
-            'completados_hoy': completados_hoy,
-            'completados_semana': completados_semana,
-            'completados_mes': completados_mes,
-            'tests_por_tipo': tests_por_tipo,
-            'tendencia_semanal': tendencia_semanal,
+            'completados_hoy': metricas['completados_hoy'],
+            'completados_semana': metricas['completados_semana'],
+            'completados_mes': metricas['completados_mes'],
+            'tests_por_tipo': metricas['tests_por_tipo'],
+            'tendencia_semanal': metricas['tendencia_semanal'],
         }
     })
\ No newline at end of file
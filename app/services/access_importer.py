@@ -1,10 +1,16 @@
 """Servicio para importar datos desde Access RM2026."""
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Sequence, Tuple
 from datetime import datetime
 from decimal import Decimal
 
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
 from app import db
+from app.services.search_index import SearchIndexService
+from app.utils import access_reader
 
 logger = logging.getLogger(__name__)
 
@@ -14,13 +20,21 @@ class AccessImporter:
     Importador de datos desde Microsoft Access.
 
     Características:
-    - Conexión vía pyodbc
+    - Conexión vía pyodbc (o cualquier conexión DB-API inyectada)
+    - Lectura por streaming (fetchmany) sin cargar la tabla en memoria
     - Mapeo de campos Access -> PostgreSQL
     - Transformación de tipos (BIT -> Boolean, CURRENCY -> Numeric)
+    - Upsert masivo por lotes (INSERT ... ON CONFLICT DO UPDATE)
     - Validación de integridad referencial
     - Reporte de estadísticas
     """
 
+    # Filas por sentencia de upsert y por commit
+    BATCH_SIZE = 500
+
+    # Filas por lectura del cursor de Access
+    FETCH_SIZE = access_reader.DEFAULT_FETCH_SIZE
+
     TABLE_MAPPING = {
         'reference': {
             'Areas': {
@@ -150,7 +164,13 @@ class AccessImporter:
         'EnsayosXProductos': 500
     }
 
-    def __init__(self, access_db_path: str, dry_run: bool = False):
+    def __init__(self, access_db_path: str, dry_run: bool = False, connection=None):
+        """
+        Args:
+            access_db_path: Ruta al archivo .accdb
+            dry_run: Si True, solo cuenta sin escribir
+            connection: Conexión DB-API ya abierta (por defecto se abre con pyodbc)
+        """
         self.access_db_path = access_db_path
         self.dry_run = dry_run
         self.stats = {
@@ -159,26 +179,16 @@ class AccessImporter:
             'skipped': 0,
             'errors': 0
         }
-        self._access_conn = None
+        self._access_conn = connection
         self._model_cache: Dict[str, Any] = {}
+        self.row_errors: List[Dict[str, Any]] = []
+        # Entidades indexadas con filas insertadas sin clave (se reconstruyen al terminar)
+        self._search_rebuild: set = set()
 
     def connect_to_access(self):
         """Establecer conexión a Access vía pyodbc."""
-        try:
-            import pyodbc
-            conn_str = (
-                r'DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};'
-                r'DBQ=' + self.access_db_path + ';'
-            )
-            self._access_conn = pyodbc.connect(conn_str)
-            logger.info(f"Conectado a Access: {self.access_db_path}")
-            return self._access_conn
-        except ImportError:
-            logger.error("pyodbc no está instalado. Instalar con: pip install pyodbc")
-            raise
-        except Exception as e:
-            logger.error(f"Error conectando a Access: {e}")
-            raise
+        self._access_conn = access_reader.connect(self.access_db_path)
+        return self._access_conn
 
     def _get_model_class(self, model_name: str):
         """Obtener clase de modelo por nombre (con cache)."""
@@ -239,100 +249,248 @@ class AccessImporter:
 
         return value
 
-    def _fetch_access_data(self, table_name: str) -> List[Dict[str, Any]]:
-        """Obtener datos desde Access."""
+    def _stream_access_data(self, table_name: str) -> Tuple[List[str], Iterator[Sequence[Any]]]:
+        """
+        Leer una tabla de Access por streaming.
+
+        Returns:
+            (columnas, iterador de filas como tuplas)
+        """
         if self._access_conn is None:
             self.connect_to_access()
 
-        cursor = self._access_conn.cursor()
         try:
-            cursor.execute(f"SELECT * FROM [{table_name}]")
-            columns = [desc[0] for desc in cursor.description]
-            rows = []
-            for row in cursor.fetchall():
-                row_dict = {}
-                for i, col in enumerate(columns):
-                    row_dict[col] = row[i]
-                rows.append(row_dict)
-            return rows
+            return access_reader.stream_query(
+                self._access_conn, f"SELECT * FROM [{table_name}]", self.FETCH_SIZE
+            )
         except Exception as e:
             logger.error(f"Error leyendo tabla {table_name}: {e}")
             raise
-        finally:
-            cursor.close()
-
-    def _map_row_to_model(self, row: Dict[str, Any], field_mapping: Dict[str, str]) -> Dict[str, Any]:
-        """Mapear fila de Access a diccionario de modelo."""
-        result = {}
-        for access_field, model_field in field_mapping.items():
-            if access_field in row:
-                value = row[access_field]
-                transformed = self._transform_value(value, model_field)
-                result[model_field] = transformed
-        return result
+
+    def _map_row_to_model(self, row: Sequence[Any], index: List[Tuple[str, int]]) -> Dict[str, Any]:
+        """Mapear fila de Access (tupla) a diccionario de modelo."""
+        return {
+            model_field: self._transform_value(row[position], model_field)
+            for model_field, position in index
+        }
+
+    @staticmethod
+    def _primary_key_columns(model_class) -> Tuple[str, ...]:
+        """Nombres de las columnas de la clave primaria del modelo."""
+        return tuple(column.name for column in model_class.__table__.primary_key.columns)
+
+    @staticmethod
+    def _fetch_existing_keys(model_class, pk_columns: Tuple[str, ...]) -> set:
+        """Claves primarias ya presentes en la tabla (una sola consulta)."""
+        table = model_class.__table__
+        result = db.session.execute(select(*(table.c[column] for column in pk_columns)))
+        return {tuple(row) for row in result}
+
+    @staticmethod
+    def _upsert_statement(table, pk_columns: Tuple[str, ...], columns: Tuple[str, ...]):
+        """INSERT ... ON CONFLICT para PostgreSQL/SQLite (None en otros motores)."""
+        dialect = db.session.get_bind().dialect.name
+        if dialect not in ('sqlite', 'postgresql'):
+            return None
+
+        stmt = (sqlite_insert if dialect == 'sqlite' else pg_insert)(table)
+        update_columns = [column for column in columns if column not in pk_columns]
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=list(pk_columns))
+        set_ = {column: stmt.excluded[column] for column in update_columns}
+        # on_conflict_do_update no aplica los onupdate de las columnas (p. ej. fecha_actualizacion)
+        for column in table.columns:
+            if column.onupdate is not None and column.name not in set_ and column.name not in pk_columns:
+                set_[column.name] = AccessImporter._onupdate_value(column.onupdate)
+        return stmt.on_conflict_do_update(index_elements=list(pk_columns), set_=set_)
+
+    @staticmethod
+    def _onupdate_value(default):
+        """Valor de un ``onupdate`` de columna para usar en el SET del upsert."""
+        if default.is_callable:
+            return default.arg(None)
+        return default.arg
+
+    def _write_rows(self, table, pk_columns: Tuple[str, ...], rows: List[Dict[str, Any]]) -> None:
+        """
+        Escribir filas con un executemany por grupo de columnas.
+
+        Las escrituras Core no disparan los eventos de mapper, así que las
+        entidades del índice de búsqueda se reindexan aquí, en la misma
+        transacción.
+        """
+        entity_type = SearchIndexService.entity_type_for_table(table)
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        for columns, group in groups.items():
+            if not all(column in columns for column in pk_columns):
+                # Sin clave primaria: la genera la base (se reindexa la entidad al final)
+                db.session.execute(insert(table), group)
+                if entity_type:
+                    self._search_rebuild.add(entity_type)
+                continue
+
+            stmt = self._upsert_statement(table, pk_columns, columns)
+            if stmt is not None:
+                db.session.execute(stmt, group)
+                continue
+
+            for row in group:
+                condition = and_(*(table.c[column] == row[column] for column in pk_columns))
+                values = {k: v for k, v in row.items() if k not in pk_columns}
+                result = None
+                if values:
+                    result = db.session.execute(update(table).where(condition).values(**values))
+                if result is None or result.rowcount == 0:
+                    exists = db.session.execute(select(table.c[pk_columns[0]]).where(condition)).first()
+                    if exists is None:
+                        db.session.execute(insert(table).values(**row))
+
+        if entity_type and pk_columns == ('id',):
+            ids = [row['id'] for row in rows if row.get('id') is not None]
+            if ids:
+                SearchIndexService.reindex(entity_type, ids)
+
+    @staticmethod
+    def _error_message(error: Exception) -> str:
+        """Mensaje del driver sin el SQL ni los parámetros del lote."""
+        return str(getattr(error, 'orig', None) or error)
+
+    def _record_row_error(self, access_table: str, key: Any, error: Exception) -> None:
+        message = self._error_message(error)
+        self.row_errors.append({'table': access_table, 'key': key, 'error': message})
+        logger.error(f"Error procesando fila {key} en {access_table}: {message}")
+
+    def _write_batch(
+        self,
+        access_table: str,
+        table,
+        pk_columns: Tuple[str, ...],
+        batch: List[Tuple[Optional[tuple], Dict[str, Any]]],
+        existing: set,
+        table_stats: Dict[str, int]
+    ) -> None:
+        """
+        Escribir y confirmar un lote.
+
+        Si el lote falla se revierte y se reintenta fila por fila para
+        aislar las filas con error sin perder el resto.
+        """
+        def count(key):
+            if key is not None and key in existing:
+                table_stats['updated'] += 1
+            else:
+                table_stats['inserted'] += 1
+                if key is not None:
+                    existing.add(key)
+
+        try:
+            self._write_rows(table, pk_columns, [data for _, data in batch])
+            db.session.commit()
+            for key, _ in batch:
+                count(key)
+            return
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(
+                f"Lote de {access_table} falló ({self._error_message(e)}); "
+                f"reintentando fila por fila"
+            )
+
+        for key, data in batch:
+            try:
+                self._write_rows(table, pk_columns, [data])
+                db.session.commit()
+                count(key)
+            except Exception as e:
+                db.session.rollback()
+                table_stats['errors'] += 1
+                self._record_row_error(access_table, key, e)
 
     def _import_table(self, access_table: str, config: Dict[str, Any]) -> Dict[str, int]:
-        """Importar una tabla específica."""
+        """
+        Importar una tabla específica con upsert masivo.
+
+        Las claves existentes se leen en una consulta; las filas de Access se
+        leen por streaming y se escriben en lotes de BATCH_SIZE con
+        INSERT ... ON CONFLICT DO UPDATE, confirmando cada lote. Un error en
+        una fila solo descarta esa fila (queda en ``row_errors``).
+        """
         model_class = self._get_model_class(config['model_class'])
-        field_mapping = config['fields']
+        table = model_class.__table__
+        pk_columns = self._primary_key_columns(model_class)
 
         logger.info(f"Importando {access_table} -> {config['model_class']}...")
 
         try:
-            rows = self._fetch_access_data(access_table)
+            columns, rows = self._stream_access_data(access_table)
         except Exception as e:
             logger.error(f"No se pudo leer tabla {access_table}: {e}")
             return {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': 1}
 
-        table_stats = {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
-
-        for row in rows:
-            try:
-                data = self._map_row_to_model(row, field_mapping)
-
-                pk_field = 'id'
-                pk_value = data.get(pk_field)
+        # Solo los campos mapeados que existen en la tabla destino
+        index = [(field, position)
+                 for field, position in access_reader.column_index(columns, config['fields'])
+                 if field in table.c]
 
-                if pk_value is None and 'anno' in data:
-                    pk_field = 'anno'
-                    pk_value = data.get('anno')
-
-                existing = None
-                if pk_value is not None:
-                    existing = model_class.query.get(pk_value)
-
-                if self.dry_run:
-                    if existing:
+        table_stats = {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
+        existing = self._fetch_existing_keys(model_class, pk_columns)
+
+        # Lote en curso: filas por clave primaria (la última repetida gana) y sin clave
+        keyed: Dict[tuple, Dict[str, Any]] = {}
+        unkeyed: List[Dict[str, Any]] = []
+        total = 0
+
+        def flush():
+            pending = list(keyed.items()) + [(None, data) for data in unkeyed]
+            keyed.clear()
+            unkeyed.clear()
+            if not pending:
+                return
+            if self.dry_run:
+                for key, _ in pending:
+                    if key is not None and key in existing:
                         table_stats['skipped'] += 1
                     else:
                         table_stats['inserted'] += 1
-                    continue
+                        if key is not None:
+                            existing.add(key)
+                return
+            self._write_batch(access_table, table, pk_columns, pending, existing, table_stats)
 
-                if existing:
-                    for key, value in data.items():
-                        if key != pk_field and hasattr(existing, key):
-                            setattr(existing, key, value)
-                    table_stats['updated'] += 1
+        for row in rows:
+            total += 1
+            key = None
+            try:
+                data = self._map_row_to_model(row, index)
+                key = tuple(data.get(column) for column in pk_columns)
+                if None in key:
+                    for column in pk_columns:
+                        if data.get(column) is None:
+                            data.pop(column, None)
+                    unkeyed.append(data)
                 else:
-                    new_record = model_class(**data)
-                    db.session.add(new_record)
-                    table_stats['inserted'] += 1
-
+                    if key in keyed:
+                        logger.warning(f"Clave {key} repetida en {access_table}: se usa la última fila")
+                        table_stats['skipped'] += 1
+                    keyed[key] = data
             except Exception as e:
-                logger.error(f"Error procesando fila en {access_table}: {e}")
                 table_stats['errors'] += 1
+                self._record_row_error(access_table, key, e)
 
-        if not self.dry_run:
-            try:
-                db.session.commit()
-            except Exception as e:
-                logger.error(f"Error en commit para {access_table}: {e}")
-                db.session.rollback()
-                table_stats['errors'] += table_stats['inserted'] + table_stats['updated']
-                table_stats['inserted'] = 0
-                table_stats['updated'] = 0
+            if len(keyed) + len(unkeyed) >= self.BATCH_SIZE:
+                flush()
+
+        flush()
 
-        expected = self.EXPECTED_COUNTS.get(access_table, len(rows))
+        entity_type = SearchIndexService.entity_type_for_table(table)
+        if entity_type in self._search_rebuild:
+            self._search_rebuild.discard(entity_type)
+            SearchIndexService.rebuild([entity_type])
+
+        expected = self.EXPECTED_COUNTS.get(access_table, total)
         logger.info(
             f"{access_table}: {table_stats['inserted']} insertados, "
             f"{table_stats['updated']} actualizados, "
@@ -343,6 +501,33 @@ class AccessImporter:
 
         return table_stats
 
+    def _table_config(self, access_table: str) -> Dict[str, Any]:
+        """Configuración de ``access_table`` en TABLE_MAPPING."""
+        for tables in self.TABLE_MAPPING.values():
+            if access_table in tables:
+                return tables[access_table]
+        raise ValueError(f"Tabla de Access desconocida: {access_table}")
+
+    def import_table(self, access_table: str) -> Dict[str, Any]:
+        """
+        Importar una sola tabla de TABLE_MAPPING y validar sus referencias.
+
+        Corre el mismo upsert que las importaciones por grupo y después
+        ``validate_references`` sobre las FKs de esa tabla (en dry-run no se
+        valida: la base no cambió).
+
+        Returns:
+            Dict con ``stats``, ``references_valid`` (None en dry-run) y
+            ``row_errors``.
+        """
+        stats = self._import_table(access_table, self._table_config(access_table))
+        references_valid = None if self.dry_run else self.validate_references([access_table])
+        return {
+            'stats': stats,
+            'references_valid': references_valid,
+            'row_errors': self.get_row_errors(),
+        }
+
     def import_reference_data(self) -> Dict[str, Any]:
         """Importar 9 tablas de referencia (73 registros)."""
         logger.info("=== Importando datos de referencia ===")
@@ -394,8 +579,12 @@ class AccessImporter:
         self.stats.update(total_stats)
         return {'total': total_stats, 'tables': results}
 
-    def validate_references(self) -> bool:
-        """Validar integridad referencial después de importar."""
+    def validate_references(self, tables: Optional[Iterable[str]] = None) -> bool:
+        """Validar integridad referencial después de importar.
+
+        Args:
+            tables: Tablas de Access cuyas FKs se validan (default: todas)
+        """
         logger.info("=== Validando integridad referencial ===")
 
         validation_checks = [
@@ -410,6 +599,10 @@ class AccessImporter:
 
         all_valid = True
 
+        if tables is not None:
+            tables = set(tables)
+            validation_checks = [check for check in validation_checks if check[0] in tables]
+
         for table, fk_field, ref_table, ref_field in validation_checks:
             try:
                 model_class = self._get_model_class(self.TABLE_MAPPING['master'].get(table, {}).get('model_class') or
@@ -457,6 +650,10 @@ class AccessImporter:
         """Obtener estadísticas de importación."""
         return self.stats.copy()
 
+    def get_row_errors(self) -> List[Dict[str, Any]]:
+        """Filas descartadas por error: tabla, clave y mensaje."""
+        return list(self.row_errors)
+
     def close(self):
         """Cerrar conexión a Access."""
         if self._access_conn:
@@ -0,0 +1,391 @@
+"""Mantenimiento de los agregados diarios de analytics.
+
+Los eventos de ``DetalleEnsayo`` y ``Entrada`` traducen cada alta, cambio
+de estado o baja en deltas (-1 en la combinación anterior, +1 en la nueva)
+que se acumulan en la sesión durante el flush. Al terminar el flush
+(``after_flush``) se resuelve el cliente de los detalles con una sola
+consulta y cada rollup (y el contador ensayo × estado de
+``rollup_detalles_estado``) se actualiza con un único upsert incremental
+sobre la conexión del flush: el agregado se confirma o se revierte junto
+con el cambio que lo originó. Esto cubre las transiciones de
+``DetalleEnsayoService`` y cualquier otra escritura por el ORM.
+
+Las escrituras masivas que no pasan por el ORM (``update()``/``insert()``
+sobre la tabla) no disparan los eventos: deben reconstruir los agregados
+con ``flask analytics-rollup rebuild``.
+"""
+import logging
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, func, insert, select, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.database.models.analytics_rollup import (
+    SIN_RAMA, DetalleEnsayoDiario, DetalleEnsayoEstadoTotal, EntradaDiaria,
+)
+from app.database.models.detalle_ensayo import DetalleEnsayo
+from app.database.models.entrada import Entrada
+from app.utils.timeseries import day_expression
+
+logger = logging.getLogger(__name__)
+
+# Atributos que determinan la combinación de cada rollup
+DETALLE_ATTRS = ('estado', 'fecha_completado', 'created_at', 'ensayo_id', 'entrada_id')
+ENTRADA_ATTRS = ('status', 'anulado', 'fech_entrada', 'cliente_id', 'rama_id')
+
+DETALLE_KEY = ('dia', 'ensayo_id', 'cliente_id', 'estado')
+ENTRADA_KEY = ('dia', 'cliente_id', 'rama_id', 'status', 'anulado')
+ESTADO_KEY = ('ensayo_id', 'estado')
+
+Key = Tuple[Any, ...]
+
+_PENDING_KEY = 'analytics_rollup_pending'
+
+
+def _plain(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def _as_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        return date.fromisoformat(value[:10])
+    return None
+
+
+def _detalle_day(fecha_completado: Any, created_at: Any) -> date:
+    return _as_date(fecha_completado) or _as_date(created_at) or datetime.utcnow().date()
+
+
+def _estado_key(values: Dict[str, Any]) -> Key:
+    return values['ensayo_id'], _plain(values['estado'])
+
+
+def _entrada_key(values: Dict[str, Any]) -> Key:
+    return (
+        _as_date(values['fech_entrada']) or datetime.utcnow().date(),
+        values['cliente_id'],
+        values['rama_id'] or SIN_RAMA,
+        _plain(values['status']),
+        bool(values['anulado']),
+    )
+
+
+def _values(target, attrs: Iterable[str], old: bool = False) -> Dict[str, Any]:
+    """Valores actuales de ``attrs`` o, con ``old``, los previos al flush."""
+    if not old:
+        return {attr: getattr(target, attr) for attr in attrs}
+    state = sa_inspect(target)
+    values = {}
+    for attr in attrs:
+        history = state.attrs[attr].history
+        if history.deleted:
+            values[attr] = history.deleted[0]
+        elif history.unchanged:
+            values[attr] = history.unchanged[0]
+        else:
+            values[attr] = getattr(target, attr)
+    return values
+
+
+def _changed(target, attrs: Iterable[str]) -> bool:
+    state = sa_inspect(target)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _add(deltas: Dict[Key, int], key: Key, amount: int) -> None:
+    deltas[key] = deltas.get(key, 0) + amount
+
+
+class AnalyticsRollupService:
+    """Altas, bajas y reconstrucción de los agregados diarios."""
+
+    # ------------------------------------------------------------------
+    # Aplicación de deltas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _upsert(connection, table, key_columns: Tuple[str, ...], deltas: Dict[Key, int]) -> None:
+        rows = [dict(zip(key_columns, key), cantidad=amount)
+                for key, amount in deltas.items() if amount]
+        if not rows:
+            return
+
+        dialect = connection.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            stmt = (sqlite_insert if dialect == 'sqlite' else pg_insert)(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={'cantidad': table.c.cantidad + stmt.excluded.cantidad},
+            )
+            connection.execute(stmt, rows)
+            return
+
+        for row in rows:
+            condition = and_(*(table.c[column] == row[column] for column in key_columns))
+            result = connection.execute(
+                update(table).where(condition).values(cantidad=table.c.cantidad + row['cantidad'])
+            )
+            if result.rowcount == 0:
+                connection.execute(insert(table).values(**row))
+
+    # ------------------------------------------------------------------
+    # Eventos de modelo: acumulan deltas en la sesión durante el flush
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _pending(session) -> Dict[str, Dict[Any, Any]]:
+        return session.info.setdefault(_PENDING_KEY, {
+            'detalles': {},   # (dia, ensayo_id, entrada_id, estado) -> n
+            'movidos': {},    # (dia, ensayo_id, cliente_id, estado) -> n
+            'entradas': {},   # ENTRADA_KEY -> n
+            'estados': {},    # ESTADO_KEY -> n
+            'clientes': {},   # entrada_id -> cliente_id conocidos en el flush
+        })
+
+    @staticmethod
+    def _queue_detalle(target, values: Dict[str, Any], amount: int) -> None:
+        session = object_session(target)
+        if session is None:
+            return
+        pending = AnalyticsRollupService._pending(session)
+        # El cliente sale de la entrada ya cargada o, al final del flush, de una consulta IN
+        entrada = sa_inspect(target).dict.get('entrada')
+        if entrada is not None and entrada.id == values['entrada_id']:
+            pending['clientes'][entrada.id] = entrada.cliente_id
+        _add(pending['detalles'], (
+            _detalle_day(values['fecha_completado'], values['created_at']),
+            values['ensayo_id'],
+            values['entrada_id'],
+            _plain(values['estado']),
+        ), amount)
+        _add(pending['estados'], _estado_key(values), amount)
+
+    @staticmethod
+    def _detalle_after_insert(mapper, connection, target) -> None:
+        AnalyticsRollupService._queue_detalle(target, _values(target, DETALLE_ATTRS), 1)
+
+    @staticmethod
+    def _detalle_after_update(mapper, connection, target) -> None:
+        if not _changed(target, DETALLE_ATTRS):
+            return
+        AnalyticsRollupService._queue_detalle(
+            target, _values(target, DETALLE_ATTRS, old=True), -1)
+        AnalyticsRollupService._queue_detalle(target, _values(target, DETALLE_ATTRS), 1)
+
+    @staticmethod
+    def _detalle_after_delete(mapper, connection, target) -> None:
+        AnalyticsRollupService._queue_detalle(
+            target, _values(target, DETALLE_ATTRS, old=True), -1)
+
+    @staticmethod
+    def _queue_entrada(target, values: Dict[str, Any], amount: int) -> None:
+        session = object_session(target)
+        if session is None:
+            return
+        pending = AnalyticsRollupService._pending(session)
+        pending['clientes'][target.id] = values['cliente_id']
+        _add(pending['entradas'], _entrada_key(values), amount)
+
+    @staticmethod
+    def _entrada_after_insert(mapper, connection, target) -> None:
+        AnalyticsRollupService._queue_entrada(target, _values(target, ENTRADA_ATTRS), 1)
+
+    @staticmethod
+    def _entrada_after_update(mapper, connection, target) -> None:
+        if not _changed(target, ENTRADA_ATTRS):
+            return
+        old = _values(target, ENTRADA_ATTRS, old=True)
+        new = _values(target, ENTRADA_ATTRS)
+        AnalyticsRollupService._queue_entrada(target, old, -1)
+        AnalyticsRollupService._queue_entrada(target, new, 1)
+
+        if old['cliente_id'] != new['cliente_id']:
+            # Los detalles de la entrada pasan al nuevo cliente
+            AnalyticsRollupService._move_detalles(
+                connection, target, old['cliente_id'], new['cliente_id'])
+
+    @staticmethod
+    def _entrada_after_delete(mapper, connection, target) -> None:
+        AnalyticsRollupService._queue_entrada(
+            target, _values(target, ENTRADA_ATTRS, old=True), -1)
+
+    @staticmethod
+    def _move_detalles(connection, entrada, old_cliente_id: int, new_cliente_id: int) -> None:
+        detalles = DetalleEnsayo.__table__
+        rows = connection.execute(
+            select(detalles.c.estado, detalles.c.fecha_completado,
+                   detalles.c.created_at, detalles.c.ensayo_id)
+            .where(detalles.c.entrada_id == entrada.id)
+        ).mappings()
+        movidos = AnalyticsRollupService._pending(object_session(entrada))['movidos']
+        for row in rows:
+            dia = _detalle_day(row['fecha_completado'], row['created_at'])
+            estado = _plain(row['estado'])
+            _add(movidos, (dia, row['ensayo_id'], old_cliente_id, estado), -1)
+            _add(movidos, (dia, row['ensayo_id'], new_cliente_id, estado), 1)
+
+    # ------------------------------------------------------------------
+    # Aplicación de los deltas al final del flush
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _before_flush(session, flush_context, instances) -> None:
+        # Deltas de un flush anterior que falló antes de after_flush
+        session.info.pop(_PENDING_KEY, None)
+
+    @staticmethod
+    def _after_flush(session, flush_context) -> None:
+        """Aplicar los deltas del flush: un upsert (executemany) por rollup."""
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        connection = session.connection()
+
+        clientes = pending['clientes']
+        missing = {key[2] for key in pending['detalles'] if key[2] not in clientes}
+        if missing:
+            entradas = Entrada.__table__
+            clientes.update(connection.execute(
+                select(entradas.c.id, entradas.c.cliente_id).where(entradas.c.id.in_(missing))
+            ).all())
+
+        detalle_deltas = dict(pending['movidos'])
+        for (dia, ensayo_id, entrada_id, estado), amount in pending['detalles'].items():
+            _add(detalle_deltas, (dia, ensayo_id, clientes.get(entrada_id), estado), amount)
+
+        AnalyticsRollupService._upsert(
+            connection, DetalleEnsayoDiario.__table__, DETALLE_KEY, detalle_deltas)
+        AnalyticsRollupService._upsert(
+            connection, EntradaDiaria.__table__, ENTRADA_KEY, pending['entradas'])
+        AnalyticsRollupService._upsert(
+            connection, DetalleEnsayoEstadoTotal.__table__, ESTADO_KEY, pending['estados'])
+
+    @staticmethod
+    def _track_old_value(target, value, oldvalue, initiator):
+        return value
+
+    @staticmethod
+    def register_listeners() -> None:
+        """Registrar los eventos que mantienen los rollups (idempotente)."""
+        handlers = (
+            (DetalleEnsayo, DETALLE_ATTRS, (
+                ('after_insert', AnalyticsRollupService._detalle_after_insert),
+                ('after_update', AnalyticsRollupService._detalle_after_update),
+                ('after_delete', AnalyticsRollupService._detalle_after_delete),
+            )),
+            (Entrada, ENTRADA_ATTRS, (
+                ('after_insert', AnalyticsRollupService._entrada_after_insert),
+                ('after_update', AnalyticsRollupService._entrada_after_update),
+                ('after_delete', AnalyticsRollupService._entrada_after_delete),
+            )),
+        )
+        for model, attrs, model_handlers in handlers:
+            for event_name, handler in model_handlers:
+                if not event.contains(model, event_name, handler):
+                    event.listen(model, event_name, handler)
+            # active_history: conservar el valor previo aunque el atributo
+            # estuviera expirado (p. ej. tras un commit) al modificarlo
+            for attr in attrs:
+                column = getattr(model, attr)
+                if not event.contains(column, 'set', AnalyticsRollupService._track_old_value):
+                    event.listen(column, 'set', AnalyticsRollupService._track_old_value,
+                                 active_history=True, retval=True)
+
+        session_handlers = (
+            ('before_flush', AnalyticsRollupService._before_flush),
+            ('after_flush', AnalyticsRollupService._after_flush),
+        )
+        for event_name, handler in session_handlers:
+            if not event.contains(Session, event_name, handler):
+                event.listen(Session, event_name, handler)
+
+    # ------------------------------------------------------------------
+    # Reconstrucción
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def rebuild() -> Dict[str, int]:
+        """Recalcular los rollups desde las tablas de origen (INSERT ... SELECT).
+
+        Returns:
+            Filas de rollup generadas por tabla.
+        """
+        detalles_rollup = DetalleEnsayoDiario.__table__
+        entradas_rollup = EntradaDiaria.__table__
+        estados_rollup = DetalleEnsayoEstadoTotal.__table__
+
+        # Por la sesión (no la conexión) para que el commit invalide la caché
+        db.session.execute(delete(detalles_rollup))
+        db.session.execute(delete(entradas_rollup))
+        db.session.execute(delete(estados_rollup))
+
+        dia = day_expression(func.coalesce(DetalleEnsayo.fecha_completado, DetalleEnsayo.created_at))
+        detalles_select = select(
+            dia, DetalleEnsayo.ensayo_id, Entrada.cliente_id, DetalleEnsayo.estado,
+            func.count(DetalleEnsayo.id),
+        ).join(
+            Entrada, DetalleEnsayo.entrada_id == Entrada.id
+        ).group_by(dia, DetalleEnsayo.ensayo_id, Entrada.cliente_id, DetalleEnsayo.estado)
+        db.session.execute(insert(detalles_rollup).from_select(
+            [*DETALLE_KEY, 'cantidad'], detalles_select))
+
+        dia = day_expression(Entrada.fech_entrada)
+        rama = func.coalesce(Entrada.rama_id, SIN_RAMA)
+        anulado = func.coalesce(Entrada.anulado, False)
+        entradas_select = select(
+            dia, Entrada.cliente_id, rama, Entrada.status, anulado, func.count(Entrada.id),
+        ).group_by(dia, Entrada.cliente_id, rama, Entrada.status, anulado)
+        db.session.execute(insert(entradas_rollup).from_select(
+            [*ENTRADA_KEY, 'cantidad'], entradas_select))
+
+        estados_select = select(
+            DetalleEnsayo.ensayo_id, DetalleEnsayo.estado, func.count(DetalleEnsayo.id),
+        ).group_by(DetalleEnsayo.ensayo_id, DetalleEnsayo.estado)
+        db.session.execute(insert(estados_rollup).from_select(
+            [*ESTADO_KEY, 'cantidad'], estados_select))
+
+        db.session.commit()
+        return AnalyticsRollupService.row_counts()
+
+    @staticmethod
+    def row_counts() -> Dict[str, int]:
+        """Filas actuales de cada rollup."""
+        return {
+            DetalleEnsayoDiario.__tablename__: db.session.query(func.count()).select_from(
+                DetalleEnsayoDiario).scalar(),
+            EntradaDiaria.__tablename__: db.session.query(func.count()).select_from(
+                EntradaDiaria).scalar(),
+            DetalleEnsayoEstadoTotal.__tablename__: db.session.query(func.count()).select_from(
+                DetalleEnsayoEstadoTotal).scalar(),
+        }
+
+    @staticmethod
+    def verify() -> Dict[str, Dict[str, int]]:
+        """Comparar el total de cada rollup con el conteo de su tabla de origen."""
+        return {
+            DetalleEnsayoDiario.__tablename__: {
+                'rollup': db.session.query(
+                    func.coalesce(func.sum(DetalleEnsayoDiario.cantidad), 0)).scalar(),
+                'origen': db.session.query(func.count(DetalleEnsayo.id)).scalar(),
+            },
+            EntradaDiaria.__tablename__: {
+                'rollup': db.session.query(
+                    func.coalesce(func.sum(EntradaDiaria.cantidad), 0)).scalar(),
+                'origen': db.session.query(func.count(Entrada.id)).scalar(),
+            },
+            DetalleEnsayoEstadoTotal.__tablename__: {
+                'rollup': db.session.query(
+                    func.coalesce(func.sum(DetalleEnsayoEstadoTotal.cantidad), 0)).scalar(),
+                'origen': db.session.query(func.count(DetalleEnsayo.id)).scalar(),
+            },
+        }
@@ -2,22 +2,12 @@
 from datetime import datetime, timedelta, date
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import func, desc, cast, Date, text
+from sqlalchemy import and_, case, func, desc, cast, Date, text
 from sqlalchemy.dialects import sqlite
 
 from app import db
-from app.utils.cache import cache, CACHE_TTL_DEFAULT
-
-
-def _month_trunc(col):
-    """Trunca una columna DateTime a año-mes de forma compatible con SQLite y PostgreSQL."""
-    from sqlalchemy import inspect as sa_inspect
-    engine = db.engine
-    dialect_name = engine.dialect.name
-    if dialect_name == 'postgresql':
-        return func.to_char(col, 'YYYY-MM')
-    # SQLite (default)
-    return func.strftime('%Y-%m', col)
+from app.utils.cache import cache, cached
+from app.utils.timeseries import StatusSeries
 
 
 class AnalyticsService:
@@ -34,13 +24,29 @@ class AnalyticsService:
 
     CACHE_PREFIX = "analytics"
 
-    @staticmethod
-    def _get_cache_key(method_name: str, **kwargs) -> str:
-        """Generar clave de caché."""
-        params = ":".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
-        return f"{AnalyticsService.CACHE_PREFIX}:{method_name}:{params}"
+    # Las entradas se invalidan al confirmar cambios en estas tablas; el TTL
+    # solo acota datos que dependen de la fecha (mes en curso, timestamp).
+    # El recálculo es single-flight (ver ``cached``).
+    CACHE_TTL = 3600
+    CACHE_TAGS = {
+        "es_pending": ("detalles_ensayo", "ensayos_es", "areas"),
+        "fq_pending": ("detalles_ensayo", "ensayos", "areas"),
+        "mb_pending_by_tech": ("detalles_ensayo", "ensayos", "areas", "users"),
+        # Reportes sobre rollups: los mantienen los flushes de sus tablas de
+        # origen y la reconstrucción escribe en ellos por la sesión
+        "completed_timeline": ("detalles_ensayo", "rollup_detalles_diarios"),
+        "lotes_by_type_client": ("entradas", "rollup_entradas_diarias", "ramas", "clientes"),
+        "muestreos_by_client_type": ("entradas", "rollup_entradas_diarias", "clientes"),
+        "kpis": ("detalles_ensayo", "entradas", "rollup_detalles_diarios",
+                 "rollup_entradas_diarias"),
+    }
+    CACHE_TAGS["full"] = tuple(sorted({tag for tags in CACHE_TAGS.values() for tag in tags}))
+    # Ventana en la que se sirve el valor vencido mientras un worker recalcula
+    CACHE_STALE_TTL = 300
 
     @staticmethod
+    @cached(f"{CACHE_PREFIX}:es_pending", ttl=CACHE_TTL, tags=CACHE_TAGS["es_pending"],
+            stale_ttl=CACHE_STALE_TTL)
     def get_es_pending() -> List[Dict[str, Any]]:
         """Obtener ensayos sensoriales pendientes por área.
 
@@ -51,11 +57,6 @@ class AnalyticsService:
         from app.database.models.detalle_ensayo import DetalleEnsayo, DetalleEnsayoStatus
         from app.database.models.reference import Area
 
-        cache_key = AnalyticsService._get_cache_key("es_pending")
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return cached
-
         pendientes = [
             DetalleEnsayoStatus.PENDIENTE.value,
             DetalleEnsayoStatus.ASIGNADO.value,
@@ -81,10 +82,11 @@ class AnalyticsService:
             for r in results
         ]
 
-        cache.set(cache_key, data, CACHE_TTL_DEFAULT)
         return data
 
     @staticmethod
+    @cached(f"{CACHE_PREFIX}:fq_pending", ttl=CACHE_TTL, tags=CACHE_TAGS["fq_pending"],
+            stale_ttl=CACHE_STALE_TTL)
     def get_fq_pending() -> List[Dict[str, Any]]:
         """Obtener ensayos físico-químicos pendientes.
 
@@ -95,11 +97,6 @@ class AnalyticsService:
         from app.database.models.detalle_ensayo import DetalleEnsayo, DetalleEnsayoStatus
         from app.database.models.reference import Area
 
-        cache_key = AnalyticsService._get_cache_key("fq_pending")
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return cached
-
         pendientes = [
             DetalleEnsayoStatus.PENDIENTE.value,
             DetalleEnsayoStatus.ASIGNADO.value,
@@ -126,10 +123,11 @@ class AnalyticsService:
             for r in results
         ]
 
-        cache.set(cache_key, data, CACHE_TTL_DEFAULT)
         return data
 
     @staticmethod
+    @cached(f"{CACHE_PREFIX}:mb_pending_by_tech", ttl=CACHE_TTL, tags=CACHE_TAGS["mb_pending_by_tech"],
+            stale_ttl=CACHE_STALE_TTL)
     def get_mb_pending_by_tech() -> List[Dict[str, Any]]:
         """Obtener ensayos de microbiología pendientes agrupados por técnico.
 
@@ -141,11 +139,6 @@ class AnalyticsService:
         from app.database.models.reference import Area
         from app.database.models.user import User
 
-        cache_key = AnalyticsService._get_cache_key("mb_pending_by_tech")
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return cached
-
         pendientes = [
             DetalleEnsayoStatus.PENDIENTE.value,
             DetalleEnsayoStatus.ASIGNADO.value,
@@ -174,214 +167,212 @@ class AnalyticsService:
             for r in results
         ]
 
-        cache.set(cache_key, data, CACHE_TTL_DEFAULT)
         return data
 
     @staticmethod
+    @cached(f"{CACHE_PREFIX}:completed_timeline", ttl=CACHE_TTL, tags=CACHE_TAGS["completed_timeline"],
+            stale_ttl=CACHE_STALE_TTL)
     def get_completed_timeline(months: int = 12) -> List[Dict[str, Any]]:
         """Obtener timeline de determinaciones completadas por mes.
 
+        Lee el rollup diario de detalles (``rollup_detalles_diarios``).
+
         Args:
             months: Número de meses hacia atrás a analizar (default: 12)
 
         Returns:
-            Lista de meses con conteo de ensayos completados.
+            Lista de meses (``YYYY-MM``, incluidos los meses sin datos)
+            con conteo de ensayos completados.
         """
-        from app.database.models.detalle_ensayo import DetalleEnsayo, DetalleEnsayoStatus
-
-        cache_key = AnalyticsService._get_cache_key("completed_timeline", months=months)
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return cached
+        from app.database.models.analytics_rollup import DetalleEnsayoDiario
+        from app.database.models.detalle_ensayo import DetalleEnsayoStatus
 
-        end_date = datetime.utcnow()
+        end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=months * 30)
-
-        results = db.session.query(
-            _month_trunc(DetalleEnsayo.fecha_completado).label('month'),
-            func.count(DetalleEnsayo.id).label('count')
+        completado = DetalleEnsayoStatus.COMPLETADO.value
+
+        # Agrupa por día sobre ix_rollup_detalles_estado_dia; los meses se
+        # arman con NumPy en lugar de formatear fechas en SQL.
+        rows = db.session.query(
+            DetalleEnsayoDiario.dia,
+            DetalleEnsayoDiario.estado,
+            func.sum(DetalleEnsayoDiario.cantidad)
         ).filter(
-            DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-            DetalleEnsayo.fecha_completado >= start_date
-        ).group_by(
-            _month_trunc(DetalleEnsayo.fecha_completado)
-        ).order_by(
-            _month_trunc(DetalleEnsayo.fecha_completado)
-        ).all()
-
-        data = [{"month": r.month, "count": r.count} for r in results]
-
-        cache.set(cache_key, data, CACHE_TTL_DEFAULT)
-        return data
+            DetalleEnsayoDiario.estado == completado,
+            DetalleEnsayoDiario.dia >= start_date,
+            DetalleEnsayoDiario.dia <= end_date
+        ).group_by(DetalleEnsayoDiario.dia, DetalleEnsayoDiario.estado).all()
+
+        series = StatusSeries.from_rows(rows, start_date, end_date, 'month', [completado])
+        return [
+            {"month": month, "count": count}
+            for month, count in zip(series.labels(), series.column(completado).tolist())
+        ]
 
     @staticmethod
+    @cached(f"{CACHE_PREFIX}:lotes_by_type_client", ttl=CACHE_TTL, tags=CACHE_TAGS["lotes_by_type_client"],
+            stale_ttl=CACHE_STALE_TTL)
     def get_lotes_by_type_client() -> List[Dict[str, Any]]:
         """Obtener lotes analizados agrupados por tipo de muestra y cliente.
 
+        Lee el rollup diario de entradas (``rollup_entradas_diarias``).
+
         Returns:
             Lista de tipos de muestra con conteo por cliente.
         """
-        from app.database.models.entrada import Entrada, EntradaStatus
-        from app.database.models.rama import Rama
+        from app.database.models.analytics_rollup import EntradaDiaria
+        from app.database.models.entrada import EntradaStatus
+        from app.database.models.reference import Rama
         from app.database.models.cliente import Cliente
 
-        cache_key = AnalyticsService._get_cache_key("lotes_by_type_client")
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return cached
-
+        total = func.sum(EntradaDiaria.cantidad)
         results = db.session.query(
             Rama.nombre.label('tipo_muestra'),
             Cliente.nombre.label('cliente'),
-            func.count(Entrada.id).label('count')
-        ).outerjoin(
-            Rama, Entrada.rama_id == Rama.id
+            total.label('count')
+        ).select_from(EntradaDiaria).outerjoin(
+            Rama, EntradaDiaria.rama_id == Rama.id
         ).outerjoin(
-            Cliente, Entrada.cliente_id == Cliente.id
+            Cliente, EntradaDiaria.cliente_id == Cliente.id
         ).filter(
-            Entrada.status.in_([
-                EntradaStatus.COMPLETADO.value,
-                EntradaStatus.ENTREGADO.value
+            EntradaDiaria.status.in_([
+                EntradaStatus.COMPLETADO,
+                EntradaStatus.ENTREGADO
             ]),
-            Entrada.anulado == False
+            EntradaDiaria.anulado == False  # noqa: E712
         ).group_by(
             Rama.nombre, Cliente.nombre
-        ).order_by(
+        ).having(total > 0).order_by(
             desc('count')
         ).limit(50).all()
 
-        data = [
+        return [
             {
                 "tipo_muestra": r.tipo_muestra or "Sin tipo",
                 "cliente": r.cliente or "Sin cliente",
-                "count": r.count
+                "count": int(r.count)
             }
             for r in results
         ]
 
-        cache.set(cache_key, data, CACHE_TTL_DEFAULT)
-        return data
-
     @staticmethod
+    @cached(f"{CACHE_PREFIX}:muestreos_by_client_type", ttl=CACHE_TTL, tags=CACHE_TAGS["muestreos_by_client_type"],
+            stale_ttl=CACHE_STALE_TTL)
     def get_muestreos_by_client_type() -> Dict[str, List[Dict[str, Any]]]:
         """Obtener muestreos agrupados por tipo de cliente.
 
+        Lee el rollup diario de entradas (``rollup_entradas_diarias``).
+
         Returns:
             Diccionario con datos para area chart y pie chart.
         """
-        from app.database.models.entrada import Entrada, EntradaStatus
+        from app.database.models.analytics_rollup import EntradaDiaria
         from app.database.models.cliente import Cliente
 
-        cache_key = AnalyticsService._get_cache_key("muestreos_by_client_type")
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return cached
-
+        total = func.sum(EntradaDiaria.cantidad)
         results = db.session.query(
-            Cliente.tipo.label('tipo_cliente'),
-            func.count(Entrada.id).label('count')
-        ).join(
-            Cliente, Entrada.cliente_id == Cliente.id
+            Cliente.tipo_cliente.label('tipo_cliente'),
+            total.label('count')
+        ).select_from(EntradaDiaria).join(
+            Cliente, EntradaDiaria.cliente_id == Cliente.id
         ).filter(
-            Entrada.anulado == False
+            EntradaDiaria.anulado == False  # noqa: E712
         ).group_by(
-            Cliente.tipo
-        ).all()
+            Cliente.tipo_cliente
+        ).having(total > 0).all()
 
         pie_data = [
-            {"tipo_cliente": r.tipo_cliente or "Sin tipo", "count": r.count}
+            {"tipo_cliente": r.tipo_cliente or "Sin tipo", "count": int(r.count)}
             for r in results
         ]
 
-        monthly_results = db.session.query(
-            _month_trunc(Entrada.fech_entrada).label('month'),
-            Cliente.tipo.label('tipo_cliente'),
-            func.count(Entrada.id).label('count')
-        ).join(
-            Cliente, Entrada.cliente_id == Cliente.id
+        # Agrupa por día (como get_completed_timeline) y arma los meses con NumPy
+        daily_rows = db.session.query(
+            EntradaDiaria.dia,
+            Cliente.tipo_cliente,
+            total
+        ).select_from(EntradaDiaria).join(
+            Cliente, EntradaDiaria.cliente_id == Cliente.id
         ).filter(
-            Entrada.anulado == False
+            EntradaDiaria.anulado == False  # noqa: E712
         ).group_by(
-            _month_trunc(Entrada.fech_entrada),
-            Cliente.tipo
-        ).order_by(
-            _month_trunc(Entrada.fech_entrada)
+            EntradaDiaria.dia,
+            Cliente.tipo_cliente
         ).all()
 
-        area_data = [
-            {
-                "month": r.month,
-                "tipo_cliente": r.tipo_cliente or "Sin tipo",
-                "count": r.count
-            }
-            for r in monthly_results
-        ]
+        area_data = []
+        if daily_rows:
+            rows = [(dia, tipo or "Sin tipo", count) for dia, tipo, count in daily_rows]
+            tipos = list(dict.fromkeys(row[1] for row in rows))
+            series = StatusSeries.from_rows(rows, min(row[0] for row in rows),
+                                            max(row[0] for row in rows), 'month', tipos)
+            area_data = [
+                {"month": month, "tipo_cliente": tipo, "count": count}
+                for month, counts in zip(series.labels(), series.values.tolist())
+                for tipo, count in zip(tipos, counts)
+                if count > 0
+            ]
 
-        data = {
+        return {
             "pie": pie_data,
             "area": area_data
         }
 
-        cache.set(cache_key, data, CACHE_TTL_DEFAULT)
-        return data
-
     @staticmethod
+    @cached(f"{CACHE_PREFIX}:kpis", ttl=CACHE_TTL, tags=CACHE_TAGS["kpis"],
+            stale_ttl=CACHE_STALE_TTL)
     def get_analytics_kpis() -> Dict[str, Any]:
         """Obtener KPIs generales del laboratorio.
 
+        Lee los rollups diarios: una consulta por tabla con sumas
+        condicionales.
+
         Returns:
             Diccionario con contadores de KPIs.
         """
-        from app.database.models.detalle_ensayo import DetalleEnsayo, DetalleEnsayoStatus
-        from app.database.models.entrada import Entrada, EntradaStatus
-
-        cache_key = AnalyticsService._get_cache_key("kpis")
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return cached
+        from app.database.models.analytics_rollup import DetalleEnsayoDiario, EntradaDiaria
+        from app.database.models.detalle_ensayo import DetalleEnsayoStatus
+        from app.database.models.entrada import EntradaStatus
 
         pendientes = [
             DetalleEnsayoStatus.PENDIENTE.value,
             DetalleEnsayoStatus.ASIGNADO.value,
             DetalleEnsayoStatus.EN_PROCESO.value,
         ]
+        completado = DetalleEnsayoStatus.COMPLETADO.value
+        inicio_mes = datetime.utcnow().date().replace(day=1)
 
-        total_ensayos_pendientes = DetalleEnsayo.query.filter(
-            DetalleEnsayo.estado.in_(pendientes)
-        ).count()
-
-        total_ensayos_completados = DetalleEnsayo.query.filter(
-            DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value
-        ).count()
-
-        hoy = datetime.utcnow().date()
-        inicio_mes = hoy.replace(day=1)
+        def _sum_if(condition, column):
+            return func.coalesce(func.sum(case((condition, column), else_=0)), 0)
 
-        completados_mes = DetalleEnsayo.query.filter(
-            DetalleEnsayo.estado == DetalleEnsayoStatus.COMPLETADO.value,
-            DetalleEnsayo.fecha_completado >= inicio_mes
-        ).count()
+        detalles = db.session.query(
+            _sum_if(DetalleEnsayoDiario.estado.in_(pendientes), DetalleEnsayoDiario.cantidad),
+            _sum_if(DetalleEnsayoDiario.estado == completado, DetalleEnsayoDiario.cantidad),
+            _sum_if(and_(DetalleEnsayoDiario.estado == completado,
+                         DetalleEnsayoDiario.dia >= inicio_mes), DetalleEnsayoDiario.cantidad),
+        ).one()
 
-        entradas_pendientes = Entrada.query.filter(
-            Entrada.status.in_([
-                EntradaStatus.RECIBIDO.value,
-                EntradaStatus.EN_PROCESO.value
+        entradas_pendientes = db.session.query(
+            func.coalesce(func.sum(EntradaDiaria.cantidad), 0)
+        ).filter(
+            EntradaDiaria.status.in_([
+                EntradaStatus.RECIBIDO,
+                EntradaStatus.EN_PROCESO
             ]),
-            Entrada.anulado == False
-        ).count()
-
-        data = {
-            "ensayos_pendientes": total_ensayos_pendientes,
-            "ensayos_completados": total_ensayos_completados,
-            "completados_mes": completados_mes,
-            "entradas_pendientes": entradas_pendientes,
+            EntradaDiaria.anulado == False  # noqa: E712
+        ).scalar()
+
+        return {
+            "ensayos_pendientes": int(detalles[0]),
+            "ensayos_completados": int(detalles[1]),
+            "completados_mes": int(detalles[2]),
+            "entradas_pendientes": int(entradas_pendientes),
             "timestamp": datetime.utcnow().isoformat()
         }
 
-        cache.set(cache_key, data, CACHE_TTL_DEFAULT)
-        return data
-
     @staticmethod
+    @cached(f"{CACHE_PREFIX}:full", ttl=CACHE_TTL, tags=CACHE_TAGS["full"],
+            stale_ttl=CACHE_STALE_TTL)
     def get_full_analytics(period_days: Optional[int] = None) -> Dict[str, Any]:
         """Obtener todos los datos de analytics en una llamada.
 
@@ -410,6 +401,9 @@ class AnalyticsService:
     def invalidate_cache() -> int:
         """Invalidar toda la caché de analytics.
 
+        Normalmente no hace falta: los commits que modifican las tablas de
+        ``CACHE_TAGS`` ya invalidan las entradas dependientes.
+
         Returns:
             Número de claves eliminadas.
         """
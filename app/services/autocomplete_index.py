@@ -0,0 +1,343 @@
+"""Índice de autocompletado en memoria para DataLab.
+
+Sustituye las consultas ``ILIKE ... DISTINCT LIMIT`` por entidad y campo
+(unas 15 por pulsación) por un arreglo ordenado de claves normalizadas que
+se consulta por prefijo con ``bisect``, sin tocar la base de datos.
+
+Cada valor indexado (códigos, nombres, lotes, números de informe) genera una
+clave por cada inicio de palabra, de modo que ``'oes'`` sugiere
+``'Lácteos del Oeste'``. Las claves están en minúsculas y sin diacríticos.
+
+Ciclo de vida:
+  - Se construye al arrancar (``AUTOCOMPLETE_PRELOAD``) o en la primera
+    consulta, y se reconstruye si supera ``AUTOCOMPLETE_INDEX_MAX_AGE``
+    segundos (reconcilia los cambios hechos por otros procesos). La
+    reconstrucción por antigüedad corre en un hilo aparte, una sola a la
+    vez, y mientras tanto se sigue respondiendo con el índice anterior.
+  - Los eventos de mapper registran los cambios de cada flush en la sesión;
+    se aplican al índice en ``after_commit`` y se descartan en rollback.
+
+Reporte de memoria y tiempo de reconstrucción: ``flask search-index autocomplete``.
+"""
+import logging
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.services.search_index import INDEXED_ENTITIES, _TERM_PATTERN, _plain, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Campos sugeridos por tipo de entidad (modelos de INDEXED_ENTITIES)
+AUTOCOMPLETE_FIELDS: Dict[str, List[str]] = {
+    'clientes': ['codigo', 'nombre'],
+    'fabricas': ['nombre'],
+    'productos': ['nombre'],
+    'entradas': ['codigo', 'lote'],
+    'pedidos': ['codigo', 'lote'],
+    'informes': ['nro_oficial'],
+}
+
+# Antigüedad máxima por defecto del índice antes de reconstruirlo (segundos)
+DEFAULT_MAX_AGE = 900
+
+_PENDING_KEY = 'autocomplete_pending'
+
+# (clave normalizada, valor original, tipo de entidad, id)
+Entry = Tuple[str, str, str, int]
+
+
+def _keys_for(value: str) -> List[str]:
+    """Claves de prefijo de un valor: el texto completo y cada inicio de palabra."""
+    normalized = normalize_text(value)
+    keys = [normalized]
+    for match in _TERM_PATTERN.finditer(normalized):
+        if match.start() > 0:
+            keys.append(normalized[match.start():])
+    return keys
+
+
+def _entries_for(entity_type: str, entity_id: int, values: List[Optional[str]]) -> List[Entry]:
+    entries = set()
+    for value in values:
+        if value:
+            for key in _keys_for(value):
+                entries.add((key, value, entity_type, entity_id))
+    return list(entries)
+
+
+def _entity_type_for(target: Any) -> Optional[str]:
+    for entity_type in AUTOCOMPLETE_FIELDS:
+        if isinstance(target, INDEXED_ENTITIES[entity_type]['model']):
+            return entity_type
+    return None
+
+
+class AutocompleteIndex:
+    """Arreglo ordenado de claves de prefijo con búsqueda por ``bisect``."""
+
+    def __init__(self):
+        self._entries: List[Entry] = []
+        self._by_entity: Dict[Tuple[str, int], List[Entry]] = {}
+        self._lock = threading.RLock()
+        # Una sola reconstrucción a la vez (la toma quien la dispara)
+        self._refresh_lock = threading.Lock()
+        self.built_at: Optional[float] = None
+        self.build_seconds: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+
+    def build(self, batch_size: int = 5000) -> int:
+        """Reconstruir el índice completo desde la base de datos.
+
+        El nuevo arreglo se arma aparte y se intercambia al final, así las
+        consultas concurrentes siguen respondiendo con el índice anterior.
+
+        Returns:
+            Cantidad de claves indexadas.
+        """
+        start = time.perf_counter()
+        entries: List[Entry] = []
+        by_entity: Dict[Tuple[str, int], List[Entry]] = {}
+
+        for entity_type, fields in AUTOCOMPLETE_FIELDS.items():
+            model = INDEXED_ENTITIES[entity_type]['model']
+            columns = [getattr(model, field) for field in fields]
+            rows = db.session.query(model.id, *columns).execution_options(yield_per=batch_size)
+            for row in rows:
+                item_entries = _entries_for(entity_type, row[0], [_plain(v) for v in row[1:]])
+                if item_entries:
+                    by_entity[(entity_type, row[0])] = item_entries
+                    entries.extend(item_entries)
+
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._by_entity = by_entity
+            self.built_at = time.time()
+            self.build_seconds = time.perf_counter() - start
+
+        logger.info('Índice de autocompletado: %d claves en %.3fs',
+                    len(entries), self.build_seconds)
+        return len(entries)
+
+    def _ensure_fresh(self) -> None:
+        """Construir el índice si no existe o refrescarlo si está vencido.
+
+        Sin índice, la primera consulta lo construye y las concurrentes
+        esperan a que termine. Vencido, solo el llamador que toma
+        ``_refresh_lock`` (sin bloquear) lanza la reconstrucción en un hilo
+        aparte; todos siguen respondiendo con el índice anterior.
+        """
+        if self.built_at is None:
+            with self._refresh_lock:
+                if self.built_at is None:
+                    self.build()
+            return
+
+        if not has_app_context():
+            return
+        app = current_app._get_current_object()
+        max_age = app.config.get('AUTOCOMPLETE_INDEX_MAX_AGE', DEFAULT_MAX_AGE)
+        if not max_age or time.time() - self.built_at <= max_age:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            threading.Thread(target=self._refresh, args=(app,),
+                             name='autocomplete-refresh', daemon=True).start()
+        except Exception:
+            self._refresh_lock.release()
+            raise
+
+    def _refresh(self, app) -> None:
+        """Reconstruir en segundo plano y liberar ``_refresh_lock`` al terminar."""
+        try:
+            with app.app_context():
+                self.build()
+        except Exception as e:
+            logger.error(f"Error reconstruyendo el índice de autocompletado: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    # ------------------------------------------------------------------
+    # Actualización incremental
+    # ------------------------------------------------------------------
+
+    def remove(self, entity_type: str, entity_id: int) -> None:
+        with self._lock:
+            for entry in self._by_entity.pop((entity_type, entity_id), []):
+                position = bisect_left(self._entries, entry)
+                if position < len(self._entries) and self._entries[position] == entry:
+                    del self._entries[position]
+
+    def upsert(self, entity_type: str, entity_id: int, values: List[Optional[str]]) -> None:
+        with self._lock:
+            self.remove(entity_type, entity_id)
+            item_entries = _entries_for(entity_type, entity_id, values)
+            if item_entries:
+                self._by_entity[(entity_type, entity_id)] = item_entries
+                for entry in item_entries:
+                    insort(self._entries, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = []
+            self._by_entity = {}
+            self.built_at = None
+            self.build_seconds = None
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def suggest(self, query: str, limit: int = 10) -> List[str]:
+        """Valores únicos cuyo texto o alguna palabra empieza por ``query``."""
+        prefix = normalize_text(query).strip()
+        if not prefix:
+            return []
+        self._ensure_fresh()
+
+        suggestions: Dict[str, None] = {}
+        with self._lock:
+            entries = self._entries
+            position = bisect_left(entries, (prefix,))
+            while position < len(entries) and len(suggestions) < limit:
+                key, value = entries[position][0], entries[position][1]
+                if not key.startswith(prefix):
+                    break
+                suggestions.setdefault(value, None)
+                position += 1
+        return list(suggestions)
+
+    def sample_keys(self, count: int) -> List[str]:
+        """Claves al azar del índice (para medir la latencia de consulta)."""
+        with self._lock:
+            entries = random.sample(self._entries, min(count, len(self._entries)))
+        return [entry[0] for entry in entries]
+
+    def stats(self) -> Dict[str, Any]:
+        """Cantidad de claves, entidades y memoria aproximada del índice."""
+        with self._lock:
+            entries = self._entries
+            by_entity = self._by_entity
+            seen = set()
+            size = sys.getsizeof(entries) + sys.getsizeof(by_entity)
+            for entry in entries:
+                size += sys.getsizeof(entry)
+                for part in entry:
+                    if id(part) not in seen:
+                        seen.add(id(part))
+                        size += sys.getsizeof(part)
+            for key, item_entries in by_entity.items():
+                size += sys.getsizeof(key) + sys.getsizeof(item_entries)
+
+            per_entity: Dict[str, int] = {}
+            for entity_type, _entity_id in by_entity:
+                per_entity[entity_type] = per_entity.get(entity_type, 0) + 1
+
+            return {
+                'keys': len(entries),
+                'entities': per_entity,
+                'memory_bytes': size,
+                'built_at': datetime.fromtimestamp(self.built_at) if self.built_at else None,
+                'build_seconds': self.build_seconds,
+            }
+
+    # ------------------------------------------------------------------
+    # Sincronización desde eventos de modelo
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _record(target, operation: str) -> None:
+        entity_type = _entity_type_for(target)
+        session = object_session(target)
+        if not entity_type or session is None:
+            return
+        values = None
+        if operation == 'upsert':
+            values = [_plain(getattr(target, field, None)) for field in AUTOCOMPLETE_FIELDS[entity_type]]
+        session.info.setdefault(_PENDING_KEY, []).append((operation, entity_type, target.id, values))
+
+    @staticmethod
+    def _after_insert(mapper, connection, target) -> None:
+        AutocompleteIndex._record(target, 'upsert')
+
+    @staticmethod
+    def _after_update(mapper, connection, target) -> None:
+        entity_type = _entity_type_for(target)
+        if not entity_type:
+            return
+        state = sa_inspect(target)
+        if any(state.attrs[field].history.has_changes() for field in AUTOCOMPLETE_FIELDS[entity_type]):
+            AutocompleteIndex._record(target, 'upsert')
+
+    @staticmethod
+    def _after_delete(mapper, connection, target) -> None:
+        AutocompleteIndex._record(target, 'delete')
+
+    @staticmethod
+    def _after_commit(session) -> None:
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending or autocomplete_index.built_at is None:
+            return
+        for operation, entity_type, entity_id, values in pending:
+            if operation == 'delete':
+                autocomplete_index.remove(entity_type, entity_id)
+            else:
+                autocomplete_index.upsert(entity_type, entity_id, values)
+
+    @staticmethod
+    def _after_rollback(session) -> None:
+        session.info.pop(_PENDING_KEY, None)
+
+    @staticmethod
+    def register_listeners() -> None:
+        """Registrar los eventos que mantienen el índice (idempotente)."""
+        handlers = (
+            ('after_insert', AutocompleteIndex._after_insert),
+            ('after_update', AutocompleteIndex._after_update),
+            ('after_delete', AutocompleteIndex._after_delete),
+        )
+        for entity_type in AUTOCOMPLETE_FIELDS:
+            model = INDEXED_ENTITIES[entity_type]['model']
+            for event_name, handler in handlers:
+                if not event.contains(model, event_name, handler):
+                    event.listen(model, event_name, handler)
+
+        session_handlers = (
+            ('after_commit', AutocompleteIndex._after_commit),
+            ('after_rollback', AutocompleteIndex._after_rollback),
+        )
+        for event_name, handler in session_handlers:
+            if not event.contains(Session, event_name, handler):
+                event.listen(Session, event_name, handler)
+
+    @staticmethod
+    def preload(app) -> None:
+        """Construir el índice al arrancar si ``AUTOCOMPLETE_PRELOAD`` está activo."""
+        if not app.config.get('AUTOCOMPLETE_PRELOAD'):
+            return
+        with app.app_context():
+            try:
+                autocomplete_index.build()
+            except SQLAlchemyError as e:
+                # Tablas aún no migradas: se construirá en la primera consulta
+                db.session.rollback()
+                logger.warning(f'No se pudo precargar el autocompletado: {type(e).__name__}')
+
+
+# Instancia global
+autocomplete_index = AutocompleteIndex()
@@ -1,10 +1,14 @@
 """Servicio de Dashboard - Métricas y widgets para el panel principal."""
+import hashlib
+import json
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import func, desc, cast, Date
+from sqlalchemy import func, desc
 
 from app import db
+from app.utils.cache import cache
+from app.utils.timeseries import StatusSeries, day_expression, day_range
 
 
 class DashboardService:
@@ -16,8 +20,15 @@ class DashboardService:
     que evitan problemas N+1.
     """
 
-    # TODO: Implementar caché con TTL de 5 minutos para datos del dashboard
-    # CACHE_TTL = 300  # segundos
+    # Snapshot del dashboard: se invalida al confirmar cambios en estas
+    # tablas; el TTL acota los valores que dependen de la fecha actual.
+    CACHE_KEY = "dashboard:snapshot"
+    CACHE_TTL = 300  # segundos
+    CACHE_STALE_TTL = 60
+    CACHE_TAGS = ("entradas", "status_history", "productos", "clientes", "fabricas", "users")
+
+    # Estados de entrada que muestran las tendencias, en orden de las series
+    TREND_STATUSES = ("RECIBIDO", "EN_PROCESO", "COMPLETADO", "ENTREGADO", "ANULADO")
 
     @staticmethod
     def get_sample_status_counts() -> Dict[str, int]:
@@ -60,15 +71,66 @@ class DashboardService:
         return counts
 
     @staticmethod
-    def get_status_trends(days: int = 30) -> List[Dict[str, Any]]:
+    def get_status_series(days: int = 30, granularity: str = 'day',
+                          rolling: Optional[int] = None,
+                          cumulative: bool = False) -> StatusSeries:
         """
-        Obtener tendencias de cambios de estado en el tiempo.
+        Obtener la matriz densa de cambios de estado por bucket y estado.
 
-        Analiza el historial de estados para generar una serie
-        temporal de muestras por estado por día.
+        Agrupa el historial por día en SQL, filtrando ``changed_at`` por
+        rango (usa ``ix_status_history_changed_at``), y reagrupa los días en
+        semanas o meses con NumPy.
 
         Args:
             days: Número de días hacia atrás a analizar (default: 30)
+            granularity: 'day', 'week' o 'month' (default: 'day')
+            rolling: Ventana de media móvil en buckets (opcional)
+            cumulative: Acumular la serie antes de la media móvil (default: False)
+
+        Returns:
+            StatusSeries: Una fila por bucket y una columna por estado.
+
+        Raises:
+            ValueError: Si la granularidad o la ventana no son válidas.
+        """
+        from app.database.models.status_history import StatusHistory
+
+        end_date = datetime.utcnow().date()
+        start_date = end_date - timedelta(days=days - 1)
+        range_start, range_end = day_range(start_date, end_date)
+
+        day = day_expression(StatusHistory.changed_at)
+        rows = db.session.query(
+            day.label('date'),
+            StatusHistory.to_status,
+            func.count(StatusHistory.id).label('count')
+        ).filter(
+            StatusHistory.changed_at >= range_start,
+            StatusHistory.changed_at < range_end
+        ).group_by(
+            day,
+            StatusHistory.to_status
+        ).all()
+
+        series = StatusSeries.from_rows(
+            rows, start_date, end_date, granularity, DashboardService.TREND_STATUSES
+        )
+        if cumulative:
+            series = series.cumulative()
+        if rolling:
+            series = series.rolling_mean(rolling)
+        return series
+
+    @staticmethod
+    def get_status_trends(days: int = 30, granularity: str = 'day',
+                          rolling: Optional[int] = None,
+                          cumulative: bool = False) -> List[Dict[str, Any]]:
+        """
+        Obtener tendencias de cambios de estado en el tiempo.
+
+        Analiza el historial de estados para generar una serie
+        temporal de muestras por estado por bucket (día por defecto).
+        Los parámetros son los de ``get_status_series``.
 
         Returns:
             List[Dict[str, Any]]: Lista de diccionarios con formato:
@@ -84,58 +146,22 @@ class DashboardService:
                     ...
                 ]
         """
-        from app.database.models.entrada import EntradaStatus
-        from app.database.models.status_history import StatusHistory
-
-        # Calcular rango de fechas
-        end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(days=days - 1)
+        return DashboardService.get_status_series(
+            days, granularity, rolling, cumulative
+        ).to_records()
 
-        # Consulta agregada por fecha y estado
-        results = db.session.query(
-            cast(StatusHistory.changed_at, Date).label('date'),
-            StatusHistory.to_status,
-            func.count(StatusHistory.id).label('count')
-        ).filter(
-            cast(StatusHistory.changed_at, Date) >= start_date,
-            cast(StatusHistory.changed_at, Date) <= end_date
-        ).group_by(
-            cast(StatusHistory.changed_at, Date),
-            StatusHistory.to_status
-        ).order_by(
-            cast(StatusHistory.changed_at, Date)
-        ).all()
+    @staticmethod
+    def status_trends_figure(series: StatusSeries) -> Dict[str, Any]:
+        """
+        Convertir una serie de estados en figura de Plotly.
 
-        # Organizar resultados por fecha
-        trends_by_date: Dict[str, Dict[str, int]] = {}
-        all_statuses = [
-            EntradaStatus.RECIBIDO,
-            EntradaStatus.EN_PROCESO,
-            EntradaStatus.COMPLETADO,
-            EntradaStatus.ENTREGADO,
-            EntradaStatus.ANULADO
-        ]
-
-        # Inicializar todas las fechas del rango con ceros
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.isoformat()
-            trends_by_date[date_str] = {status: 0 for status in all_statuses}
-            current_date += timedelta(days=1)
-
-        # Poblar con datos reales
-        for date_val, status, count in results:
-            date_str = date_val.isoformat() if isinstance(date_val, datetime) else str(date_val)
-            if date_str in trends_by_date and status in trends_by_date[date_str]:
-                trends_by_date[date_str][status] = count
-
-        # Convertir a lista ordenada por fecha
-        trends_list = [
-            {'date': date_str, **counts}
-            for date_str, counts in sorted(trends_by_date.items())
-        ]
-
-        return trends_list
+        Returns:
+            Dict[str, Any]: ``{'data': [traza por estado], 'layout': {...}}``.
+        """
+        return series.to_plotly(layout={
+            'xaxis': {'title': 'Fecha'},
+            'yaxis': {'title': 'Cambios de estado', 'rangemode': 'tozero'},
+        })
 
     @staticmethod
     def get_recent_activity(limit: int = 10) -> List[Dict[str, Any]]:
@@ -240,3 +266,38 @@ class DashboardService:
             'pending_deliveries': DashboardService.get_pending_deliveries(),
             'timestamp': datetime.utcnow().isoformat()
         }
+
+    @staticmethod
+    def _compute_snapshot() -> Dict[str, Any]:
+        data = DashboardService.get_full_dashboard_data()
+        content = {key: value for key, value in data.items() if key != 'timestamp'}
+        digest = hashlib.sha1(
+            json.dumps(content, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return {'data': data, 'etag': digest, 'generated_at': data['timestamp']}
+
+    @staticmethod
+    def get_snapshot() -> Dict[str, Any]:
+        """
+        Obtener el snapshot cacheado del dashboard.
+
+        Se calcula una vez por intervalo (``CACHE_TTL``) o tras un commit
+        que modifique alguna tabla de ``CACHE_TAGS``; mientras tanto todas
+        las peticiones comparten el mismo resultado. El ``etag`` depende
+        solo del contenido (no del timestamp), así un recálculo sin cambios
+        conserva el mismo valor.
+
+        Returns:
+            Dict[str, Any]: Diccionario con:
+                - data: Resultado de ``get_full_dashboard_data``
+                - etag: Hash del contenido
+                - generated_at: Fecha/hora de generación
+            Tratar como solo lectura (compartido con la caché en memoria).
+        """
+        return cache.get_or_compute(
+            DashboardService.CACHE_KEY,
+            DashboardService._compute_snapshot,
+            ttl=DashboardService.CACHE_TTL,
+            tags=DashboardService.CACHE_TAGS,
+            stale_ttl=DashboardService.CACHE_STALE_TTL,
+        )
@@ -1,8 +1,9 @@
 """Servicio de negocio para gestión de DetalleEnsayo."""
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 from app import db
+from app.utils.pagination import TOTAL_EXACT, keyset_paginate, sort_column_for
 
 
 class DetalleEnsayoService:
@@ -13,6 +14,9 @@ class DetalleEnsayoService:
     y consulta de detalles de ensayo asociados a entradas de muestras.
     """
 
+    # Máximo de IDs por cláusula IN en las operaciones en lote
+    LOTE_TAMANO = 500
+
     # -------------------------------------------------------------------------
     # Métodos de escritura / transición de estado
     # -------------------------------------------------------------------------
@@ -327,6 +331,208 @@ class DetalleEnsayoService:
         db.session.commit()
         return detalle
 
+    @classmethod
+    def _cargar_detalles(cls, detalle_ids: List[int]) -> Dict[int, object]:
+        """Cargar y bloquear detalles por bloques de LOTE_TAMANO ids, en orden de id."""
+        from app.database.models.detalle_ensayo import DetalleEnsayo
+
+        ids = sorted(set(detalle_ids))
+        detalles = {}
+        for inicio in range(0, len(ids), cls.LOTE_TAMANO):
+            bloque = ids[inicio:inicio + cls.LOTE_TAMANO]
+            for detalle in (DetalleEnsayo.query
+                            .filter(DetalleEnsayo.id.in_(bloque))
+                            .order_by(DetalleEnsayo.id)
+                            .with_for_update()):
+                detalles[detalle.id] = detalle
+        return detalles
+
+    @classmethod
+    def _transicionar_lote(
+        cls,
+        detalle_ids: List[int],
+        destino: str,
+        usuario_id: Optional[int],
+        aplicar: Callable,
+    ) -> Tuple[Dict[str, List], List]:
+        """
+        Validar y aplicar en memoria una transición sobre varios detalles.
+
+        No confirma: el llamador hace un único commit al final.
+
+        Args:
+            detalle_ids: IDs de los detalles, en el orden de los resultados.
+            destino: Estado destino (valor de DetalleEnsayoStatus).
+            usuario_id: ID del usuario; sin usuario no se registra auditoría.
+            aplicar: ``aplicar(detalle, ahora) -> (anteriores, nuevos)``
+                actualiza el detalle y retorna los valores para AuditLog.
+
+        Returns:
+            Tuple: (resultados, detalles_modificados)
+        """
+        from app.database.models.audit import AuditLog
+        from app.database.models.detalle_ensayo import DetalleEnsayo
+
+        ids = list(dict.fromkeys(detalle_ids))
+        detalles = cls._cargar_detalles(ids)
+        resultados = {'exitosos': [], 'errores': []}
+        modificados = []
+        ahora = datetime.utcnow()
+
+        for detalle_id in ids:
+            detalle = detalles.get(detalle_id)
+            if not detalle:
+                resultados['errores'].append({
+                    'id': detalle_id,
+                    'error': f'DetalleEnsayo con id={detalle_id} no encontrado',
+                })
+                continue
+
+            if not DetalleEnsayo.can_transition(detalle.estado, destino):
+                resultados['errores'].append({
+                    'id': detalle_id,
+                    'error': f'Transición no válida: {detalle.estado} → {destino}',
+                })
+                continue
+
+            valores_anteriores, valores_nuevos = aplicar(detalle, ahora)
+            detalle.estado = destino
+            detalle.updated_at = ahora
+            valores_nuevos['estado'] = destino
+
+            if usuario_id is not None:
+                AuditLog.log_change(
+                    user_id=usuario_id,
+                    action='UPDATE',
+                    table_name='detalle_ensayos',
+                    record_id=detalle.id,
+                    old_values=valores_anteriores,
+                    new_values=valores_nuevos,
+                )
+
+            modificados.append(detalle)
+            resultados['exitosos'].append(detalle_id)
+
+        return resultados, modificados
+
+    @classmethod
+    def iniciar_ensayos(cls, detalle_ids: List[int], usuario_id: int) -> Dict[str, List]:
+        """
+        Iniciar varios ensayos con una sola carga y un solo commit.
+
+        Equivale a ``iniciar_ensayo`` por cada ID, pero los errores de un
+        detalle no impiden iniciar los demás.
+
+        Args:
+            detalle_ids: IDs de los DetalleEnsayo a iniciar.
+            usuario_id: ID del usuario que inicia los ensayos.
+
+        Returns:
+            Dict[str, List]: ``exitosos`` (IDs iniciados) y ``errores``
+            (``{'id', 'error'}`` por cada detalle no iniciado).
+        """
+        from app.database.models.detalle_ensayo import DetalleEnsayoStatus
+
+        def aplicar(detalle, ahora):
+            anteriores = {
+                'estado': detalle.estado,
+                'fecha_inicio': (
+                    detalle.fecha_inicio.isoformat() if detalle.fecha_inicio else None
+                ),
+            }
+            detalle.fecha_inicio = ahora
+            return anteriores, {'fecha_inicio': ahora.isoformat()}
+
+        resultados, _ = cls._transicionar_lote(
+            detalle_ids, DetalleEnsayoStatus.EN_PROCESO.value, usuario_id, aplicar
+        )
+        db.session.commit()
+        return resultados
+
+    @classmethod
+    def completar_ensayos(
+        cls,
+        detalle_ids: List[int],
+        observaciones: Optional[str] = None,
+        usuario_id: Optional[int] = None,
+    ) -> Dict[str, List]:
+        """
+        Completar varios ensayos con una sola carga y un solo commit.
+
+        Equivale a ``completar_ensayo`` por cada ID. La finalización de cada
+        entrada afectada se evalúa una sola vez, con una consulta agrupada
+        para todas, y las entradas que quedan con todos sus detalles en
+        COMPLETADO o REPORTADO pasan a COMPLETADO con
+        ``StatusWorkflow.apply_batch`` (historial y notificaciones en la
+        misma transacción).
+
+        Args:
+            detalle_ids: IDs de los DetalleEnsayo a completar.
+            observaciones: Observaciones opcionales del resultado.
+            usuario_id: ID del usuario que completa los ensayos.
+
+        Returns:
+            Dict[str, List]: ``exitosos`` (IDs completados) y ``errores``
+            (``{'id', 'error'}`` por cada detalle no completado).
+        """
+        from app.database.models.detalle_ensayo import DetalleEnsayo, DetalleEnsayoStatus
+        from app.database.models.entrada import EntradaStatus
+        from app.services.status_workflow import StatusWorkflow
+
+        def aplicar(detalle, ahora):
+            anteriores = {
+                'estado': detalle.estado,
+                'observaciones': detalle.observaciones,
+                'fecha_completado': (
+                    detalle.fecha_completado.isoformat() if detalle.fecha_completado else None
+                ),
+            }
+            detalle.fecha_completado = ahora
+            if observaciones is not None:
+                detalle.observaciones = observaciones
+            return anteriores, {
+                'observaciones': detalle.observaciones,
+                'fecha_completado': ahora.isoformat(),
+            }
+
+        resultados, completados = cls._transicionar_lote(
+            detalle_ids, DetalleEnsayoStatus.COMPLETADO.value, usuario_id, aplicar
+        )
+
+        # Entradas con algún detalle aún sin finalizar (una consulta por bloque)
+        estados_finales = (DetalleEnsayoStatus.COMPLETADO.value,
+                           DetalleEnsayoStatus.REPORTADO.value)
+        entrada_ids = sorted({d.entrada_id for d in completados})
+        con_pendientes = set()
+        for inicio in range(0, len(entrada_ids), cls.LOTE_TAMANO):
+            bloque = entrada_ids[inicio:inicio + cls.LOTE_TAMANO]
+            con_pendientes.update(
+                row[0] for row in db.session.query(DetalleEnsayo.entrada_id).filter(
+                    DetalleEnsayo.entrada_id.in_(bloque),
+                    DetalleEnsayo.estado.notin_(estados_finales),
+                ).distinct()
+            )
+
+        finalizadas = [eid for eid in entrada_ids if eid not in con_pendientes]
+        entradas = {
+            entrada.id: entrada
+            for entrada in StatusWorkflow.lock_entradas(finalizadas).values()
+            # Transicionar Entrada a COMPLETADO solo si aún no está en ese estado
+            if entrada.status not in (
+                EntradaStatus.COMPLETADO,
+                EntradaStatus.ENTREGADO,
+                EntradaStatus.ANULADO,
+            )
+        }
+        # Las transiciones no válidas desde el estado actual se ignoran
+        StatusWorkflow.apply_batch(
+            list(entradas), entradas, EntradaStatus.COMPLETADO,
+            changed_by_id=usuario_id, reason='Todos los ensayos completados',
+        )
+
+        db.session.commit()
+        return resultados
+
     @classmethod
     def pausar_ensayo(cls, detalle_id: int, usuario_id: int):
         """
@@ -579,3 +785,89 @@ class DetalleEnsayoService:
             agrupados[area_nombre].append(detalle)
 
         return agrupados
+
+    @classmethod
+    def obtener_detalles_paginados(
+        cls,
+        filtros: Optional[Dict] = None,
+        pagina: int = 1,
+        por_pagina: int = 20,
+        ordenar_por: str = 'id',
+        orden: str = 'desc',
+        cursor: Optional[str] = None,
+        total: str = TOTAL_EXACT
+    ) -> Tuple[List, Dict]:
+        """
+        Obtener detalles de ensayo paginados con filtros.
+
+        Args:
+            filtros: Diccionario con filtros opcionales:
+                    - entrada_id: Filtrar por entrada
+                    - tecnico_id: Filtrar por técnico asignado
+                    - estado: Filtrar por estado
+                    - area_id: Filtrar por área del ensayo
+            pagina: Número de página (1-based), solo sin cursor
+            por_pagina: Cantidad de registros por página
+            ordenar_por: Campo para ordenar (p. ej. 'fecha_completado')
+            orden: 'asc' o 'desc'
+            cursor: Cursor de paginación por keyset (opt-in). None usa
+                    OFFSET; '' pide la primera página por cursor y el resto
+                    se piden con el ``siguiente_cursor`` devuelto.
+            total: Conteo en modo cursor: 'exact', 'estimate' o 'none'
+
+        Returns:
+            Tuple: (lista_de_detalles, metadata_de_paginacion)
+        """
+        from sqlalchemy.orm import joinedload
+
+        from app.database.models.detalle_ensayo import DetalleEnsayo
+        from app.database.models.ensayo import Ensayo
+
+        filtros = filtros or {}
+        query = DetalleEnsayo.query.options(
+            joinedload(DetalleEnsayo.entrada),
+            joinedload(DetalleEnsayo.ensayo),
+            joinedload(DetalleEnsayo.tecnico_asignado),
+        )
+
+        if filtros.get('entrada_id'):
+            query = query.filter(DetalleEnsayo.entrada_id == filtros['entrada_id'])
+
+        if filtros.get('tecnico_id'):
+            query = query.filter(DetalleEnsayo.tecnico_asignado_id == filtros['tecnico_id'])
+
+        if filtros.get('estado'):
+            query = query.filter(DetalleEnsayo.estado == filtros['estado'])
+
+        if filtros.get('area_id'):
+            query = query.join(Ensayo, DetalleEnsayo.ensayo_id == Ensayo.id).filter(
+                Ensayo.area_id == filtros['area_id']
+            )
+
+        columna_orden = sort_column_for(DetalleEnsayo, ordenar_por, DetalleEnsayo.id)
+
+        # Paginación por cursor: (columna_orden, id) > último visto, sin OFFSET
+        if cursor is not None:
+            return keyset_paginate(
+                query, DetalleEnsayo, columna_orden, orden, por_pagina, cursor, total
+            )
+
+        if orden.lower() == 'desc':
+            query = query.order_by(columna_orden.desc(), DetalleEnsayo.id.desc())
+        else:
+            query = query.order_by(columna_orden.asc(), DetalleEnsayo.id.asc())
+
+        paginacion = query.paginate(page=pagina, per_page=por_pagina, error_out=False)
+
+        meta = {
+            'pagina': pagina,
+            'por_pagina': por_pagina,
+            'total': paginacion.total,
+            'total_paginas': paginacion.pages,
+            'tiene_siguiente': paginacion.has_next,
+            'tiene_anterior': paginacion.has_prev,
+            'siguiente_pagina': paginacion.next_num if paginacion.has_next else None,
+            'pagina_anterior': paginacion.prev_num if paginacion.has_prev else None
+        }
+
+        return paginacion.items, meta
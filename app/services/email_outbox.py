@@ -0,0 +1,356 @@
+"""Servicio de la cola de emails salientes (outbox).
+
+Los emails se encolan en la transacción del cambio que los origina
+(``EmailOutboxService.enqueue``) y los envía el worker lanzado con
+``flask email-outbox worker``:
+
+1. ``claim_batch`` reserva hasta ``batch_size`` filas listas
+   (``FOR UPDATE SKIP LOCKED`` en PostgreSQL), las marca ENVIANDO y confirma.
+2. ``send_batch`` envía el lote por una sola conexión SMTP y registra el
+   resultado de cada fila: ENVIADO, o PENDIENTE con backoff exponencial
+   hasta ``MAX_ATTEMPTS`` intentos (luego FALLIDO).
+
+Con ``MAIL_SUPPRESS_SEND`` (desarrollo y tests) Flask-Mail no abre conexión
+SMTP y solo emite la señal ``email_dispatched``: ``mail.record_messages()``
+sirve como buzón falso para verificar los envíos.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import case, func, update
+
+from app import db
+from app.database.models.email_outbox import EmailOutbox, EmailOutboxStatus
+
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutboxService:
+    """Encolado, envío por lotes y monitoreo de la cola de emails."""
+
+    # Filas por lote (una conexión SMTP por lote)
+    BATCH_SIZE = 50
+
+    # Reintentos: 30s, 1m, 2m, 4m, ... hasta BACKOFF_MAX
+    MAX_ATTEMPTS = 6
+    BACKOFF_BASE = 30  # segundos
+    BACKOFF_MAX = 3600
+
+    # Tiempo que una fila ENVIANDO queda reservada para su worker
+    LEASE_SECONDS = 300
+
+    # Espera del worker cuando la cola está vacía
+    POLL_INTERVAL = 5.0
+
+    # -------------------------------------------------------------------------
+    # Encolado
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def enqueue(recipient: str, subject: str, body: Optional[str] = None,
+                html: Optional[str] = None,
+                template: Optional[str] = None) -> EmailOutbox:
+        """
+        Agregar un email a la cola en la sesión actual, sin confirmar.
+
+        El email queda confirmado (y visible para el worker) con el commit
+        del llamador, junto con el cambio que lo origina.
+
+        Args:
+            recipient: Dirección del destinatario
+            subject: Asunto
+            body: Cuerpo en texto plano
+            html: Cuerpo HTML (opcional)
+            template: Template de email que lo generó (para diagnóstico)
+
+        Returns:
+            EmailOutbox: Fila agregada a la sesión
+        """
+        email = EmailOutbox(
+            recipient=recipient,
+            subject=subject,
+            body=body,
+            html=html,
+            template=template,
+            status=EmailOutboxStatus.PENDIENTE,
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+        )
+        db.session.add(email)
+        return email
+
+    # -------------------------------------------------------------------------
+    # Envío
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def backoff(cls, attempts: int) -> timedelta:
+        """Espera antes del siguiente intento tras ``attempts`` intentos fallidos."""
+        seconds = cls.BACKOFF_BASE * (2 ** max(attempts - 1, 0))
+        return timedelta(seconds=min(seconds, cls.BACKOFF_MAX))
+
+    @classmethod
+    def claim_batch(cls, batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Reservar un lote de emails listos para enviar.
+
+        Toma filas PENDIENTE cuyo próximo intento ya venció y filas ENVIANDO
+        con la reserva vencida (worker caído). Las marca ENVIANDO, suma un
+        intento y confirma, así otros workers no las toman.
+
+        La reserva es un ``UPDATE`` condicional que repite el filtro: si otro
+        worker tomó la fila entre la lectura y la escritura, su
+        ``next_attempt_at`` ya no está vencido y la fila no se retorna. En
+        PostgreSQL ``SKIP LOCKED`` evita además esperar esas filas; en SQLite
+        (donde ``FOR UPDATE`` no tiene efecto) la condición es la que impide
+        que dos workers envíen el mismo email.
+
+        Args:
+            batch_size: Máximo de filas (default BATCH_SIZE)
+
+        Returns:
+            List[Dict]: Datos de cada fila reservada (id, recipient, subject,
+            body, html, attempts)
+        """
+        now = datetime.utcnow()
+        claimable = (EmailOutbox.status.in_((EmailOutboxStatus.PENDIENTE,
+                                             EmailOutboxStatus.ENVIANDO)),
+                     EmailOutbox.next_attempt_at <= now)
+        ids = [row_id for (row_id,) in (db.session.query(EmailOutbox.id)
+                                        .filter(*claimable)
+                                        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+                                        .limit(batch_size or cls.BATCH_SIZE)
+                                        .with_for_update(skip_locked=True))]
+        if not ids:
+            db.session.commit()
+            return []
+
+        lease_until = now + timedelta(seconds=cls.LEASE_SECONDS)
+        rows = db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids), *claimable)
+            .values(status=EmailOutboxStatus.ENVIANDO,
+                    attempts=EmailOutbox.attempts + 1,
+                    next_attempt_at=lease_until)
+            .returning(EmailOutbox.id, EmailOutbox.recipient, EmailOutbox.subject,
+                       EmailOutbox.body, EmailOutbox.html, EmailOutbox.attempts)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.session.commit()
+
+        # Mismo orden que la lectura
+        position = {row_id: index for index, row_id in enumerate(ids)}
+        return [dict(row._mapping) for row in sorted(rows, key=lambda row: position[row.id])]
+
+    @classmethod
+    def send_batch(cls, emails: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Enviar un lote reservado por una sola conexión SMTP y registrar el resultado.
+
+        Un error de un mensaje solo afecta a ese mensaje; un error al abrir
+        la conexión reprograma todo el lote.
+
+        Args:
+            emails: Lote retornado por ``claim_batch``
+
+        Returns:
+            Dict[str, int]: Cantidad de enviados, reprogramados y fallidos
+        """
+        result = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+        if not emails:
+            return result
+
+        errors: Dict[int, str] = {}
+        sent: List[int] = []
+        mail = current_app.extensions.get('mail')
+        try:
+            if not mail:
+                raise RuntimeError('Flask-Mail no está configurado')
+            with mail.connect() as connection:
+                for email in emails:
+                    try:
+                        connection.send(Message(
+                            subject=email['subject'],
+                            recipients=[email['recipient']],
+                            body=email['body'],
+                            html=email['html'],
+                        ))
+                        sent.append(email['id'])
+                    except Exception as e:
+                        errors[email['id']] = str(e)
+        except Exception as e:
+            # Falla de conexión: reprogramar los que no llegaron a enviarse
+            logger.error(f"Error de conexión SMTP: {e}")
+            for email in emails:
+                if email['id'] not in sent:
+                    errors.setdefault(email['id'], str(e))
+
+        now = datetime.utcnow()
+        changes = [
+            {'id': email_id, 'status': EmailOutboxStatus.ENVIADO,
+             'sent_at': now, 'last_error': None}
+            for email_id in sent
+        ]
+        for email in emails:
+            error = errors.get(email['id'])
+            if error is None:
+                continue
+            if email['attempts'] >= cls.MAX_ATTEMPTS:
+                changes.append({'id': email['id'], 'status': EmailOutboxStatus.FALLIDO,
+                                'last_error': error})
+                result['fallidos'] += 1
+                logger.error(f"Email {email['id']} a {email['recipient']} descartado "
+                             f"tras {email['attempts']} intentos: {error}")
+            else:
+                changes.append({'id': email['id'], 'status': EmailOutboxStatus.PENDIENTE,
+                                'next_attempt_at': now + cls.backoff(email['attempts']),
+                                'last_error': error})
+                result['reintentos'] += 1
+
+        # UPDATE por clave primaria agrupado por conjunto de columnas (executemany)
+        for keys in {tuple(sorted(change)) for change in changes}:
+            db.session.execute(
+                update(EmailOutbox),
+                [change for change in changes if tuple(sorted(change)) == keys]
+            )
+        db.session.commit()
+
+        result['enviados'] = len(sent)
+        if sent:
+            logger.info(f"{len(sent)} emails enviados desde la cola")
+        return result
+
+    @classmethod
+    def process_batch(cls, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """Reservar y enviar un lote. Retorna los conteos de ``send_batch``."""
+        return cls.send_batch(cls.claim_batch(batch_size))
+
+    @classmethod
+    def drain(cls, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Procesar lotes hasta que no queden emails listos para enviar.
+
+        Los emails reprogramados con backoff no se vuelven a tomar en la
+        misma llamada.
+
+        Returns:
+            Dict[str, int]: Conteos acumulados de ``send_batch``
+        """
+        totals = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+        while True:
+            batch = cls.claim_batch(batch_size)
+            if not batch:
+                return totals
+            for key, value in cls.send_batch(batch).items():
+                totals[key] += value
+
+    @classmethod
+    def run_worker(cls, app, workers: int = 1, batch_size: Optional[int] = None,
+                   poll_interval: Optional[float] = None,
+                   stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Ejecutar ``workers`` hilos que drenan la cola hasta ``stop_event``.
+
+        Antes de cada lote se generan los resúmenes de notificaciones
+        vencidos (``NotificationService.flush_digests``), cuyos emails salen
+        en el mismo ciclo. Cada hilo usa su propio contexto de aplicación (y
+        su propia sesión). La reserva con SKIP LOCKED evita que dos hilos, o
+        dos procesos worker, envíen la misma fila.
+
+        Args:
+            app: Aplicación Flask
+            workers: Cantidad de hilos
+            batch_size: Filas por lote (default BATCH_SIZE)
+            poll_interval: Espera con la cola vacía (default POLL_INTERVAL)
+            stop_event: Evento para detener los hilos (default: nunca)
+        """
+        # Import local: notification_service importa este módulo
+        from app.services.notification_service import NotificationService
+
+        stop_event = stop_event or threading.Event()
+        poll_interval = cls.POLL_INTERVAL if poll_interval is None else poll_interval
+
+        def loop(number: int) -> None:
+            with app.app_context():
+                logger.info(f"Worker de email {number} iniciado")
+                while not stop_event.is_set():
+                    try:
+                        processed = NotificationService.flush_digests()['grupos']
+                        processed += sum(cls.process_batch(batch_size).values())
+                    except Exception as e:
+                        logger.error(f"Error en worker de email {number}: {e}")
+                        db.session.rollback()
+                        processed = 0
+                    finally:
+                        db.session.remove()
+                    if not processed:
+                        stop_event.wait(poll_interval)
+
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix='email-outbox') as executor:
+            for future in [executor.submit(loop, n) for n in range(1, workers + 1)]:
+                future.result()
+
+    # -------------------------------------------------------------------------
+    # Monitoreo y mantenimiento
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def queue_depth() -> Dict[str, Any]:
+        """
+        Obtener el estado de la cola.
+
+        Returns:
+            Dict: Filas por estado (``por_estado``), ``listos`` para enviar
+            ahora y antigüedad en segundos del pendiente más viejo
+            (``antiguedad_max``, None si no hay pendientes)
+        """
+        now = datetime.utcnow()
+        por_estado = {status: 0 for status in (EmailOutboxStatus.PENDIENTE,
+                                               EmailOutboxStatus.ENVIANDO,
+                                               EmailOutboxStatus.ENVIADO,
+                                               EmailOutboxStatus.FALLIDO)}
+        for status, count in db.session.query(
+            EmailOutbox.status, func.count(EmailOutbox.id)
+        ).group_by(EmailOutbox.status):
+            por_estado[status] = count
+
+        en_cola = (EmailOutboxStatus.PENDIENTE, EmailOutboxStatus.ENVIANDO)
+        listos, oldest = db.session.query(
+            func.sum(case((EmailOutbox.next_attempt_at <= now, 1), else_=0)),
+            func.min(EmailOutbox.created_at),
+        ).filter(EmailOutbox.status.in_(en_cola)).one()
+
+        return {
+            'por_estado': por_estado,
+            'listos': int(listos or 0),
+            'antiguedad_max': (now - oldest).total_seconds() if oldest else None,
+        }
+
+    @staticmethod
+    def retry_failed() -> int:
+        """Volver a encolar los emails FALLIDO. Retorna la cantidad."""
+        count = EmailOutbox.query.filter_by(status=EmailOutboxStatus.FALLIDO).update(
+            {'status': EmailOutboxStatus.PENDIENTE, 'attempts': 0,
+             'next_attempt_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def purge_sent(days: int) -> int:
+        """Eliminar los emails ENVIADO hace más de ``days`` días. Retorna la cantidad."""
+        limite = datetime.utcnow() - timedelta(days=days)
+        count = EmailOutbox.query.filter(
+            EmailOutbox.status == EmailOutboxStatus.ENVIADO,
+            EmailOutbox.sent_at < limite
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return count
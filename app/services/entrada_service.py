@@ -8,6 +8,7 @@ from sqlalchemy import asc, desc
 
 from app import db
 from app.services.status_workflow import StatusWorkflow
+from app.utils.pagination import TOTAL_EXACT, keyset_paginate, sort_column_for
 
 
 class EntradaService:
@@ -405,7 +406,9 @@ class EntradaService:
         pagina: int = 1,
         por_pagina: int = 20,
         ordenar_por: str = 'fech_entrada',
-        orden: str = 'desc'
+        orden: str = 'desc',
+        cursor: Optional[str] = None,
+        total: str = TOTAL_EXACT
     ) -> Tuple[List[Any], Dict[str, Any]]:
         """
         Obtener entradas paginadas con filtros.
@@ -421,6 +424,10 @@ class EntradaService:
             por_pagina: Cantidad de registros por página
             ordenar_por: Campo para ordenar
             orden: 'asc' o 'desc'
+            cursor: Cursor de paginación por keyset (opt-in). None usa
+                    OFFSET; '' pide la primera página por cursor y el resto
+                    se piden con el ``siguiente_cursor`` devuelto.
+            total: Conteo en modo cursor: 'exact', 'estimate' o 'none'
 
         Returns:
             Tuple: (lista_de_entradas, metadata_de_paginacion)
@@ -446,8 +453,15 @@ class EntradaService:
         if filtros.get('fecha_hasta'):
             query = query.filter(Entrada.fech_entrada <= filtros['fecha_hasta'])
 
+        columna_orden = sort_column_for(Entrada, ordenar_por, Entrada.fech_entrada)
+
+        # Paginación por cursor: (columna_orden, id) > último visto, sin OFFSET
+        if cursor is not None:
+            return keyset_paginate(
+                query, Entrada, columna_orden, orden, por_pagina, cursor, total
+            )
+
         # Aplicar ordenamiento
-        columna_orden = getattr(Entrada, ordenar_por, Entrada.fech_entrada)
         if orden.lower() == 'desc':
             query = query.order_by(desc(columna_orden))
         else:
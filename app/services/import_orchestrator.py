@@ -0,0 +1,531 @@
+"""Orquestador de importación en paralelo según dependencias.
+
+Cada fuente de datos (una tabla de Access, un CSV maestro, Phase 3, Phase 4)
+es un paso que escribe una o más tablas. Las dependencias entre pasos salen
+de las claves foráneas de esas tablas: un paso espera a los pasos que
+escriben las tablas que referencia, y dos pasos que escriben la misma tabla
+se ejecutan en el orden del plan. El resultado es un DAG; los pasos sin
+dependencias pendientes se ejecutan a la vez, cada uno con su propia
+conexión a la base:
+
+  - ``process``: pool de procesos; cada worker crea su app y su engine, así
+    la lectura y validación de los archivos corre en paralelo real.
+  - ``thread``: hilos con un contexto de aplicación (y una sesión) por paso.
+  - ``inline``: un paso por vez en el proceso actual.
+
+Un paso se lanza recién cuando terminaron los pasos de los que depende, de
+modo que las escrituras respetan las FKs. Si un paso falla, los que dependen
+de él se omiten. Los resultados de todos los pasos se combinan en un único
+``OrchestratedImportResult``.
+
+Uso típico::
+
+    orchestrator = ImportOrchestrator(data_dir='data/migrations', workers=4)
+    result = orchestrator.run()
+"""
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from flask import current_app
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ('process', 'thread', 'inline')
+
+KINDS = ('access', 'master', 'phase3', 'phase4')
+
+# CSV maestros: archivo -> método de MasterDataImportService
+MASTER_FILES = (
+    ('clientes.csv', 'import_clientes'),
+    ('fabricas.csv', 'import_fabricas'),
+    ('productos.csv', 'import_productos'),
+)
+
+PHASE3_FILES = ('ordenes_trabajo.csv', 'pedidos.csv', 'entradas.csv')
+
+PHASE4_FILES = ('detalles_ensayos.csv', 'utilizado_r.csv')
+
+
+class ImportStep:
+    """Paso del plan: una fuente que escribe ``tables``."""
+
+    def __init__(self, name: str, kind: str, tables: Tuple[str, ...], source: str,
+                 target: Optional[str] = None):
+        """
+        Args:
+            name: Identificador del paso (p. ej. ``access:Areas``, ``master:clientes``)
+            kind: 'access' | 'master' | 'phase3' | 'phase4'
+            tables: Tablas que escribe
+            source: Archivo Access, CSV o directorio de datos
+            target: Tabla de Access o método del servicio que ejecuta el paso
+        """
+        self.name = name
+        self.kind = kind
+        self.tables = tables
+        self.source = source
+        self.target = target
+        self.depends_on: List[str] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'tables': list(self.tables),
+            'source': self.source,
+            'depends_on': list(self.depends_on),
+        }
+
+
+class OrchestratedImportResult:
+    """Resultado combinado de todos los pasos de una importación orquestada."""
+
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.executor: Optional[str] = None
+        self.workers = 0
+        self.plan: List[List[str]] = []
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        # Resultados por fuente
+        self.access: Dict[str, Dict[str, Any]] = {}
+        self.master: Dict[str, Any] = {}      # nombre -> ImportResult
+        self.phase3 = None                    # Phase3ImportResult
+        self.phase4 = None                    # Phase4ImportResult
+        self.start_time: Optional[datetime] = None
+        self.end_time: Optional[datetime] = None
+
+    # ------------------------------------------------------------------
+    # Registro de pasos
+    # ------------------------------------------------------------------
+
+    def _record(self, step: ImportStep, status: str, **extra) -> None:
+        self.steps[step.name] = {
+            'kind': step.kind,
+            'tables': list(step.tables),
+            'depends_on': list(step.depends_on),
+            'status': status,
+            'seconds': 0.0,
+            'worker': None,
+            'error': None,
+            **extra,
+        }
+
+    def add(self, step: ImportStep, payload: Any, seconds: float, worker: Any) -> None:
+        """Registrar un paso terminado y su resultado."""
+        self._record(step, 'ok', seconds=round(seconds, 3), worker=worker)
+        if step.kind == 'access':
+            self.access[step.target] = payload
+        elif step.kind == 'master':
+            self.master[step.name.split(':', 1)[1]] = payload
+        elif step.kind == 'phase3':
+            self.phase3 = payload
+        elif step.kind == 'phase4':
+            self.phase4 = payload
+
+    def add_failure(self, step: ImportStep, error: Exception) -> None:
+        self._record(step, 'failed', error=str(getattr(error, 'orig', None) or error))
+
+    def add_skipped(self, step: ImportStep, cause: str) -> None:
+        self._record(step, 'skipped', error=f"Depende de {cause}, que no terminó")
+
+    # ------------------------------------------------------------------
+    # Totales
+    # ------------------------------------------------------------------
+
+    @property
+    def duration_seconds(self) -> float:
+        if self.start_time and self.end_time:
+            return (self.end_time - self.start_time).total_seconds()
+        return 0.0
+
+    @property
+    def steps_seconds(self) -> float:
+        """Suma de la duración de los pasos (lo que tardaría en serie)."""
+        return sum(step['seconds'] for step in self.steps.values())
+
+    @property
+    def failed_steps(self) -> List[str]:
+        return [name for name, step in self.steps.items() if step['status'] != 'ok']
+
+    @property
+    def total_imported(self) -> int:
+        total = sum(r.imported for r in self.master.values())
+        total += sum(stats['stats']['inserted'] + stats['stats']['updated']
+                     for stats in self.access.values())
+        for phase in (self.phase3, self.phase4):
+            if phase is not None:
+                total += phase.total_imported
+        return total
+
+    @property
+    def total_errors(self) -> int:
+        total = sum(len(r.errors) for r in self.master.values())
+        total += sum(stats['stats']['errors'] for stats in self.access.values())
+        for phase in (self.phase3, self.phase4):
+            if phase is not None:
+                total += phase.total_errors
+        return total
+
+    def to_dict(self) -> dict:
+        return {
+            'timestamp': (self.end_time or datetime.utcnow()).isoformat(),
+            'dry_run': self.dry_run,
+            'executor': self.executor,
+            'workers': self.workers,
+            'duration_seconds': self.duration_seconds,
+            'steps_seconds': round(self.steps_seconds, 3),
+            'total_imported': self.total_imported,
+            'total_errors': self.total_errors,
+            'failed_steps': self.failed_steps,
+            'plan': self.plan,
+            'steps': self.steps,
+            'access': self.access,
+            'master': {name: r.to_dict() for name, r in self.master.items()},
+            'phase3': self.phase3.to_dict() if self.phase3 is not None else None,
+            'phase4': self.phase4.to_dict() if self.phase4 is not None else None,
+        }
+
+
+# ----------------------------------------------------------------------
+# Ejecución de pasos (funciones de módulo: se envían a los procesos worker)
+# ----------------------------------------------------------------------
+
+def _run_access(step: ImportStep, dry_run: bool) -> Dict[str, Any]:
+    from app.services.access_importer import AccessImporter
+
+    # Cada paso abre su propia conexión a Access
+    with AccessImporter(step.source, dry_run=dry_run) as importer:
+        return importer.import_table(step.target)
+
+
+def _run_master(step: ImportStep, dry_run: bool):
+    from app.services.import_service import MasterDataImportService
+
+    service = MasterDataImportService(dry_run=dry_run)
+    return getattr(service, step.target)(step.source)
+
+
+def _run_phase3(step: ImportStep, dry_run: bool):
+    from app.services.phase3_import_service import Phase3ImportService
+
+    return Phase3ImportService(dry_run=dry_run).import_all(step.source)
+
+
+def _run_phase4(step: ImportStep, dry_run: bool):
+    from app.services.phase4_import_service import Phase4ImportService
+
+    return Phase4ImportService(dry_run=dry_run).import_all(step.source)
+
+
+_RUNNERS = {
+    'access': _run_access,
+    'master': _run_master,
+    'phase3': _run_phase3,
+    'phase4': _run_phase4,
+}
+
+
+def _execute_step(step: ImportStep, dry_run: bool) -> Tuple[Any, float, str]:
+    """Ejecutar un paso en el contexto actual; retorna (resultado, segundos, worker)."""
+    start = time.monotonic()
+    try:
+        payload = _RUNNERS[step.kind](step, dry_run)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        # Devolver la conexión al pool: el próximo paso del worker usa otra sesión
+        db.session.remove()
+    return payload, time.monotonic() - start, f"pid {os.getpid()}"
+
+
+def _execute_in_app_context(app, step: ImportStep, dry_run: bool) -> Tuple[Any, float, str]:
+    """Ejecutar un paso en un hilo, con su propio contexto de aplicación (y sesión)."""
+    import threading
+
+    with app.app_context():
+        payload, seconds, _ = _execute_step(step, dry_run)
+    return payload, seconds, threading.current_thread().name
+
+
+def _init_process_worker(config_name: str, database_uri: str) -> None:
+    """Inicializador de cada proceso: crear la app y dejar su contexto activo.
+
+    El worker solo importa: no precarga el índice de autocompletado.
+    """
+    from app import create_app
+
+    app = create_app(config_name, {'AUTOCOMPLETE_PRELOAD': False})
+    if app.config['SQLALCHEMY_DATABASE_URI'] != database_uri:
+        raise RuntimeError(
+            "El worker de importación no resuelve la misma base que el proceso principal"
+        )
+    app.app_context().push()
+
+
+class _InlineExecutor:
+    """Ejecutor que corre cada paso al enviarlo, en el hilo actual."""
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        pass
+
+
+def _access_tables() -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """Tablas de Access en el orden de ``TABLE_MAPPING``: nombre -> (grupo, config)."""
+    from app.services.access_importer import AccessImporter
+
+    return {
+        access_table: (group, config)
+        for group, tables in AccessImporter.TABLE_MAPPING.items()
+        for access_table, config in tables.items()
+    }
+
+
+# ----------------------------------------------------------------------
+# Orquestador
+# ----------------------------------------------------------------------
+
+class ImportOrchestrator:
+    """Planifica los pasos de importación como un DAG y los ejecuta en paralelo."""
+
+    def __init__(
+        self,
+        data_dir: Optional[str] = None,
+        access_db: Optional[str] = None,
+        dry_run: bool = False,
+        workers: Optional[int] = None,
+        executor: str = 'process',
+        kinds: Sequence[str] = KINDS
+    ):
+        """
+        Args:
+            data_dir: Directorio con los CSV (maestros, Phase 3 y Phase 4)
+            access_db: Archivo Access (.accdb) para las tablas de ``TABLE_MAPPING``
+            dry_run: Si True, los servicios validan sin escribir
+            workers: Pasos simultáneos (default: CPUs disponibles)
+            executor: 'process', 'thread' o 'inline'
+            kinds: Fuentes a incluir ('access', 'master', 'phase3', 'phase4')
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Ejecutor inválido: {executor} (opciones: {', '.join(EXECUTORS)})")
+        self.data_dir = Path(data_dir) if data_dir else None
+        self.access_db = access_db
+        self.dry_run = dry_run
+        self.workers = max(workers or os.cpu_count() or 1, 1)
+        self.executor = executor
+        self.kinds = tuple(kinds)
+
+    # ------------------------------------------------------------------
+    # Plan
+    # ------------------------------------------------------------------
+
+    def build_steps(self) -> List[ImportStep]:
+        """Pasos disponibles según las fuentes indicadas, con sus dependencias."""
+        from app.database.models import (
+            Cliente, DetalleEnsayo, Entrada, Fabrica, OrdenTrabajo, Pedido, Producto, Utilizado
+        )
+        from app.services.access_importer import AccessImporter
+
+        steps: List[ImportStep] = []
+
+        if self.access_db and 'access' in self.kinds:
+            importer = AccessImporter(self.access_db)
+            for access_table, (_, config) in _access_tables().items():
+                model = importer._get_model_class(config['model_class'])
+                steps.append(ImportStep(f"access:{access_table}", 'access',
+                                        (model.__tablename__,), self.access_db, access_table))
+
+        if self.data_dir is not None:
+            master_models = {
+                'import_clientes': Cliente,
+                'import_fabricas': Fabrica,
+                'import_productos': Producto,
+            }
+            if 'master' in self.kinds:
+                for filename, method in MASTER_FILES:
+                    path = self.data_dir / filename
+                    if not path.exists():
+                        logger.warning(f"Archivo no encontrado, se omite: {path}")
+                        continue
+                    steps.append(ImportStep(f"master:{path.stem}", 'master',
+                                            (master_models[method].__tablename__,),
+                                            str(path), method))
+
+            # OT → Pedidos → Entradas (y Detalles → Utilizados) es una cadena de
+            # FKs: cada fase es un paso y su servicio conserva las claves entre tablas
+            phases = (
+                ('phase3', PHASE3_FILES, (OrdenTrabajo, Pedido, Entrada)),
+                ('phase4', PHASE4_FILES, (DetalleEnsayo, Utilizado)),
+            )
+            for kind, files, models in phases:
+                if kind in self.kinds and any((self.data_dir / f).exists() for f in files):
+                    steps.append(ImportStep(kind, kind,
+                                            tuple(m.__tablename__ for m in models),
+                                            str(self.data_dir)))
+
+        self._resolve_dependencies(steps)
+        return steps
+
+    @staticmethod
+    def _resolve_dependencies(steps: List[ImportStep]) -> None:
+        """Completar ``depends_on`` de cada paso a partir de las FKs de sus tablas."""
+        writers: Dict[str, List[ImportStep]] = {}
+        for step in steps:
+            for table in step.tables:
+                writers.setdefault(table, []).append(step)
+
+        def add(step: ImportStep, depends_on: List[str], other: ImportStep) -> None:
+            if other is not step and other.name not in depends_on:
+                depends_on.append(other.name)
+
+        for step in steps:
+            depends_on: List[str] = []
+
+            for table_name in step.tables:
+                # Tablas referenciadas (las FKs dentro del mismo paso las ordena el servicio)
+                for fk in db.metadata.tables[table_name].foreign_keys:
+                    parent = fk.column.table.name
+                    if parent not in step.tables:
+                        for other in writers.get(parent, []):
+                            add(step, depends_on, other)
+                # Pasos anteriores que escriben la misma tabla
+                for other in writers[table_name]:
+                    if other is step:
+                        break
+                    add(step, depends_on, other)
+
+            step.depends_on = depends_on
+
+    def plan(self) -> List[List[ImportStep]]:
+        """
+        Ordenar los pasos en niveles: cada nivel solo depende de los anteriores.
+
+        Raises:
+            ValueError: si las dependencias forman un ciclo
+        """
+        steps = self.build_steps()
+        done: set = set()
+        levels: List[List[ImportStep]] = []
+        remaining = list(steps)
+        while remaining:
+            level = [s for s in remaining if all(d in done for d in s.depends_on)]
+            if not level:
+                names = ', '.join(s.name for s in remaining)
+                raise ValueError(f"Dependencias circulares entre: {names}")
+            levels.append(level)
+            done.update(s.name for s in level)
+            remaining = [s for s in remaining if s.name not in done]
+        return levels
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def _resolve_executor(self, step_count: int) -> Tuple[str, int]:
+        """Ejecutor y cantidad de workers efectivos para esta corrida."""
+        workers = min(self.workers, max(step_count, 1))
+        if self.executor == 'inline' or workers <= 1:
+            return 'inline', 1
+        if db.engine.url.get_backend_name() == 'sqlite':
+            # SQLite serializa las escrituras y una base en memoria no se comparte
+            logger.warning("SQLite no admite escrituras concurrentes: los pasos se ejecutan en serie")
+            return 'inline', 1
+        return self.executor, workers
+
+    def _start_executor(self, executor: str, workers: int):
+        """Crear el ejecutor y la función que envía un paso."""
+        if executor == 'process':
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_process_worker,
+                initargs=(current_app.config['CONFIG_NAME'],
+                          current_app.config['SQLALCHEMY_DATABASE_URI']),
+            )
+            return pool, lambda step: pool.submit(_execute_step, step, self.dry_run)
+
+        if executor == 'thread':
+            app = current_app._get_current_object()
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='import')
+            return pool, lambda step: pool.submit(_execute_in_app_context, app, step, self.dry_run)
+
+        pool = _InlineExecutor()
+        return pool, lambda step: pool.submit(_execute_step, step, self.dry_run)
+
+    def run(self) -> OrchestratedImportResult:
+        """Ejecutar el plan completo y combinar los resultados."""
+        levels = self.plan()
+        steps = [step for level in levels for step in level]
+        by_name = {step.name: step for step in steps}
+
+        result = OrchestratedImportResult(dry_run=self.dry_run)
+        result.plan = [[step.name for step in level] for level in levels]
+        result.executor, result.workers = self._resolve_executor(len(steps))
+        result.start_time = datetime.utcnow()
+
+        logger.info(f"Importación orquestada: {len(steps)} pasos en {len(levels)} niveles, "
+                    f"ejecutor {result.executor} ({result.workers} workers)")
+
+        # Dependencias pendientes de los pasos que aún no se lanzaron
+        waiting = {step.name: set(step.depends_on) for step in steps}
+        running: Dict[Future, ImportStep] = {}
+
+        pool, submit = self._start_executor(result.executor, result.workers)
+        try:
+            while waiting or running:
+                for step in steps:
+                    if step.name in waiting and not waiting[step.name]:
+                        del waiting[step.name]
+                        logger.info(f"Iniciando {step.name}")
+                        running[submit(step)] = step
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    try:
+                        payload, seconds, worker = future.result()
+                    except Exception as e:
+                        logger.error(f"Paso {step.name} falló: {e}")
+                        result.add_failure(step, e)
+                        self._skip_dependents(step.name, waiting, by_name, result)
+                        continue
+                    logger.info(f"Paso {step.name} terminado en {seconds:.1f}s ({worker})")
+                    result.add(step, payload, seconds, worker)
+                    for pending in waiting.values():
+                        pending.discard(step.name)
+        finally:
+            pool.shutdown(wait=True)
+
+        result.end_time = datetime.utcnow()
+        return result
+
+    @staticmethod
+    def _skip_dependents(failed: str, waiting: Dict[str, set], by_name: Dict[str, ImportStep],
+                         result: OrchestratedImportResult) -> None:
+        """Omitir (transitivamente) los pasos que dependen de ``failed``."""
+        stack = [failed]
+        while stack:
+            cause = stack.pop()
+            for name in [n for n, deps in waiting.items() if cause in deps]:
+                del waiting[name]
+                result.add_skipped(by_name[name], cause)
+                stack.append(name)
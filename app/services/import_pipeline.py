@@ -0,0 +1,249 @@
+"""Pipeline de importación por streaming desde CSV.
+
+Los importadores de CSV (Phase 3/4 y datos maestros) recorren el archivo
+una sola vez: cada fila se lee, se valida y se transforma en el momento, y
+los objetos resultantes se escriben en lotes con un commit por lote. En
+memoria solo queda el lote en curso, de modo que exportaciones de cientos
+de miles de filas se importan con memoria acotada.
+
+Uso típico::
+
+    stats = CsvImportPipeline(
+        csv_path, transform, on_error,
+        label='Entradas', batch_size=self.BATCH_SIZE, dry_run=self.dry_run,
+    ).run()
+
+``transform(row_num, row)`` valida la fila y retorna el objeto (o una lista
+de objetos) a escribir, o None para omitirla; si levanta una excepción la
+fila se reporta con ``on_error(row_num, row, exc)``. Si un lote falla al
+confirmarse se revierte y se reintenta fila por fila, de modo que solo se
+pierden las filas con error.
+"""
+import csv
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+Row = Dict[str, str]
+
+
+def iter_csv_rows(csv_path, encoding: str = 'utf-8') -> Iterator[Tuple[int, Row]]:
+    """Recorrer un CSV fila por fila como (número de fila, dict); el encabezado es la fila 1."""
+    with open(csv_path, 'r', encoding=encoding, newline='') as f:
+        yield from enumerate(csv.DictReader(f), start=2)
+
+
+def count_data_lines(csv_path) -> int:
+    """
+    Cantidad aproximada de filas de datos (líneas menos el encabezado).
+
+    Cuenta saltos de línea en bloques binarios, sin parsear el CSV; los
+    campos con saltos de línea entrecomillados la inflan, así que solo se
+    usa para estimar el avance.
+    """
+    lines = 0
+    last = b''
+    with open(csv_path, 'rb') as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            lines += chunk.count(b'\n')
+            last = chunk
+    if last and not last.endswith(b'\n'):
+        lines += 1
+    return max(lines - 1, 0)
+
+
+class ImportProgress:
+    """
+    Avance de una importación: filas procesadas, filas/s y ETA.
+
+    Registra el avance en el log cada ``interval`` segundos y, si se indica,
+    llama a ``callback(progress)``.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        total: Optional[int] = None,
+        interval: float = 5.0,
+        callback: Optional[Callable[['ImportProgress'], None]] = None
+    ):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.callback = callback
+        self.processed = 0
+        self.start = time.monotonic()
+        self._last_report = self.start
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    @property
+    def rate(self) -> float:
+        """Filas por segundo desde el inicio."""
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Segundos estimados para terminar (None si no se conoce el total)."""
+        if not self.total or not self.rate:
+            return None
+        return max(self.total - self.processed, 0) / self.rate
+
+    def advance(self, rows: int = 1) -> None:
+        self.processed += rows
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self) -> None:
+        if self.total:
+            pct = min(self.processed / self.total * 100, 100.0)
+            eta = self.eta_seconds
+            eta_text = f", ETA {eta:.0f}s" if eta is not None else ''
+            logger.info(
+                f"{self.label}: {self.processed}/{self.total} filas ({pct:.1f}%), "
+                f"{self.rate:.0f} filas/s{eta_text}"
+            )
+        else:
+            logger.info(f"{self.label}: {self.processed} filas, {self.rate:.0f} filas/s")
+        if self.callback:
+            self.callback(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'processed': self.processed,
+            'total': self.total,
+            'elapsed_seconds': round(self.elapsed, 2),
+            'rows_per_second': round(self.rate, 1),
+        }
+
+
+class PipelineStats:
+    """Resultado de una corrida del pipeline."""
+
+    def __init__(self):
+        self.total = 0       # Filas leídas
+        self.imported = 0    # Objetos escritos (o aceptados en dry-run)
+        self.failed = 0      # Filas descartadas al escribir
+        self.progress: Optional[ImportProgress] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'total': self.total, 'imported': self.imported, 'failed': self.failed}
+        if self.progress:
+            data['progress'] = self.progress.to_dict()
+        return data
+
+
+class CsvImportPipeline:
+    """Lectura → validación/transformación → escritura por lotes de un CSV."""
+
+    def __init__(
+        self,
+        csv_path,
+        transform: Callable[[int, Row], Any],
+        on_error: Callable[[int, Row, Exception], None],
+        label: str,
+        batch_size: int = 500,
+        dry_run: bool = False,
+        encoding: str = 'utf-8',
+        write: Optional[Callable[[List[Any]], None]] = None,
+        progress_interval: float = 5.0,
+        progress_callback: Optional[Callable[[ImportProgress], None]] = None
+    ):
+        """
+        Args:
+            csv_path: Archivo CSV con encabezado
+            transform: (row_num, row) -> objeto, lista de objetos o None (omitir)
+            on_error: Se llama con cada fila que falla al transformar o escribir
+            label: Nombre para el log de avance
+            batch_size: Objetos por commit
+            dry_run: Si True, transforma pero no escribe
+            encoding: Codificación del archivo
+            write: Escritura de un lote (default: ``db.session.add_all``)
+            progress_interval: Segundos entre reportes de avance
+            progress_callback: Función opcional llamada en cada reporte
+        """
+        self.csv_path = Path(csv_path)
+        self.transform = transform
+        self.on_error = on_error
+        self.label = label
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.encoding = encoding
+        self.write = write or db.session.add_all
+        self.progress_interval = progress_interval
+        self.progress_callback = progress_callback
+
+    def run(self) -> PipelineStats:
+        """Procesar el archivo completo en una pasada."""
+        stats = PipelineStats()
+        progress = ImportProgress(
+            self.label, count_data_lines(self.csv_path),
+            self.progress_interval, self.progress_callback
+        )
+        stats.progress = progress
+
+        batch: List[Tuple[int, Row, Any]] = []
+
+        for row_num, row in iter_csv_rows(self.csv_path, self.encoding):
+            stats.total += 1
+            progress.advance()
+            try:
+                produced = self.transform(row_num, row)
+            except Exception as e:
+                self.on_error(row_num, row, e)
+                continue
+
+            if produced is None:
+                continue
+            items = produced if isinstance(produced, list) else [produced]
+
+            if self.dry_run:
+                stats.imported += len(items)
+                continue
+
+            batch.extend((row_num, row, item) for item in items)
+            if len(batch) >= self.batch_size:
+                self._flush(batch, stats)
+                batch = []
+
+        if batch:
+            self._flush(batch, stats)
+
+        progress.total = stats.total
+        progress.report()
+        return stats
+
+    def _flush(self, batch: List[Tuple[int, Row, Any]], stats: PipelineStats) -> None:
+        """Escribir y confirmar un lote; si falla, reintentar fila por fila."""
+        try:
+            self.write([item for _, _, item in batch])
+            db.session.commit()
+            stats.imported += len(batch)
+            return
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"{self.label}: lote falló ({getattr(e, 'orig', None) or e}); "
+                           f"reintentando fila por fila")
+
+        for row_num, row, item in batch:
+            try:
+                self.write([item])
+                db.session.commit()
+                stats.imported += 1
+            except Exception as e:
+                db.session.rollback()
+                stats.failed += 1
+                self.on_error(row_num, row, e)
@@ -1,5 +1,4 @@
 """Servicio para importación de datos desde Access."""
-import csv
 import json
 import logging
 from datetime import datetime
@@ -8,6 +7,7 @@ from pathlib import Path
 
 from app import db
 from app.database.models import Cliente, Fabrica, Producto, Organismo, Provincia, Destino
+from app.services.import_pipeline import CsvImportPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -62,71 +62,62 @@ class ImportResult:
 class MasterDataImportService:
     """Servicio para importar datos maestros desde CSV."""
 
-    BATCH_SIZE = 50
+    BATCH_SIZE = 500
 
     def __init__(self, dry_run: bool = False):
         self.dry_run = dry_run
         self.results: List[ImportResult] = []
 
-    def import_clientes(self, csv_path: str, skip_existing: bool = True) -> ImportResult:
-        """Importar clientes desde CSV."""
-        result = ImportResult('clientes')
+    def _import_by_id(self, result: ImportResult, csv_path: str, model, label: str,
+                      build, skip_existing: bool) -> ImportResult:
+        """
+        Importar un CSV cuyas filas se identifican por la columna ``id``.
+
+        Los ids existentes se leen una vez y se actualizan en memoria con cada
+        fila preparada, así los duplicados se resuelven sin consultar la base.
+        ``build(row_num, row)`` valida la fila y retorna la instancia, o None
+        si registró un error en ``result``.
+        """
         result.start_time = datetime.utcnow()
 
-        # IDs válidos de organismos
-        valid_organismos = {o.id for o in Organismo.query.all()}
+        existing_ids = set(db.session.execute(db.select(model.id)).scalars())
+        # Filas existentes a actualizar (merge) en lugar de insertar
+        to_merge = set()
+
+        def transform(row_num, row):
+            # Verificar si existe
+            row_id = int(row['id'])
+            exists = row_id in existing_ids
+            if exists and skip_existing:
+                result.skipped += 1
+                return None
+
+            instance = build(row_num, row)
+            if instance is None:
+                return None
+
+            if exists:
+                to_merge.add(row_id)
+            existing_ids.add(row_id)
+            return instance
+
+        def on_error(row_num, row, e):
+            result.errors.append(ImportError(row_num, 'general', str(e), row))
+
+        def write(instances):
+            for instance in instances:
+                if instance.id in to_merge:
+                    db.session.merge(instance)
+                else:
+                    db.session.add(instance)
 
         try:
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-
-                for row_num, row in enumerate(reader, start=2):  # Header es 1
-                    try:
-                        # Verificar si existe
-                        existing = Cliente.query.get(int(row['id']))
-                        if existing and skip_existing:
-                            result.skipped += 1
-                            continue
-
-                        # Validar organismo_id
-                        organismo_id = int(row['organismo_id']) if row['organismo_id'] else None
-                        if organismo_id and organismo_id not in valid_organismos:
-                            result.errors.append(ImportError(
-                                row_num, 'organismo_id',
-                                f'Organismo inválido: {organismo_id}',
-                                row['organismo_id']
-                            ))
-                            continue
-
-                        # Crear cliente
-                        cliente = Cliente(
-                            id=int(row['id']),
-                            nombre=row['nombre'].strip(),
-                            codigo=row.get('codigo', f'CLI{row["id"]}'),
-                            organismo_id=organismo_id,
-                            tipo_cliente=int(row['tipo_cliente']) if row['tipo_cliente'] else 1,
-                            activo=bool(int(row['activo'])) if row['activo'] else True
-                        )
-
-                        if not self.dry_run:
-                            if existing:
-                                db.session.merge(cliente)
-                            else:
-                                db.session.add(cliente)
-
-                            # Commit cada BATCH_SIZE
-                            if result.imported % self.BATCH_SIZE == 0:
-                                db.session.commit()
-
-                        result.imported += 1
-
-                    except Exception as e:
-                        result.errors.append(ImportError(
-                            row_num, 'general', str(e), row
-                        ))
-
-            if not self.dry_run:
-                db.session.commit()
+            stats = CsvImportPipeline(
+                csv_path, transform, on_error,
+                label=label, batch_size=self.BATCH_SIZE, dry_run=self.dry_run,
+                write=write,
+            ).run()
+            result.imported = stats.imported
 
         except FileNotFoundError:
             logger.error(f"Archivo no encontrado: {csv_path}")
@@ -136,146 +127,102 @@ class MasterDataImportService:
         self.results.append(result)
         return result
 
+    def import_clientes(self, csv_path: str, skip_existing: bool = True) -> ImportResult:
+        """Importar clientes desde CSV."""
+        result = ImportResult('clientes')
+
+        # IDs válidos de organismos
+        valid_organismos = set(db.session.execute(db.select(Organismo.id)).scalars())
+
+        def build(row_num, row):
+            # Validar organismo_id
+            organismo_id = int(row['organismo_id']) if row['organismo_id'] else None
+            if organismo_id and organismo_id not in valid_organismos:
+                result.errors.append(ImportError(
+                    row_num, 'organismo_id',
+                    f'Organismo inválido: {organismo_id}',
+                    row['organismo_id']
+                ))
+                return None
+
+            # Crear cliente
+            return Cliente(
+                id=int(row['id']),
+                nombre=row['nombre'].strip(),
+                codigo=row.get('codigo', f'CLI{row["id"]}'),
+                organismo_id=organismo_id,
+                tipo_cliente=int(row['tipo_cliente']) if row['tipo_cliente'] else 1,
+                activo=bool(int(row['activo'])) if row['activo'] else True
+            )
+
+        return self._import_by_id(result, csv_path, Cliente, 'Clientes', build, skip_existing)
+
     def import_fabricas(self, csv_path: str, skip_existing: bool = True) -> ImportResult:
         """Importar fábricas desde CSV."""
         result = ImportResult('fabricas')
-        result.start_time = datetime.utcnow()
 
         # IDs válidos
-        valid_clientes = {c.id for c in Cliente.query.all()}
-        valid_provincias = {p.id for p in Provincia.query.all()}
-
-        try:
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-
-                for row_num, row in enumerate(reader, start=2):
-                    try:
-                        # Verificar si existe
-                        existing = Fabrica.query.get(int(row['id']))
-                        if existing and skip_existing:
-                            result.skipped += 1
-                            continue
-
-                        # Validar FKs
-                        cliente_id = int(row['cliente_id'])
-                        if cliente_id not in valid_clientes:
-                            result.errors.append(ImportError(
-                                row_num, 'cliente_id',
-                                f'Cliente inválido: {cliente_id}',
-                                row['cliente_id']
-                            ))
-                            continue
-
-                        provincia_id = int(row['provincia_id']) if row['provincia_id'] else None
-                        if provincia_id and provincia_id not in valid_provincias:
-                            result.errors.append(ImportError(
-                                row_num, 'provincia_id',
-                                f'Provincia inválida: {provincia_id}',
-                                row['provincia_id']
-                            ))
-                            continue
-
-                        # Crear fábrica
-                        fabrica = Fabrica(
-                            id=int(row['id']),
-                            cliente_id=cliente_id,
-                            nombre=row['nombre'].strip() or f'Fábrica {row["id"]}',
-                            provincia_id=provincia_id,
-                            activo=True
-                        )
-
-                        if not self.dry_run:
-                            if existing:
-                                db.session.merge(fabrica)
-                            else:
-                                db.session.add(fabrica)
-
-                            if result.imported % self.BATCH_SIZE == 0:
-                                db.session.commit()
-
-                        result.imported += 1
-
-                    except Exception as e:
-                        result.errors.append(ImportError(
-                            row_num, 'general', str(e), row
-                        ))
-
-            if not self.dry_run:
-                db.session.commit()
-
-        except FileNotFoundError:
-            logger.error(f"Archivo no encontrado: {csv_path}")
-            raise
-
-        result.end_time = datetime.utcnow()
-        self.results.append(result)
-        return result
+        valid_clientes = set(db.session.execute(db.select(Cliente.id)).scalars())
+        valid_provincias = set(db.session.execute(db.select(Provincia.id)).scalars())
+
+        def build(row_num, row):
+            # Validar FKs
+            cliente_id = int(row['cliente_id'])
+            if cliente_id not in valid_clientes:
+                result.errors.append(ImportError(
+                    row_num, 'cliente_id',
+                    f'Cliente inválido: {cliente_id}',
+                    row['cliente_id']
+                ))
+                return None
+
+            provincia_id = int(row['provincia_id']) if row['provincia_id'] else None
+            if provincia_id and provincia_id not in valid_provincias:
+                result.errors.append(ImportError(
+                    row_num, 'provincia_id',
+                    f'Provincia inválida: {provincia_id}',
+                    row['provincia_id']
+                ))
+                return None
+
+            # Crear fábrica
+            return Fabrica(
+                id=int(row['id']),
+                cliente_id=cliente_id,
+                nombre=row['nombre'].strip() or f'Fábrica {row["id"]}',
+                provincia_id=provincia_id,
+                activo=True
+            )
+
+        return self._import_by_id(result, csv_path, Fabrica, 'Fábricas', build, skip_existing)
 
     def import_productos(self, csv_path: str, skip_existing: bool = True) -> ImportResult:
         """Importar productos desde CSV."""
         result = ImportResult('productos')
-        result.start_time = datetime.utcnow()
 
         # IDs válidos
-        valid_destinos = {d.id for d in Destino.query.all()}
-
-        try:
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-
-                for row_num, row in enumerate(reader, start=2):
-                    try:
-                        # Verificar si existe
-                        existing = Producto.query.get(int(row['id']))
-                        if existing and skip_existing:
-                            result.skipped += 1
-                            continue
-
-                        # Validar FK
-                        destino_id = int(row['destino_id']) if row['destino_id'] else None
-                        if destino_id and destino_id not in valid_destinos:
-                            result.errors.append(ImportError(
-                                row_num, 'destino_id',
-                                f'Destino inválido: {destino_id}',
-                                row['destino_id']
-                            ))
-                            continue
-
-                        # Crear producto
-                        producto = Producto(
-                            id=int(row['id']),
-                            nombre=row['nombre'].strip(),
-                            destino_id=destino_id,
-                            activo=True
-                        )
-
-                        if not self.dry_run:
-                            if existing:
-                                db.session.merge(producto)
-                            else:
-                                db.session.add(producto)
-
-                            if result.imported % self.BATCH_SIZE == 0:
-                                db.session.commit()
-
-                        result.imported += 1
-
-                    except Exception as e:
-                        result.errors.append(ImportError(
-                            row_num, 'general', str(e), row
-                        ))
-
-            if not self.dry_run:
-                db.session.commit()
-
-        except FileNotFoundError:
-            logger.error(f"Archivo no encontrado: {csv_path}")
-            raise
-
-        result.end_time = datetime.utcnow()
-        self.results.append(result)
-        return result
+        valid_destinos = set(db.session.execute(db.select(Destino.id)).scalars())
+
+        def build(row_num, row):
+            # Validar FK
+            destino_id = int(row['destino_id']) if row['destino_id'] else None
+            if destino_id and destino_id not in valid_destinos:
+                result.errors.append(ImportError(
+                    row_num, 'destino_id',
+                    f'Destino inválido: {destino_id}',
+                    row['destino_id']
+                ))
+                return None
+
+            # Crear producto
+            return Producto(
+                id=int(row['id']),
+                nombre=row['nombre'].strip(),
+                destino_id=destino_id,
+                activo=True
+            )
+
+        return self._import_by_id(result, csv_path, Producto, 'Productos', build, skip_existing)
 
     def validate_all(self) -> Dict:
         """Validar importación completa."""
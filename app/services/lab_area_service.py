@@ -0,0 +1,102 @@
+"""Servicio de estadísticas por área de laboratorio (FQ, MB, ES, OS)."""
+from typing import Dict
+
+from sqlalchemy import func
+
+from app import db
+
+
+class LabAreaService:
+    """
+    Conteos de detalles de ensayo por estado para un área.
+
+    ``count_by_estado`` lee el contador ensayo × estado
+    (``rollup_detalles_estado``), mantenido por los eventos de
+    ``DetalleEnsayo``: su costo depende de la cantidad de ensayos del área,
+    no de sus detalles. ``count_by_estado_live`` agrupa directamente sobre
+    ``detalles_ensayo`` y sirve para verificar el contador.
+    """
+
+    @staticmethod
+    def _empty_counts() -> Dict[str, int]:
+        from app.database.models.detalle_ensayo import DetalleEnsayoStatus
+
+        return {status.value: 0 for status in DetalleEnsayoStatus}
+
+    @staticmethod
+    def count_by_estado(area_id: int) -> Dict[str, int]:
+        """
+        Obtener detalles del área por estado desde el contador.
+
+        Args:
+            area_id: ID del área.
+
+        Returns:
+            Dict[str, int]: Conteo por estado (DetalleEnsayoStatus), con ceros.
+        """
+        from app.database.models.analytics_rollup import DetalleEnsayoEstadoTotal
+        from app.database.models.ensayo import Ensayo
+
+        counts = LabAreaService._empty_counts()
+        rows = db.session.query(
+            DetalleEnsayoEstadoTotal.estado,
+            func.sum(DetalleEnsayoEstadoTotal.cantidad)
+        ).join(
+            Ensayo, DetalleEnsayoEstadoTotal.ensayo_id == Ensayo.id
+        ).filter(
+            Ensayo.area_id == area_id
+        ).group_by(DetalleEnsayoEstadoTotal.estado).all()
+
+        for estado, count in rows:
+            counts[estado] = int(count or 0)
+        return counts
+
+    @staticmethod
+    def count_by_estado_live(area_id: int) -> Dict[str, int]:
+        """
+        Obtener detalles del área por estado con GROUP BY sobre detalles_ensayo.
+
+        Args:
+            area_id: ID del área.
+
+        Returns:
+            Dict[str, int]: Conteo por estado (DetalleEnsayoStatus), con ceros.
+        """
+        from app.database.models.detalle_ensayo import DetalleEnsayo
+        from app.database.models.ensayo import Ensayo
+
+        counts = LabAreaService._empty_counts()
+        rows = db.session.query(
+            DetalleEnsayo.estado,
+            func.count(DetalleEnsayo.id)
+        ).join(
+            Ensayo, DetalleEnsayo.ensayo_id == Ensayo.id
+        ).filter(
+            Ensayo.area_id == area_id
+        ).group_by(DetalleEnsayo.estado).all()
+
+        for estado, count in rows:
+            counts[estado] = count
+        return counts
+
+    @staticmethod
+    def get_area_stats(area_id: int) -> Dict[str, int]:
+        """
+        Obtener las estadísticas de la página del área.
+
+        Args:
+            area_id: ID del área.
+
+        Returns:
+            Dict[str, int]: pendiente, asignado, en_proceso, completado y reportado.
+        """
+        from app.database.models.detalle_ensayo import DetalleEnsayoStatus
+
+        counts = LabAreaService.count_by_estado(area_id)
+        return {
+            'pendiente': counts[DetalleEnsayoStatus.PENDIENTE.value],
+            'asignado': counts[DetalleEnsayoStatus.ASIGNADO.value],
+            'en_proceso': counts[DetalleEnsayoStatus.EN_PROCESO.value],
+            'completado': counts[DetalleEnsayoStatus.COMPLETADO.value],
+            'reportado': counts[DetalleEnsayoStatus.REPORTADO.value],
+        }
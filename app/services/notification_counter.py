@@ -0,0 +1,245 @@
+"""Contadores cacheados de notificaciones por usuario.
+
+Por cada usuario se guardan en caché (``cache.get_counter``) dos enteros:
+
+  - ``notifications:unread:<user_id>``: notificaciones no leídas.
+  - ``notifications:latest:<user_id>``: id de la notificación más reciente.
+
+Se calculan desde la base la primera vez que se leen y después se mantienen
+con los eventos de ``Notification``: las altas, los cambios de ``read`` y
+las bajas acumulan deltas en la sesión que se aplican en ``after_commit``
+(un rollback los descarta). Las actualizaciones en bloque (``Query.update``)
+no disparan esos eventos: deben registrar su delta con ``queue_unread_delta``.
+
+El endpoint de long-poll/SSE (``wait_for_update``) solo consulta estos
+contadores mientras espera; va a la base únicamente cuando hay cambios.
+Sin Redis los contadores viven en la memoria de cada proceso y no ven las
+notificaciones creadas en otro: ``realtime_available`` es False y los
+clientes usan polling por intervalo.
+"""
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, func, inspect as sa_inspect
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.database.models.notification import Notification
+from app.utils.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = 'notification_counter_pending'
+
+
+class NotificationCounters:
+    """Contadores de no leídas y última notificación por usuario."""
+
+    # Vida de los contadores: acota la deriva si algún cambio no pasó por la sesión
+    CACHE_TTL = 300
+
+    # Intervalo entre lecturas del contador mientras se espera (segundos)
+    WAIT_INTERVAL = 1.0
+
+    # Notificaciones nuevas retornadas por actualización
+    MAX_NEW_ITEMS = 20
+
+    @staticmethod
+    def _unread_key(user_id: int) -> str:
+        return f"notifications:unread:{user_id}"
+
+    @staticmethod
+    def _latest_key(user_id: int) -> str:
+        return f"notifications:latest:{user_id}"
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def get_unread_count(cls, user_id: int) -> int:
+        """No leídas del usuario (COUNT en la base solo si no está en caché)."""
+        key = cls._unread_key(user_id)
+        count = cache.get_counter(key)
+        if count is None:
+            count = db.session.query(func.count(Notification.id)).filter(
+                Notification.user_id == user_id,
+                Notification.read.is_(False)
+            ).scalar() or 0
+            cache.set_counter(key, count, cls.CACHE_TTL)
+        return max(count, 0)
+
+    @classmethod
+    def get_latest_id(cls, user_id: int) -> int:
+        """Id de la notificación más reciente del usuario (0 si no tiene)."""
+        key = cls._latest_key(user_id)
+        latest = cache.get_counter(key)
+        if latest is None:
+            latest = db.session.query(func.max(Notification.id)).filter(
+                Notification.user_id == user_id
+            ).scalar() or 0
+            cache.set_counter(key, latest, cls.CACHE_TTL)
+        return latest
+
+    @staticmethod
+    def realtime_available() -> bool:
+        """Los contadores son compartidos entre procesos (long-poll/SSE habilitados)."""
+        return cache.shared
+
+    @classmethod
+    def snapshot(cls, user_id: int) -> Dict[str, int]:
+        """Estado actual: ``unread_count`` y ``latest_id``."""
+        return {
+            'unread_count': cls.get_unread_count(user_id),
+            'latest_id': cls.get_latest_id(user_id),
+        }
+
+    @classmethod
+    def wait_for_update(
+        cls,
+        user_id: int,
+        since_id: int,
+        known_count: Optional[int],
+        timeout: float,
+        interval: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Esperar hasta que el usuario tenga notificaciones nuevas o cambie su conteo.
+
+        Mientras espera solo lee los contadores en caché y no retiene una
+        conexión a la base.
+
+        Args:
+            user_id: ID del usuario
+            since_id: Última notificación que ya tiene el cliente
+            known_count: Conteo de no leídas que muestra el cliente (None: cualquiera)
+            timeout: Segundos máximos de espera
+            interval: Segundos entre lecturas (default WAIT_INTERVAL)
+
+        Returns:
+            Dict con unread_count, latest_id y notifications (las nuevas desde
+            ``since_id``), o None si no hubo cambios en ``timeout``.
+        """
+        interval = cls.WAIT_INTERVAL if interval is None else interval
+        deadline = time.monotonic() + timeout
+        while True:
+            state = cls.snapshot(user_id)
+            # Liberar la conexión (si se usó para recalcular) durante la espera
+            db.session.remove()
+            if state['latest_id'] > since_id or (
+                known_count is not None and state['unread_count'] != known_count
+            ):
+                break
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+
+        state['notifications'] = []
+        if state['latest_id'] > since_id:
+            nuevas = (Notification.query
+                      .filter(Notification.user_id == user_id, Notification.id > since_id)
+                      .order_by(Notification.id.desc())
+                      .limit(cls.MAX_NEW_ITEMS)
+                      .all())
+            state['notifications'] = [n.to_dict() for n in nuevas]
+            db.session.remove()
+        return state
+
+    # ------------------------------------------------------------------
+    # Mantenimiento desde eventos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _pending(session) -> Dict[str, Dict[int, int]]:
+        return session.info.setdefault(_PENDING_KEY, {'unread': {}, 'latest': {}})
+
+    @classmethod
+    def queue_unread_delta(cls, session, user_id: int, delta: int) -> None:
+        """Registrar un cambio de no leídas a aplicar cuando la sesión confirme."""
+        if not delta:
+            return
+        unread = cls._pending(session)['unread']
+        unread[user_id] = unread.get(user_id, 0) + delta
+
+    @staticmethod
+    def _after_insert(mapper, connection, target) -> None:
+        session = object_session(target)
+        if session is None:
+            return
+        if not target.read:
+            NotificationCounters.queue_unread_delta(session, target.user_id, 1)
+        latest = NotificationCounters._pending(session)['latest']
+        latest[target.user_id] = max(latest.get(target.user_id, 0), target.id)
+
+    @staticmethod
+    def _after_update(mapper, connection, target) -> None:
+        session = object_session(target)
+        if session is None:
+            return
+        history = sa_inspect(target).attrs.read.history
+        if not history.has_changes():
+            return
+        was_read = bool(history.deleted[0]) if history.deleted else False
+        is_read = bool(target.read)
+        if was_read != is_read:
+            NotificationCounters.queue_unread_delta(session, target.user_id,
+                                                    -1 if is_read else 1)
+
+    @staticmethod
+    def _after_delete(mapper, connection, target) -> None:
+        session = object_session(target)
+        if session is not None and not target.read:
+            NotificationCounters.queue_unread_delta(session, target.user_id, -1)
+
+    @staticmethod
+    def _track_old_value(target, value, oldvalue, initiator):
+        return value
+
+    @staticmethod
+    def _after_commit(session) -> None:
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        try:
+            # Primero la última notificación: quien vea el conteo nuevo ya la encuentra
+            for user_id, latest_id in pending['latest'].items():
+                key = NotificationCounters._latest_key(user_id)
+                current = cache.get_counter(key)
+                if current is not None and latest_id > current:
+                    cache.incr_counter(key, latest_id - current)
+            for user_id, delta in pending['unread'].items():
+                cache.incr_counter(NotificationCounters._unread_key(user_id), delta)
+        except Exception as e:
+            # La transacción ya se confirmó: un fallo de caché no debe propagarse
+            logger.error(f"Error actualizando contadores de notificaciones: {e}")
+
+    @staticmethod
+    def _after_rollback(session) -> None:
+        session.info.pop(_PENDING_KEY, None)
+
+    @staticmethod
+    def register_listeners() -> None:
+        """Registrar los eventos que mantienen los contadores (idempotente)."""
+        handlers = (
+            ('after_insert', NotificationCounters._after_insert),
+            ('after_update', NotificationCounters._after_update),
+            ('after_delete', NotificationCounters._after_delete),
+        )
+        for event_name, handler in handlers:
+            if not event.contains(Notification, event_name, handler):
+                event.listen(Notification, event_name, handler)
+
+        # active_history: conocer el valor previo de ``read`` aunque estuviera expirado
+        if not event.contains(Notification.read, 'set', NotificationCounters._track_old_value):
+            event.listen(Notification.read, 'set', NotificationCounters._track_old_value,
+                         active_history=True, retval=True)
+
+        session_handlers = (
+            ('after_commit', NotificationCounters._after_commit),
+            ('after_rollback', NotificationCounters._after_rollback),
+        )
+        for event_name, handler in session_handlers:
+            if not event.contains(Session, event_name, handler):
+                event.listen(Session, event_name, handler)
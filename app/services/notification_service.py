@@ -2,17 +2,30 @@
 
 Sistema de notificaciones que soporta:
 - Notificaciones in-app (base de datos)
-- Notificaciones por email (Flask-Mail)
+- Notificaciones por email (cola ``email_outbox`` + Flask-Mail)
 - Preferencias de usuario
+
+Las notificaciones se agregan a la sesión sin confirmar: quedan guardadas
+con el commit del cambio que las origina, en la misma transacción. Los
+emails no se envían durante la petición; el worker ``flask email-outbox
+worker`` los envía desde la cola (ver ``EmailOutboxService``).
+
+Con ``NOTIFICATION_DIGEST_WINDOW`` > 0 (modo digest) cada notificación se
+guarda como NotificationDigestItem y el mismo worker las agrupa por usuario
+y tipo en una notificación in-app y un email por ventana
+(``flush_digests``).
 """
 import logging
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
 from flask import current_app, render_template
-from flask_mail import Message
+from sqlalchemy import func
 
 from app import db
-from app.database.models.notification import Notification
+from app.database.models.notification import Notification, NotificationDigestItem
+from app.services.email_outbox import EmailOutboxService
+from app.services.notification_counter import NotificationCounters
 from app.database.models.user import User
 
 
@@ -36,6 +49,27 @@ class NotificationService:
     TYPE_ENTRY_DELIVERED = 'entry_delivered'
     TYPE_ASSIGNED_TO_OT = 'assigned_to_ot'
 
+    # Tipo de NotificationPreference que controla el email de cada tipo
+    PREFERENCE_TYPES = {
+        TYPE_STATUS_CHANGE: 'status_change',
+        TYPE_DELIVERY_PENDING: 'pending_alert',
+        TYPE_ENTRY_DELIVERED: 'delivery',
+    }
+
+    # Título de los resúmenes (modo digest)
+    TYPE_LABELS = {
+        TYPE_STATUS_CHANGE: 'Cambio de estado',
+        TYPE_DELIVERY_PENDING: 'Saldo pendiente',
+        TYPE_TEST_COMPLETED: 'Ensayos completados',
+        TYPE_REPORT_READY: 'Informes listos',
+        TYPE_LOW_BALANCE: 'Saldo bajo',
+        TYPE_ENTRY_DELIVERED: 'Entradas entregadas',
+        TYPE_ASSIGNED_TO_OT: 'Muestras asignadas a Orden de Trabajo',
+    }
+
+    # Grupos (usuario, tipo) procesados por llamada a flush_digests
+    DIGEST_MAX_GROUPS = 200
+
     @staticmethod
     def _should_send_email(user: User, notification_type: str) -> bool:
         """
@@ -53,10 +87,11 @@ class NotificationService:
             return False
 
         # Verificar preferencias si existen
-        if hasattr(user, 'notification_preferences'):
-            prefs = user.notification_preferences
-            if prefs:
-                return getattr(prefs, f'email_{notification_type}', True)
+        prefs = getattr(user, 'notification_preferences', None)
+        if prefs:
+            return prefs.should_send_email(
+                NotificationService.PREFERENCE_TYPES.get(notification_type, notification_type)
+            )
 
         # Por defecto, enviar email
         return True
@@ -77,14 +112,91 @@ class NotificationService:
             return False
 
         # Verificar preferencias si existen
-        if hasattr(user, 'notification_preferences'):
-            prefs = user.notification_preferences
-            if prefs:
-                return getattr(prefs, f'in_app_{notification_type}', True)
+        prefs = getattr(user, 'notification_preferences', None)
+        if prefs:
+            return prefs.should_send_in_app(notification_type)
 
         # Por defecto, crear notificación
         return True
 
+    @staticmethod
+    def digest_window() -> int:
+        """Ventana del modo digest en segundos (0 = notificaciones inmediatas)."""
+        return int(current_app.config.get('NOTIFICATION_DIGEST_WINDOW') or 0)
+
+    @classmethod
+    def _deliver(
+        cls,
+        user: User,
+        type: str,
+        title: str,
+        message: str,
+        entity_type: Optional[str] = None,
+        entity_id: Optional[int] = None,
+        template: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Crear la notificación in-app y encolar el email según preferencias.
+
+        En modo digest guarda un NotificationDigestItem con los canales
+        habilitados en lugar de crear la notificación y el email.
+
+        Args:
+            user: Usuario destinatario
+            type: Tipo de notificación
+            title: Título de la notificación
+            message: Mensaje/detalle
+            entity_type: Tipo de entidad relacionada (opcional)
+            entity_id: ID de la entidad relacionada (opcional)
+            template: Template del email inmediato
+            context: Variables del template del email inmediato
+            data: Detalle estructurado para el resumen (modo digest)
+
+        Returns:
+            Dict: Resultado con claves in_app, email y digest
+        """
+        result = {'in_app': None, 'email': False, 'digest': False}
+        in_app = cls._should_send_in_app(user, type)
+        email = cls._should_send_email(user, type)
+
+        if cls.digest_window() > 0:
+            if in_app or email:
+                db.session.add(NotificationDigestItem(
+                    user_id=user.id,
+                    type=type,
+                    title=title,
+                    message=message,
+                    entity_type=entity_type,
+                    entity_id=entity_id,
+                    data=data,
+                    in_app=in_app,
+                    email=email
+                ))
+                result['digest'] = True
+            return result
+
+        if in_app:
+            result['in_app'] = cls.send_in_app_notification(
+                user_id=user.id,
+                type=type,
+                title=title,
+                message=message,
+                entity_type=entity_type,
+                entity_id=entity_id
+            )
+
+        if email and template:
+            result['email'] = cls.send_email_notification(
+                user=user,
+                template=template,
+                context=context or {},
+                subject=title
+            )
+
+        return result
+
     @staticmethod
     def send_email_notification(
         user: User,
@@ -93,7 +205,10 @@ class NotificationService:
         subject: Optional[str] = None
     ) -> bool:
         """
-        Enviar notificación por email usando Flask-Mail.
+        Encolar una notificación por email en la cola ``email_outbox``.
+
+        El email se renderiza ahora y se agrega a la sesión sin confirmar;
+        el worker de la cola lo envía después del commit del llamador.
 
         Args:
             user: Usuario destinatario
@@ -102,18 +217,13 @@ class NotificationService:
             subject: Asunto del email (opcional, puede estar en context)
 
         Returns:
-            bool: True si se envió correctamente
+            bool: True si se encoló correctamente
         """
         try:
             if not user or not user.email:
                 logger.warning("No se puede enviar email: usuario sin email")
                 return False
 
-            mail = current_app.extensions.get('mail')
-            if not mail:
-                logger.error("Flask-Mail no está configurado")
-                return False
-
             # Obtener asunto del contexto o usar default
             email_subject = subject or context.get('subject', 'Notificación DataLab')
 
@@ -131,21 +241,18 @@ class NotificationService:
                 # Generar texto plano desde HTML si no hay template
                 text_body = context.get('message', 'Notificación DataLab')
 
-            # Crear mensaje
-            msg = Message(
+            EmailOutboxService.enqueue(
+                recipient=user.email,
                 subject=email_subject,
-                recipients=[user.email],
                 body=text_body,
-                html=html_body
+                html=html_body,
+                template=template
             )
-
-            # Enviar email
-            mail.send(msg)
-            logger.info(f"Email enviado a {user.email}: {email_subject}")
+            logger.info(f"Email encolado para {user.email}: {email_subject}")
             return True
 
         except Exception as e:
-            logger.error(f"Error enviando email a {user.email if user else 'N/A'}: {e}")
+            logger.error(f"Error encolando email a {user.email if user else 'N/A'}: {e}")
             return False
 
     @staticmethod
@@ -160,6 +267,9 @@ class NotificationService:
         """
         Crear una notificación in-app para un usuario.
 
+        La notificación se agrega a la sesión sin confirmar: se guarda con el
+        commit del llamador.
+
         Args:
             user_id: ID del usuario destinatario
             type: Tipo de notificación
@@ -183,14 +293,12 @@ class NotificationService:
             )
 
             db.session.add(notification)
-            db.session.commit()
 
             logger.info(f"Notificación in-app creada para usuario {user_id}: {title}")
             return notification
 
         except Exception as e:
             logger.error(f"Error creando notificación para usuario {user_id}: {e}")
-            db.session.rollback()
             return None
 
     @classmethod
@@ -227,42 +335,164 @@ class NotificationService:
                 return result
 
             # Preparar mensaje
-            title = f"Cambio de estado: {entrada.codigo}"
-            message = (
-                f"La entrada {entrada.codigo} cambió de estado "
-                f"de '{from_status}' a '{to_status}'"
-            )
-
-            # Crear notificación in-app si está habilitado
-            if cls._should_send_in_app(user, cls.TYPE_STATUS_CHANGE):
-                result['in_app'] = cls.send_in_app_notification(
-                    user_id=user.id,
-                    type=cls.TYPE_STATUS_CHANGE,
-                    title=title,
-                    message=message,
-                    entity_type='entrada',
-                    entity_id=entrada.id
-                )
-
-            # Enviar email si está habilitado
-            if cls._should_send_email(user, cls.TYPE_STATUS_CHANGE):
-                context = {
+            change = {
+                'entrada_id': entrada.id,
+                'codigo': entrada.codigo,
+                'cliente_id': entrada.cliente_id,
+                'from_status': from_status,
+                'to_status': to_status,
+            }
+            title, message = cls._status_changes_text([change])
+
+            # Notificación in-app y email según preferencias (o resumen)
+            result = cls._deliver(
+                user,
+                cls.TYPE_STATUS_CHANGE,
+                title,
+                message,
+                entity_type='entrada',
+                entity_id=entrada.id,
+                template='status_change',
+                context={
                     'subject': title,
                     'entrada': entrada,
                     'from_status': from_status,
                     'to_status': to_status,
                     'message': message,
                     'user': user
+                },
+                data=change
+            )
+
+        except Exception as e:
+            logger.error(f"Error en notify_status_change: {e}")
+
+        return result
+
+    # Códigos de entrada listados en una notificación agrupada
+    BATCH_MAX_CODES = 20
+
+    @classmethod
+    def _status_changes_text(cls, changes: List[Dict[str, Any]]) -> Tuple[str, str]:
+        """Título y mensaje de una notificación con uno o varios cambios."""
+        if len(changes) == 1:
+            change = changes[0]
+            return (
+                f"Cambio de estado: {change['codigo']}",
+                f"La entrada {change['codigo']} cambió de estado "
+                f"de '{change['from_status']}' a '{change['to_status']}'"
+            )
+
+        destinos = sorted({change['to_status'] for change in changes})
+        codigos = [change['codigo'] for change in changes[:cls.BATCH_MAX_CODES]]
+        resto = len(changes) - len(codigos)
+        listado = ', '.join(codigos) + (f" y {resto} más" if resto else '')
+        return (
+            f"Cambio de estado: {len(changes)} entradas",
+            f"{len(changes)} entradas cambiaron de estado a "
+            f"'{', '.join(destinos)}': {listado}"
+        )
+
+    @staticmethod
+    def _first_user_by_cliente(cliente_ids) -> Dict[int, User]:
+        """Primer usuario (por id) de cada cliente, en una sola consulta."""
+        users_by_cliente: Dict[int, User] = {}
+        if cliente_ids:
+            for user in User.query.filter(
+                User.cliente_id.in_(cliente_ids)
+            ).order_by(User.id):
+                users_by_cliente.setdefault(user.cliente_id, user)
+        return users_by_cliente
+
+    @classmethod
+    def notify_status_changes(cls, changes: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Notificar un lote de cambios de estado, agrupados por usuario.
+
+        Cada usuario recibe una sola notificación in-app y un solo email con
+        todos sus cambios. Los usuarios se resuelven en una consulta; las
+        notificaciones in-app y los emails se agregan a la sesión y se
+        confirman con el commit de los cambios de estado.
+
+        Args:
+            changes: Cambios con claves entrada_id, codigo, cliente_id,
+                     from_status y to_status
+
+        Returns:
+            Dict: Cantidad de notificaciones in-app, emails y cambios en resumen
+        """
+        result = {'in_app': 0, 'email': 0, 'digest': 0}
+        if not changes:
+            return result
+
+        try:
+            # Primer usuario de cada cliente (como notify_status_change)
+            users_by_cliente = cls._first_user_by_cliente(
+                {change['cliente_id'] for change in changes if change['cliente_id']}
+            )
+
+            by_user: Dict[int, List[Dict[str, Any]]] = {}
+            users: Dict[int, User] = {}
+            for change in changes:
+                user = users_by_cliente.get(change['cliente_id'])
+                if not user:
+                    logger.warning(f"No se encontró usuario para entrada {change['entrada_id']}")
+                    continue
+                users[user.id] = user
+                by_user.setdefault(user.id, []).append(change)
+
+            # Modo digest: un ítem por cambio, agrupados después por flush_digests
+            if cls.digest_window() > 0:
+                for user_id, user_changes in by_user.items():
+                    for change in user_changes:
+                        title, message = cls._status_changes_text([change])
+                        if cls._deliver(users[user_id], cls.TYPE_STATUS_CHANGE, title, message,
+                                        entity_type='entrada', entity_id=change['entrada_id'],
+                                        data=change)['digest']:
+                            result['digest'] += 1
+                return result
+
+            notifications = []
+            emails = []
+            for user_id, user_changes in by_user.items():
+                user = users[user_id]
+                title, message = cls._status_changes_text(user_changes)
+                if cls._should_send_in_app(user, cls.TYPE_STATUS_CHANGE):
+                    notifications.append(Notification(
+                        user_id=user_id,
+                        type=cls.TYPE_STATUS_CHANGE,
+                        title=title,
+                        message=message,
+                        entity_type='entrada',
+                        entity_id=user_changes[0]['entrada_id'] if len(user_changes) == 1 else None,
+                        read=False
+                    ))
+                if cls._should_send_email(user, cls.TYPE_STATUS_CHANGE):
+                    emails.append((user, title, message, user_changes))
+
+            if notifications:
+                db.session.add_all(notifications)
+                result['in_app'] = len(notifications)
+                logger.info(f"{len(notifications)} notificaciones in-app de cambio de estado creadas")
+
+            for user, title, message, user_changes in emails:
+                context = {
+                    'subject': title,
+                    'message': message,
+                    'user': user,
+                    'user_name': user.username,
+                    'changes': user_changes
                 }
-                result['email'] = cls.send_email_notification(
+                if cls.send_email_notification(
                     user=user,
-                    template='status_change',
+                    template='status_change_batch',
                     context=context,
                     subject=title
-                )
+                ):
+                    result['email'] += 1
 
         except Exception as e:
-            logger.error(f"Error en notify_status_change: {e}")
+            logger.error(f"Error en notify_status_changes: {e}")
 
         return result
 
@@ -292,44 +522,70 @@ class NotificationService:
             if not user:
                 return result
 
-            title = f"Saldo pendiente: {entrada.codigo}"
-            message = (
-                f"La entrada {entrada.codigo} tiene un saldo pendiente "
-                f"de {entrada.saldo} unidades por entregar."
-            )
-
-            # Notificación in-app
-            if cls._should_send_in_app(user, cls.TYPE_DELIVERY_PENDING):
-                result['in_app'] = cls.send_in_app_notification(
-                    user_id=user.id,
-                    type=cls.TYPE_DELIVERY_PENDING,
-                    title=title,
-                    message=message,
-                    entity_type='entrada',
-                    entity_id=entrada.id
-                )
-
-            # Email
-            if cls._should_send_email(user, cls.TYPE_DELIVERY_PENDING):
-                context = {
-                    'subject': title,
-                    'entrada': entrada,
-                    'saldo': entrada.saldo,
-                    'message': message,
-                    'user': user
-                }
-                result['email'] = cls.send_email_notification(
-                    user=user,
-                    template='delivery_pending',
-                    context=context,
-                    subject=title
-                )
+            result = cls._deliver_delivery_pending(entrada, user)
 
         except Exception as e:
             logger.error(f"Error en notify_delivery_pending: {e}")
 
         return result
 
+    @classmethod
+    def notify_delivery_pending_batch(cls, entradas: List[Any]) -> int:
+        """
+        Notificar saldo pendiente para un lote de entradas.
+
+        Los usuarios se resuelven en una consulta para todo el lote (como
+        ``notify_status_changes``).
+
+        Args:
+            entradas: Instancias de Entrada
+
+        Returns:
+            int: Entradas notificadas
+        """
+        pending = [entrada for entrada in entradas if entrada.saldo > 0 and entrada.cliente_id]
+        if not pending:
+            return 0
+
+        notified = 0
+        try:
+            users_by_cliente = cls._first_user_by_cliente({e.cliente_id for e in pending})
+            for entrada in pending:
+                user = users_by_cliente.get(entrada.cliente_id)
+                if user:
+                    cls._deliver_delivery_pending(entrada, user)
+                    notified += 1
+        except Exception as e:
+            logger.error(f"Error en notify_delivery_pending_batch: {e}")
+
+        return notified
+
+    @classmethod
+    def _deliver_delivery_pending(cls, entrada: Any, user: User) -> Dict[str, Any]:
+        """Notificación in-app y email de saldo pendiente para ``user``."""
+        title = f"Saldo pendiente: {entrada.codigo}"
+        message = (
+            f"La entrada {entrada.codigo} tiene un saldo pendiente "
+            f"de {entrada.saldo} unidades por entregar."
+        )
+
+        return cls._deliver(
+            user,
+            cls.TYPE_DELIVERY_PENDING,
+            title,
+            message,
+            entity_type='entrada',
+            entity_id=entrada.id,
+            template='delivery_pending',
+            context={
+                'subject': title,
+                'entrada': entrada,
+                'saldo': entrada.saldo,
+                'message': message,
+                'user': user
+            }
+        )
+
     @classmethod
     def notify_assigned_to_ot(cls, entrada: Any) -> Dict[str, Any]:
         """
@@ -364,20 +620,13 @@ class NotificationService:
                 f"{ot_info}"
             )
 
-            if cls._should_send_in_app(user, cls.TYPE_ASSIGNED_TO_OT):
-                result['in_app'] = cls.send_in_app_notification(
-                    user_id=user.id,
-                    type=cls.TYPE_ASSIGNED_TO_OT,
-                    title=title,
-                    message=message,
-                    entity_type='entrada',
-                    entity_id=entrada.id
-                )
-
-            if cls._should_send_email(user, cls.TYPE_ASSIGNED_TO_OT):
+            # El contexto del email solo se arma si el email se envía ahora
+            context = None
+            if (cls.digest_window() == 0
+                    and cls._should_send_email(user, cls.TYPE_ASSIGNED_TO_OT)):
                 from flask import url_for
                 sample_url = url_for('entradas.entrada_detail', id=entrada.id, _external=True)
-                
+
                 context = {
                     'subject': title,
                     'entrada': entrada,
@@ -391,23 +640,146 @@ class NotificationService:
                     'assignment_date': entrada.updated_at.strftime('%d/%m/%Y %H:%M') if entrada.updated_at else '',
                     'message': message
                 }
-                result['email'] = cls.send_email_notification(
-                    user=user,
-                    template='assigned_to_ot',
-                    context=context,
-                    subject=title
-                )
+
+            result = cls._deliver(
+                user,
+                cls.TYPE_ASSIGNED_TO_OT,
+                title,
+                message,
+                entity_type='entrada',
+                entity_id=entrada.id,
+                template='assigned_to_ot',
+                context=context
+            )
 
         except Exception as e:
             logger.error(f"Error en notify_assigned_to_ot: {e}")
 
         return result
 
+    @classmethod
+    def _digest_text(cls, type: str, items: List[NotificationDigestItem]) -> Tuple[str, str]:
+        """Título y mensaje del resumen de un usuario y tipo."""
+        if type == cls.TYPE_STATUS_CHANGE and all(item.data for item in items):
+            return cls._status_changes_text([item.data for item in items])
+        if len(items) == 1:
+            return items[0].title, items[0].message
+
+        lineas = [item.message for item in items[:cls.BATCH_MAX_CODES]]
+        resto = len(items) - len(lineas)
+        if resto:
+            lineas.append(f"y {resto} más")
+        return (
+            f"{cls.TYPE_LABELS.get(type, type)}: {len(items)} notificaciones",
+            '\n'.join(lineas)
+        )
+
+    @classmethod
+    def flush_digests(cls, force: bool = False) -> Dict[str, int]:
+        """
+        Agrupar los ítems en resumen vencidos en una notificación y un email.
+
+        Un grupo (usuario, tipo) vence cuando su ítem más antiguo supera
+        ``NOTIFICATION_DIGEST_WINDOW``. Cada grupo genera una Notification
+        (si algún ítem la pedía) y un email en la cola (si algún ítem lo
+        pedía); los ítems se eliminan en el mismo commit. Lo ejecuta el
+        worker ``flask email-outbox worker`` antes de cada lote.
+
+        Args:
+            force: Procesar todos los grupos sin esperar la ventana
+
+        Returns:
+            Dict[str, int]: Grupos, notificaciones in-app y emails generados
+        """
+        result = {'grupos': 0, 'in_app': 0, 'email': 0}
+
+        limite = datetime.utcnow() - timedelta(seconds=cls.digest_window())
+        query = db.session.query(
+            NotificationDigestItem.user_id, NotificationDigestItem.type
+        ).group_by(NotificationDigestItem.user_id, NotificationDigestItem.type)
+        if not force:
+            query = query.having(func.min(NotificationDigestItem.created_at) <= limite)
+        grupos = set(query.limit(cls.DIGEST_MAX_GROUPS).all())
+        if not grupos:
+            return result
+
+        items_por_grupo: Dict[Tuple[int, str], List[NotificationDigestItem]] = {}
+        for item in (NotificationDigestItem.query
+                     .filter(NotificationDigestItem.user_id.in_({g[0] for g in grupos}),
+                             NotificationDigestItem.type.in_({g[1] for g in grupos}))
+                     .order_by(NotificationDigestItem.created_at, NotificationDigestItem.id)
+                     .with_for_update(skip_locked=True)):
+            key = (item.user_id, item.type)
+            if key in grupos:
+                items_por_grupo.setdefault(key, []).append(item)
+
+        users = {
+            user.id: user
+            for user in User.query.filter(User.id.in_({key[0] for key in items_por_grupo}))
+        }
+
+        notifications = []
+        item_ids = []
+        for (user_id, type), items in items_por_grupo.items():
+            item_ids.extend(item.id for item in items)
+            user = users.get(user_id)
+            if not user:
+                continue
+            result['grupos'] += 1
+            title, message = cls._digest_text(type, items)
+            unico = items[0] if len(items) == 1 else None
+
+            if any(item.in_app for item in items):
+                notifications.append(Notification(
+                    user_id=user_id,
+                    type=type,
+                    title=title,
+                    message=message,
+                    entity_type=unico.entity_type if unico else None,
+                    entity_id=unico.entity_id if unico else None,
+                    read=False
+                ))
+
+            if any(item.email for item in items):
+                context = {
+                    'subject': title,
+                    'message': message,
+                    'user': user,
+                    'user_name': user.username,
+                    'items': [item for item in items if item.email],
+                }
+                template = 'notification_digest'
+                if type == cls.TYPE_STATUS_CHANGE and all(item.data for item in items):
+                    template = 'status_change_batch'
+                    context['changes'] = [item.data for item in items if item.email]
+                if cls.send_email_notification(user, template, context, subject=title):
+                    result['email'] += 1
+
+        if notifications:
+            db.session.add_all(notifications)
+            result['in_app'] = len(notifications)
+        if item_ids:
+            NotificationDigestItem.query.filter(
+                NotificationDigestItem.id.in_(item_ids)
+            ).delete(synchronize_session=False)
+        db.session.commit()
+
+        if result['grupos']:
+            logger.info(f"{result['grupos']} resúmenes de notificaciones generados")
+        return result
+
+    @staticmethod
+    def pending_digest_count() -> int:
+        """Cantidad de ítems esperando a ser agrupados en un resumen."""
+        return db.session.query(func.count(NotificationDigestItem.id)).scalar() or 0
+
     @staticmethod
     def get_unread_count(user_id: int) -> int:
         """
         Obtener cantidad de notificaciones no leídas de un usuario.
 
+        El conteo se mantiene en caché (ver ``NotificationCounters``).
+
         Args:
             user_id: ID del usuario
 
@@ -415,10 +787,7 @@ class NotificationService:
             int: Cantidad de notificaciones no leídas
         """
         try:
-            return Notification.query.filter_by(
-                user_id=user_id,
-                read=False
-            ).count()
+            return NotificationCounters.get_unread_count(user_id)
         except Exception as e:
             logger.error(f"Error obteniendo conteo de notificaciones: {e}")
             return 0
@@ -519,17 +888,17 @@ class NotificationService:
             int: Cantidad de notificaciones marcadas
         """
         try:
-            notifications = Notification.query.filter_by(
+            count = Notification.query.filter_by(
                 user_id=user_id,
                 read=False
-            ).all()
-
-            count = 0
-            for notification in notifications:
-                notification.mark_read()
-                count += 1
+            ).update(
+                {Notification.read: True, Notification.read_at: datetime.utcnow()},
+                synchronize_session='fetch'
+            )
 
             if count > 0:
+                # El UPDATE en bloque no dispara los eventos del modelo
+                NotificationCounters.queue_unread_delta(db.session, user_id, -count)
                 db.session.commit()
                 logger.info(f"{count} notificaciones marcadas como leídas para usuario {user_id}")
 
@@ -1,11 +1,14 @@
 """Servicio de negocio para gestión de Ordenes de Trabajo."""
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
 from flask_babel import _
-from sqlalchemy import asc, desc, func
+from sqlalchemy import asc, case, desc, func
+from sqlalchemy.orm import joinedload
 
 from app import db
+from app.utils.cache import cache
+from app.utils.pagination import TOTAL_EXACT, keyset_paginate, sort_column_for
 
 
 class OrdenTrabajoService:
@@ -16,6 +19,16 @@ class OrdenTrabajoService:
     eliminacion y consulta de ordenes de trabajo.
     """
 
+    # Estadisticas del dashboard: se invalidan al confirmar cambios en estas
+    # tablas; el TTL acota los valores que dependen de la fecha actual.
+    ESTADISTICAS_CACHE_KEY = "ordenes_trabajo:estadisticas"
+    ESTADISTICAS_CACHE_TTL = 300  # segundos
+    ESTADISTICAS_CACHE_STALE_TTL = 60
+    ESTADISTICAS_CACHE_TAGS = ("ordenes_trabajo", "pedidos", "entradas", "clientes")
+
+    # Antiguedad (dias) de un pedido pendiente para marcar su orden
+    ESTADISTICAS_DIAS_ATENCION = 30
+
     @staticmethod
     def _generar_codigo() -> str:
         """
@@ -213,7 +226,9 @@ class OrdenTrabajoService:
         pagina: int = 1,
         por_pagina: int = 20,
         ordenar_por: str = 'fech_creacion',
-        orden: str = 'desc'
+        orden: str = 'desc',
+        cursor: Optional[str] = None,
+        total: str = TOTAL_EXACT
     ) -> Tuple[List[Any], Dict[str, Any]]:
         """
         Obtener ordenes de trabajo paginadas con filtros.
@@ -229,6 +244,10 @@ class OrdenTrabajoService:
             por_pagina: Cantidad de registros por pagina
             ordenar_por: Campo para ordenar
             orden: 'asc' o 'desc'
+            cursor: Cursor de paginacion por keyset (opt-in). None usa
+                    OFFSET; '' pide la primera pagina por cursor y el resto
+                    se piden con el ``siguiente_cursor`` devuelto.
+            total: Conteo en modo cursor: 'exact', 'estimate' o 'none'
 
         Returns:
             Tuple: (lista_de_ordenes, metadata_de_paginacion)
@@ -256,8 +275,15 @@ class OrdenTrabajoService:
         if filtros.get('fecha_hasta'):
             query = query.filter(OrdenTrabajo.fech_creacion <= filtros['fecha_hasta'])
 
+        columna_orden = sort_column_for(OrdenTrabajo, ordenar_por, OrdenTrabajo.fech_creacion)
+
+        # Paginacion por cursor: (columna_orden, id) > ultimo visto, sin OFFSET
+        if cursor is not None:
+            return keyset_paginate(
+                query, OrdenTrabajo, columna_orden, orden, por_pagina, cursor, total
+            )
+
         # Aplicar ordenamiento
-        columna_orden = getattr(OrdenTrabajo, ordenar_por, OrdenTrabajo.fech_creacion)
         if orden.lower() == 'desc':
             query = query.order_by(desc(columna_orden))
         else:
@@ -425,51 +451,140 @@ class OrdenTrabajoService:
         """
         Obtener estadisticas de ordenes de trabajo para dashboard.
 
+        El resultado se cachea y se invalida al confirmar cambios en
+        ordenes, pedidos, entradas o clientes; el TTL acota los valores que
+        dependen de la fecha actual (mes en curso, pedidos antiguos).
+
         Returns:
             Dict: Estadisticas incluyendo:
-                - total: Total de ordenes
+                - total: Total de ordenes (excluyendo eliminadas)
                 - por_estado: Conteo por estado
                 - promedio_pedidos: Promedio de pedidos por orden
+                - total_pedidos_asociados: Pedidos asignados a alguna orden
                 - ordenes_recientes: Ordenes creadas recientemente
                 - completadas_este_mes: Ordenes completadas este mes
+                - requieren_atencion: Ordenes EN_PROGRESO con pedidos
+                  pendientes de mas de ESTADISTICAS_DIAS_ATENCION dias
         """
+        return cache.get_or_compute(
+            cls.ESTADISTICAS_CACHE_KEY,
+            cls._calcular_estadisticas,
+            ttl=cls.ESTADISTICAS_CACHE_TTL,
+            tags=cls.ESTADISTICAS_CACHE_TAGS,
+            stale_ttl=cls.ESTADISTICAS_CACHE_STALE_TTL,
+        )
+
+    @classmethod
+    def _calcular_estadisticas(cls) -> Dict[str, Any]:
+        """Calcular las estadisticas con consultas agregadas (ver obtener_estadisticas)."""
+        from app.database.models.entrada import Entrada
         from app.database.models.orden_trabajo import OrdenTrabajo, OTStatus
+        from app.database.models.pedido import Pedido, PedidoStatus
 
-        # Total de ordenes (excluyendo eliminadas)
-        total = OrdenTrabajo.query.filter(
-            OrdenTrabajo.status != 'ELIMINADA'
-        ).count()
+        hoy = datetime.utcnow()
+        inicio_mes = hoy.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-        # Conteo por estado
-        por_estado = {}
-        for status in [OTStatus.PENDIENTE, OTStatus.EN_PROGRESO, OTStatus.COMPLETADA]:
-            por_estado[status] = OrdenTrabajo.query.filter_by(status=status).count()
+        # Conteo por estado y completadas este mes en una sola consulta
+        por_status = db.session.query(
+            OrdenTrabajo.status,
+            func.count(OrdenTrabajo.id),
+            func.sum(case((OrdenTrabajo.fech_completado >= inicio_mes, 1), else_=0))
+        ).group_by(OrdenTrabajo.status).all()
+
+        conteos = {status: count for status, count, _completadas in por_status}
+        por_estado = {
+            status: conteos.get(status, 0)
+            for status in [OTStatus.PENDIENTE, OTStatus.EN_PROGRESO, OTStatus.COMPLETADA]
+        }
+        total = sum(count for status, count in conteos.items() if status != 'ELIMINADA')
+        total_ordenes = sum(conteos.values())
+        completadas_este_mes = sum(
+            int(completadas or 0)
+            for status, _count, completadas in por_status
+            if status == OTStatus.COMPLETADA
+        )
 
-        # Promedio de pedidos por orden
-        ordenes_con_pedidos = OrdenTrabajo.query.all()
-        total_pedidos = sum(o.pedidos_count for o in ordenes_con_pedidos)
+        # Promedio de pedidos por orden (sobre todas las ordenes)
+        total_pedidos_asociados = db.session.query(func.count(Pedido.id)).filter(
+            Pedido.orden_trabajo_id.isnot(None)
+        ).scalar()
         promedio_pedidos = (
-            round(total_pedidos / len(ordenes_con_pedidos), 2)
-            if ordenes_con_pedidos else 0
+            round(total_pedidos_asociados / total_ordenes, 2) if total_ordenes else 0
         )
 
-        # Ordenes recientes (ultimas 5)
-        ordenes_recientes = OrdenTrabajo.query.filter(
+        # Ordenes recientes (ultimas 5) con sus conteos en subconsultas agrupadas
+        pedidos_sq = db.session.query(
+            Pedido.orden_trabajo_id.label('orden_id'),
+            func.count(Pedido.id).label('pedidos'),
+            func.sum(case((Pedido.status == PedidoStatus.COMPLETADO, 1), else_=0)).label('completados')
+        ).filter(Pedido.orden_trabajo_id.isnot(None)).group_by(Pedido.orden_trabajo_id).subquery()
+
+        entradas_sq = db.session.query(
+            Pedido.orden_trabajo_id.label('orden_id'),
+            func.count(Entrada.id).label('entradas')
+        ).join(
+            Entrada, Entrada.pedido_id == Pedido.id
+        ).filter(Pedido.orden_trabajo_id.isnot(None)).group_by(Pedido.orden_trabajo_id).subquery()
+
+        recientes = db.session.query(
+            OrdenTrabajo,
+            func.coalesce(pedidos_sq.c.pedidos, 0),
+            func.coalesce(pedidos_sq.c.completados, 0),
+            func.coalesce(entradas_sq.c.entradas, 0)
+        ).outerjoin(
+            pedidos_sq, pedidos_sq.c.orden_id == OrdenTrabajo.id
+        ).outerjoin(
+            entradas_sq, entradas_sq.c.orden_id == OrdenTrabajo.id
+        ).options(
+            joinedload(OrdenTrabajo.cliente)
+        ).filter(
             OrdenTrabajo.status != 'ELIMINADA'
         ).order_by(desc(OrdenTrabajo.fech_creacion)).limit(5).all()
 
-        # Completadas este mes
-        hoy = datetime.utcnow()
-        inicio_mes = hoy.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        completadas_este_mes = OrdenTrabajo.query.filter(
-            OrdenTrabajo.status == OTStatus.COMPLETADA,
-            OrdenTrabajo.fech_completado >= inicio_mes
-        ).count()
+        ordenes_recientes = [
+            {
+                'id': orden.id,
+                'nro_ofic': orden.nro_ofic,
+                'codigo': orden.codigo,
+                'cliente': orden.cliente.nombre if orden.cliente else None,
+                'descripcion': orden.descripcion,
+                'status': orden.status,
+                'progreso': int(completados / pedidos * 100) if pedidos else 0,
+                'pedidos_count': pedidos,
+                'entradas_count': entradas,
+                'fech_creacion': orden.fech_creacion.isoformat() if orden.fech_creacion else None,
+                'fech_completado': orden.fech_completado.isoformat() if orden.fech_completado else None
+            }
+            for orden, pedidos, completados, entradas in recientes
+        ]
+
+        # Ordenes EN_PROGRESO con pedidos pendientes antiguos
+        fecha_limite = hoy - timedelta(days=cls.ESTADISTICAS_DIAS_ATENCION)
+        con_pedidos_antiguos = db.session.query(
+            OrdenTrabajo.id, OrdenTrabajo.nro_ofic
+        ).join(
+            Pedido, OrdenTrabajo.id == Pedido.orden_trabajo_id
+        ).filter(
+            OrdenTrabajo.status == OTStatus.EN_PROGRESO,
+            Pedido.fech_pedido < fecha_limite,
+            Pedido.status != PedidoStatus.COMPLETADO
+        ).distinct().all()
+
+        requieren_atencion = [
+            {
+                'id': orden_id,
+                'nro_ofic': nro_ofic,
+                'motivo': f'Pedidos pendientes > {cls.ESTADISTICAS_DIAS_ATENCION} dias'
+            }
+            for orden_id, nro_ofic in con_pedidos_antiguos
+        ]
 
         return {
             'total': total,
             'por_estado': por_estado,
             'promedio_pedidos': promedio_pedidos,
-            'ordenes_recientes': [o.to_dict() for o in ordenes_recientes],
-            'completadas_este_mes': completadas_este_mes
+            'total_pedidos_asociados': total_pedidos_asociados,
+            'ordenes_recientes': ordenes_recientes,
+            'completadas_este_mes': completadas_este_mes,
+            'requieren_atencion': requieren_atencion
         }
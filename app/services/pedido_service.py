@@ -6,6 +6,7 @@ from flask_babel import _
 from sqlalchemy import asc, desc, func
 
 from app import db
+from app.utils.pagination import TOTAL_EXACT, keyset_paginate, sort_column_for
 
 
 class PedidoService:
@@ -280,7 +281,9 @@ class PedidoService:
         pagina: int = 1,
         por_pagina: int = 20,
         ordenar_por: str = 'fech_pedido',
-        orden: str = 'desc'
+        orden: str = 'desc',
+        cursor: Optional[str] = None,
+        total: str = TOTAL_EXACT
     ) -> Tuple[List[Any], Dict[str, Any]]:
         """
         Obtener pedidos paginados con filtros.
@@ -296,6 +299,10 @@ class PedidoService:
             por_pagina: Cantidad de registros por página
             ordenar_por: Campo para ordenar
             orden: 'asc' o 'desc'
+            cursor: Cursor de paginación por keyset (opt-in). None usa
+                    OFFSET; '' pide la primera página por cursor y el resto
+                    se piden con el ``siguiente_cursor`` devuelto.
+            total: Conteo en modo cursor: 'exact', 'estimate' o 'none'
 
         Returns:
             Tuple: (lista_de_pedidos, metadata_de_paginacion)
@@ -321,8 +328,15 @@ class PedidoService:
         if filtros.get('fecha_hasta'):
             query = query.filter(Pedido.fech_pedido <= filtros['fecha_hasta'])
 
+        columna_orden = sort_column_for(Pedido, ordenar_por, Pedido.fech_pedido)
+
+        # Paginación por cursor: (columna_orden, id) > último visto, sin OFFSET
+        if cursor is not None:
+            return keyset_paginate(
+                query, Pedido, columna_orden, orden, por_pagina, cursor, total
+            )
+
         # Aplicar ordenamiento
-        columna_orden = getattr(Pedido, ordenar_por, Pedido.fech_pedido)
         if orden.lower() == 'desc':
             query = query.order_by(desc(columna_orden))
         else:
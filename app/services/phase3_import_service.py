@@ -9,7 +9,6 @@ Cubre los requisitos del Issue #5 (Phase 3): Transactional Data Import
 - Reporte final en Markdown
 - Dry-run standalone (sin efectos secundarios)
 """
-import csv
 import logging
 import re
 from datetime import datetime, date
@@ -24,6 +23,7 @@ from app.database.models import (
 from app.database.models.entrada import EntradaStatus
 from app.database.models.orden_trabajo import OTStatus
 from app.database.models.pedido import PedidoStatus
+from app.services.import_pipeline import CsvImportPipeline, iter_csv_rows
 
 logger = logging.getLogger(__name__)
 
@@ -240,7 +240,7 @@ class PostImportVerification:
 class Phase3ImportService:
     """Servicio para importar datos transaccionales Phase 3."""
 
-    BATCH_SIZE = 50
+    BATCH_SIZE = 500
 
     def __init__(self, dry_run: bool = False):
         self.dry_run = dry_run
@@ -252,6 +252,11 @@ class Phase3ImportService:
         self._valid_ramas: Optional[set] = None
         self._valid_unidades: Optional[set] = None
         self._valid_ots: Optional[set] = None
+        # Claves naturales ya presentes (BD + filas en curso) para detectar duplicados
+        self._existing_nro_ofic: Optional[set] = None
+        self._existing_pedidos: Optional[set] = None
+        self._existing_entradas: Optional[set] = None
+        self._existing_entrada_codigos: Optional[set] = None
 
     # ------------------------------------------------------------------
     # Public API
@@ -528,14 +533,34 @@ class Phase3ImportService:
     # Private: import methods
     # ------------------------------------------------------------------
 
+    @staticmethod
+    def _column_set(column) -> set:
+        """Valores de una columna en un set (una consulta, sin cargar entidades)."""
+        return set(db.session.execute(db.select(column)).scalars())
+
     def _load_fk_cache(self):
-        """Cargar sets de IDs válidos para validación FK rápida."""
-        self._valid_clientes  = {c.id for c in Cliente.query.all()}
-        self._valid_productos  = {p.id for p in Producto.query.all()}
-        self._valid_fabricas   = {f.id for f in Fabrica.query.all()}
-        self._valid_ramas      = {r.id for r in Rama.query.all()}
-        self._valid_unidades   = {u.id for u in UnidadMedida.query.all()}
-        self._valid_ots        = {o.id for o in OrdenTrabajo.query.all()}
+        """Cargar sets de IDs válidos y claves existentes para validación sin consultas por fila."""
+        self._valid_clientes  = self._column_set(Cliente.id)
+        self._valid_productos  = self._column_set(Producto.id)
+        self._valid_fabricas   = self._column_set(Fabrica.id)
+        self._valid_ramas      = self._column_set(Rama.id)
+        self._valid_unidades   = self._column_set(UnidadMedida.id)
+        self._valid_ots        = self._column_set(OrdenTrabajo.id)
+
+        self._existing_nro_ofic        = self._column_set(OrdenTrabajo.nro_ofic)
+        self._existing_pedidos         = self._column_set(Pedido.id)
+        self._existing_entradas        = self._column_set(Entrada.id)
+        self._existing_entrada_codigos = self._column_set(Entrada.codigo)
+
+    def _run_pipeline(self, csv_path: Path, label: str, transform, on_error, counters: dict):
+        """Importar un CSV en una pasada (ver ``CsvImportPipeline``) y acumular en ``counters``."""
+        stats = CsvImportPipeline(
+            csv_path, transform, on_error,
+            label=label, batch_size=self.BATCH_SIZE, dry_run=self.dry_run,
+        ).run()
+        counters['total'] = stats.total
+        counters['imported'] += stats.imported
+        return stats
 
     def _import_ordenes_trabajo(self, csv_path: Path):
         """Importar 37 órdenes de trabajo."""
@@ -543,58 +568,47 @@ class Phase3ImportService:
             logger.error(f"Archivo no encontrado: {csv_path}")
             return
 
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            rows = list(csv.DictReader(f))
-
-        self.result.ordenes_trabajo['total'] = len(rows)
-        batch_count = 0
-
-        for row_num, row in enumerate(rows, start=2):
-            row_id = row.get('Id', row_num)
-            try:
-                cliente_id = int(row['IdCliente']) if row.get('IdCliente') else None
-                if not cliente_id or cliente_id not in self._valid_clientes:
-                    raise ValueError(f"Cliente inválido: {cliente_id}")
-
-                nro_ofic = row.get('NroOfic', '').strip()
-                if not nro_ofic:
-                    raise ValueError("NroOfic es obligatorio")
-
-                if OrdenTrabajo.query.filter_by(nro_ofic=nro_ofic).first():
-                    logger.debug(f"OT {nro_ofic} ya existe, saltando")
-                    self.result.ordenes_trabajo['skipped'] += 1
-                    continue
-
-                ot = OrdenTrabajo(
-                    id=int(row['Id']),
-                    nro_ofic=nro_ofic,
-                    codigo=f"OT-{int(row['Id']):04d}",
-                    cliente_id=cliente_id,
-                    descripcion=row.get('Descripcion', ''),
-                    observaciones=row.get('Observaciones', ''),
-                    status=OTStatus.PENDIENTE,
-                    fech_creacion=self._parse_datetime(row.get('FechCreacion')) or datetime.utcnow(),
-                )
-
-                if not self.dry_run:
-                    db.session.add(ot)
-                    batch_count += 1
-                    if batch_count % self.BATCH_SIZE == 0:
-                        db.session.commit()
-                        logger.debug(f"Commit batch OT ({batch_count})")
-
-                self.result.ordenes_trabajo['imported'] += 1
+        def transform(row_num, row):
+            cliente_id = int(row['IdCliente']) if row.get('IdCliente') else None
+            if not cliente_id or cliente_id not in self._valid_clientes:
+                raise ValueError(f"Cliente inválido: {cliente_id}")
+
+            nro_ofic = row.get('NroOfic', '').strip()
+            if not nro_ofic:
+                raise ValueError("NroOfic es obligatorio")
+
+            if nro_ofic in self._existing_nro_ofic:
+                logger.debug(f"OT {nro_ofic} ya existe, saltando")
+                self.result.ordenes_trabajo['skipped'] += 1
+                return None
+
+            ot = OrdenTrabajo(
+                id=int(row['Id']),
+                nro_ofic=nro_ofic,
+                codigo=f"OT-{int(row['Id']):04d}",
+                cliente_id=cliente_id,
+                descripcion=row.get('Descripcion', ''),
+                observaciones=row.get('Observaciones', ''),
+                status=OTStatus.PENDIENTE,
+                fech_creacion=self._parse_datetime(row.get('FechCreacion')) or datetime.utcnow(),
+            )
+            self._existing_nro_ofic.add(nro_ofic)
+            self._valid_ots.add(ot.id)
+            return ot
+
+        def on_error(row_num, row, e):
+            logger.error(f"Error OT fila {row_num}: {e}")
+            self.result.ordenes_trabajo['errors'].append(
+                ImportError('ordenes_trabajo', row.get('Id', row_num), 'general', str(e), row)
+            )
 
-            except Exception as e:
-                logger.error(f"Error OT fila {row_num}: {e}")
-                self.result.ordenes_trabajo['errors'].append(
-                    ImportError('ordenes_trabajo', row_id, 'general', str(e), row)
-                )
+        self._run_pipeline(csv_path, 'Órdenes de Trabajo', transform, on_error,
+                           self.result.ordenes_trabajo)
 
+        # Las OTs preparadas ya están en _valid_ots; al escribir, releer para
+        # descartar las que fallaron
         if not self.dry_run:
-            db.session.commit()
-        # Actualizar caché de OTs para que Pedidos las puedan referenciar
-        self._valid_ots = {o.id for o in OrdenTrabajo.query.all()}
+            self._valid_ots = self._column_set(OrdenTrabajo.id)
 
         logger.info(
             f"OT: {self.result.ordenes_trabajo['imported']} importadas, "
@@ -608,70 +622,56 @@ class Phase3ImportService:
             logger.error(f"Archivo no encontrado: {csv_path}")
             return
 
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            rows = list(csv.DictReader(f))
-
-        self.result.pedidos['total'] = len(rows)
-        batch_count = 0
-
-        for row_num, row in enumerate(rows, start=2):
+        def transform(row_num, row):
             row_id = row.get('IdPedido', row_num)
-            try:
-                cliente_id  = int(row['IdCliente'])  if row.get('IdCliente')  else None
-                producto_id = int(row['IdProducto']) if row.get('IdProducto') else None
-
-                if not cliente_id or cliente_id not in self._valid_clientes:
-                    raise ValueError(f"Cliente inválido: {cliente_id}")
-                if not producto_id or producto_id not in self._valid_productos:
-                    raise ValueError(f"Producto inválido: {producto_id}")
-
-                # OT opcional: si no existe, se deja en None con advertencia
-                ot_id = int(row['IdOrdenTrabajo']) if row.get('IdOrdenTrabajo') else None
-                if ot_id and ot_id not in self._valid_ots:
-                    logger.warning(f"OT {ot_id} no encontrada para pedido {row_id}, FK ignorada")
-                    ot_id = None
-
-                fech_fab  = self._parse_date(row.get('FechFab'))
-                fech_venc = self._parse_date(row.get('FechVenc'))
-                if fech_fab and fech_venc and fech_venc < fech_fab:
-                    raise ValueError(f"FechVenc ({fech_venc}) < FechFab ({fech_fab})")
-
-                if Pedido.query.get(int(row['IdPedido'])):
-                    self.result.pedidos['skipped'] += 1
-                    continue
-
-                pedido = Pedido(
-                    id=int(row['IdPedido']),
-                    codigo=f"PED-{int(row['IdPedido']):04d}",
-                    cliente_id=cliente_id,
-                    producto_id=producto_id,
-                    orden_trabajo_id=ot_id,
-                    lote=row.get('Lote') or None,
-                    cantidad=self._parse_decimal(row.get('Cantidad')),
-                    unidad_medida_id=int(row['IdUnidadMedida']) if row.get('IdUnidadMedida') else None,
-                    fech_fab=fech_fab,
-                    fech_venc=fech_venc,
-                    observaciones=row.get('Observaciones', ''),
-                    status=PedidoStatus.PENDIENTE,
-                    fech_pedido=self._parse_datetime(row.get('FechPedido')) or datetime.utcnow(),
-                )
+            cliente_id  = int(row['IdCliente'])  if row.get('IdCliente')  else None
+            producto_id = int(row['IdProducto']) if row.get('IdProducto') else None
 
-                if not self.dry_run:
-                    db.session.add(pedido)
-                    batch_count += 1
-                    if batch_count % self.BATCH_SIZE == 0:
-                        db.session.commit()
+            if not cliente_id or cliente_id not in self._valid_clientes:
+                raise ValueError(f"Cliente inválido: {cliente_id}")
+            if not producto_id or producto_id not in self._valid_productos:
+                raise ValueError(f"Producto inválido: {producto_id}")
 
-                self.result.pedidos['imported'] += 1
+            # OT opcional: si no existe, se deja en None con advertencia
+            ot_id = int(row['IdOrdenTrabajo']) if row.get('IdOrdenTrabajo') else None
+            if ot_id and ot_id not in self._valid_ots:
+                logger.warning(f"OT {ot_id} no encontrada para pedido {row_id}, FK ignorada")
+                ot_id = None
 
-            except Exception as e:
-                logger.error(f"Error Pedido fila {row_num}: {e}")
-                self.result.pedidos['errors'].append(
-                    ImportError('pedidos', row_id, 'general', str(e), row)
-                )
+            fech_fab  = self._parse_date(row.get('FechFab'))
+            fech_venc = self._parse_date(row.get('FechVenc'))
+            if fech_fab and fech_venc and fech_venc < fech_fab:
+                raise ValueError(f"FechVenc ({fech_venc}) < FechFab ({fech_fab})")
+
+            pedido_id = int(row['IdPedido'])
+            if pedido_id in self._existing_pedidos:
+                self.result.pedidos['skipped'] += 1
+                return None
+            self._existing_pedidos.add(pedido_id)
+
+            return Pedido(
+                id=int(row['IdPedido']),
+                codigo=f"PED-{int(row['IdPedido']):04d}",
+                cliente_id=cliente_id,
+                producto_id=producto_id,
+                orden_trabajo_id=ot_id,
+                lote=row.get('Lote') or None,
+                cantidad=self._parse_decimal(row.get('Cantidad')),
+                unidad_medida_id=int(row['IdUnidadMedida']) if row.get('IdUnidadMedida') else None,
+                fech_fab=fech_fab,
+                fech_venc=fech_venc,
+                observaciones=row.get('Observaciones', ''),
+                status=PedidoStatus.PENDIENTE,
+                fech_pedido=self._parse_datetime(row.get('FechPedido')) or datetime.utcnow(),
+            )
 
-        if not self.dry_run:
-            db.session.commit()
+        def on_error(row_num, row, e):
+            logger.error(f"Error Pedido fila {row_num}: {e}")
+            self.result.pedidos['errors'].append(
+                ImportError('pedidos', row.get('IdPedido', row_num), 'general', str(e), row)
+            )
+
+        self._run_pipeline(csv_path, 'Pedidos', transform, on_error, self.result.pedidos)
 
         logger.info(
             f"Pedidos: {self.result.pedidos['imported']} importados, "
@@ -685,95 +685,87 @@ class Phase3ImportService:
             logger.error(f"Archivo no encontrado: {csv_path}")
             return
 
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            rows = list(csv.DictReader(f))
-
-        self.result.entradas['total'] = len(rows)
-        batch_count = 0
-
-        for row_num, row in enumerate(rows, start=2):
+        def transform(row_num, row):
             row_id = row.get('Id', row_num)
-            try:
-                cliente_id  = int(row['IdCliente'])  if row.get('IdCliente')  else None
-                producto_id = int(row['IdProducto']) if row.get('IdProducto') else None
-                fabrica_id  = int(row['IdFabrica'])  if row.get('IdFabrica')  else None
-
-                if not cliente_id or cliente_id not in self._valid_clientes:
-                    raise ValueError(f"Cliente inválido: {cliente_id}")
-                if not producto_id or producto_id not in self._valid_productos:
-                    raise ValueError(f"Producto inválido: {producto_id}")
-                if not fabrica_id or fabrica_id not in self._valid_fabricas:
-                    raise ValueError(f"Fábrica inválida: {fabrica_id}")
-
-                # Validar y registrar formato de lote
-                lote = row.get('Lote', '').strip() or None
-                if lote and not re.match(r'^[A-Z]-\d{4}$', lote):
-                    warn = ImportWarning('entradas', row_id, 'lot_format',
-                                         f"Lote '{lote}' no cumple formato X-XXXX", lote)
-                    self.result.lot_warnings.append(warn)
-                    logger.warning(f"Lote incorrecto Entrada {row_id}: {lote}")
-
-                # Verificar y registrar balance
-                cant_recib  = self._parse_decimal(row.get('CantidadRecib', 0))
-                cant_entreg = self._parse_decimal(row.get('CantidadEntreg', 0))
-                expected_saldo = cant_recib - cant_entreg
-                stated_saldo   = self._parse_decimal(row.get('Saldo', expected_saldo))
-
-                if abs(expected_saldo - stated_saldo) > Decimal('0.01'):
-                    warn = ImportWarning(
-                        'entradas', row_id, 'balance_mismatch',
-                        f"Saldo declarado {stated_saldo} ≠ calculado {expected_saldo} "
-                        f"(recib={cant_recib}, entreg={cant_entreg})",
-                        stated_saldo,
-                    )
-                    self.result.balance_warnings.append(warn)
-                    logger.warning(f"Balance mismatch Entrada {row_id}: {warn.message}")
-
-                if Entrada.query.get(int(row['Id'])):
-                    self.result.entradas['skipped'] += 1
-                    continue
-
-                entrada = Entrada(
-                    id=int(row['Id']),
-                    codigo=row.get('Codigo') or f"ENT-{int(row['Id']):04d}",
-                    pedido_id=int(row['IdPedido']) if row.get('IdPedido') else None,
-                    producto_id=producto_id,
-                    fabrica_id=fabrica_id,
-                    cliente_id=cliente_id,
-                    rama_id=int(row['IdRama']) if row.get('IdRama') else None,
-                    unidad_medida_id=int(row['IdUnidadMedida']) if row.get('IdUnidadMedida') else None,
-                    lote=lote,
-                    nro_parte=row.get('NroParte') or None,
-                    cantidad_recib=cant_recib,
-                    cantidad_entreg=cant_entreg,
-                    cantidad_muest=self._parse_decimal(row.get('CantidadMuest')) or None,
-                    fech_fab=self._parse_date(row.get('FechFab')),
-                    fech_venc=self._parse_date(row.get('FechVenc')),
-                    fech_muestreo=self._parse_date(row.get('FechMuestreo')),
-                    fech_entrada=self._parse_datetime(row.get('FechEntrada')) or datetime.utcnow(),
-                    status=row.get('Status') or EntradaStatus.RECIBIDO,
-                    en_os=bool(int(row.get('EnOS', 0) or 0)),
-                    anulado=bool(int(row.get('Anulado', 0) or 0)),
-                    ent_entregada=bool(int(row.get('EntEntregada', 0) or 0)),
-                    observaciones=row.get('Observaciones', ''),
-                )
+            cliente_id  = int(row['IdCliente'])  if row.get('IdCliente')  else None
+            producto_id = int(row['IdProducto']) if row.get('IdProducto') else None
+            fabrica_id  = int(row['IdFabrica'])  if row.get('IdFabrica')  else None
 
-                if not self.dry_run:
-                    db.session.add(entrada)
-                    batch_count += 1
-                    if batch_count % self.BATCH_SIZE == 0:
-                        db.session.commit()
+            if not cliente_id or cliente_id not in self._valid_clientes:
+                raise ValueError(f"Cliente inválido: {cliente_id}")
+            if not producto_id or producto_id not in self._valid_productos:
+                raise ValueError(f"Producto inválido: {producto_id}")
+            if not fabrica_id or fabrica_id not in self._valid_fabricas:
+                raise ValueError(f"Fábrica inválida: {fabrica_id}")
 
-                self.result.entradas['imported'] += 1
+            # Validar y registrar formato de lote
+            lote = row.get('Lote', '').strip() or None
+            if lote and not re.match(r'^[A-Z]-\d{4}$', lote):
+                warn = ImportWarning('entradas', row_id, 'lot_format',
+                                     f"Lote '{lote}' no cumple formato X-XXXX", lote)
+                self.result.lot_warnings.append(warn)
+                logger.warning(f"Lote incorrecto Entrada {row_id}: {lote}")
+
+            # Verificar y registrar balance
+            cant_recib  = self._parse_decimal(row.get('CantidadRecib', 0))
+            cant_entreg = self._parse_decimal(row.get('CantidadEntreg', 0))
+            expected_saldo = cant_recib - cant_entreg
+            stated_saldo   = self._parse_decimal(row.get('Saldo', expected_saldo))
 
-            except Exception as e:
-                logger.error(f"Error Entrada fila {row_num}: {e}")
-                self.result.entradas['errors'].append(
-                    ImportError('entradas', row_id, 'general', str(e), row)
+            if abs(expected_saldo - stated_saldo) > Decimal('0.01'):
+                warn = ImportWarning(
+                    'entradas', row_id, 'balance_mismatch',
+                    f"Saldo declarado {stated_saldo} ≠ calculado {expected_saldo} "
+                    f"(recib={cant_recib}, entreg={cant_entreg})",
+                    stated_saldo,
                 )
+                self.result.balance_warnings.append(warn)
+                logger.warning(f"Balance mismatch Entrada {row_id}: {warn.message}")
+
+            entrada_id = int(row['Id'])
+            if entrada_id in self._existing_entradas:
+                self.result.entradas['skipped'] += 1
+                return None
+
+            codigo = row.get('Codigo') or f"ENT-{entrada_id:04d}"
+            if codigo in self._existing_entrada_codigos:
+                raise ValueError(f"Código de entrada duplicado: {codigo}")
+
+            self._existing_entradas.add(entrada_id)
+            self._existing_entrada_codigos.add(codigo)
+
+            return Entrada(
+                id=entrada_id,
+                codigo=codigo,
+                pedido_id=int(row['IdPedido']) if row.get('IdPedido') else None,
+                producto_id=producto_id,
+                fabrica_id=fabrica_id,
+                cliente_id=cliente_id,
+                rama_id=int(row['IdRama']) if row.get('IdRama') else None,
+                unidad_medida_id=int(row['IdUnidadMedida']) if row.get('IdUnidadMedida') else None,
+                lote=lote,
+                nro_parte=row.get('NroParte') or None,
+                cantidad_recib=cant_recib,
+                cantidad_entreg=cant_entreg,
+                cantidad_muest=self._parse_decimal(row.get('CantidadMuest')) or None,
+                fech_fab=self._parse_date(row.get('FechFab')),
+                fech_venc=self._parse_date(row.get('FechVenc')),
+                fech_muestreo=self._parse_date(row.get('FechMuestreo')),
+                fech_entrada=self._parse_datetime(row.get('FechEntrada')) or datetime.utcnow(),
+                status=row.get('Status') or EntradaStatus.RECIBIDO,
+                en_os=bool(int(row.get('EnOS', 0) or 0)),
+                anulado=bool(int(row.get('Anulado', 0) or 0)),
+                ent_entregada=bool(int(row.get('EntEntregada', 0) or 0)),
+                observaciones=row.get('Observaciones', ''),
+            )
 
-        if not self.dry_run:
-            db.session.commit()
+        def on_error(row_num, row, e):
+            logger.error(f"Error Entrada fila {row_num}: {e}")
+            self.result.entradas['errors'].append(
+                ImportError('entradas', row.get('Id', row_num), 'general', str(e), row)
+            )
+
+        self._run_pipeline(csv_path, 'Entradas', transform, on_error, self.result.entradas)
 
         logger.info(
             f"Entradas: {self.result.entradas['imported']} importadas, "
@@ -793,10 +785,7 @@ class Phase3ImportService:
             report.file_errors.append(f"Archivo no encontrado: {csv_path}")
             return
 
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            rows = list(csv.DictReader(f))
-
-        for row_num, row in enumerate(rows, start=2):
+        for row_num, row in iter_csv_rows(csv_path):
             row_id = row.get('Id', row_num)
 
             cliente_id = int(row['IdCliente']) if row.get('IdCliente') else None
@@ -811,10 +800,7 @@ class Phase3ImportService:
             report.file_errors.append(f"Archivo no encontrado: {csv_path}")
             return
 
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            rows = list(csv.DictReader(f))
-
-        for row_num, row in enumerate(rows, start=2):
+        for row_num, row in iter_csv_rows(csv_path):
             row_id = row.get('IdPedido', row_num)
 
             cliente_id  = int(row['IdCliente'])  if row.get('IdCliente')  else None
@@ -848,10 +834,7 @@ class Phase3ImportService:
             report.file_errors.append(f"Archivo no encontrado: {csv_path}")
             return
 
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            rows = list(csv.DictReader(f))
-
-        for row_num, row in enumerate(rows, start=2):
+        for row_num, row in iter_csv_rows(csv_path):
             row_id = row.get('Id', row_num)
 
             cliente_id  = int(row['IdCliente'])  if row.get('IdCliente')  else None
@@ -8,17 +8,17 @@ Cubre los requisitos del Issue #6 (Phase 4): Assignment & Usage Tracking
 - Reporte final en Markdown
 - Soporte para dry-run standalone
 """
-import csv
 import logging
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 
 from app import db
 from app.database.models import DetalleEnsayo, Ensayo, Entrada, Utilizado
 from app.database.models.detalle_ensayo import DetalleEnsayoStatus
 from app.database.models.utilizado import UtilizadoStatus
+from app.services.import_pipeline import CsvImportPipeline, iter_csv_rows
 
 logger = logging.getLogger(__name__)
 
@@ -208,13 +208,17 @@ class PostImportVerification:
 class Phase4ImportService:
     """Servicio para importar datos Phase 4 - Detalles de Ensayos y Utilizado."""
 
-    BATCH_SIZE = 50
+    BATCH_SIZE = 500
 
     def __init__(self, dry_run: bool = False):
         self.dry_run = dry_run
         self.result = Phase4ImportResult()
         self._valid_entradas: Optional[Set[int]] = None
         self._valid_ensayos: Optional[Set[int]] = None
+        # Pares (entrada_id, ensayo_id) ya presentes (BD + filas en curso)
+        self._existing_detalles: Optional[Set[Tuple[int, int]]] = None
+        # Ensayo por sigla de área (se resuelve una vez por área)
+        self._ensayo_by_area: Dict[str, Optional[int]] = {}
 
     def import_all(self, data_dir: str) -> Phase4ImportResult:
         """Importar todos los datos Phase 4 en orden correcto."""
@@ -409,9 +413,27 @@ class Phase4ImportService:
         return report_md
 
     def _load_fk_cache(self):
-        """Cargar sets de IDs válidos para validación FK rápida."""
-        self._valid_entradas = {e.id for e in Entrada.query.all()}
-        self._valid_ensayos = {e.id for e in Ensayo.query.all()}
+        """Cargar sets de IDs válidos y detalles existentes para validación sin consultas por fila."""
+        self._valid_entradas = set(db.session.execute(db.select(Entrada.id)).scalars())
+        self._valid_ensayos = set(db.session.execute(db.select(Ensayo.id)).scalars())
+        self._existing_detalles = {
+            (entrada_id, ensayo_id)
+            for entrada_id, ensayo_id in db.session.execute(
+                db.select(DetalleEnsayo.entrada_id, DetalleEnsayo.ensayo_id)
+            )
+        }
+        self._ensayo_by_area = {}
+
+    def _run_pipeline(self, csv_path: Path, label: str, transform, on_error, counters: dict):
+        """Importar un CSV en una pasada (ver ``CsvImportPipeline``) y acumular en ``counters``."""
+        stats = CsvImportPipeline(
+            csv_path, transform, on_error,
+            label=label, batch_size=self.BATCH_SIZE, dry_run=self.dry_run,
+            encoding='utf-8-sig',
+        ).run()
+        counters['total'] = stats.total
+        counters['imported'] += stats.imported
+        return stats
 
     def _import_detalles_ensayos(self, csv_path: Path):
         """Importar detalles de ensayos desde CSV."""
@@ -419,59 +441,40 @@ class Phase4ImportService:
             logger.error(f"Archivo no encontrado: {csv_path}")
             return
 
-        with open(csv_path, 'r', encoding='utf-8-sig') as f:
-            rows = list(csv.DictReader(f))
+        def transform(row_num, row):
+            entrada_id = int(row['IdEnt']) if row.get('IdEnt') else None
+            ensayo_id = int(row['IdEns']) if row.get('IdEns') else None
 
-        self.result.detalles_ensayos['total'] = len(rows)
-        batch_count = 0
+            if not entrada_id or entrada_id not in self._valid_entradas:
+                raise ValueError(f"Entrada inválida: {entrada_id}")
+            if not ensayo_id or ensayo_id not in self._valid_ensayos:
+                raise ValueError(f"Ensayo inválido: {ensayo_id}")
+
+            if (entrada_id, ensayo_id) in self._existing_detalles:
+                logger.debug(f"DetalleEnsayo {entrada_id}-{ensayo_id} ya existe, saltando")
+                self.result.detalles_ensayos['skipped'] += 1
+                return None
+            self._existing_detalles.add((entrada_id, ensayo_id))
+
+            cantidad = int(row['Cantidad']) if row.get('Cantidad') else 1
+
+            return DetalleEnsayo(
+                entrada_id=entrada_id,
+                ensayo_id=ensayo_id,
+                cantidad=cantidad,
+                estado=DetalleEnsayoStatus.PENDIENTE.value,
+                fecha_asignacion=None,
+            )
 
-        for row_num, row in enumerate(rows, start=2):
+        def on_error(row_num, row, e):
+            logger.error(f"Error DetalleEnsayo fila {row_num}: {e}")
             row_id = f"{row.get('IdEnt')}-{row.get('IdEns')}"
-            try:
-                entrada_id = int(row['IdEnt']) if row.get('IdEnt') else None
-                ensayo_id = int(row['IdEns']) if row.get('IdEns') else None
-
-                if not entrada_id or entrada_id not in self._valid_entradas:
-                    raise ValueError(f"Entrada inválida: {entrada_id}")
-                if not ensayo_id or ensayo_id not in self._valid_ensayos:
-                    raise ValueError(f"Ensayo inválido: {ensayo_id}")
-
-                existing = DetalleEnsayo.query.filter_by(
-                    entrada_id=entrada_id,
-                    ensayo_id=ensayo_id
-                ).first()
-                if existing:
-                    logger.debug(f"DetalleEnsayo {entrada_id}-{ensayo_id} ya existe, saltando")
-                    self.result.detalles_ensayos['skipped'] += 1
-                    continue
-
-                cantidad = int(row['Cantidad']) if row.get('Cantidad') else 1
-
-                detalle = DetalleEnsayo(
-                    entrada_id=entrada_id,
-                    ensayo_id=ensayo_id,
-                    cantidad=cantidad,
-                    estado=DetalleEnsayoStatus.PENDIENTE.value,
-                    fecha_asignacion=None,
-                )
-
-                if not self.dry_run:
-                    db.session.add(detalle)
-                    batch_count += 1
-                    if batch_count % self.BATCH_SIZE == 0:
-                        db.session.commit()
-                        logger.debug(f"Commit batch DetalleEnsayo ({batch_count})")
-
-                self.result.detalles_ensayos['imported'] += 1
-
-            except Exception as e:
-                logger.error(f"Error DetalleEnsayo fila {row_num}: {e}")
-                self.result.detalles_ensayos['errors'].append(
-                    ImportError('detalles_ensayos', row_id, 'general', str(e), row)
-                )
+            self.result.detalles_ensayos['errors'].append(
+                ImportError('detalles_ensayos', row_id, 'general', str(e), row)
+            )
 
-        if not self.dry_run:
-            db.session.commit()
+        self._run_pipeline(csv_path, 'Detalles de Ensayos', transform, on_error,
+                           self.result.detalles_ensayos)
 
         logger.info(
             f"Detalles de Ensayos: {self.result.detalles_ensayos['imported']} importadas, "
@@ -485,83 +488,64 @@ class Phase4ImportService:
             logger.error(f"Archivo no encontrado: {csv_path}")
             return
 
-        with open(csv_path, 'r', encoding='utf-8-sig') as f:
-            rows = list(csv.DictReader(f))
-
-        self.result.utilizados['total'] = len(rows)
-        batch_count = 0
-        imported_count = 0
-
-        for row_num, row in enumerate(rows, start=2):
+        def transform(row_num, row):
             row_id = row.get('IdEnt', row_num)
-            try:
-                id_ent = int(row['IdEnt']) if row.get('IdEnt') else None
-
-                if id_ent not in self._valid_entradas:
-                    warn = ImportWarning(
-                        'utilizados', row_id, 'no_entry_match',
-                        f"IdEnt {id_ent} no coincide con ninguna entrada existente",
-                        id_ent
-                    )
-                    self.result.utilizado_warnings.append(warn)
-                    self.result.utilizados['skipped'] += 1
-                    continue
-
-                entrada_id = id_ent
-
-                meses = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12']
-                mes = int(row.get('Mes', 1)) if row.get('Mes') else 1
-                year = 2024
-                mes_facturacion = f"{year}-{meses[mes-1]}" if 1 <= mes <= 12 else None
-
-                created = False
-                for campo, area in AREA_MAP.items():
-                    cantidad = self._parse_decimal(row.get(campo, 0))
-                    if cantidad > 0:
-                        ensayo_id = self._get_ensayo_id_by_area(area)
-                        if ensayo_id is None:
-                            warn = ImportWarning(
-                                'utilizados', row_id, 'no_ensayo_area',
-                                f"No existe ensayo para área {area}",
-                                area
-                            )
-                            self.result.utilizado_warnings.append(warn)
-                            continue
-
-                        utilizado = Utilizado(
-                            entrada_id=entrada_id,
-                            ensayo_id=ensayo_id,
-                            cantidad=cantidad,
-                            precio_unitario=Decimal('0'),
-                            importe=Decimal('0'),
-                            mes_facturacion=mes_facturacion,
-                            fecha_uso=datetime.utcnow(),
-                            estado=UtilizadoStatus.PENDIENTE.value,
-                        )
-
-                        if not self.dry_run:
-                            db.session.add(utilizado)
-                            created = True
-                            batch_count += 1
-                            if batch_count % self.BATCH_SIZE == 0:
-                                db.session.commit()
-                                logger.debug(f"Commit batch Utilizado ({batch_count})")
-
-                        imported_count += 1
-
-                if not created:
-                    self.result.utilizados['skipped'] += 1
+            id_ent = int(row['IdEnt']) if row.get('IdEnt') else None
 
-            except Exception as e:
-                logger.error(f"Error Utilizado fila {row_num}: {e}")
-                self.result.utilizados['errors'].append(
-                    ImportError('utilizados', row_id, 'general', str(e), row)
+            if id_ent not in self._valid_entradas:
+                warn = ImportWarning(
+                    'utilizados', row_id, 'no_entry_match',
+                    f"IdEnt {id_ent} no coincide con ninguna entrada existente",
+                    id_ent
                 )
+                self.result.utilizado_warnings.append(warn)
+                self.result.utilizados['skipped'] += 1
+                return None
+
+            entrada_id = id_ent
+
+            meses = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12']
+            mes = int(row.get('Mes', 1)) if row.get('Mes') else 1
+            year = 2024
+            mes_facturacion = f"{year}-{meses[mes-1]}" if 1 <= mes <= 12 else None
+
+            utilizados = []
+            for campo, area in AREA_MAP.items():
+                cantidad = self._parse_decimal(row.get(campo, 0))
+                if cantidad > 0:
+                    ensayo_id = self._get_ensayo_id_by_area(area)
+                    if ensayo_id is None:
+                        warn = ImportWarning(
+                            'utilizados', row_id, 'no_ensayo_area',
+                            f"No existe ensayo para área {area}",
+                            area
+                        )
+                        self.result.utilizado_warnings.append(warn)
+                        continue
+
+                    utilizados.append(Utilizado(
+                        entrada_id=entrada_id,
+                        ensayo_id=ensayo_id,
+                        cantidad=cantidad,
+                        precio_unitario=Decimal('0'),
+                        importe=Decimal('0'),
+                        mes_facturacion=mes_facturacion,
+                        fecha_uso=datetime.utcnow(),
+                        estado=UtilizadoStatus.PENDIENTE.value,
+                    ))
+
+            if not utilizados:
+                self.result.utilizados['skipped'] += 1
+                return None
+            return utilizados
+
+        def on_error(row_num, row, e):
+            logger.error(f"Error Utilizado fila {row_num}: {e}")
+            self.result.utilizados['errors'].append(
+                ImportError('utilizados', row.get('IdEnt', row_num), 'general', str(e), row)
+            )
 
-        if not self.dry_run:
-            db.session.commit()
-
-        self.result.utilizados['imported'] = imported_count
+        self._run_pipeline(csv_path, 'Utilizados', transform, on_error, self.result.utilizados)
 
         logger.info(
             f"Utilizados: {self.result.utilizados['imported']} importados, "
@@ -576,10 +560,7 @@ class Phase4ImportService:
             report.file_errors.append(f"Archivo no encontrado: {csv_path}")
             return
 
-        with open(csv_path, 'r', encoding='utf-8-sig') as f:
-            rows = list(csv.DictReader(f))
-
-        for row_num, row in enumerate(rows, start=2):
+        for row_num, row in iter_csv_rows(csv_path, encoding='utf-8-sig'):
             row_id = f"{row.get('IdEnt')}-{row.get('IdEns')}"
 
             entrada_id = int(row['IdEnt']) if row.get('IdEnt') else None
@@ -600,10 +581,7 @@ class Phase4ImportService:
             report.file_errors.append(f"Archivo no encontrado: {csv_path}")
             return
 
-        with open(csv_path, 'r', encoding='utf-8-sig') as f:
-            rows = list(csv.DictReader(f))
-
-        for row_num, row in enumerate(rows, start=2):
+        for row_num, row in iter_csv_rows(csv_path, encoding='utf-8-sig'):
             row_id = row.get('IdEnt', row_num)
 
             id_ent = int(row['IdEnt']) if row.get('IdEnt') else None
@@ -622,10 +600,16 @@ class Phase4ImportService:
             return Decimal('0')
 
     def _get_ensayo_id_by_area(self, area: str) -> Optional[int]:
-        """Obtener ID de ensayo por área (sigla del área)."""
+        """Obtener ID de ensayo por área (sigla del área), consultando una vez por área."""
+        if area in self._ensayo_by_area:
+            return self._ensayo_by_area[area]
+
         from app.database.models import Ensayo, Area
+        ensayo_id = None
         area_obj = Area.query.filter_by(sigla=area).first()
-        if not area_obj:
-            return None
-        ensayo = Ensayo.query.filter_by(area_id=area_obj.id, activo=True).first()
-        return ensayo.id if ensayo else None
+        if area_obj:
+            ensayo = Ensayo.query.filter_by(area_id=area_obj.id, activo=True).first()
+            ensayo_id = ensayo.id if ensayo else None
+
+        self._ensayo_by_area[area] = ensayo_id
+        return ensayo_id
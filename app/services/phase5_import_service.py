@@ -16,6 +16,7 @@ from pathlib import Path
 from typing import Dict, List, Optional, Set
 
 from app import db
+from app.utils import access_reader
 from app.database.models.plantilla_informe import PlantillaInforme
 from app.database.models.informe import Informe, InformeStatus, TipoInforme, MedioEntrega
 from app.database.models.entrada import Entrada
@@ -208,8 +209,13 @@ class Phase5ImportService:
 
     BATCH_SIZE = 50
 
-    def __init__(self, dry_run: bool = False):
+    # Columnas de la tabla Informes de Access
+    PLANTILLA_FIELDS = {'IdInf': 'id_inf', 'NomInf': 'nom_inf', 'Parametro': 'parametro', 'Activo': 'activo'}
+
+    def __init__(self, dry_run: bool = False, connection=None):
         self.dry_run = dry_run
+        # Conexión DB-API inyectada (p. ej. un cursor falso en pruebas); si no, pyodbc
+        self._access_conn = connection
         self.result = Phase5ImportResult()
         self._valid_entradas: Optional[Set[int]] = None
         self._valid_clientes: Optional[Set[int]] = None
@@ -237,54 +243,45 @@ class Phase5ImportService:
 
     def _connect_to_access(self):
         """Establecer conexión a la base de datos Access."""
-        try:
-            import pyodbc
-
-            conn_str = (
-                f"DRIVER={{Microsoft Access Driver (*.mdb, *.accdb)}};"
-                f"DBQ={ACCESS_DB_PATH};"
-            )
-            conn = pyodbc.connect(conn_str)
-            logger.info(f"Conexión a Access establecida: {ACCESS_DB_PATH}")
-            return conn
-        except ImportError:
-            logger.error("pyodbc no está instalado. Instalar con: pip install pyodbc")
-            raise
-        except Exception as e:
-            logger.error(f"Error conectando a Access: {e}")
-            raise
+        if self._access_conn is not None:
+            return self._access_conn
+        return access_reader.connect(ACCESS_DB_PATH)
 
     def _import_plantillas_from_access(self):
         """Importar plantillas de informes desde la tabla Informes de Access."""
         try:
             conn = self._connect_to_access()
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT IdInf, NomInf, Parametro, Activo FROM Informes")
-            rows = cursor.fetchall()
-
-            self.result.plantillas["total"] = len(rows)
+            columns, rows = access_reader.stream_query(
+                conn, "SELECT IdInf, NomInf, Parametro, Activo FROM Informes"
+            )
+            index = dict(access_reader.column_index(columns, self.PLANTILLA_FIELDS))
+            pos_id, pos_nombre, pos_activo = index['id_inf'], index['nom_inf'], index['activo']
 
             tipos_disponibles = list(TipoInforme)
             tipo_index = 0
             batch_count = 0
 
+            # Nombres ya usados (BD + filas en curso): sin consulta por fila
+            existing_nombres = set(db.session.execute(db.select(PlantillaInforme.nombre)).scalars())
+
             for row in rows:
+                self.result.plantillas["total"] += 1
+                id_inf = None
                 try:
-                    id_inf = row.IdInf
-                    nom_inf = row.NomInf
-                    activo = bool(row.Activo) if row.Activo is not None else True
+                    id_inf = row[pos_id]
+                    nom_inf = row[pos_nombre]
+                    activo = bool(row[pos_activo]) if row[pos_activo] is not None else True
 
                     tipo_informe = tipos_disponibles[tipo_index % len(tipos_disponibles)]
                     tipo_index += 1
 
                     nombre_plantilla = nom_inf if nom_inf else f"Plantilla_{id_inf}"
 
-                    existing = PlantillaInforme.query.filter_by(nombre=nombre_plantilla).first()
-                    if existing:
+                    if nombre_plantilla in existing_nombres:
                         logger.debug(f"Plantilla {nombre_plantilla} ya existe, saltando")
                         self.result.plantillas["skipped"] += 1
                         continue
+                    existing_nombres.add(nombre_plantilla)
 
                     plantilla = PlantillaInforme(
                         nombre=nombre_plantilla,
@@ -313,8 +310,8 @@ class Phase5ImportService:
                         ImportError("plantillas", id_inf, "general", str(e), {"IdInf": id_inf})
                     )
 
-            cursor.close()
-            conn.close()
+            if self._access_conn is None:
+                conn.close()
 
             if not self.dry_run:
                 db.session.commit()
@@ -0,0 +1,669 @@
+"""Índice de búsqueda global para DataLab.
+
+Mantiene la tabla ``search_documents`` sincronizada con las entidades
+buscables mediante eventos de mapper (after_insert/after_update/after_delete)
+y resuelve la búsqueda global con una única consulta rankeada:
+
+  - PostgreSQL: ``to_tsvector``/``to_tsquery`` con prefijos + similitud
+    trigram (pg_trgm) sobre el título para el ranking.
+  - SQLite: FTS5 con ``bm25()`` ponderando título sobre contenido.
+
+Una etapa difusa (tolerante a errores de tipeo) se une a las coincidencias
+exactas dentro de la misma consulta, antes de paginar:
+
+  - PostgreSQL: ``word_similarity(q, title)`` de pg_trgm (operador ``<%`` + GIN).
+  - Otros dialectos: fracción de trigramas de la consulta presentes en el
+    título, agregada sobre la tabla ``search_trigrams``.
+
+La paginación por tipo de entidad y el total de coincidencias se obtienen
+en la misma consulta con ``ROW_NUMBER()``/``COUNT(*) OVER (PARTITION BY ...)``.
+"""
+import logging
+import re
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import (
+    Float, and_, case, cast, column, delete, event, func, insert, inspect as sa_inspect,
+    literal, literal_column, null, or_, select, table, text, union_all,
+)
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.database.models.cliente import Cliente
+from app.database.models.entrada import Entrada
+from app.database.models.fabrica import Fabrica
+from app.database.models.informe import Informe
+from app.database.models.pedido import Pedido
+from app.database.models.producto import Producto
+from app.database.models.reference import Rama
+from app.database.models.search_document import (
+    FTS_TABLE_NAME, SQLITE_FTS_DDL, SearchDocument, SearchTrigram,
+)
+
+logger = logging.getLogger(__name__)
+
+# Configuración de indexación por tipo de entidad.
+#   title:  campo principal (pondera más en el ranking)
+#   fields: campos concatenados en el contenido indexado
+#   status: campo de estado usado por el filtro ``status``
+#   date:   campo de fecha usado por los filtros ``date_from``/``date_to``
+INDEXED_ENTITIES: Dict[str, Dict[str, Any]] = {
+    'clientes': {
+        'model': Cliente,
+        'title': 'nombre',
+        'fields': ['codigo', 'nombre', 'email', 'telefono'],
+        'status': None,
+        'date': None,
+    },
+    'fabricas': {
+        'model': Fabrica,
+        'title': 'nombre',
+        'fields': ['nombre', 'id'],
+        'status': None,
+        'date': 'creado_en',
+    },
+    'productos': {
+        'model': Producto,
+        'title': 'nombre',
+        'fields': ['nombre', 'id'],
+        'status': None,
+        'date': 'creado_en',
+    },
+    'entradas': {
+        'model': Entrada,
+        'title': 'codigo',
+        'fields': ['codigo', 'lote', 'nro_parte', 'observaciones'],
+        'status': 'status',
+        'date': 'fech_entrada',
+    },
+    'pedidos': {
+        'model': Pedido,
+        'title': 'codigo',
+        'fields': ['codigo', 'lote', 'observaciones'],
+        'status': 'status',
+        'date': 'fech_pedido',
+    },
+    'informes': {
+        'model': Informe,
+        'title': 'nro_oficial',
+        'fields': ['nro_oficial', 'resumen_resultados', 'conclusiones'],
+        'status': 'estado',
+        'date': 'fecha_generacion',
+    },
+}
+
+# Peso del título frente al contenido en bm25() (SQLite)
+TITLE_WEIGHT = 10.0
+
+# Similitud trigram por palabra mínima para coincidencias difusas
+TRIGRAM_SIMILARITY_THRESHOLD = 0.5
+
+# Longitud mínima de la consulta para activar la etapa difusa
+FUZZY_MIN_LENGTH = 3
+
+# Siglas de área del laboratorio. El área de una entidad se deriva del
+# nombre de la rama de su producto (mismo criterio que el filtro ``area``).
+AREA_SIGLAS = ['FQ', 'MB', 'ES', 'OS']
+
+# Columna con el id del producto, por tipo de entidad con faceta de área
+AREA_FACET_ENTITIES = {
+    'productos': 'id',
+    'entradas': 'producto_id',
+    'pedidos': 'producto_id',
+}
+
+_TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """Minúsculas y sin diacríticos (``'Lácteos'`` -> ``'lacteos'``)."""
+    normalized = unicodedata.normalize('NFKD', value or '')
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch)).lower()
+
+
+def trigrams(value: str) -> set:
+    """Trigramas de un texto con el mismo esquema que pg_trgm.
+
+    Cada palabra se normaliza (minúsculas, sin diacríticos) y se rellena con
+    dos espacios al inicio y uno al final: ``'cat'`` -> ``{'  c', ' ca', 'cat', 'at '}``.
+    """
+    result = set()
+    for word in _TERM_PATTERN.findall(normalize_text(value)):
+        padded = f'  {word} '
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return result
+
+
+def _plain(value: Any) -> Optional[str]:
+    """Normalizar un valor de columna a texto (Enums por su ``value``)."""
+    if value is None:
+        return None
+    if hasattr(value, 'value'):
+        value = value.value
+    return str(value)
+
+
+def area_facet(stmt, producto_id_column):
+    """Agregar a ``stmt`` los outer joins hasta la rama del producto.
+
+    Returns:
+        Tuple: (stmt con los joins, expresión con la sigla de área o NULL)
+    """
+    producto = aliased(Producto)
+    rama = aliased(Rama)
+    stmt = stmt.outerjoin(producto, producto.id == producto_id_column).outerjoin(
+        rama, rama.id == producto.rama_id
+    )
+    # Constantes en línea (no parámetros) para poder agrupar por la expresión
+    area = case(
+        *[(rama.nombre.ilike(literal_column(f"'%{sigla}%'")), literal_column(f"'{sigla}'"))
+          for sigla in AREA_SIGLAS],
+        else_=null(),
+    )
+    return stmt, area
+
+
+def _entity_type_for(target: Any) -> Optional[str]:
+    for entity_type, config in INDEXED_ENTITIES.items():
+        if isinstance(target, config['model']):
+            return entity_type
+    return None
+
+
+class SearchIndexService:
+    """Construcción, sincronización y consulta del índice de búsqueda."""
+
+    # ------------------------------------------------------------------
+    # Construcción de documentos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build_document(entity_type: str, item: Any) -> Dict[str, Any]:
+        """Construir la fila de ``search_documents`` para una entidad."""
+        config = INDEXED_ENTITIES[entity_type]
+        values = [_plain(getattr(item, field, None)) for field in config['fields']]
+        title = _plain(getattr(item, config['title'], None)) or ''
+
+        status_field = config['status']
+        date_field = config['date']
+
+        return {
+            'entity_type': entity_type,
+            'entity_id': item.id,
+            'title': title[:300],
+            'content': ' '.join(v for v in values if v),
+            'status': _plain(getattr(item, status_field, None)) if status_field else None,
+            'fecha': getattr(item, date_field, None) if date_field else None,
+            'updated_at': datetime.utcnow(),
+        }
+
+    @staticmethod
+    def _indexed_attributes(entity_type: str) -> List[str]:
+        config = INDEXED_ENTITIES[entity_type]
+        attrs = set(config['fields']) | {config['title']}
+        for key in ('status', 'date'):
+            if config[key]:
+                attrs.add(config[key])
+        return sorted(attrs)
+
+    # ------------------------------------------------------------------
+    # Sincronización desde eventos de modelo
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _uses_trigram_table(connection) -> bool:
+        """PostgreSQL calcula la similitud con pg_trgm; el resto usa search_trigrams."""
+        return connection.dialect.name != 'postgresql'
+
+    @staticmethod
+    def _trigram_rows(document: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {
+                'trigram': trigram,
+                'entity_type': document['entity_type'],
+                'entity_id': document['entity_id'],
+            }
+            for trigram in trigrams(document['title'])
+        ]
+
+    @staticmethod
+    def _delete_documents(connection, entity_type: str, entity_id: Optional[int] = None) -> None:
+        documents = SearchDocument.__table__
+        trigram_table = SearchTrigram.__table__
+        doc_filter = [documents.c.entity_type == entity_type]
+        trigram_filter = [trigram_table.c.entity_type == entity_type]
+        if entity_id is not None:
+            doc_filter.append(documents.c.entity_id == entity_id)
+            trigram_filter.append(trigram_table.c.entity_id == entity_id)
+
+        connection.execute(delete(documents).where(*doc_filter))
+        if SearchIndexService._uses_trigram_table(connection):
+            connection.execute(delete(trigram_table).where(*trigram_filter))
+
+    @staticmethod
+    def _write_documents(connection, documents: List[Dict[str, Any]]) -> None:
+        if not documents:
+            return
+        connection.execute(insert(SearchDocument.__table__), documents)
+        if SearchIndexService._uses_trigram_table(connection):
+            rows = [row for document in documents
+                    for row in SearchIndexService._trigram_rows(document)]
+            if rows:
+                connection.execute(insert(SearchTrigram.__table__), rows)
+
+    @staticmethod
+    def _upsert(connection, entity_type: str, item: Any) -> None:
+        SearchIndexService._delete_documents(connection, entity_type, item.id)
+        SearchIndexService._write_documents(
+            connection, [SearchIndexService.build_document(entity_type, item)]
+        )
+
+    @staticmethod
+    def _after_insert(mapper, connection, target) -> None:
+        entity_type = _entity_type_for(target)
+        if entity_type:
+            SearchIndexService._upsert(connection, entity_type, target)
+
+    @staticmethod
+    def _after_update(mapper, connection, target) -> None:
+        entity_type = _entity_type_for(target)
+        if not entity_type:
+            return
+        state = sa_inspect(target)
+        changed = any(
+            state.attrs[attr].history.has_changes()
+            for attr in SearchIndexService._indexed_attributes(entity_type)
+        )
+        if changed:
+            SearchIndexService._upsert(connection, entity_type, target)
+
+    @staticmethod
+    def _after_delete(mapper, connection, target) -> None:
+        entity_type = _entity_type_for(target)
+        if entity_type:
+            SearchIndexService._delete_documents(connection, entity_type, target.id)
+
+    @staticmethod
+    def register_listeners() -> None:
+        """Registrar los eventos de mapper que mantienen el índice (idempotente)."""
+        handlers = (
+            ('after_insert', SearchIndexService._after_insert),
+            ('after_update', SearchIndexService._after_update),
+            ('after_delete', SearchIndexService._after_delete),
+        )
+        for config in INDEXED_ENTITIES.values():
+            model = config['model']
+            for event_name, handler in handlers:
+                if not event.contains(model, event_name, handler):
+                    event.listen(model, event_name, handler)
+
+    # ------------------------------------------------------------------
+    # Reconstrucción
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def ensure_structures() -> None:
+        """Crear la tabla FTS5 y sus triggers si faltan (solo SQLite)."""
+        if db.engine.dialect.name != 'sqlite':
+            return
+        for statement in SQLITE_FTS_DDL:
+            db.session.execute(text(statement))
+
+    @staticmethod
+    def rebuild(entities: Optional[Iterable[str]] = None,
+                batch_size: int = 1000) -> Dict[str, int]:
+        """Reconstruir el índice desde cero para las entidades indicadas.
+
+        Args:
+            entities: Tipos de entidad a reindexar (por defecto todos)
+            batch_size: Filas leídas e insertadas por lote
+
+        Returns:
+            Dict[str, int]: Documentos indexados por tipo de entidad.
+        """
+        entities = list(entities or INDEXED_ENTITIES.keys())
+        counts: Dict[str, int] = {}
+
+        SearchIndexService.ensure_structures()
+        connection = db.session.connection()
+
+        for entity_type in entities:
+            if entity_type not in INDEXED_ENTITIES:
+                raise ValueError(f'Entidad no indexable: {entity_type}')
+            model = INDEXED_ENTITIES[entity_type]['model']
+
+            SearchIndexService._delete_documents(connection, entity_type)
+
+            batch: List[Dict[str, Any]] = []
+            total = 0
+            for item in db.session.query(model).yield_per(batch_size):
+                batch.append(SearchIndexService.build_document(entity_type, item))
+                if len(batch) >= batch_size:
+                    SearchIndexService._write_documents(connection, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                SearchIndexService._write_documents(connection, batch)
+                total += len(batch)
+
+            counts[entity_type] = total
+            logger.info("Índice de búsqueda: %s documentos de %s", total, entity_type)
+
+        if db.engine.dialect.name == 'sqlite':
+            db.session.execute(text(
+                f"INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}) VALUES ('rebuild')"
+            ))
+
+        db.session.commit()
+        return counts
+
+    @staticmethod
+    def reindex(entity_type: str, entity_ids: Iterable[int], batch_size: int = 1000) -> int:
+        """Reindexar entidades escritas sin pasar por el ORM (upserts en bloque).
+
+        Las escrituras Core no disparan los eventos de mapper: quien las hace
+        llama a este método con los ids escritos, dentro de la misma
+        transacción (no confirma).
+
+        Returns:
+            int: Documentos escritos.
+        """
+        config = INDEXED_ENTITIES[entity_type]
+        model = config['model']
+        documents_table = SearchDocument.__table__
+        trigram_table = SearchTrigram.__table__
+        connection = db.session.connection()
+        ids = sorted(set(entity_ids))
+        total = 0
+
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            connection.execute(delete(documents_table).where(
+                documents_table.c.entity_type == entity_type,
+                documents_table.c.entity_id.in_(chunk),
+            ))
+            if SearchIndexService._uses_trigram_table(connection):
+                connection.execute(delete(trigram_table).where(
+                    trigram_table.c.entity_type == entity_type,
+                    trigram_table.c.entity_id.in_(chunk),
+                ))
+            # populate_existing: las instancias en la sesión pueden ser previas al upsert
+            items = db.session.execute(
+                select(model).where(model.id.in_(chunk)).execution_options(populate_existing=True)
+            ).scalars()
+            documents = [SearchIndexService.build_document(entity_type, item) for item in items]
+            SearchIndexService._write_documents(connection, documents)
+            total += len(documents)
+
+        return total
+
+    @staticmethod
+    def entity_type_for_table(table) -> Optional[str]:
+        """Tipo de entidad indexada que corresponde a ``table`` (None si no se indexa)."""
+        for entity_type, config in INDEXED_ENTITIES.items():
+            if config['model'].__table__ is table:
+                return entity_type
+        return None
+
+    @staticmethod
+    def document_counts() -> Dict[str, int]:
+        """Contar documentos indexados por tipo de entidad."""
+        rows = db.session.query(
+            SearchDocument.entity_type, func.count(SearchDocument.id)
+        ).group_by(SearchDocument.entity_type).all()
+        return {entity_type: count for entity_type, count in rows}
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _terms(query: str) -> List[str]:
+        return _TERM_PATTERN.findall(query.lower())
+
+    @staticmethod
+    def _exact_hits(query: str):
+        """Select de coincidencias exactas/por prefijo según el dialecto.
+
+        Columnas: id, entity_type, entity_id, exact (=1), score.
+        """
+        doc = SearchDocument.__table__
+        dialect = db.engine.dialect.name
+        terms = SearchIndexService._terms(query)
+        exact = literal(1).label('exact')
+
+        if dialect == 'postgresql' and terms:
+            tsquery = func.to_tsquery('simple', ' & '.join(f'{t}:*' for t in terms))
+            tsvector = SearchDocument.tsvector_expression(doc.c.content)
+            score = func.ts_rank_cd(tsvector, tsquery) + func.similarity(doc.c.title, query)
+            return select(
+                doc.c.id, doc.c.entity_type, doc.c.entity_id, exact, score.label('score')
+            ).where(or_(tsvector.op('@@')(tsquery), doc.c.content.ilike(f'%{query}%')))
+
+        if dialect == 'sqlite' and terms:
+            fts = table(FTS_TABLE_NAME, column('rowid'))
+            fts_ref = literal_column(FTS_TABLE_NAME)
+            match = ' AND '.join(f'"{t}"*' for t in terms)
+            score = -func.bm25(fts_ref, TITLE_WEIGHT, 1.0)
+            # bm25() solo es válido en el contexto de la consulta FTS: el
+            # LIMIT -1 impide que SQLite aplane la subconsulta dentro del
+            # GROUP BY de ``search``.
+            fts_hits = select(
+                fts.c.rowid, score.label('score')
+            ).where(fts_ref.op('MATCH')(match)).limit(-1).subquery('fts_hits')
+            return select(
+                doc.c.id, doc.c.entity_type, doc.c.entity_id, exact, fts_hits.c.score
+            ).select_from(
+                doc.join(fts_hits, fts_hits.c.rowid == doc.c.id)
+            )
+
+        # Otros dialectos (o consultas sin términos alfanuméricos): LIKE simple
+        pattern = f'%{query}%'
+        return select(
+            doc.c.id, doc.c.entity_type, doc.c.entity_id, exact, literal(1.0).label('score')
+        ).where(or_(doc.c.title.ilike(pattern), doc.c.content.ilike(pattern)))
+
+    @staticmethod
+    def _fuzzy_hits(query: str, entities: List[str], threshold: float):
+        """Select de coincidencias difusas por similitud trigram con el título.
+
+        Columnas: id, entity_type, entity_id, exact (=0), score (similitud).
+        Devuelve None si la consulta no genera trigramas.
+        """
+        doc = SearchDocument.__table__
+        fuzzy = literal(0).label('exact')
+
+        if db.engine.dialect.name == 'postgresql':
+            similarity = func.word_similarity(query, doc.c.title)
+            # ``<%`` usa el índice GIN (umbral pg_trgm.word_similarity_threshold);
+            # la comparación explícita aplica el umbral solicitado.
+            return select(
+                doc.c.id, doc.c.entity_type, doc.c.entity_id, fuzzy, similarity.label('score')
+            ).where(literal(query).op('<%')(doc.c.title), similarity >= threshold)
+
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            return None
+
+        trigram_table = SearchTrigram.__table__
+        shared = func.count()
+        # Fracción de trigramas de la consulta presentes en el título
+        similarity = (cast(shared, Float) / len(query_trigrams)).label('score')
+        matches = select(
+            trigram_table.c.entity_type,
+            trigram_table.c.entity_id,
+            similarity,
+        ).where(
+            trigram_table.c.trigram.in_(sorted(query_trigrams)),
+            trigram_table.c.entity_type.in_(entities),
+        ).group_by(
+            trigram_table.c.entity_type, trigram_table.c.entity_id
+        ).having(
+            shared >= threshold * len(query_trigrams)
+        ).subquery('trigram_matches')
+
+        return select(
+            doc.c.id, doc.c.entity_type, doc.c.entity_id, fuzzy, matches.c.score
+        ).select_from(
+            doc.join(matches, and_(
+                matches.c.entity_type == doc.c.entity_type,
+                matches.c.entity_id == doc.c.entity_id,
+            ))
+        )
+
+    @staticmethod
+    def _apply_filters(stmt, entities: List[str], filters: Dict[str, Any]):
+        doc = SearchDocument.__table__
+        stmt = stmt.where(doc.c.entity_type.in_(entities))
+        if filters.get('status'):
+            stmt = stmt.where(or_(doc.c.status.is_(None), doc.c.status == filters['status']))
+        if filters.get('date_from'):
+            stmt = stmt.where(or_(doc.c.fecha.is_(None), doc.c.fecha >= filters['date_from']))
+        if filters.get('date_to'):
+            stmt = stmt.where(or_(doc.c.fecha.is_(None), doc.c.fecha <= filters['date_to']))
+        return stmt
+
+    @staticmethod
+    def _matches(query: str, entities: List[str], filters: Dict[str, Any],
+                 fuzzy: bool, threshold: float):
+        """CTE con un registro por documento coincidente: entity_type, entity_id, exact, score."""
+        branches = [SearchIndexService._exact_hits(query)]
+        if fuzzy and len(query) >= FUZZY_MIN_LENGTH:
+            fuzzy_hits = SearchIndexService._fuzzy_hits(query, entities, threshold)
+            if fuzzy_hits is not None:
+                branches.append(fuzzy_hits)
+        branches = [SearchIndexService._apply_filters(b, entities, filters) for b in branches]
+        hits = union_all(*branches).subquery('hits')
+
+        # Un documento puede aparecer en ambas ramas: prevalece la exacta
+        exact = func.max(hits.c.exact)
+        score = func.coalesce(
+            func.max(case((hits.c.exact == 1, hits.c.score), else_=None)),
+            func.max(hits.c.score),
+        )
+        return select(
+            hits.c.entity_type, hits.c.entity_id, exact.label('exact'), score.label('score')
+        ).group_by(hits.c.entity_type, hits.c.entity_id).cte('matches')
+
+    @staticmethod
+    def _facet_branches(matches, entities: List[str]) -> list:
+        """Selects de conteo por estado y por área sobre las coincidencias.
+
+        Columnas alineadas con las filas de página de ``search``:
+        kind, entity_type, entity_id (NULL), facet, score (NULL), rn (NULL), total.
+        """
+        doc = SearchDocument.__table__
+        branches = [
+            select(
+                literal('status').label('kind'), matches.c.entity_type,
+                null().label('entity_id'), doc.c.status.label('facet'),
+                null().label('score'), null().label('rn'), func.count().label('total'),
+            ).select_from(
+                matches.join(doc, and_(
+                    doc.c.entity_type == matches.c.entity_type,
+                    doc.c.entity_id == matches.c.entity_id,
+                ))
+            ).group_by(matches.c.entity_type, doc.c.status)
+        ]
+
+        for entity_type in entities:
+            if entity_type not in AREA_FACET_ENTITIES:
+                continue
+            model = INDEXED_ENTITIES[entity_type]['model']
+            producto_column = AREA_FACET_ENTITIES[entity_type]
+            stmt = select(matches.c.entity_type).where(matches.c.entity_type == entity_type)
+            if producto_column == 'id':
+                producto_id = matches.c.entity_id
+            else:
+                stmt = stmt.join(model, model.id == matches.c.entity_id)
+                producto_id = getattr(model, producto_column)
+            stmt, area = area_facet(stmt, producto_id)
+            branches.append(
+                stmt.with_only_columns(
+                    literal('area').label('kind'), matches.c.entity_type,
+                    null().label('entity_id'), area.label('facet'),
+                    null().label('score'), null().label('rn'), func.count().label('total'),
+                    maintain_column_froms=True,
+                ).group_by(matches.c.entity_type, area)
+            )
+        return branches
+
+    @staticmethod
+    def search(query: str, entities: Iterable[str], filters: Optional[Dict[str, Any]] = None,
+               page: int = 1, limit: int = 20, fuzzy: bool = True,
+               threshold: Optional[float] = None, facets: bool = False):
+        """Búsqueda rankeada sobre el índice en una sola consulta.
+
+        Las coincidencias exactas se ordenan antes que las difusas; dentro de
+        cada grupo, por score descendente. Con ``facets`` la misma sentencia
+        (UNION ALL) devuelve además los conteos por estado y por área.
+
+        Args:
+            query: Texto de búsqueda
+            entities: Tipos de entidad a incluir
+            filters: Filtros ``status``, ``date_from`` y ``date_to`` (datetime)
+            page: Página (1-based), aplicada por tipo de entidad
+            limit: Resultados por tipo de entidad y página
+            fuzzy: Incluir coincidencias difusas por similitud trigram
+            threshold: Similitud trigram por palabra mínima (por defecto
+                TRIGRAM_SIMILARITY_THRESHOLD)
+            facets: Calcular también las facetas por estado y por área
+
+        Returns:
+            Dict[str, Tuple[List[Tuple[int, float]], int]]: Por tipo de entidad,
+            la lista de (entity_id, score) de la página ordenada por relevancia
+            y el total de coincidencias. Con ``facets`` devuelve la tupla
+            (resultados, facetas), donde facetas es
+            ``{'statuses': {entity_type: {estado: n}}, 'areas': {entity_type: {sigla: n}}}``.
+        """
+        filters = filters or {}
+        entities = list(entities)
+        threshold = TRIGRAM_SIMILARITY_THRESHOLD if threshold is None else threshold
+
+        matches = SearchIndexService._matches(query, entities, filters, fuzzy, threshold)
+
+        row_number = func.row_number().over(
+            partition_by=matches.c.entity_type,
+            order_by=(matches.c.exact.desc(), matches.c.score.desc(), matches.c.entity_id),
+        ).label('rn')
+        total = func.count().over(partition_by=matches.c.entity_type).label('total')
+        ranked = select(
+            matches.c.entity_type, matches.c.entity_id, matches.c.score, row_number, total
+        ).subquery('ranked')
+
+        offset = (page - 1) * limit
+        # rn = 1 se conserva siempre para conocer el total aunque la página
+        # solicitada quede fuera del rango de ese tipo de entidad.
+        page_rows = select(
+            literal('hit').label('kind'), ranked.c.entity_type, ranked.c.entity_id,
+            null().label('facet'), ranked.c.score, ranked.c.rn, ranked.c.total,
+        ).where(
+            or_(and_(ranked.c.rn > offset, ranked.c.rn <= offset + limit), ranked.c.rn == 1)
+        )
+
+        if facets:
+            combined = union_all(
+                page_rows, *SearchIndexService._facet_branches(matches, entities)
+            ).subquery('combined')
+            stmt = select(combined).order_by(combined.c.kind, combined.c.entity_type, combined.c.rn)
+        else:
+            stmt = page_rows.order_by(ranked.c.entity_type, ranked.c.rn)
+
+        results: Dict[str, Tuple[List[Tuple[int, float]], int]] = {}
+        facet_counts: Dict[str, Dict[str, Dict[str, int]]] = {'statuses': {}, 'areas': {}}
+        for row in db.session.execute(stmt):
+            if row.kind == 'hit':
+                page_hits, _total = results.get(row.entity_type, ([], row.total))
+                if row.rn > offset:
+                    page_hits.append((row.entity_id, float(row.score or 0)))
+                results[row.entity_type] = (page_hits, row.total)
+            elif row.facet is not None:
+                group = 'statuses' if row.kind == 'status' else 'areas'
+                facet_counts[group].setdefault(row.entity_type, {})[row.facet] = row.total
+
+        if facets:
+            return results, facet_counts
+        return results
@@ -10,7 +10,8 @@ from datetime import datetime, date, timedelta
 from typing import Any, Dict, List, Optional, Set
 from collections import defaultdict
 
-from sqlalchemy import or_, and_
+from sqlalchemy import String, and_, cast, func, literal, null, or_, select, union_all
+from flask import current_app
 from sqlalchemy.orm import Query, joinedload
 
 from app import db
@@ -22,12 +23,17 @@ from app.database.models.pedido import Pedido
 from app.database.models.informe import Informe, InformeStatus
 from app.database.models.reference import Area, Rama
 from app.database.models.recent_search import RecentSearch
+from app.services.autocomplete_index import autocomplete_index
+from app.services.search_index import (
+    AREA_FACET_ENTITIES, AREA_SIGLAS, SearchIndexService, area_facet,
+)
 
 
 class SearchService:
     """Global search service for DataLab."""
 
     DEFAULT_SIMILARITY_THRESHOLD = 0.8
+    SUBSTRING_SIMILARITY = 0.9
     MAX_RESULTS_PER_ENTITY = 50
     AUTOCOMPLETE_LIMIT = 10
 
@@ -65,32 +71,58 @@ class SearchService:
         },
     }
 
-    AREA_SIGLAS = ['FQ', 'MB', 'ES', 'OS']
+    AREA_SIGLAS = AREA_SIGLAS
 
     @staticmethod
-    def _calculate_levenshtein_distance(s1: str, s2: str) -> int:
-        """Calculate Levenshtein distance between two strings."""
+    def _calculate_levenshtein_distance(s1: str, s2: str, max_distance: Optional[int] = None) -> int:
+        """Calculate case-insensitive Levenshtein distance between two strings.
+
+        With ``max_distance`` only the diagonal band of width 2k+1 is computed
+        and the scan stops as soon as a whole row exceeds the bound; in that
+        case ``max_distance + 1`` is returned instead of the exact distance.
+        """
+        s1 = s1.lower()
+        s2 = s2.lower()
         if len(s1) < len(s2):
-            return SearchService._calculate_levenshtein_distance(s2, s1)
+            s1, s2 = s2, s1
 
+        if max_distance is None:
+            max_distance = len(s1)
+        bound = max_distance + 1
+
+        if len(s1) - len(s2) > max_distance:
+            return bound
         if len(s2) == 0:
             return len(s1)
 
-        previous_row = range(len(s2) + 1)
-        for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1.lower() != c2.lower())
-                current_row.append(min(insertions, deletions, substitutions))
+        previous_row = list(range(len(s2) + 1))
+        for i, c1 in enumerate(s1, start=1):
+            current_row = [bound] * (len(s2) + 1)
+            current_row[0] = i if i <= max_distance else bound
+            row_min = current_row[0]
+
+            for j in range(max(1, i - max_distance), min(len(s2), i + max_distance) + 1):
+                insertions = previous_row[j] + 1
+                deletions = current_row[j - 1] + 1
+                substitutions = previous_row[j - 1] + (c1 != s2[j - 1])
+                value = min(insertions, deletions, substitutions, bound)
+                current_row[j] = value
+                if value < row_min:
+                    row_min = value
+
+            if row_min > max_distance:
+                return bound
             previous_row = current_row
 
         return previous_row[-1]
 
     @staticmethod
-    def _calculate_similarity(s1: str, s2: str) -> float:
-        """Calculate similarity ratio between two strings."""
+    def _calculate_similarity(s1: str, s2: str, threshold: float = 0.0) -> float:
+        """Calculate similarity ratio between two strings.
+
+        Distances are only computed up to what ``threshold`` allows; pairs
+        beyond that bound still score below the threshold.
+        """
         if not s1 or not s2:
             return 0.0
 
@@ -101,31 +133,36 @@ class SearchService:
             return 1.0
 
         if s1_lower in s2_lower or s2_lower in s1_lower:
-            return 0.9
+            return SearchService.SUBSTRING_SIMILARITY
 
         max_len = max(len(s1), len(s2))
-        distance = SearchService._calculate_levenshtein_distance(s1_lower, s2_lower)
+        max_distance = int((1.0 - threshold) * max_len)
+        distance = SearchService._calculate_levenshtein_distance(s1_lower, s2_lower, max_distance)
         similarity = 1.0 - (distance / max_len)
 
         return similarity
 
     @staticmethod
     def _apply_fuzzy_filter(items, search_fields, query, threshold):
-        """Apply fuzzy matching filter to results."""
+        """Keep the items with a search field similar enough to the query.
+
+        ``items`` may be ORM objects or rows labelled with the field names;
+        the per-entity search runs it over lightweight rows before paginating.
+        """
         if not query or threshold >= 1.0:
             return items
-        
+
         filtered_items = []
         for item in items:
             for field in search_fields:
                 if hasattr(item, field):
                     value = getattr(item, field)
                     if value:
-                        similarity = SearchService._calculate_similarity(query, str(value))
+                        similarity = SearchService._calculate_similarity(query, str(value), threshold)
                         if similarity >= threshold:
                             filtered_items.append(item)
                             break
-        
+
         return filtered_items
 
     @staticmethod
@@ -143,9 +180,63 @@ class SearchService:
 
         return or_(*filters) if filters else None
 
+    @staticmethod
+    def _use_index(filters):
+        """Whether the search index can answer this query.
+
+        The area filter depends on joins to productos/ramas that the index
+        does not store, so those searches still use the per-entity queries.
+        """
+        if not current_app.config.get('SEARCH_INDEX_ENABLED', False):
+            return False
+        return filters.get('area') not in SearchService.AREA_SIGLAS
+
+    @staticmethod
+    def _eager_options(entity_type):
+        """Relationship loaders used by _format_results for an entity type."""
+        if entity_type == 'fabricas':
+            return [joinedload(Fabrica.cliente), joinedload(Fabrica.provincia)]
+        if entity_type == 'productos':
+            return [joinedload(Producto.destino), joinedload(Producto.rama)]
+        if entity_type == 'entradas':
+            return [joinedload(Entrada.cliente), joinedload(Entrada.producto), joinedload(Entrada.fabrica)]
+        if entity_type == 'pedidos':
+            return [joinedload(Pedido.cliente)]
+        if entity_type == 'informes':
+            return [joinedload(Informe.cliente)]
+        return []
+
+    @staticmethod
+    def _load_ordered(entity_type, model_class, ids):
+        """Load entities by id with eager loads, preserving the order of ``ids``."""
+        if not ids:
+            return []
+        loaded = {
+            item.id: item
+            for item in db.session.query(model_class).options(
+                *SearchService._eager_options(entity_type)
+            ).filter(model_class.id.in_(list(ids))).all()
+        }
+        return [loaded[entity_id] for entity_id in ids if entity_id in loaded]
+
+    @staticmethod
+    def _parse_date(value):
+        """Parse an ISO date filter, returning None when invalid."""
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+
     @staticmethod
     def search(query, entities=None, filters=None, page=1, limit=20, threshold=None):
-        """Perform global search across entities."""
+        """Perform global search across entities.
+
+        ``threshold`` is the minimum similarity for fuzzy matches: trigram
+        similarity on the search index, edit-distance ratio on the
+        per-entity fallback. Fuzzy matching always runs before pagination.
+        """
         if not query or not query.strip():
             return SearchService._empty_results()
 
@@ -155,6 +246,12 @@ class SearchService:
             entities = list(SearchService.SEARCHABLE_ENTITIES.keys())
 
         filters = filters or {}
+
+        if SearchService._use_index(filters):
+            return SearchService._search_indexed(query, entities, filters, page, limit, threshold)
+
+        threshold = threshold if threshold is not None else SearchService.DEFAULT_SIMILARITY_THRESHOLD
+
         date_from = filters.get('date_from')
         date_to = filters.get('date_to')
         area = filters.get('area')
@@ -180,17 +277,6 @@ class SearchService:
 
             q = db.session.query(model_class)
 
-            if entity_type == 'fabricas':
-                q = q.options(joinedload(Fabrica.cliente), joinedload(Fabrica.provincia))
-            elif entity_type == 'productos':
-                q = q.options(joinedload(Producto.destino), joinedload(Producto.rama))
-            elif entity_type == 'entradas':
-                q = q.options(joinedload(Entrada.cliente), joinedload(Entrada.producto), joinedload(Entrada.fabrica))
-            elif entity_type == 'pedidos':
-                q = q.options(joinedload(Pedido.cliente))
-            elif entity_type == 'informes':
-                q = q.options(joinedload(Informe.cliente))
-
             search_filter = SearchService._build_ilike_filter(
                 model_class, search_fields, query, field_mapping
             )
@@ -201,14 +287,45 @@ class SearchService:
             q = SearchService._apply_area_filter(q, model_class, area)
             q = SearchService._apply_status_filter(q, model_class, entity_type, status)
 
-            count = q.count()
-
             offset = (page - 1) * limit
-            items = q.limit(limit).offset(offset).all()
+            q, status_facet, area_facet_expr = SearchService._facet_columns(
+                q, model_class, entity_type
+            )
 
-            # Apply fuzzy matching filter
-            threshold = threshold if threshold is not None else SearchService.DEFAULT_SIMILARITY_THRESHOLD
-            items = SearchService._apply_fuzzy_filter(items, search_fields, query, threshold)
+            if threshold > SearchService.SUBSTRING_SIMILARITY:
+                # Fuzzy stage over lightweight rows, before counting and paginating
+                fuzzy_fields = [
+                    field_mapping.get(field, field) for field in search_fields
+                    if hasattr(model_class, field_mapping.get(field, field))
+                ]
+                columns = [
+                    getattr(model_class, field).label(field)
+                    for field in dict.fromkeys(fuzzy_fields) if field != 'id'
+                ]
+                rows = q.with_entities(
+                    model_class.id, *columns,
+                    status_facet.label('facet_status'), area_facet_expr.label('facet_area'),
+                ).order_by(model_class.id).all()
+                matched = SearchService._apply_fuzzy_filter(rows, fuzzy_fields, query, threshold)
+                matched_ids = [row.id for row in matched]
+                count = len(matched_ids)
+                page_ids = matched_ids[offset:offset + limit]
+                for row in matched:
+                    if row.facet_status is not None:
+                        facets['statuses'][row.facet_status] += 1
+                    if row.facet_area is not None:
+                        facets['areas'][row.facet_area] += 1
+            else:
+                # Every ILIKE match contains the query, so it already scores
+                # SUBSTRING_SIMILARITY and passes the fuzzy filter.
+                page_ids, count, entity_facets = SearchService._faceted_page(
+                    q, model_class, status_facet, area_facet_expr, offset, limit
+                )
+                for group, counts in entity_facets.items():
+                    for key, value in counts.items():
+                        facets[group][key] += value
+
+            items = SearchService._load_ordered(entity_type, model_class, page_ids)
 
             formatted_items = SearchService._format_results(
                 entity_type, items, search_fields, query
@@ -222,7 +339,136 @@ class SearchService:
             'query': query,
             'total_results': total_results,
             'results': results,
-            'facets': dict(facets),
+            'facets': {
+                'areas': dict(facets['areas']),
+                'statuses': dict(facets['statuses']),
+                'entity_counts': facets['entity_counts'],
+            },
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'total_pages': (total_results + limit - 1) // limit if total_results > 0 else 0,
+            },
+        }
+
+    @staticmethod
+    def _facet_columns(q, model_class, entity_type):
+        """Status and area expressions used for facet counts.
+
+        Returns the query with the outer joins the area expression needs,
+        the status expression and the area expression (NULL when the entity
+        has no such facet).
+        """
+        status_field = SearchService._status_field(model_class, entity_type)
+        status = cast(status_field, String) if status_field is not None else null()
+        area = null()
+        if entity_type in AREA_FACET_ENTITIES:
+            q, area = area_facet(q, getattr(model_class, AREA_FACET_ENTITIES[entity_type]))
+        return q, status, area
+
+    @staticmethod
+    def _faceted_page(q, model_class, status, area, offset, limit):
+        """Page ids, total and facet counts for one entity in a single statement.
+
+        The page rows are combined with the status and area GROUP BY counts
+        in one UNION ALL; the total is the sum of the status groups.
+
+        Returns:
+            (page ids, total, {'statuses': {...}, 'areas': {...}})
+        """
+        matched = q.with_entities(
+            model_class.id.label('id'), status.label('status'), area.label('area')
+        ).cte('matched')
+
+        page_rows = select(
+            literal('hit').label('kind'), matched.c.id, null().label('facet'),
+            null().label('total'),
+        ).order_by(matched.c.id).limit(limit).offset(offset).subquery('page_rows')
+
+        stmt = union_all(
+            select(page_rows),
+            select(
+                literal('statuses').label('kind'), null().label('id'),
+                matched.c.status.label('facet'), func.count().label('total'),
+            ).group_by(matched.c.status),
+            select(
+                literal('areas').label('kind'), null().label('id'),
+                matched.c.area.label('facet'), func.count().label('total'),
+            ).group_by(matched.c.area),
+        )
+
+        ids = []
+        total = 0
+        facets = {'statuses': {}, 'areas': {}}
+        for row in db.session.execute(stmt):
+            if row.kind == 'hit':
+                ids.append(row.id)
+                continue
+            if row.kind == 'statuses':
+                # Every match falls in exactly one status group (NULL included),
+                # so the total survives pages past the end.
+                total += row.total
+            if row.facet is not None:
+                facets[row.kind][row.facet] = row.total
+        return ids, total, facets
+
+    @staticmethod
+    def _search_indexed(query, entities, filters, page, limit, threshold=None):
+        """Ranked search over the search_documents index (single query)."""
+        entities = [e for e in entities if e in SearchService.SEARCHABLE_ENTITIES]
+
+        index_filters = {
+            'status': filters.get('status'),
+            'date_from': SearchService._parse_date(filters.get('date_from')),
+            'date_to': SearchService._parse_date(filters.get('date_to')),
+        }
+        hits, index_facets = SearchIndexService.search(
+            query, entities, index_filters, page, limit, threshold=threshold, facets=True
+        )
+
+        # Entity groups with the best-scoring hit first
+        def best_score(entity_type):
+            page_hits = hits.get(entity_type, ([], 0))[0]
+            return page_hits[0][1] if page_hits else float('-inf')
+
+        results = {}
+        facets = {
+            'areas': defaultdict(int),
+            'statuses': defaultdict(int),
+            'entity_counts': {},
+        }
+        for group in ('areas', 'statuses'):
+            for counts in index_facets[group].values():
+                for key, value in counts.items():
+                    facets[group][key] += value
+        total_results = 0
+
+        for entity_type in sorted(entities, key=best_score, reverse=True):
+            entity_config = SearchService.SEARCHABLE_ENTITIES[entity_type]
+            page_hits, count = hits.get(entity_type, ([], 0))
+            scores = dict(page_hits)
+
+            items = SearchService._load_ordered(entity_type, entity_config['model'], list(scores))
+
+            formatted_items = SearchService._format_results(
+                entity_type, items, entity_config['search_fields'], query
+            )
+            for result in formatted_items:
+                result['score'] = round(scores.get(result['id'], 0.0), 4)
+
+            results[entity_type] = formatted_items
+            facets['entity_counts'][entity_type] = count
+            total_results += count
+
+        return {
+            'query': query,
+            'total_results': total_results,
+            'results': results,
+            'facets': {
+                'areas': dict(facets['areas']),
+                'statuses': dict(facets['statuses']),
+                'entity_counts': facets['entity_counts'],
+            },
             'pagination': {
                 'page': page,
                 'limit': limit,
@@ -276,19 +522,23 @@ class SearchService:
 
         return q
 
+    @staticmethod
+    def _status_field(model_class, entity_type):
+        """Status column of an entity type, or None."""
+        if entity_type == 'entradas' and hasattr(model_class, 'status'):
+            return model_class.status
+        if entity_type == 'pedidos' and hasattr(model_class, 'status'):
+            return model_class.status
+        if entity_type == 'informes' and hasattr(model_class, 'estado'):
+            return model_class.estado
+        return None
+
     @staticmethod
     def _apply_status_filter(q, model_class, entity_type, status):
         """Apply status filter based on entity type."""
-        status_field = None
-
-        if entity_type == 'entradas' and hasattr(model_class, 'status'):
-            status_field = model_class.status
-        elif entity_type == 'pedidos' and hasattr(model_class, 'status'):
-            status_field = model_class.status
-        elif entity_type == 'informes' and hasattr(model_class, 'estado'):
-            status_field = model_class.estado
+        status_field = SearchService._status_field(model_class, entity_type)
 
-        if status and status_field:
+        if status and status_field is not None:
             q = q.filter(status_field == status)
 
         return q
@@ -405,32 +655,17 @@ class SearchService:
 
     @staticmethod
     def get_autocomplete_suggestions(query, limit=10):
-        """Get autocomplete suggestions based on query."""
+        """Get autocomplete suggestions based on query.
+
+        Answered from the in-memory prefix index (see
+        ``app.services.autocomplete_index``): values whose text or any word
+        starts with ``query``, without touching the database.
+        """
         if not query or len(query) < 2:
             return {'suggestions': []}
 
-        suggestions = []
-
-        for entity_type, config in SearchService.SEARCHABLE_ENTITIES.items():
-            model_class = config['model']
-            search_fields = config['search_fields']
-
-            for field in search_fields:
-                if hasattr(model_class, field):
-                    values = db.session.query(
-                        getattr(model_class, field)
-                    ).filter(
-                        getattr(model_class, field).ilike(f'%{query}%')
-                    ).distinct().limit(limit).all()
-
-                    for value in values:
-                        if value[0]:
-                            suggestions.append(str(value[0]))
-
-        unique_suggestions = list(dict.fromkeys(suggestions))[:limit]
-
         return {
-            'suggestions': unique_suggestions,
+            'suggestions': autocomplete_index.suggest(query, limit),
             'query': query,
         }
 
@@ -1,7 +1,9 @@
 """Servicio para gestionar workflow de estados."""
-from typing import List
+import logging
+from typing import Dict, List
 
 from flask_babel import _
+from sqlalchemy import insert
 
 from app import db
 from app.database.models.entrada import Entrada, EntradaStatus
@@ -9,10 +11,15 @@ from app.database.models.status_history import StatusHistory
 from app.database.models.notification import Notification
 from app.services.notification_service import NotificationService
 
+logger = logging.getLogger(__name__)
+
 
 class StatusWorkflow:
     """Gestiona transiciones de estado para Entradas."""
 
+    # Ids por sentencia SELECT ... FOR UPDATE en batch_transition
+    BATCH_SIZE = 500
+
     VALID_TRANSITIONS = {
         EntradaStatus.RECIBIDO: [EntradaStatus.EN_PROCESO, EntradaStatus.ANULADO],
         EntradaStatus.EN_PROCESO: [EntradaStatus.COMPLETADO, EntradaStatus.ANULADO],
@@ -67,7 +74,28 @@ class StatusWorkflow:
         """
         from_status = entrada.status
 
-        # Validar transición
+        # Validar transición y actualizar estado
+        cls._validate_transition(from_status, to_status)
+        cls._apply_status(entrada, to_status)
+
+        # Registrar en historial
+        history = StatusHistory(
+            **cls._history_values(entrada.id, from_status, to_status, changed_by_id, reason)
+        )
+        db.session.add(history)
+
+        # Enviar notificaciones
+        cls._send_notifications(entrada, from_status, to_status)
+
+        # Verificar notificación de entrega pendiente si es completado
+        if to_status == EntradaStatus.COMPLETADO:
+            cls.check_delivery_pending(entrada)
+
+        return True
+
+    @classmethod
+    def _validate_transition(cls, from_status: str, to_status: str) -> None:
+        """Lanzar ValueError si la transición no es válida."""
         if not cls.can_transition(from_status, to_status):
             raise ValueError(
                 _('Transición no válida: %(from_s)s -> %(to_s)s. '
@@ -76,59 +104,66 @@ class StatusWorkflow:
                   valid=', '.join(cls.get_valid_transitions(from_status)))
             )
 
-        # Actualizar estado
+    @staticmethod
+    def _apply_status(entrada: Entrada, to_status: str) -> None:
+        """Asignar el nuevo estado y los flags que dependen de él."""
         entrada.status = to_status
 
-        # Actualizar flags según estado
         if to_status == EntradaStatus.ANULADO:
             entrada.anulado = True
         elif to_status == EntradaStatus.ENTREGADO:
             entrada.ent_entregada = True
 
-        # Registrar en historial
-        history = StatusHistory(
-            entrada_id=entrada.id,
-            from_status=from_status,
-            to_status=to_status,
-            changed_by_id=changed_by_id,
-            reason=reason,
-            meta_data={
+    @staticmethod
+    def _history_values(entrada_id: int, from_status: str, to_status: str,
+                        changed_by_id: int, reason: str = None) -> dict:
+        """Valores de una fila de StatusHistory."""
+        return {
+            'entrada_id': entrada_id,
+            'from_status': from_status,
+            'to_status': to_status,
+            'changed_by_id': changed_by_id,
+            'reason': reason,
+            'meta_data': {
                 'ip_address': None,  # Se puede obtener de request
                 'user_agent': None   # Se puede obtener de request
             }
-        )
-        db.session.add(history)
+        }
 
-        # Enviar notificaciones
-        cls._send_notifications(entrada, from_status, to_status)
+    @staticmethod
+    def _is_delivery_pending(entrada: Entrada) -> bool:
+        """Completada con menos del 10% del saldo por entregar."""
+        return (entrada.status == EntradaStatus.COMPLETADO and
+                entrada.saldo > 0 and
+                entrada.saldo * 10 <= entrada.cantidad_recib)  # saldo <= 10% (válido con Decimal)
 
-        # Verificar notificación de entrega pendiente si es completado
-        if to_status == EntradaStatus.COMPLETADO:
-            cls.check_delivery_pending(entrada)
+    @staticmethod
+    def _notify(notify, *args) -> None:
+        """
+        Ejecutar una notificación dentro de un savepoint.
 
-        return True
+        Las notificaciones se escriben en la transacción del cambio de estado.
+        Si fallan, incluso por un error de la base durante un autoflush o una
+        consulta que el servicio de notificaciones captura, el savepoint no
+        puede liberarse y se revierte solo él: la sesión sigue usable y el
+        cambio de estado se confirma igual.
+        """
+        try:
+            with db.session.begin_nested():
+                notify(*args)
+        except Exception as e:
+            logger.error(f"Error en {notify.__name__}: {e}")
 
     @classmethod
     def _send_notifications(cls, entrada: Entrada, from_status: str, to_status: str):
         """Enviar notificaciones según el cambio de estado."""
-        try:
-            NotificationService.notify_status_change(entrada, from_status, to_status)
-        except Exception as e:
-            # Log error but don't fail the status change
-            import logging
-            logging.getLogger(__name__).error(f"Error sending notification: {e}")
+        cls._notify(NotificationService.notify_status_change, entrada, from_status, to_status)
 
     @classmethod
     def check_delivery_pending(cls, entrada: Entrada):
         """Check if sample should trigger pending delivery notification."""
-        if (entrada.status == EntradaStatus.COMPLETADO and
-            entrada.saldo > 0 and
-            entrada.saldo <= entrada.cantidad_recib * 0.1):  # Less than 10% remaining
-            try:
-                NotificationService.notify_delivery_pending(entrada)
-            except Exception as e:
-                import logging
-                logging.getLogger(__name__).error(f"Error sending pending notification: {e}")
+        if cls._is_delivery_pending(entrada):
+            cls._notify(NotificationService.notify_delivery_pending, entrada)
 
     @classmethod
     def batch_transition(cls, entrada_ids: List[int], to_status: str,
@@ -136,6 +171,12 @@ class StatusWorkflow:
         """
         Cambiar estado de múltiples entradas.
 
+        Bloquea las entradas con ``SELECT ... FOR UPDATE`` (por bloques de
+        BATCH_SIZE ids, en orden de id), valida las transiciones en memoria,
+        inserta el historial en bloque y confirma todo en un solo commit,
+        junto con las notificaciones agrupadas por usuario (los emails se
+        envían desde la cola ``email_outbox``).
+
         Args:
             entrada_ids: Lista de IDs de entradas
             to_status: Nuevo estado
@@ -145,10 +186,69 @@ class StatusWorkflow:
         Returns:
             dict: Resultados con éxitos y fallos
         """
-        results = {'success': [], 'failed': []}
+        ids = list(dict.fromkeys(entrada_ids))
+        entradas = cls.lock_entradas(ids)
+        results = cls.apply_batch(ids, entradas, to_status, changed_by_id, reason)
+
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return results
+
+    @classmethod
+    def lock_entradas(cls, entrada_ids: List[int]) -> Dict[int, Entrada]:
+        """
+        Cargar entradas con ``SELECT ... FOR UPDATE``, por bloques de BATCH_SIZE ids.
+
+        Los bloques se piden en orden de id para que dos lotes concurrentes
+        tomen los bloqueos en el mismo orden.
+
+        Args:
+            entrada_ids: IDs de las entradas
+
+        Returns:
+            Dict[int, Entrada]: Entradas encontradas por ID
+        """
+        ids = sorted(set(entrada_ids))
+        entradas = {}
+        for start in range(0, len(ids), cls.BATCH_SIZE):
+            chunk = ids[start:start + cls.BATCH_SIZE]
+            for entrada in (Entrada.query
+                            .filter(Entrada.id.in_(chunk))
+                            .order_by(Entrada.id)
+                            .with_for_update()):
+                entradas[entrada.id] = entrada
+        return entradas
+
+    @classmethod
+    def apply_batch(cls, entrada_ids: List[int], entradas: Dict[int, Entrada],
+                    to_status: str, changed_by_id: int, reason: str = None) -> dict:
+        """
+        Aplicar un cambio de estado a entradas ya cargadas, sin confirmar.
+
+        Valida cada transición en memoria, actualiza las instancias, inserta
+        el historial en bloque y agrega las notificaciones (agrupadas por
+        usuario) a la sesión actual. El llamador hace el commit.
 
+        Args:
+            entrada_ids: IDs de las entradas, en el orden de los resultados
+            entradas: Entradas cargadas (y bloqueadas) por ID
+            to_status: Nuevo estado
+            changed_by_id: ID del usuario que hace el cambio
+            reason: Razón del cambio (opcional)
+
+        Returns:
+            dict: Resultados con éxitos y fallos
+        """
+        results = {'success': [], 'failed': []}
+        history_rows = []
+        changes = []
+        delivery_pending = []
         for entrada_id in entrada_ids:
-            entrada = Entrada.query.get(entrada_id)
+            entrada = entradas.get(entrada_id)
             if not entrada:
                 results['failed'].append({
                     'id': entrada_id,
@@ -156,14 +256,39 @@ class StatusWorkflow:
                 })
                 continue
 
+            from_status = entrada.status
             try:
-                cls.transition(entrada, to_status, changed_by_id, reason)
-                results['success'].append(entrada_id)
+                cls._validate_transition(from_status, to_status)
             except ValueError as e:
                 results['failed'].append({
                     'id': entrada_id,
                     'error': str(e)
                 })
+                continue
+
+            cls._apply_status(entrada, to_status)
+            history_rows.append(
+                cls._history_values(entrada.id, from_status, to_status, changed_by_id, reason)
+            )
+            # Cambio para la notificación agrupada por usuario
+            changes.append({
+                'entrada_id': entrada.id,
+                'codigo': entrada.codigo,
+                'cliente_id': entrada.cliente_id,
+                'from_status': from_status,
+                'to_status': to_status,
+            })
+            if cls._is_delivery_pending(entrada):
+                delivery_pending.append(entrada)
+            results['success'].append(entrada_id)
+
+        if history_rows:
+            db.session.execute(insert(StatusHistory), history_rows)
+
+        # Notificaciones en la misma transacción que el cambio de estado
+        cls._notify(NotificationService.notify_status_changes, changes)
+
+        if delivery_pending:
+            cls._notify(NotificationService.notify_delivery_pending_batch, delivery_pending)
 
-        db.session.commit()
         return results
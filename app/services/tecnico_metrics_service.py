@@ -0,0 +1,176 @@
+"""Servicio de métricas del técnico - KPIs de ensayos asignados."""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import and_, case, func
+
+from app import db
+from app.utils.cache import cache
+from app.utils.timeseries import day_expression, day_range
+
+
+class TecnicoMetricsService:
+    """
+    Métricas de los ensayos asignados a un técnico.
+
+    Todas las cifras salen de dos consultas agrupadas: una por área y estado
+    (con el conteo de completados a tiempo) y otra por día de completado.
+    El resultado se cachea por técnico y día; cualquier cambio confirmado en
+    ``detalles_ensayo`` invalida la caché.
+    """
+
+    CACHE_TTL = 300  # segundos
+    CACHE_STALE_TTL = 60
+    CACHE_TAGS = ("detalles_ensayo", "ensayos", "areas")
+
+    # Áreas que se muestran en "tests por tipo"
+    AREAS = ("FQ", "MB", "ES")
+
+    # Un ensayo se completa "a tiempo" si tarda menos que esto desde la asignación
+    HORAS_A_TIEMPO = 48
+
+    # Días de la tendencia semanal (incluido hoy)
+    DIAS_TENDENCIA = 7
+
+    @staticmethod
+    def _cache_key(tecnico_id: int, hoy: date) -> str:
+        return f"tecnico:metricas:{tecnico_id}:{hoy.isoformat()}"
+
+    @staticmethod
+    def get_metrics(tecnico_id: int) -> Dict[str, Any]:
+        """
+        Obtener todas las métricas del técnico (cacheadas).
+
+        Args:
+            tecnico_id: ID del usuario técnico.
+
+        Returns:
+            Dict[str, Any]: Métricas con las claves:
+                - por_estado: Detalles asignados por estado (ASIGNADO, ...)
+                - total: Total de detalles asignados
+                - completados_hoy / completados_semana / completados_mes
+                - tests_por_tipo: Completados por sigla de área
+                - rendimiento_por_area: Completados y horas promedio por área
+                - eficiencia: % de completados en menos de HORAS_A_TIEMPO
+                - total_completados: Completados con fechas de asignación y fin
+                - tendencia_semanal: Completados por día de los últimos 7 días
+                - en_proceso / pausados
+        """
+        hoy = datetime.utcnow().date()
+        return cache.get_or_compute(
+            TecnicoMetricsService._cache_key(tecnico_id, hoy),
+            lambda: TecnicoMetricsService._compute(tecnico_id, hoy),
+            ttl=TecnicoMetricsService.CACHE_TTL,
+            tags=TecnicoMetricsService.CACHE_TAGS,
+            stale_ttl=TecnicoMetricsService.CACHE_STALE_TTL,
+        )
+
+    @staticmethod
+    def _horas_hasta_completar():
+        """Expresión SQL: horas entre la asignación y el completado."""
+        from app.database.models.detalle_ensayo import DetalleEnsayo
+
+        if db.engine.dialect.name == 'postgresql':
+            return func.extract(
+                'epoch', DetalleEnsayo.fecha_completado - DetalleEnsayo.fecha_asignacion
+            ) / 3600
+        return (func.julianday(DetalleEnsayo.fecha_completado)
+                - func.julianday(DetalleEnsayo.fecha_asignacion)) * 24
+
+    @staticmethod
+    def _compute(tecnico_id: int, hoy: date) -> Dict[str, Any]:
+        from app.database.models.detalle_ensayo import DetalleEnsayo, DetalleEnsayoStatus
+        from app.database.models.ensayo import Ensayo
+        from app.database.models.reference import Area
+
+        completado = DetalleEnsayoStatus.COMPLETADO.value
+        con_fechas = and_(
+            DetalleEnsayo.estado == completado,
+            DetalleEnsayo.fecha_completado.isnot(None),
+            DetalleEnsayo.fecha_asignacion.isnot(None),
+        )
+
+        horas = TecnicoMetricsService._horas_hasta_completar()
+        a_tiempo_cond = and_(con_fechas, horas < TecnicoMetricsService.HORAS_A_TIEMPO)
+
+        # 1) Conteos por área y estado, con completados a tiempo y horas totales
+        por_area_estado = db.session.query(
+            Area.sigla,
+            DetalleEnsayo.estado,
+            func.count(DetalleEnsayo.id),
+            func.sum(case((con_fechas, 1), else_=0)),
+            func.sum(case((a_tiempo_cond, 1), else_=0)),
+            func.sum(case((con_fechas, horas), else_=0)),
+        ).join(
+            Ensayo, DetalleEnsayo.ensayo_id == Ensayo.id
+        ).join(
+            Area, Ensayo.area_id == Area.id
+        ).filter(
+            DetalleEnsayo.tecnico_asignado_id == tecnico_id
+        ).group_by(Area.sigla, DetalleEnsayo.estado).all()
+
+        por_estado = {status.value: 0 for status in DetalleEnsayoStatus}
+        tests_por_tipo = {sigla: 0 for sigla in TecnicoMetricsService.AREAS}
+        rendimiento_por_area: Dict[str, Dict[str, Any]] = {}
+        total_completados = a_tiempo = 0
+        for sigla, estado, count, count_con_fechas, count_a_tiempo, horas_total in por_area_estado:
+            por_estado[estado] = por_estado.get(estado, 0) + count
+            if estado != completado:
+                continue
+            if sigla in tests_por_tipo:
+                tests_por_tipo[sigla] += count
+            count_con_fechas = int(count_con_fechas or 0)
+            total_completados += count_con_fechas
+            a_tiempo += int(count_a_tiempo or 0)
+            rendimiento_por_area[sigla] = {
+                'total': count,
+                'tiempo_promedio': (round(float(horas_total or 0) / count_con_fechas, 1)
+                                    if count_con_fechas else 0),
+            }
+
+        # 2) Completados por día desde el inicio del período más largo
+        inicio_semana = hoy - timedelta(days=hoy.weekday())
+        inicio_mes = hoy.replace(day=1)
+        inicio_tendencia = hoy - timedelta(days=TecnicoMetricsService.DIAS_TENDENCIA - 1)
+        desde = min(inicio_semana, inicio_mes, inicio_tendencia)
+        range_start, range_end = day_range(desde, hoy)
+
+        dia = day_expression(DetalleEnsayo.fecha_completado)
+        por_dia = {
+            str(fecha)[:10]: count
+            for fecha, count in db.session.query(
+                dia, func.count(DetalleEnsayo.id)
+            ).filter(
+                DetalleEnsayo.tecnico_asignado_id == tecnico_id,
+                DetalleEnsayo.estado == completado,
+                DetalleEnsayo.fecha_completado >= range_start,
+                DetalleEnsayo.fecha_completado < range_end,
+            ).group_by(dia).all()
+        }
+
+        def completados_desde(inicio: date) -> int:
+            return sum(count for fecha, count in por_dia.items() if fecha >= inicio.isoformat())
+
+        tendencia_semanal: List[Dict[str, Any]] = []
+        for i in range(TecnicoMetricsService.DIAS_TENDENCIA - 1, -1, -1):
+            fecha = hoy - timedelta(days=i)
+            tendencia_semanal.append({
+                'dia': fecha.strftime('%a'),
+                'fecha': fecha.isoformat(),
+                'count': por_dia.get(fecha.isoformat(), 0),
+            })
+
+        return {
+            'por_estado': por_estado,
+            'total': sum(por_estado.values()),
+            'completados_hoy': por_dia.get(hoy.isoformat(), 0),
+            'completados_semana': completados_desde(inicio_semana),
+            'completados_mes': completados_desde(inicio_mes),
+            'tests_por_tipo': tests_por_tipo,
+            'rendimiento_por_area': rendimiento_por_area,
+            'eficiencia': round(a_tiempo / total_completados * 100, 1) if total_completados else 0,
+            'total_completados': total_completados,
+            'tendencia_semanal': tendencia_semanal,
+            'en_proceso': por_estado[DetalleEnsayoStatus.EN_PROCESO.value],
+            'pausados': por_estado[DetalleEnsayoStatus.PAUSADO.value],
+        }
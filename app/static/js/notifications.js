@@ -22,7 +22,8 @@ const NotificationSystem = {
         totalPages: 1,
         selectedIds: new Set(),
         pollTimer: null,
-        isPolling: false
+        isPolling: false,
+        eventSource: null
     },
 
     // Iconos por tipo de notificación
@@ -125,12 +126,32 @@ const NotificationSystem = {
     },
 
     /**
-     * Inicia el polling para nuevas notificaciones
+     * Inicia la escucha de nuevas notificaciones.
+     * Usa Server-Sent Events si el servidor los habilita (caché compartida)
+     * y el navegador los soporta; si no, polling por intervalo.
      */
-    startPolling() {
+    async startPolling() {
         if (this.state.isPolling) return;
         
         this.state.isPolling = true;
+
+        const realtime = await this.poll();
+        if (!this.state.isPolling) return;
+
+        if (realtime && window.EventSource) {
+            this.startStream();
+            return;
+        }
+
+        this.state.pollTimer = setInterval(() => {
+            this.poll();
+        }, this.config.pollInterval);
+    },
+
+    /**
+     * Polling periódico del conteo de no leídas
+     */
+    startIntervalPolling() {
         this.poll();
         
         this.state.pollTimer = setInterval(() => {
@@ -138,10 +159,44 @@ const NotificationSystem = {
         }, this.config.pollInterval);
     },
 
+    /**
+     * Abre el stream SSE de notificaciones
+     */
+    startStream() {
+        const source = new EventSource('/api/notifications/stream');
+        this.state.eventSource = source;
+
+        source.addEventListener('notifications', (event) => {
+            const data = JSON.parse(event.data);
+            this.updateBadge(data.unread_count);
+
+            // Si llegaron notificaciones nuevas, recargar el dropdown
+            if (data.notifications && data.notifications.length > 0) {
+                this.loadDropdownNotifications();
+            }
+
+            this.state.unreadCount = data.unread_count;
+        });
+
+        source.onerror = () => {
+            // El navegador reconecta solo; si el stream se cerró, volver al polling
+            if (source.readyState === EventSource.CLOSED) {
+                this.state.eventSource = null;
+                if (this.state.isPolling && !this.state.pollTimer) {
+                    this.startIntervalPolling();
+                }
+            }
+        };
+    },
+
     /**
      * Detiene el polling
      */
     stopPolling() {
+        if (this.state.eventSource) {
+            this.state.eventSource.close();
+            this.state.eventSource = null;
+        }
         if (this.state.pollTimer) {
             clearInterval(this.state.pollTimer);
             this.state.pollTimer = null;
@@ -150,7 +205,8 @@ const NotificationSystem = {
     },
 
     /**
-     * Realiza una petición de polling
+     * Realiza una petición de polling.
+     * Retorna si el servidor habilita notificaciones en tiempo real.
      */
     async poll() {
         try {
@@ -166,8 +222,10 @@ const NotificationSystem = {
             }
             
             this.state.unreadCount = data.count;
+            return Boolean(data.realtime);
         } catch (error) {
             console.error('Polling error:', error);
+            return false;
         }
     },
 
@@ -0,0 +1,90 @@
+"""Lectura por streaming de tablas de Microsoft Access.
+
+Las filas se leen con ``cursor.fetchmany`` y se entregan tal como vienen
+del driver (tuplas / ``pyodbc.Row``), sin armar un dict por fila: el
+consumidor resuelve las columnas con el índice de ``column_index``. Así la
+memoria no depende del tamaño de la tabla.
+
+Cualquier conexión DB-API (``cursor()``, ``execute``, ``description``,
+``fetchmany``) sirve, de modo que pyodbc puede reemplazarse por un cursor
+falso en pruebas.
+"""
+import logging
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Filas por llamada a fetchmany
+DEFAULT_FETCH_SIZE = 1000
+
+
+def connect(db_path: str):
+    """Abrir una conexión pyodbc al archivo Access ``db_path``."""
+    try:
+        import pyodbc
+    except ImportError:
+        logger.error("pyodbc no está instalado. Instalar con: pip install pyodbc")
+        raise
+
+    conn_str = (
+        r'DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};'
+        r'DBQ=' + db_path + ';'
+    )
+    try:
+        conn = pyodbc.connect(conn_str)
+    except Exception as e:
+        logger.error(f"Error conectando a Access: {e}")
+        raise
+    logger.info(f"Conectado a Access: {db_path}")
+    return conn
+
+
+def iter_cursor(cursor, fetch_size: int = DEFAULT_FETCH_SIZE) -> Iterator[Sequence[Any]]:
+    """Recorrer un cursor ya ejecutado de a ``fetch_size`` filas y cerrarlo al final."""
+    try:
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def stream_query(
+    connection,
+    sql: str,
+    fetch_size: int = DEFAULT_FETCH_SIZE
+) -> Tuple[List[str], Iterator[Sequence[Any]]]:
+    """
+    Ejecutar ``sql`` y devolver sus columnas y un iterador de filas.
+
+    La consulta se ejecuta de inmediato (los errores se ven aquí); las filas
+    se leen a medida que se consume el iterador.
+
+    Returns:
+        (nombres de columnas, iterador de filas)
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql)
+        columns = [desc[0] for desc in cursor.description]
+    except Exception:
+        cursor.close()
+        raise
+    return columns, iter_cursor(cursor, fetch_size)
+
+
+def column_index(columns: Sequence[str], fields: Dict[str, str]) -> List[Tuple[str, int]]:
+    """
+    Posición de cada campo mapeado dentro de la fila.
+
+    Args:
+        columns: Columnas devueltas por la consulta
+        fields: Mapeo columna Access -> campo destino
+
+    Returns:
+        Lista (campo destino, posición); las columnas ausentes se omiten.
+    """
+    positions = {name: i for i, name in enumerate(columns)}
+    return [(field, positions[column]) for column, field in fields.items() if column in positions]
@@ -1,118 +1,913 @@
-"""Utilitario de caché para DataLab usando Redis."""
-import json
+"""Utilitario de caché para DataLab.
+
+Caché de dos niveles:
+  - local:  LRU/TTL acotado en memoria del proceso (sin red ni deserializar).
+  - remoto: Redis opcional, compartido entre procesos (serializado con
+            ``CACHE_SERIALIZER``, ver ``app.utils.cache_serializers``).
+
+``get`` consulta primero el nivel local y, si falla, el remoto (y rellena el
+local). ``set``/``delete`` escriben en ambos. Sin ``REDIS_URL`` (desarrollo,
+caída de Redis) el nivel local sigue funcionando.
+
+El espacio de nombres de una clave es el prefijo anterior al primer ``:``
+(``analytics:kpis:`` -> ``analytics``); cada espacio tiene su propio límite
+de entradas en el nivel local y sus contadores de hits/misses/evictions.
+
+Invalidación por etiquetas: una entrada puede declarar las tablas de las que
+depende (``tags=('entradas', 'detalles_ensayo')``). Cada etiqueta tiene un
+contador de generación (en Redis si está disponible, si no en el proceso)
+que forma parte de la clave física; los eventos de sesión incrementan la
+generación de las tablas modificadas en ``after_commit``, con lo que las
+entradas dependientes dejan de leerse sin recorrer el espacio de claves.
+Solo se detectan los cambios hechos con la sesión ORM (flush y
+``insert``/``update``/``delete`` ejecutados con ``db.session.execute``).
+
+Recomputación (``get_or_compute`` y el decorador ``cached``):
+  - single-flight: un candado por clave (en Redis si está disponible) hace
+    que un solo worker recalcule; el resto espera o sirve el valor viejo.
+  - stale-while-revalidate: la entrada física vive ``stale_ttl`` segundos
+    más que su TTL lógico; mientras tanto se sirve el valor vencido a quien
+    no obtiene el candado.
+  - expiración temprana probabilística (XFetch): cada lectura puede
+    adelantar el recálculo con probabilidad creciente al acercarse el
+    vencimiento, proporcional al tiempo que costó calcular el valor.
+
+Configuración:
+  CACHE_BACKEND:            'tiered' (default), 'memory', 'redis' o 'none'
+  CACHE_LOCAL_MAX_ENTRIES:  entradas por espacio de nombres (default 1024)
+  CACHE_NAMESPACE_LIMITS:   límites por espacio, p. ej. {'analytics': 256}
+  CACHE_LOCAL_TTL:          TTL máximo del nivel local cuando hay Redis
+                            (acota la desactualización entre procesos)
+  CACHE_SERIALIZER:         'pickle' (default), 'msgpack' o 'json'
+  CACHE_COMPRESS_MIN_BYTES: comprimir payloads remotos desde este tamaño
+
+Los valores del nivel local se comparten por referencia: tratarlos como de
+solo lectura.
+"""
+import fnmatch
+import hashlib
+import inspect
 import logging
+import math
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime
+from decimal import Decimal
 from functools import wraps
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.utils.cache_serializers import COMPRESS_MIN_BYTES, CacheSerializer, get_serializer
 
 logger = logging.getLogger(__name__)
 
 CACHE_TTL_DEFAULT = 300
+CACHE_LOCAL_MAX_ENTRIES = 1024
+CACHE_LOCAL_TTL = 30
 
+# Ventana por defecto en la que se sirve un valor vencido mientras se recalcula
+CACHE_STALE_TTL = 60
+# Vida máxima del candado de recálculo (segundos)
+CACHE_LOCK_TIMEOUT = 30
+# Factor de la expiración temprana (0 la desactiva; >1 recalcula antes)
+CACHE_EARLY_BETA = 1.0
 
-class CacheManager:
-    """Gestor de caché con Redis."""
+# Prefijos de los contadores de generación y candados en Redis
+GENERATION_PREFIX = 'cache:gen'
+LOCK_PREFIX = 'cache:lock'
 
-    _instance: Optional['CacheManager'] = None
-    _client: Optional[redis.Redis] = None
+_PENDING_TAGS_KEY = 'cache_pending_tags'
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+_MISSING = object()
+_NO_LOCK = object()
 
-    def init_app(self, app) -> None:
-        """Inicializar Redis con configuración de la app."""
-        redis_url = app.config.get('REDIS_URL')
-        if redis_url:
-            try:
-                self._client = redis.from_url(
-                    redis_url,
-                    decode_responses=True
-                )
-                logger.info("Redis cache initialized successfully")
-            except Exception as e:
-                logger.warning(f"Redis not available: {e}. Using no-op cache.")
-                self._client = None
-        else:
-            logger.warning("REDIS_URL not configured. Cache disabled.")
-            self._client = None
 
-    def get(self, key: str) -> Optional[Any]:
-        """Obtener valor de caché."""
-        if not self._client:
-            return None
+def namespace_of(key: str) -> str:
+    """Espacio de nombres de una clave (prefijo anterior al primer ``:``)."""
+    return key.split(':', 1)[0]
+
+
+class CacheStats:
+    """Contadores por nivel y espacio de nombres."""
+
+    FIELDS = ('hits', 'misses', 'sets', 'evictions', 'expirations', 'errors',
+              'recomputes', 'early_recomputes', 'stale_served', 'lock_waits')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(
+            lambda: dict.fromkeys(self.FIELDS, 0)
+        )
+
+    def incr(self, tier: str, namespace: str, field: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[(tier, namespace)][field] += amount
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """``{tier: {namespace: {counter: n}}}``."""
+        with self._lock:
+            result: Dict[str, Dict[str, Dict[str, int]]] = {}
+            for (tier, namespace), counters in self._counters.items():
+                result.setdefault(tier, {})[namespace] = dict(counters)
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+class FunctionStats:
+    """Llamadas, recálculos y tiempo de cálculo por función decorada con ``cached``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._functions: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, computed: bool, seconds: float = 0.0) -> None:
+        with self._lock:
+            counters = self._functions.setdefault(
+                name, {'calls': 0, 'computes': 0, 'compute_seconds': 0.0}
+            )
+            counters['calls'] += 1
+            if computed:
+                counters['computes'] += 1
+                counters['compute_seconds'] += seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for name, counters in self._functions.items():
+                calls, computes = counters['calls'], counters['computes']
+                result[name] = {
+                    'calls': calls,
+                    'hits': calls - computes,
+                    'computes': computes,
+                    'hit_ratio': round((calls - computes) / calls, 4) if calls else None,
+                    'avg_compute_ms': (round(counters['compute_seconds'] * 1000 / computes, 2)
+                                       if computes else None),
+                }
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._functions.clear()
+
+
+class CacheBackend(ABC):
+    """Interfaz de un nivel de caché."""
+
+    name = 'backend'
+
+    def __init__(self, stats: Optional[CacheStats] = None):
+        self.stats = stats or CacheStats()
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Valor almacenado o ``_MISSING``."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: int) -> bool:
+        """Guardar ``value`` durante ``ttl`` segundos."""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Eliminar ``key``; True si existía."""
+
+    @abstractmethod
+    def clear_pattern(self, pattern: str) -> int:
+        """Eliminar las claves que coinciden con ``pattern``; retorna cuántas."""
+
+
+class MemoryBackend(CacheBackend):
+    """LRU con TTL en memoria del proceso, acotado por espacio de nombres."""
+
+    name = 'local'
+
+    def __init__(self, max_entries: int = CACHE_LOCAL_MAX_ENTRIES,
+                 namespace_limits: Optional[Dict[str, int]] = None,
+                 stats: Optional[CacheStats] = None):
+        super().__init__(stats)
+        self.max_entries = max_entries
+        self.namespace_limits = dict(namespace_limits or {})
+        self._lock = threading.Lock()
+        # namespace -> OrderedDict[key, (expires_at, value)] (más reciente al final)
+        self._data: Dict[str, 'OrderedDict[str, Tuple[float, Any]]'] = defaultdict(OrderedDict)
+
+    def _limit(self, namespace: str) -> int:
+        return self.namespace_limits.get(namespace, self.max_entries)
+
+    def get(self, key: str) -> Any:
+        namespace = namespace_of(key)
+        with self._lock:
+            entries = self._data.get(namespace)
+            item = entries.get(key) if entries is not None else None
+            if item is None:
+                self.stats.incr(self.name, namespace, 'misses')
+                return _MISSING
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del entries[key]
+                self.stats.incr(self.name, namespace, 'expirations')
+                self.stats.incr(self.name, namespace, 'misses')
+                return _MISSING
+            entries.move_to_end(key)
+        self.stats.incr(self.name, namespace, 'hits')
+        return value
+
+    def set(self, key: str, value: Any, ttl: int) -> bool:
+        namespace = namespace_of(key)
+        limit = self._limit(namespace)
+        if limit <= 0:
+            return False
+        evicted = 0
+        with self._lock:
+            entries = self._data[namespace]
+            entries[key] = (time.monotonic() + ttl, value)
+            entries.move_to_end(key)
+            while len(entries) > limit:
+                entries.popitem(last=False)
+                evicted += 1
+        self.stats.incr(self.name, namespace, 'sets')
+        if evicted:
+            self.stats.incr(self.name, namespace, 'evictions', evicted)
+        return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            entries = self._data.get(namespace_of(key))
+            return entries is not None and entries.pop(key, None) is not None
+
+    def incr(self, key: str, amount: int) -> Any:
+        """Sumar ``amount`` a un contador existente (conserva su vencimiento)."""
+        with self._lock:
+            entries = self._data.get(namespace_of(key))
+            item = entries.get(key) if entries is not None else None
+            if item is None or item[0] <= time.monotonic() or not isinstance(item[1], int):
+                return _MISSING
+            entries[key] = (item[0], item[1] + amount)
+            return item[1] + amount
+
+    def clear_pattern(self, pattern: str) -> int:
+        removed = 0
+        with self._lock:
+            for entries in self._data.values():
+                for key in [k for k in entries if fnmatch.fnmatchcase(k, pattern)]:
+                    del entries[key]
+                    removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def sizes(self) -> Dict[str, int]:
+        """Entradas actuales por espacio de nombres."""
+        with self._lock:
+            return {namespace: len(entries) for namespace, entries in self._data.items()}
+
+
+class RedisBackend(CacheBackend):
+    """Nivel remoto en Redis con valores serializados con cabecera versionada."""
+
+    name = 'remote'
+
+    def __init__(self, client: redis.Redis, serializer: Optional[CacheSerializer] = None,
+                 stats: Optional[CacheStats] = None):
+        super().__init__(stats)
+        self.client = client
+        self.serializer = serializer or get_serializer()
+
+    def get(self, key: str) -> Any:
+        namespace = namespace_of(key)
         try:
-            value = self._client.get(key)
-            if value:
-                return json.loads(value)
+            value = self.client.get(key)
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
-        return None
+            self.stats.incr(self.name, namespace, 'errors')
+            return _MISSING
+        if not value:
+            self.stats.incr(self.name, namespace, 'misses')
+            return _MISSING
+        try:
+            decoded = self.serializer.loads(value)
+        except Exception as e:
+            # Formato anterior u otro códec: se trata como miss
+            logger.warning(f"Cache decode error for key {key}: {e}")
+            self.stats.incr(self.name, namespace, 'errors')
+            self.stats.incr(self.name, namespace, 'misses')
+            return _MISSING
+        self.stats.incr(self.name, namespace, 'hits')
+        return decoded
 
-    def set(self, key: str, value: Any, ttl: int = CACHE_TTL_DEFAULT) -> bool:
-        """Establecer valor en caché."""
-        if not self._client:
-            return False
+    def set(self, key: str, value: Any, ttl: int) -> bool:
         try:
-            serialized = json.dumps(value)
-            self._client.setex(key, ttl, serialized)
-            return True
+            self.client.setex(key, ttl, self.serializer.dumps(value))
         except Exception as e:
             logger.error(f"Cache set error for key {key}: {e}")
+            self.stats.incr(self.name, namespace_of(key), 'errors')
             return False
+        self.stats.incr(self.name, namespace_of(key), 'sets')
+        return True
 
     def delete(self, key: str) -> bool:
-        """Eliminar valor de caché."""
-        if not self._client:
-            return False
         try:
-            self._client.delete(key)
+            self.client.delete(key)
             return True
         except Exception as e:
             logger.error(f"Cache delete error for key {key}: {e}")
             return False
 
-    def clear_pattern(self, pattern: str) -> int:
-        """Limpiar todas las claves que coincidan con el patrón."""
-        if not self._client:
-            return 0
+    def clear_pattern(self, pattern: str, batch_size: int = 500) -> int:
+        """Eliminar las claves que coinciden con ``pattern``.
+
+        Usa ``SCAN`` por lotes en lugar de ``KEYS`` para no bloquear Redis.
+        """
+        removed = 0
+        batch = []
         try:
-            keys = self._client.keys(pattern)
-            if keys:
-                return self._client.delete(*keys)
+            for key in self.client.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    removed += self.client.delete(*batch)
+                    batch = []
+            if batch:
+                removed += self.client.delete(*batch)
         except Exception as e:
             logger.error(f"Cache clear pattern error for {pattern}: {e}")
-        return 0
+        return removed
+
+    # INCRBY solo si la clave existe: un contador vencido no debe renacer
+    # con el valor del delta (el próximo lector lo recalcula desde la base)
+    _INCR_EXISTING = (
+        "if redis.call('exists', KEYS[1]) == 1 then "
+        "return redis.call('incrby', KEYS[1], ARGV[1]) end "
+        "return nil"
+    )
+
+    def get_counter(self, key: str) -> Any:
+        """Contador entero guardado sin serializar (para INCRBY)."""
+        try:
+            value = self.client.get(key)
+        except Exception as e:
+            logger.error(f"Cache counter get error for key {key}: {e}")
+            self.stats.incr(self.name, namespace_of(key), 'errors')
+            return _MISSING
+        if value is None:
+            self.stats.incr(self.name, namespace_of(key), 'misses')
+            return _MISSING
+        self.stats.incr(self.name, namespace_of(key), 'hits')
+        return int(value)
+
+    def set_counter(self, key: str, value: int, ttl: int) -> bool:
+        try:
+            self.client.setex(key, ttl, int(value))
+        except Exception as e:
+            logger.error(f"Cache counter set error for key {key}: {e}")
+            self.stats.incr(self.name, namespace_of(key), 'errors')
+            return False
+        self.stats.incr(self.name, namespace_of(key), 'sets')
+        return True
+
+    def incr(self, key: str, amount: int) -> Any:
+        try:
+            value = self.client.eval(self._INCR_EXISTING, 1, key, int(amount))
+        except Exception as e:
+            logger.error(f"Cache counter incr error for key {key}: {e}")
+            self.stats.incr(self.name, namespace_of(key), 'errors')
+            # Estado incierto: descartar para que se recalcule
+            self.delete(key)
+            return _MISSING
+        return _MISSING if value is None else int(value)
+
+    def generations(self, tags: Tuple[str, ...]) -> Optional[List[int]]:
+        """Generación actual de cada etiqueta (None si Redis no responde)."""
+        try:
+            values = self.client.mget([f"{GENERATION_PREFIX}:{tag}" for tag in tags])
+        except Exception as e:
+            logger.error(f"Cache generation read error for {tags}: {e}")
+            return None
+        return [int(value or 0) for value in values]
+
+    def bump(self, tags: Tuple[str, ...]) -> bool:
+        """Incrementar la generación de cada etiqueta."""
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(f"{GENERATION_PREFIX}:{tag}")
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache generation bump error for {tags}: {e}")
+            return False
+
+    def acquire_lock(self, key: str, timeout: int):
+        """Candado de recálculo sin espera; None si otro proceso lo tiene."""
+        try:
+            lock = self.client.lock(f"{LOCK_PREFIX}:{key}", timeout=timeout, blocking=False)
+            return lock if lock.acquire() else None
+        except Exception as e:
+            # Sin Redis se recalcula igual: peor que single-flight, pero correcto
+            logger.error(f"Cache lock error for key {key}: {e}")
+            return _NO_LOCK
+
+    @staticmethod
+    def release_lock(lock) -> None:
+        if lock is _NO_LOCK:
+            return
+        try:
+            lock.release()
+        except Exception as e:
+            # Candado vencido (el cálculo superó CACHE_LOCK_TIMEOUT)
+            logger.warning(f"Cache lock release error: {e}")
+
+
+class CacheManager:
+    """Gestor de caché de dos niveles (memoria local + Redis opcional)."""
+
+    _instance: Optional['CacheManager'] = None
+    _local: Optional[MemoryBackend] = None
+    _remote: Optional[RedisBackend] = None
+    _local_ttl: Optional[int] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.stats = CacheStats()
+            cls._instance.function_stats = FunctionStats()
+            cls._instance._generations = defaultdict(int)
+            cls._instance._generations_lock = threading.Lock()
+            cls._instance._inflight = set()
+            cls._instance._inflight_lock = threading.Lock()
+        return cls._instance
+
+    def init_app(self, app) -> None:
+        """Configurar los niveles de caché según la configuración de la app."""
+        backend = app.config.get('CACHE_BACKEND', 'tiered')
+        self.stats.reset()
+        self.function_stats.reset()
+        self._generations.clear()
+        self._local = None
+        self._remote = None
+
+        if backend in ('tiered', 'memory'):
+            self._local = MemoryBackend(
+                max_entries=app.config.get('CACHE_LOCAL_MAX_ENTRIES', CACHE_LOCAL_MAX_ENTRIES),
+                namespace_limits=app.config.get('CACHE_NAMESPACE_LIMITS'),
+                stats=self.stats,
+            )
+
+        redis_url = app.config.get('REDIS_URL')
+        if backend in ('tiered', 'redis'):
+            if redis_url:
+                # Un serializador mal configurado debe fallar al arrancar
+                serializer = get_serializer(
+                    app.config.get('CACHE_SERIALIZER', 'pickle'),
+                    compress_min_bytes=app.config.get('CACHE_COMPRESS_MIN_BYTES',
+                                                      COMPRESS_MIN_BYTES),
+                )
+                try:
+                    client = redis.from_url(redis_url)
+                    self._remote = RedisBackend(client, serializer=serializer, stats=self.stats)
+                    logger.info("Redis cache initialized successfully")
+                except Exception as e:
+                    logger.warning(f"Redis not available: {e}. Using local cache only.")
+            else:
+                logger.warning("REDIS_URL not configured. Using local cache only.")
+
+        # Con Redis, el nivel local solo guarda por poco tiempo: las
+        # invalidaciones de otros procesos no le llegan.
+        self._local_ttl = app.config.get('CACHE_LOCAL_TTL', CACHE_LOCAL_TTL) if self._remote else None
+
+    @property
+    def enabled(self) -> bool:
+        return self._local is not None or self._remote is not None
+
+    @property
+    def shared(self) -> bool:
+        """Hay un nivel remoto (Redis) compartido entre procesos."""
+        return self._remote is not None
+
+    @property
+    def _client(self) -> Optional[redis.Redis]:
+        """Cliente Redis del nivel remoto (compatibilidad)."""
+        return self._remote.client if self._remote else None
+
+    def _local_expiry(self, ttl: int) -> int:
+        return min(ttl, self._local_ttl) if self._local_ttl else ttl
+
+    # ------------------------------------------------------------------
+    # Generaciones por etiqueta
+    # ------------------------------------------------------------------
+
+    def generations(self, tags: Iterable[str]) -> List[int]:
+        """Generación actual de cada etiqueta, en el orden recibido."""
+        tags = tuple(tags)
+        if self._remote is not None:
+            remote = self._remote.generations(tags)
+            if remote is not None:
+                return remote
+        with self._generations_lock:
+            return [self._generations[tag] for tag in tags]
+
+    def invalidate_tags(self, *tags: str) -> None:
+        """Invalidar todas las entradas que dependen de alguna de ``tags``."""
+        tags = tuple(sorted(set(tags)))
+        if not tags:
+            return
+        with self._generations_lock:
+            for tag in tags:
+                self._generations[tag] += 1
+        if self._remote is not None:
+            self._remote.bump(tags)
+
+    def _physical_key(self, key: str, tags: Optional[Iterable[str]]) -> str:
+        """Clave almacenada: la lógica más la generación de sus etiquetas."""
+        if not tags:
+            return key
+        tags = tuple(sorted(set(tags)))
+        return f"{key}@{'.'.join(str(g) for g in self.generations(tags))}"
+
+    # ------------------------------------------------------------------
+    # Operaciones
+    # ------------------------------------------------------------------
+
+    def get(self, key: str, tags: Optional[Iterable[str]] = None) -> Optional[Any]:
+        """Obtener valor de caché.
+
+        Args:
+            key: Clave lógica
+            tags: Tablas de las que depende el valor (mismas que en ``set``)
+        """
+        if not self.enabled:
+            return None
+        value = self._read(self._physical_key(key, tags))
+        return None if value is _MISSING else value
+
+    def _read(self, key: str) -> Any:
+        if self._local is not None:
+            value = self._local.get(key)
+            if value is not _MISSING:
+                return value
+        if self._remote is not None:
+            value = self._remote.get(key)
+            if value is not _MISSING:
+                if self._local is not None:
+                    # TTL restante desconocido: se usa el del nivel local
+                    self._local.set(key, value, self._local_ttl or CACHE_LOCAL_TTL)
+                return value
+        return _MISSING
+
+    def set(self, key: str, value: Any, ttl: int = CACHE_TTL_DEFAULT,
+            tags: Optional[Iterable[str]] = None) -> bool:
+        """Establecer valor en caché.
+
+        Args:
+            key: Clave lógica
+            value: Valor serializable en JSON
+            ttl: Time-to-live en segundos
+            tags: Tablas de las que depende el valor; un commit que las
+                modifique invalida la entrada
+        """
+        if not self.enabled:
+            return False
+        return self._write(self._physical_key(key, tags), value, ttl)
+
+    def _write(self, key: str, value: Any, ttl: int) -> bool:
+        stored = False
+        if self._local is not None:
+            stored = self._local.set(key, value, self._local_expiry(ttl))
+        if self._remote is not None:
+            stored = self._remote.set(key, value, ttl) or stored
+        return stored
+
+    # ------------------------------------------------------------------
+    # Recomputación con single-flight y stale-while-revalidate
+    # ------------------------------------------------------------------
+
+    def _acquire(self, key: str, timeout: int):
+        """Candado de recálculo de ``key`` (proceso y, si hay, Redis)."""
+        with self._inflight_lock:
+            if key in self._inflight:
+                return None
+            self._inflight.add(key)
+        remote_lock = None
+        if self._remote is not None:
+            remote_lock = self._remote.acquire_lock(key, timeout)
+            if remote_lock is None:
+                self._release(key, None)
+                return None
+        return (key, remote_lock)
+
+    def _release(self, key: str, remote_lock) -> None:
+        if remote_lock is not None:
+            self._remote.release_lock(remote_lock)
+        with self._inflight_lock:
+            self._inflight.discard(key)
+
+    def _read_envelope(self, key: str) -> Any:
+        envelope = self._read(key)
+        if isinstance(envelope, dict) and 'x' in envelope and 'v' in envelope:
+            return envelope
+        return _MISSING
+
+    @staticmethod
+    def _needs_refresh(envelope: Dict[str, Any], beta: float) -> Tuple[bool, bool]:
+        """(vencido, recalcular antes de tiempo) según XFetch."""
+        now = time.time()
+        if now >= envelope['x']:
+            return True, False
+        if beta > 0 and envelope.get('d'):
+            early = now - envelope['d'] * beta * math.log(1.0 - random.random())
+            return False, early >= envelope['x']
+        return False, False
+
+    def _compute_and_store(self, key: str, namespace: str, compute: Callable[[], Any],
+                           ttl: int, stale_ttl: int) -> Any:
+        start = time.time()
+        value = compute()
+        delta = time.time() - start
+        envelope = {'v': value, 'x': time.time() + ttl, 'd': round(delta, 4)}
+        self._write(key, envelope, ttl + stale_ttl)
+        self.stats.incr('compute', namespace, 'recomputes')
+        return value
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       ttl: int = CACHE_TTL_DEFAULT,
+                       tags: Optional[Iterable[str]] = None,
+                       stale_ttl: int = CACHE_STALE_TTL,
+                       beta: float = CACHE_EARLY_BETA,
+                       lock_timeout: int = CACHE_LOCK_TIMEOUT) -> Any:
+        """Valor cacheado de ``key`` o el resultado de ``compute()``.
+
+        Un solo llamador por clave recalcula; los demás reciben el valor
+        vencido si existe o esperan a que el recálculo termine (como mucho
+        ``lock_timeout`` segundos, después calculan por su cuenta).
+
+        Args:
+            key: Clave lógica
+            compute: Función sin argumentos que produce el valor
+            ttl: Segundos durante los que el valor se considera vigente
+            tags: Tablas de las que depende el valor
+            stale_ttl: Segundos adicionales en que se sirve el valor vencido
+            beta: Factor de expiración temprana (0 la desactiva)
+            lock_timeout: Vida máxima del candado de recálculo
+        """
+        if not self.enabled:
+            return compute()
+
+        namespace = namespace_of(key)
+        physical_key = self._physical_key(key, tags)
+        envelope = self._read_envelope(physical_key)
+        waited = False
+
+        while True:
+            expired = early = False
+            if envelope is not _MISSING:
+                expired, early = self._needs_refresh(envelope, beta)
+                if not expired and not early:
+                    return envelope['v']
+
+            lock = self._acquire(key, lock_timeout)
+            if lock is not None:
+                try:
+                    if waited:
+                        # El worker que teníamos delante pudo dejar el valor listo
+                        envelope = self._read_envelope(physical_key)
+                        if envelope is not _MISSING and not self._needs_refresh(envelope, 0)[0]:
+                            return envelope['v']
+                    if early:
+                        self.stats.incr('compute', namespace, 'early_recomputes')
+                    return self._compute_and_store(physical_key, namespace, compute, ttl, stale_ttl)
+                finally:
+                    self._release(*lock)
+
+            if envelope is not _MISSING:
+                # Otro worker está recalculando: servir el valor actual/vencido
+                if expired:
+                    self.stats.incr('compute', namespace, 'stale_served')
+                return envelope['v']
+
+            # Sin valor que servir: esperar al worker que recalcula
+            if not waited:
+                self.stats.incr('compute', namespace, 'lock_waits')
+                waited = True
+                deadline = time.monotonic() + lock_timeout
+            if time.monotonic() >= deadline:
+                return compute()
+            time.sleep(0.05)
+            envelope = self._read_envelope(physical_key)
+
+    # ------------------------------------------------------------------
+    # Contadores enteros
+    # ------------------------------------------------------------------
+    # Viven en un solo nivel: Redis si está disponible (compartido entre
+    # procesos, con INCRBY atómico) y si no la memoria del proceso. No usan
+    # etiquetas: quien los mantiene los actualiza con ``incr_counter``.
+
+    def get_counter(self, key: str) -> Optional[int]:
+        """Valor de un contador, o None si no existe o venció."""
+        if self._remote is not None:
+            value = self._remote.get_counter(key)
+        elif self._local is not None:
+            value = self._local.get(key)
+        else:
+            return None
+        return value if isinstance(value, int) else None
+
+    def set_counter(self, key: str, value: int, ttl: int = CACHE_TTL_DEFAULT) -> bool:
+        """Inicializar un contador (normalmente con el valor leído de la base)."""
+        if self._remote is not None:
+            return self._remote.set_counter(key, value, ttl)
+        if self._local is not None:
+            return self._local.set(key, int(value), ttl)
+        return False
+
+    def incr_counter(self, key: str, amount: int = 1) -> Optional[int]:
+        """Sumar ``amount`` a un contador existente.
+
+        Si el contador no existe no se crea (retorna None): el siguiente
+        ``get_counter`` fallará y el llamador lo recalculará.
+        """
+        if self._remote is not None:
+            value = self._remote.incr(key, amount)
+        elif self._local is not None:
+            value = self._local.incr(key, amount)
+        else:
+            return None
+        return None if value is _MISSING else value
+
+    def delete(self, key: str) -> bool:
+        """Eliminar valor de caché."""
+        deleted = False
+        if self._local is not None:
+            deleted = self._local.delete(key)
+        if self._remote is not None:
+            deleted = self._remote.delete(key) or deleted
+        return deleted
+
+    def clear_pattern(self, pattern: str) -> int:
+        """Limpiar todas las claves que coincidan con el patrón."""
+        local_count = self._local.clear_pattern(pattern) if self._local is not None else 0
+        remote_count = self._remote.clear_pattern(pattern) if self._remote is not None else 0
+        return max(local_count, remote_count)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores por nivel/espacio de nombres y ocupación del nivel local."""
+        return {
+            'backends': {
+                'local': self._local is not None,
+                'remote': self._remote is not None,
+            },
+            'serializer': self._remote.serializer.name if self._remote is not None else None,
+            'counters': self.stats.snapshot(),
+            'local_sizes': self._local.sizes() if self._local is not None else {},
+            'functions': self.function_stats.snapshot(),
+        }
 
 
 cache = CacheManager()
 
 
-def cached(key_prefix: str, ttl: int = CACHE_TTL_DEFAULT):
+def table_tags(*models) -> Tuple[str, ...]:
+    """Etiquetas de invalidación (nombres de tabla) de los modelos dados."""
+    return tuple(model.__table__.name for model in models)
+
+
+def _session_tags(session) -> set:
+    return session.info.setdefault(_PENDING_TAGS_KEY, set())
+
+
+def _tables_of(instance) -> List[str]:
+    mapper = getattr(instance, '__mapper__', None)
+    return [table.name for table in mapper.tables] if mapper is not None else []
+
+
+def _after_flush(session, flush_context) -> None:
+    tags = _session_tags(session)
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        tags.update(_tables_of(instance))
+
+
+def _do_orm_execute(orm_execute_state) -> None:
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update
+            or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    name = getattr(table, 'name', None)
+    if name:
+        _session_tags(orm_execute_state.session).add(name)
+
+
+def _after_commit(session) -> None:
+    tags = session.info.pop(_PENDING_TAGS_KEY, None)
+    if not tags:
+        return
+    try:
+        cache.invalidate_tags(*tags)
+    except Exception as e:
+        # La transacción ya se confirmó: un fallo de caché no debe propagarse
+        logger.error(f"Cache invalidation error for {sorted(tags)}: {e}")
+
+
+def _after_rollback(session) -> None:
+    session.info.pop(_PENDING_TAGS_KEY, None)
+
+
+def register_invalidation_listeners() -> None:
+    """Registrar los eventos de sesión que invalidan por tabla (idempotente)."""
+    handlers = (
+        ('after_flush', _after_flush),
+        ('do_orm_execute', _do_orm_execute),
+        ('after_commit', _after_commit),
+        ('after_rollback', _after_rollback),
+    )
+    for event_name, handler in handlers:
+        if not event.contains(Session, event_name, handler):
+            event.listen(Session, event_name, handler)
+
+
+def _canonical(value: Any) -> str:
+    """Representación estable de un argumento para la clave de caché."""
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return f"{type(value).__name__}:{value!r}"
+    if isinstance(value, (Decimal, date, datetime)):
+        return f"{type(value).__name__}:{value}"
+    if isinstance(value, dict):
+        items = sorted((_canonical(k), _canonical(v)) for k, v in value.items())
+        return '{' + ','.join(f"{k}={v}" for k, v in items) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_canonical(v) for v in value) + ']'
+    if isinstance(value, (set, frozenset)):
+        return '{' + ','.join(sorted(_canonical(v) for v in value)) + '}'
+    if hasattr(value, 'value') and hasattr(type(value), '__members__'):
+        return f"{type(value).__name__}.{value.value!r}"
+    if hasattr(value, '__table__') and hasattr(value, 'id'):
+        # Instancia ORM: identificada por tabla e id, no por su repr
+        return f"{value.__table__.name}#{value.id}"
+    return repr(value)
+
+
+def make_key(key_prefix: str, signature: inspect.Signature, args: tuple, kwargs: dict) -> str:
+    """Clave de ``key_prefix`` para una llamada, independiente de cómo se pasaron los argumentos.
+
+    ``f(1, b=2)``, ``f(a=1, b=2)`` y ``f(1)`` (con ``b=2`` por defecto)
+    producen la misma clave. ``self``/``cls`` no forman parte de la clave.
+    """
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {name: value for name, value in bound.arguments.items()
+                 if name not in ('self', 'cls')}
+    digest = hashlib.blake2b(_canonical(arguments).encode(), digest_size=12).hexdigest()
+    return f"{key_prefix}:{digest}"
+
+
+def cached(key_prefix: str, ttl: int = CACHE_TTL_DEFAULT,
+           tags: Optional[Iterable[str]] = None,
+           stale_ttl: int = CACHE_STALE_TTL, beta: float = CACHE_EARLY_BETA):
     """Decorador para caching de funciones.
 
+    La clave combina ``key_prefix`` con un hash de los argumentos
+    posicionales y por nombre (ver ``make_key``). El recálculo es
+    single-flight y sirve el valor vencido durante ``stale_ttl`` segundos
+    (ver ``CacheManager.get_or_compute``). Las llamadas y recálculos de
+    cada función se reportan en ``cache.get_stats()['functions']``.
+
     Args:
         key_prefix: Prefijo para la clave de caché
         ttl: Time-to-live en segundos (default 5 minutos)
+        tags: Tablas de las que depende el resultado
+        stale_ttl: Segundos en que se sirve el valor vencido mientras se recalcula
+        beta: Factor de expiración temprana probabilística (0 la desactiva)
     """
     def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        stats_name = f"{func.__module__}.{func.__qualname__}"
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            from flask import current_app
-
-            cache_key = f"{key_prefix}:{':'.join(str(a) for a in args)}"
+            cache_key = make_key(key_prefix, signature, args, kwargs)
+            computed = []
 
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                return cached_value
+            def compute():
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                computed.append(time.perf_counter() - start)
+                return result
 
-            result = func(*args, **kwargs)
+            value = cache.get_or_compute(
+                cache_key, compute,
+                ttl=ttl, tags=tags, stale_ttl=stale_ttl, beta=beta,
+            )
+            cache.function_stats.record(stats_name, bool(computed), sum(computed))
+            return value
 
-            cache.set(cache_key, result, ttl)
-
-            return result
+        wrapper.cache_key = lambda *args, **kwargs: make_key(key_prefix, signature, args, kwargs)
         return wrapper
     return decorator
 
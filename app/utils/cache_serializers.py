@@ -0,0 +1,186 @@
+"""Serializadores del nivel remoto (Redis) de la caché.
+
+Cada valor se guarda con una cabecera de 5 bytes::
+
+    b'DL' | versión de esquema | códec | flags
+
+de modo que un cambio de formato (o de códec en la configuración) convierte
+las entradas viejas en misses en lugar de errores de deserialización.
+
+Códecs (``CACHE_SERIALIZER``):
+  - ``pickle``:  protocolo 5; conserva ``Decimal``, ``date``, tuplas, etc.
+                 Solo apto porque Redis es infraestructura de confianza.
+  - ``msgpack``: binario compacto con tipos extendidos para ``Decimal``,
+                 ``date`` y ``datetime`` (requiere ``pip install msgpack``).
+  - ``json``:    compatible con el formato anterior; fechas y decimales se
+                 guardan como texto.
+
+Los payloads de más de ``CACHE_COMPRESS_MIN_BYTES`` se comprimen con zlib.
+"""
+import json
+import pickle
+import zlib
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Type
+
+MAGIC = b'DL'
+SCHEMA_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+FLAG_COMPRESSED = 0x01
+
+# Tamaño a partir del cual se comprime el payload (bytes)
+COMPRESS_MIN_BYTES = 4096
+COMPRESS_LEVEL = 1
+
+
+class SerializationError(ValueError):
+    """Payload con cabecera, versión o códec distinto al esperado."""
+
+
+class CacheSerializer(ABC):
+    """Codifica valores de caché a bytes con cabecera versionada."""
+
+    name = 'base'
+    codec_id = 0
+
+    def __init__(self, compress_min_bytes: int = COMPRESS_MIN_BYTES):
+        self.compress_min_bytes = compress_min_bytes
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        """Payload sin cabecera ni compresión."""
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> Any:
+        """Valor a partir del payload ya descomprimido."""
+
+    def dumps(self, value: Any) -> bytes:
+        payload = self.encode(value)
+        flags = 0
+        if self.compress_min_bytes and len(payload) >= self.compress_min_bytes:
+            payload = zlib.compress(payload, COMPRESS_LEVEL)
+            flags |= FLAG_COMPRESSED
+        return MAGIC + bytes((SCHEMA_VERSION, self.codec_id, flags)) + payload
+
+    def loads(self, data: bytes) -> Any:
+        if isinstance(data, str):
+            data = data.encode()
+        if len(data) < HEADER_SIZE or data[:2] != MAGIC:
+            raise SerializationError('Payload de caché sin cabecera')
+        version, codec_id, flags = data[2], data[3], data[4]
+        if version != SCHEMA_VERSION or codec_id != self.codec_id:
+            raise SerializationError(
+                f'Payload de caché v{version}/códec {codec_id}; '
+                f'se esperaba v{SCHEMA_VERSION}/{self.codec_id}'
+            )
+        payload = data[HEADER_SIZE:]
+        if flags & FLAG_COMPRESSED:
+            payload = zlib.decompress(payload)
+        return self.decode(payload)
+
+
+class PickleSerializer(CacheSerializer):
+    name = 'pickle'
+    codec_id = 1
+
+    def encode(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=5)
+
+    def decode(self, payload: bytes) -> Any:
+        return pickle.loads(payload)
+
+
+# Tipos extendidos de msgpack
+_EXT_DECIMAL = 1
+_EXT_DATE = 2
+_EXT_DATETIME = 3
+
+
+class MsgpackSerializer(CacheSerializer):
+    name = 'msgpack'
+    codec_id = 2
+
+    def __init__(self, compress_min_bytes: int = COMPRESS_MIN_BYTES):
+        super().__init__(compress_min_bytes)
+        try:
+            import msgpack
+        except ImportError as e:
+            raise ImportError("msgpack no está instalado. Instalar con: pip install msgpack") from e
+        self._msgpack = msgpack
+
+    def _default(self, value: Any):
+        ext = self._msgpack.ExtType
+        if isinstance(value, Decimal):
+            return ext(_EXT_DECIMAL, str(value).encode())
+        if isinstance(value, datetime):
+            return ext(_EXT_DATETIME, value.isoformat().encode())
+        if isinstance(value, date):
+            return ext(_EXT_DATE, value.isoformat().encode())
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+        raise TypeError(f'Tipo no serializable en caché: {type(value).__name__}')
+
+    @staticmethod
+    def _ext_hook(code: int, data: bytes):
+        text = data.decode()
+        if code == _EXT_DECIMAL:
+            return Decimal(text)
+        if code == _EXT_DATETIME:
+            return datetime.fromisoformat(text)
+        if code == _EXT_DATE:
+            return date.fromisoformat(text)
+        raise SerializationError(f'Tipo extendido desconocido: {code}')
+
+    def encode(self, value: Any) -> bytes:
+        return self._msgpack.packb(value, default=self._default, use_bin_type=True)
+
+    def decode(self, payload: bytes) -> Any:
+        return self._msgpack.unpackb(payload, ext_hook=self._ext_hook, raw=False,
+                                     strict_map_key=False)
+
+
+class JsonSerializer(CacheSerializer):
+    name = 'json'
+    codec_id = 3
+
+    @staticmethod
+    def _default(value: Any):
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+        raise TypeError(f'Tipo no serializable en caché: {type(value).__name__}')
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, default=self._default, separators=(',', ':')).encode()
+
+    def decode(self, payload: bytes) -> Any:
+        return json.loads(payload)
+
+
+SERIALIZERS: Dict[str, Type[CacheSerializer]] = {
+    PickleSerializer.name: PickleSerializer,
+    MsgpackSerializer.name: MsgpackSerializer,
+    JsonSerializer.name: JsonSerializer,
+}
+
+
+def get_serializer(name: str = 'pickle',
+                   compress_min_bytes: int = COMPRESS_MIN_BYTES) -> CacheSerializer:
+    """Instancia del serializador ``name``.
+
+    Raises:
+        ValueError: Si el nombre no corresponde a un serializador.
+        ImportError: Si el serializador requiere un paquete no instalado.
+    """
+    try:
+        serializer_class = SERIALIZERS[name]
+    except KeyError as e:
+        raise ValueError(f"Serializador de caché inválido: {name} "
+                         f"(use {', '.join(SERIALIZERS)})") from e
+    return serializer_class(compress_min_bytes=compress_min_bytes)
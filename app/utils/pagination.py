@@ -0,0 +1,229 @@
+"""Paginación por cursor (keyset) para las APIs de listados.
+
+En lugar de ``OFFSET`` + ``COUNT(*)``, cada página continúa a partir de la
+última fila de la anterior::
+
+    WHERE (fech_entrada, id) < (:ultima_fecha, :ultimo_id)
+    ORDER BY fech_entrada DESC, id DESC
+    LIMIT :por_pagina + 1
+
+Con un índice sobre la columna de orden, la página 10.000 cuesta lo mismo que
+la primera. El cursor es opaco para el cliente: base64 url-safe de un JSON
+con el campo y la dirección de orden y los valores de la última fila.
+
+El total es opcional:
+  - ``exact``:    ``COUNT(*)`` sobre la consulta filtrada.
+  - ``estimate``: estimación del planificador en PostgreSQL (``EXPLAIN``);
+                  en otros motores se usa el conteo exacto.
+  - ``none``:     sin total (el cliente usa ``tiene_siguiente``).
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, tuple_
+
+from app import db
+
+TOTAL_EXACT = 'exact'
+TOTAL_ESTIMATE = 'estimate'
+TOTAL_NONE = 'none'
+TOTAL_MODES = (TOTAL_EXACT, TOTAL_ESTIMATE, TOTAL_NONE)
+
+
+class CursorError(ValueError):
+    """Cursor mal formado o generado para otro orden de listado."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    if hasattr(value, 'value'):
+        return value.value
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+    return value
+
+
+def encode_cursor(field: str, direction: str, value: Any, last_id: int) -> str:
+    """Cursor opaco que apunta después de la fila (value, last_id)."""
+    payload = json.dumps(
+        {'f': field, 'o': direction, 'v': _encode_value(value), 'id': last_id},
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str, field: str, direction: str) -> Tuple[Any, int]:
+    """Decodificar un cursor y validar que corresponde al orden solicitado.
+
+    Raises:
+        CursorError: Si el cursor es inválido o fue generado para otro orden.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = _decode_value(payload['v']), int(payload['id'])
+    except (ValueError, TypeError, KeyError) as e:
+        raise CursorError('Cursor de paginación inválido') from e
+
+    if payload.get('f') != field or payload.get('o') != direction:
+        raise CursorError('El cursor no corresponde al orden solicitado')
+    return value, last_id
+
+
+def _after_condition(column, id_column, value: Any, last_id: int,
+                     descending: bool, nullable: bool):
+    """Filas posteriores a (value, last_id) en el orden (column, id) con NULLs al final."""
+    if value is None:
+        # La página anterior terminó dentro del bloque de NULLs
+        return and_(column.is_(None), id_column < last_id if descending else id_column > last_id)
+
+    if descending:
+        condition = tuple_(column, id_column) < tuple_(value, last_id)
+    else:
+        condition = tuple_(column, id_column) > tuple_(value, last_id)
+    if nullable:
+        condition = or_(condition, column.is_(None))
+    return condition
+
+
+def _planner_estimate(query) -> Optional[int]:
+    """Filas estimadas por el planificador de PostgreSQL para ``query``."""
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    result = db.session.connection().exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params
+    ).scalar()
+    plan = json.loads(result) if isinstance(result, str) else result
+    try:
+        return int(plan[0]['Plan']['Plan Rows'])
+    except (IndexError, KeyError, TypeError):
+        return None
+
+
+def count_total(query, mode: str = TOTAL_EXACT) -> Tuple[Optional[int], bool]:
+    """Total de filas de ``query`` según ``mode``.
+
+    Returns:
+        Tuple: (total o None, True si el total es una estimación)
+    """
+    if mode == TOTAL_NONE:
+        return None, False
+    if mode == TOTAL_ESTIMATE and db.engine.dialect.name == 'postgresql':
+        estimate = _planner_estimate(query.order_by(None))
+        if estimate is not None:
+            return estimate, True
+    return query.order_by(None).count(), False
+
+
+def keyset_paginate(query, model, sort_column, direction: str = 'desc',
+                    per_page: int = 20, cursor: Optional[str] = None,
+                    total: str = TOTAL_NONE) -> Tuple[List[Any], Dict[str, Any]]:
+    """Paginar ``query`` por cursor sobre (sort_column, id).
+
+    Args:
+        query: Consulta ya filtrada, sin ``order_by``
+        model: Modelo con clave primaria ``id`` (desempate del orden)
+        sort_column: Columna del modelo por la que se ordena
+        direction: 'asc' o 'desc'
+        per_page: Filas por página
+        cursor: Cursor devuelto en ``siguiente_cursor`` (None o '' = primera página)
+        total: Modo de conteo (TOTAL_EXACT, TOTAL_ESTIMATE o TOTAL_NONE)
+
+    Returns:
+        Tuple: (lista_de_items, metadata_de_paginacion)
+
+    Raises:
+        CursorError: Si el cursor es inválido o no corresponde al orden.
+    """
+    if total not in TOTAL_MODES:
+        raise ValueError(f'Modo de total inválido: {total}')
+
+    direction = 'desc' if direction.lower() == 'desc' else 'asc'
+    descending = direction == 'desc'
+    field = sort_column.key
+    nullable = any(col.nullable for col in sort_column.property.columns)
+
+    total_count, estimated = count_total(query, total)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, field, direction)
+        query = query.filter(
+            _after_condition(sort_column, model.id, value, last_id, descending, nullable)
+        )
+
+    order = sort_column.desc() if descending else sort_column.asc()
+    if nullable:
+        order = order.nulls_last()
+    id_order = model.id.desc() if descending else model.id.asc()
+
+    rows = query.order_by(order, id_order).limit(per_page + 1).all()
+    items = rows[:per_page]
+    has_next = len(rows) > per_page
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(field, direction, getattr(last, field), last.id)
+
+    meta = {
+        'por_pagina': per_page,
+        'cursor': cursor or None,
+        'siguiente_cursor': next_cursor,
+        'tiene_siguiente': has_next,
+        'total': total_count,
+        'total_estimado': estimated,
+    }
+    return items, meta
+
+
+def sort_column_for(model, field: str, default):
+    """Columna de ``model`` llamada ``field``, o ``default`` si no es una columna."""
+    attribute = getattr(model, field, None)
+    prop = getattr(attribute, 'property', None)
+    if prop is not None and hasattr(prop, 'columns'):
+        return attribute
+    return default
+
+
+def cursor_args(args) -> Tuple[Optional[str], str]:
+    """Leer ``after`` y ``total`` de los query params de un listado.
+
+    ``after`` presente (aunque vacío) activa la paginación por cursor; en ese
+    modo el total por defecto es ``none``.
+
+    Raises:
+        ValueError: Si ``total`` no es un modo válido.
+    """
+    cursor = args.get('after')
+    total = args.get('total') or (TOTAL_NONE if cursor is not None else TOTAL_EXACT)
+    if total not in TOTAL_MODES:
+        raise ValueError(f"Parámetro total inválido: {total} (use {', '.join(TOTAL_MODES)})")
+    return cursor, total
+
+
+def cursor_meta(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Bloque ``meta`` de respuesta API para un listado paginado por cursor."""
+    return {
+        'per_page': meta['por_pagina'],
+        'after': meta['cursor'],
+        'next_cursor': meta['siguiente_cursor'],
+        'has_next': meta['tiene_siguiente'],
+        'total': meta['total'],
+        'total_estimated': meta['total_estimado'],
+    }
@@ -0,0 +1,180 @@
+"""Series temporales densas (fecha × estado) sobre arreglos NumPy.
+
+Las consultas agrupan por día en SQL y filtran la columna de fecha por rango
+(``col >= inicio AND col < fin``), de modo que el filtro puede usar el índice
+de la columna. El paso de días a semanas o meses se hace aquí con NumPy, sin
+formateo de fechas por dialecto en la consulta.
+
+Ejemplo::
+
+    rows = db.session.query(dia, estado, func.count(...)).group_by(dia, estado)
+    serie = StatusSeries.from_rows(rows, start, end, 'week', ESTADOS)
+    serie.rolling_mean(4).to_plotly()
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Date, cast, func
+
+from app import db
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# 1970-01-01 fue jueves: desplazamiento para que la semana empiece en lunes
+_EPOCH_WEEKDAY = 3
+
+
+def day_expression(column):
+    """Fecha (sin hora) de una columna DateTime, compatible con SQLite y PostgreSQL."""
+    if db.engine.dialect.name == 'postgresql':
+        return cast(column, Date)
+    return func.date(column)
+
+
+def day_range(start: date, end: date) -> Tuple[datetime, datetime]:
+    """Límites ``[inicio, fin)`` en DateTime para filtrar una columna por días.
+
+    Filtrar ``col >= inicio AND col < fin`` sobre la columna sin transformar
+    permite usar su índice, a diferencia de ``date(col) BETWEEN ...``.
+    """
+    return (datetime.combine(start, time.min),
+            datetime.combine(end + timedelta(days=1), time.min))
+
+
+def _validate_granularity(granularity: str) -> None:
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularidad inválida: {granularity} "
+                         f"(use {', '.join(GRANULARITIES)})")
+
+
+def _to_days(values: Iterable[Any]) -> np.ndarray:
+    """Convierte fechas (date, datetime o texto ISO) a ``datetime64[D]``."""
+    days = [v.date() if isinstance(v, datetime) else v for v in values]
+    days = [date.fromisoformat(v[:10]) if isinstance(v, str) else v for v in days]
+    return np.array(days, dtype='datetime64[D]')
+
+
+def align(days: np.ndarray, granularity: str) -> np.ndarray:
+    """Inicio del bucket (día, lunes de la semana o día 1 del mes) de cada fecha."""
+    _validate_granularity(granularity)
+    days = days.astype('datetime64[D]')
+    if granularity == 'week':
+        weekday = (days.astype('int64') + _EPOCH_WEEKDAY) % 7
+        return days - weekday.astype('timedelta64[D]')
+    if granularity == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+
+def bucket_axis(start: date, end: date, granularity: str) -> np.ndarray:
+    """Inicios de todos los buckets entre ``start`` y ``end`` (inclusive)."""
+    first, last = align(_to_days([start, end]), granularity)
+    if granularity == 'month':
+        return np.arange(first.astype('datetime64[M]'), last.astype('datetime64[M]') + 1,
+                         dtype='datetime64[M]').astype('datetime64[D]')
+    step = 7 if granularity == 'week' else 1
+    return np.arange(first, last + 1, step, dtype='datetime64[D]')
+
+
+class StatusSeries:
+    """Matriz densa de conteos con una fila por bucket y una columna por estado.
+
+    Attributes:
+        buckets: Inicio de cada bucket (``datetime64[D]``), ordenados.
+        statuses: Estados, en el orden de las columnas.
+        values: Matriz ``len(buckets) × len(statuses)``.
+        granularity: ``day``, ``week`` o ``month``.
+    """
+
+    def __init__(self, buckets: np.ndarray, statuses: Sequence[str],
+                 values: np.ndarray, granularity: str):
+        self.buckets = buckets
+        self.statuses = list(statuses)
+        self.values = values
+        self.granularity = granularity
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[Any, str, Any]], start: date, end: date,
+                  granularity: str = 'day',
+                  statuses: Optional[Sequence[str]] = None) -> 'StatusSeries':
+        """Construye la matriz a partir de filas ``(día, estado, conteo)``.
+
+        Los buckets sin datos quedan en cero. Las filas con estados fuera de
+        ``statuses`` o fechas fuera del rango se descartan; si no se indican
+        estados se usan los presentes en las filas, ordenados.
+        """
+        axis = bucket_axis(start, end, granularity)
+        rows = list(rows)
+        if statuses is None:
+            statuses = sorted({row[1] for row in rows})
+        values = np.zeros((len(axis), len(statuses)), dtype=np.int64)
+        if not rows:
+            return cls(axis, statuses, values, granularity)
+
+        days, row_statuses, counts = zip(*rows)
+        status_index = {status: i for i, status in enumerate(statuses)}
+        columns = np.array([status_index.get(s, -1) for s in row_statuses], dtype=np.int64)
+        bucket_days = align(_to_days(days), granularity)
+        positions = np.searchsorted(axis, bucket_days)
+        in_range = ((columns >= 0) & (positions < len(axis))
+                    & (axis[np.minimum(positions, len(axis) - 1)] == bucket_days))
+        np.add.at(values, (positions[in_range], columns[in_range]),
+                  np.array(counts, dtype=np.int64)[in_range])
+        return cls(axis, statuses, values, granularity)
+
+    def _derive(self, values: np.ndarray) -> 'StatusSeries':
+        return StatusSeries(self.buckets, self.statuses, values, self.granularity)
+
+    def rolling_mean(self, window: int) -> 'StatusSeries':
+        """Media móvil hacia atrás de ``window`` buckets (menos al inicio de la serie)."""
+        if window < 1:
+            raise ValueError('La ventana de la media móvil debe ser mayor que cero')
+        sums = np.cumsum(np.vstack([np.zeros((1, self.values.shape[1])), self.values]), axis=0)
+        index = np.arange(1, len(self.buckets) + 1)
+        lower = np.maximum(index - window, 0)
+        widths = (index - lower).reshape(-1, 1)
+        return self._derive((sums[index] - sums[lower]) / np.maximum(widths, 1))
+
+    def cumulative(self) -> 'StatusSeries':
+        """Suma acumulada de cada estado a lo largo de los buckets."""
+        return self._derive(np.cumsum(self.values, axis=0))
+
+    def column(self, status: str) -> np.ndarray:
+        return self.values[:, self.statuses.index(status)]
+
+    def labels(self) -> List[str]:
+        """Etiquetas ISO de los buckets (``YYYY-MM`` para meses)."""
+        unit = 'M' if self.granularity == 'month' else 'D'
+        return np.datetime_as_string(self.buckets.astype(f'datetime64[{unit}]'),
+                                     unit=unit).tolist()
+
+    def _plain_values(self) -> List[List[Any]]:
+        if np.issubdtype(self.values.dtype, np.floating):
+            return np.round(self.values, 2).tolist()
+        return self.values.tolist()
+
+    def to_records(self, date_key: str = 'date') -> List[Dict[str, Any]]:
+        """Una fila por bucket: ``{date_key: etiqueta, estado: valor, ...}``."""
+        return [
+            {date_key: label, **dict(zip(self.statuses, row))}
+            for label, row in zip(self.labels(), self._plain_values())
+        ]
+
+    def to_plotly(self, mode: str = 'lines', names: Optional[Dict[str, str]] = None,
+                  layout: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Figura de Plotly (``{'data': trazas, 'layout': ...}``) lista para JSON."""
+        labels = self.labels()
+        columns = list(zip(*self._plain_values())) or [() for _ in self.statuses]
+        names = names or {}
+        traces = [
+            {
+                'type': 'scatter',
+                'mode': mode,
+                'name': names.get(status, status),
+                'x': labels,
+                'y': list(column),
+            }
+            for status, column in zip(self.statuses, columns)
+        ]
+        return {'data': traces, 'layout': layout or {}}
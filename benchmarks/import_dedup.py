@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Benchmark de la detección de duplicados en los importadores CSV.
+
+Genera un fixture sintético de N filas (productos por id y órdenes de
+trabajo por nro_ofic), lo carga en una base SQLite en memoria y mide la
+re-importación del mismo archivo, donde todas las filas ya existen y el
+costo es la deduplicación:
+
+  - por fila:     una consulta por fila (session.get / filter_by().first(), implementación previa)
+  - set precargado: MasterDataImportService.import_productos y
+                    Phase3ImportService._import_ordenes_trabajo (claves precargadas)
+
+Para cada escenario se informa el tiempo y la cantidad de SELECT ejecutados.
+
+Uso:
+    python benchmarks/import_dedup.py                 # 100000 filas
+    python benchmarks/import_dedup.py --rows 10000 --rows 100000
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def write_fixture(directory, rows):
+    """Escribir productos.csv y ordenes_trabajo.csv con ``rows`` filas cada uno."""
+    productos = os.path.join(directory, 'productos.csv')
+    with open(productos, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'nombre', 'destino_id'])
+        for i in range(1, rows + 1):
+            writer.writerow([i, f'Producto sintético {i:06d}', ''])
+
+    ordenes = os.path.join(directory, 'ordenes_trabajo.csv')
+    with open(ordenes, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Id', 'IdCliente', 'NroOfic', 'Descripcion', 'FechCreacion'])
+        for i in range(1, rows + 1):
+            writer.writerow([i, 1, f'OF-{i:07d}', 'OT sintética', '2025-01-01 08:00:00'])
+
+    return productos, ordenes
+
+
+def load_fixture(db, rows):
+    """Cargar las mismas filas directamente en la base (estado previo a la re-importación)."""
+    from app.database.models import Cliente, OrdenTrabajo, Producto
+    from app.database.models.orden_trabajo import OTStatus
+
+    now = datetime(2025, 1, 1, 8, 0, 0)
+    db.session.add(Cliente(id=1, codigo='BENCH', nombre='Cliente benchmark'))
+    db.session.commit()
+    for start in range(1, rows + 1, 10000):
+        ids = range(start, min(rows, start + 9999) + 1)
+        db.session.execute(db.insert(Producto.__table__), [
+            {'id': i, 'nombre': f'Producto sintético {i:06d}', 'activo': True} for i in ids
+        ])
+        db.session.execute(db.insert(OrdenTrabajo.__table__), [
+            {'id': i, 'nro_ofic': f'OF-{i:07d}', 'codigo': f'OT-{i:04d}', 'cliente_id': 1,
+             'status': OTStatus.PENDIENTE, 'fech_creacion': now} for i in ids
+        ])
+    db.session.commit()
+
+
+class SelectCounter:
+    """Cuenta los SELECT ejecutados por el engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.count += 1
+
+
+def measure(counter, func):
+    counter.count = 0
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start, counter.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, action='append',
+                        help='Filas del fixture (repetible). Por defecto: 100000')
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from app.database.models import OrdenTrabajo, Producto
+    from app.services.import_pipeline import iter_csv_rows
+    from app.services.import_service import MasterDataImportService
+    from app.services.phase3_import_service import Phase3ImportService
+
+    app = create_app('testing')
+    app.config['SQLALCHEMY_ECHO'] = False
+
+    print('| filas | escenario | por fila (s) | SELECTs | set precargado (s) | SELECTs |')
+    print('|---:|---|---:|---:|---:|---:|')
+
+    for rows in args.rows or [100000]:
+        with app.app_context(), tempfile.TemporaryDirectory() as directory:
+            # SQLite no acepta ON DELETE PROTECT: se omiten esas tablas (informes)
+            tables = [t for t in db.metadata.sorted_tables
+                      if not any(fk.ondelete == 'PROTECT' for fk in t.foreign_keys)]
+            db.metadata.drop_all(db.engine, tables=tables)
+            db.metadata.create_all(db.engine, tables=tables)
+            productos_csv, ordenes_csv = write_fixture(directory, rows)
+            load_fixture(db, rows)
+            counter = SelectCounter(db.engine)
+
+            def productos_por_fila(productos_csv=productos_csv):
+                for _, row in iter_csv_rows(productos_csv):
+                    db.session.get(Producto, int(row['id']))
+                db.session.expunge_all()
+
+            def productos_set(productos_csv=productos_csv, rows=rows):
+                result = MasterDataImportService().import_productos(productos_csv)
+                assert result.skipped == rows, result.to_dict()
+
+            def ordenes_por_fila(ordenes_csv=ordenes_csv):
+                for _, row in iter_csv_rows(ordenes_csv):
+                    OrdenTrabajo.query.filter_by(nro_ofic=row['NroOfic']).first()
+                db.session.expunge_all()
+
+            def ordenes_set(ordenes_csv=ordenes_csv, rows=rows):
+                service = Phase3ImportService()
+                service._load_fk_cache()
+                service._import_ordenes_trabajo(Path(ordenes_csv))
+                assert service.result.ordenes_trabajo['skipped'] == rows
+
+            for name, per_row, preloaded in (
+                ('productos (id)', productos_por_fila, productos_set),
+                ('órdenes de trabajo (nro_ofic)', ordenes_por_fila, ordenes_set),
+            ):
+                row_time, row_selects = measure(counter, per_row)
+                set_time, set_selects = measure(counter, preloaded)
+                print(f'| {rows:,} | {name} | {row_time:.2f} | {row_selects:,} '
+                      f'| {set_time:.2f} | {set_selects:,} |')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Benchmark de la etapa difusa de la búsqueda global.
+
+Genera N documentos sintéticos por entidad en una base SQLite en memoria
+(solo las tablas del índice) y mide la latencia de:
+
+  - index exact:   SearchIndexService.search sin etapa difusa
+  - index fuzzy:   SearchIndexService.search con etapa difusa (search_trigrams)
+  - python bounded:   _apply_fuzzy_filter con Levenshtein acotado (early exit)
+  - python unbounded: Levenshtein completo O(n·m) por fila (implementación previa)
+
+Uso:
+    python benchmarks/search_fuzzy.py --rows 10000 --rows 100000
+    python benchmarks/search_fuzzy.py --rows 10000 --entities clientes,entradas
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+WORDS = [
+    'leche', 'polvo', 'queso', 'yogurt', 'carne', 'jamon', 'pescado', 'arroz',
+    'harina', 'aceite', 'refresco', 'cerveza', 'ron', 'conserva', 'tomate',
+    'dulce', 'galleta', 'pan', 'helado', 'mantequilla', 'embutido', 'mortadela',
+    'empresa', 'planta', 'fabrica', 'lacteos', 'bebidas', 'oeste', 'habana',
+    'artemisa', 'mayabeque', 'pinar', 'central', 'provincial', 'nacional',
+]
+
+
+def _title(rng, entity_type, i):
+    if entity_type in ('entradas', 'pedidos', 'informes'):
+        return f'{entity_type[:3].upper()}-{2020 + i % 7}-{i:06d}'
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))).title()
+
+
+def _timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, action='append',
+                        help='Filas por entidad (repetible). Por defecto: 10000 y 100000')
+    parser.add_argument('--entities', default='clientes,entradas',
+                        help='Entidades separadas por coma')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por medición')
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from app.database.models.search_document import SearchDocument, SearchTrigram
+    from app.services.search_index import SearchIndexService
+    from app.services.search_service import SearchService
+
+    app = create_app('testing')
+    app.config['SQLALCHEMY_ECHO'] = False
+    entities = [e.strip() for e in args.entities.split(',') if e.strip()]
+    queries = {'exact': 'leche polvo', 'fuzzy': 'mantequila'}
+
+    print('| filas/entidad | entidades | index exact (ms) | index fuzzy (ms) '
+          '| python bounded (ms) | python unbounded (ms) |')
+    print('|---:|---|---:|---:|---:|---:|')
+
+    with app.app_context():
+        for rows in args.rows or [10000, 100000]:
+            SearchTrigram.__table__.drop(db.engine, checkfirst=True)
+            SearchDocument.__table__.drop(db.engine, checkfirst=True)
+            SearchDocument.__table__.create(db.engine)
+            SearchTrigram.__table__.create(db.engine)
+
+            rng = random.Random(rows)
+            connection = db.session.connection()
+            titles = []
+            for entity_type in entities:
+                for start in range(0, rows, 5000):
+                    batch = []
+                    for i in range(start, min(rows, start + 5000)):
+                        title = _title(rng, entity_type, i)
+                        titles.append(title)
+                        item = SimpleNamespace(id=i + 1, nombre=title, codigo=title,
+                                               email=None, telefono=None, lote=None,
+                                               nro_parte=None, observaciones=None,
+                                               status=None, fech_entrada=None)
+                        batch.append(SearchIndexService.build_document(entity_type, item))
+                    SearchIndexService._write_documents(connection, batch)
+            db.session.commit()
+
+            exact_ms = _timed(lambda: SearchIndexService.search(
+                queries['exact'], entities, fuzzy=False), args.repeat)
+            fuzzy_ms = _timed(lambda: SearchIndexService.search(
+                queries['fuzzy'], entities, fuzzy=True), args.repeat)
+
+            candidates = [SimpleNamespace(nombre=t) for t in titles]
+            threshold = SearchService.DEFAULT_SIMILARITY_THRESHOLD
+            bounded_ms = _timed(lambda candidates=candidates, threshold=threshold:
+                                SearchService._apply_fuzzy_filter(
+                                    candidates, ['nombre'], queries['fuzzy'], threshold), 1)
+
+            def unbounded(titles=titles):
+                for t in titles:
+                    SearchService._calculate_levenshtein_distance(queries['fuzzy'], t)
+            unbounded_ms = _timed(unbounded, 1)
+
+            print(f'| {rows:,} | {len(entities)} | {exact_ms:.1f} | {fuzzy_ms:.1f} '
+                  f'| {bounded_ms:.1f} | {unbounded_ms:.1f} |')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Add search_documents table for the global search index
+
+Revision ID: 5a1c3e9d2b7f
+Revises: 289c039aa934
+Create Date: 2026-10-18 09:12:40.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a1c3e9d2b7f'
+down_revision = '289c039aa934'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5(
+        title, content,
+        content='search_documents', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_documents_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO search_documents_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+]
+
+
+# Entidades indexadas (igual que INDEXED_ENTITIES en app/services/search_index.py):
+# tabla -> (título, campos del contenido, estado, fecha)
+INDEXED_ENTITIES = {
+    'clientes': ('nombre', ['codigo', 'nombre', 'email', 'telefono'], None, None),
+    'fabricas': ('nombre', ['nombre', 'id'], None, 'creado_en'),
+    'productos': ('nombre', ['nombre', 'id'], None, 'creado_en'),
+    'entradas': ('codigo', ['codigo', 'lote', 'nro_parte', 'observaciones'], 'status', 'fech_entrada'),
+    'pedidos': ('codigo', ['codigo', 'lote', 'observaciones'], 'status', 'fech_pedido'),
+    'informes': ('nro_oficial', ['nro_oficial', 'resumen_resultados', 'conclusiones'],
+                 'estado', 'fecha_generacion'),
+}
+
+
+def _backfill_documents():
+    """Indexar las filas existentes (equivalente a `flask search-index rebuild`)."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for entity_type, (title, fields, status, fecha) in INDEXED_ENTITIES.items():
+        if not inspector.has_table(entity_type):
+            continue
+        # Campos no vacíos separados por un espacio
+        content = ' || '.join(
+            [f"COALESCE(CAST({fields[0]} AS TEXT), '')"] +
+            [f"COALESCE(' ' || NULLIF(CAST({field} AS TEXT), ''), '')" for field in fields[1:]]
+        )
+        op.execute(f"""
+            INSERT INTO search_documents
+                (entity_type, entity_id, title, content, status, fecha, updated_at)
+            SELECT '{entity_type}', id,
+                   SUBSTR(COALESCE(CAST({title} AS TEXT), ''), 1, 300),
+                   TRIM({content}),
+                   {f'CAST({status} AS TEXT)' if status else 'NULL'},
+                   {fecha or 'NULL'},
+                   CURRENT_TIMESTAMP
+            FROM {entity_type}
+        """)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    op.create_table('search_documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=300), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=30), nullable=True),
+    sa.Column('fecha', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('entity_type', 'entity_id', name='uq_search_document_entity')
+    )
+    with op.batch_alter_table('search_documents', schema=None) as batch_op:
+        batch_op.create_index('ix_search_documents_type_status', ['entity_type', 'status'], unique=False)
+
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_search_documents_tsv ON search_documents "
+            "USING gin (to_tsvector('simple', content))"
+        )
+        op.execute(
+            "CREATE INDEX ix_search_documents_content_trgm ON search_documents "
+            "USING gin (content gin_trgm_ops)"
+        )
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+
+    # Después de los triggers FTS5: cada documento se indexa también en FTS
+    _backfill_documents()
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS search_documents_fts')
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_search_documents_content_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_search_documents_tsv')
+
+    with op.batch_alter_table('search_documents', schema=None) as batch_op:
+        batch_op.drop_index('ix_search_documents_type_status')
+
+    op.drop_table('search_documents')
@@ -0,0 +1,90 @@
+"""Add search_trigrams table and title trigram index for fuzzy search
+
+Revision ID: 7c4e2a91f0d3
+Revises: 5a1c3e9d2b7f
+Create Date: 2026-10-18 11:40:05.774129
+
+"""
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e2a91f0d3'
+down_revision = '5a1c3e9d2b7f'
+branch_labels = None
+depends_on = None
+
+
+_TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def _trigrams(value):
+    """Trigramas del título (mismo esquema que ``trigrams`` en search_index)."""
+    normalized = unicodedata.normalize('NFKD', value or '')
+    text = ''.join(ch for ch in normalized if not unicodedata.combining(ch)).lower()
+    result = set()
+    for word in _TERM_PATTERN.findall(text):
+        padded = f'  {word} '
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return result
+
+
+def _backfill_trigrams(batch_size=1000):
+    """Trigramas de los títulos ya indexados (PostgreSQL usa pg_trgm)."""
+    bind = op.get_bind()
+    trigram_table = sa.table(
+        'search_trigrams',
+        sa.column('trigram', sa.String),
+        sa.column('entity_type', sa.String),
+        sa.column('entity_id', sa.Integer),
+    )
+    documents = bind.execute(sa.text(
+        'SELECT entity_type, entity_id, title FROM search_documents'
+    )).fetchall()
+    rows = []
+    for entity_type, entity_id, title in documents:
+        rows.extend({'trigram': trigram, 'entity_type': entity_type, 'entity_id': entity_id}
+                    for trigram in _trigrams(title))
+        if len(rows) >= batch_size:
+            bind.execute(trigram_table.insert(), rows)
+            rows = []
+    if rows:
+        bind.execute(trigram_table.insert(), rows)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    op.create_table('search_trigrams',
+    sa.Column('trigram', sa.String(length=3), nullable=False),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.PrimaryKeyConstraint('trigram', 'entity_type', 'entity_id')
+    )
+    with op.batch_alter_table('search_trigrams', schema=None) as batch_op:
+        batch_op.create_index('ix_search_trigrams_entity', ['entity_type', 'entity_id'], unique=False)
+
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_search_documents_title_trgm ON search_documents "
+            "USING gin (title gin_trgm_ops)"
+        )
+    else:
+        _backfill_trigrams()
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_search_documents_title_trgm')
+
+    with op.batch_alter_table('search_trigrams', schema=None) as batch_op:
+        batch_op.drop_index('ix_search_trigrams_entity')
+
+    op.drop_table('search_trigrams')
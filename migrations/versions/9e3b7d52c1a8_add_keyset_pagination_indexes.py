@@ -0,0 +1,43 @@
+"""Add (sort column, id) indexes for keyset pagination
+
+Revision ID: 9e3b7d52c1a8
+Revises: 7c4e2a91f0d3
+Create Date: 2026-10-18 14:02:51.118734
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3b7d52c1a8'
+down_revision = '7c4e2a91f0d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('entradas', schema=None) as batch_op:
+        batch_op.create_index('ix_entradas_fech_entrada_id', ['fech_entrada', 'id'], unique=False)
+
+    with op.batch_alter_table('pedidos', schema=None) as batch_op:
+        batch_op.create_index('ix_pedidos_fech_pedido_id', ['fech_pedido', 'id'], unique=False)
+
+    with op.batch_alter_table('ordenes_trabajo', schema=None) as batch_op:
+        batch_op.create_index('ix_ordenes_trabajo_fech_creacion_id', ['fech_creacion', 'id'], unique=False)
+
+    with op.batch_alter_table('detalles_ensayo', schema=None) as batch_op:
+        batch_op.create_index('ix_detalle_fecha_completado_id', ['fecha_completado', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('detalles_ensayo', schema=None) as batch_op:
+        batch_op.drop_index('ix_detalle_fecha_completado_id')
+
+    with op.batch_alter_table('ordenes_trabajo', schema=None) as batch_op:
+        batch_op.drop_index('ix_ordenes_trabajo_fech_creacion_id')
+
+    with op.batch_alter_table('pedidos', schema=None) as batch_op:
+        batch_op.drop_index('ix_pedidos_fech_pedido_id')
+
+    with op.batch_alter_table('entradas', schema=None) as batch_op:
+        batch_op.drop_index('ix_entradas_fech_entrada_id')
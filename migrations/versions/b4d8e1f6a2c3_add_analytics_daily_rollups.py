@@ -0,0 +1,75 @@
+"""Add daily rollup tables for analytics reports
+
+Revision ID: b4d8e1f6a2c3
+Revises: 9e3b7d52c1a8
+Create Date: 2026-10-18 16:40:12.503281
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d8e1f6a2c3'
+down_revision = '9e3b7d52c1a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'rollup_detalles_diarios',
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('ensayo_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('cliente_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('dia', 'ensayo_id', 'cliente_id', 'estado'),
+    )
+    with op.batch_alter_table('rollup_detalles_diarios', schema=None) as batch_op:
+        batch_op.create_index('ix_rollup_detalles_estado_dia', ['estado', 'dia'], unique=False)
+
+    op.create_table(
+        'rollup_entradas_diarias',
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('cliente_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('rama_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('anulado', sa.Boolean(), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('dia', 'cliente_id', 'rama_id', 'status', 'anulado'),
+    )
+    with op.batch_alter_table('rollup_entradas_diarias', schema=None) as batch_op:
+        batch_op.create_index('ix_rollup_entradas_status_dia', ['status', 'dia'], unique=False)
+
+    # Backfill inicial: equivalente a `flask analytics-rollup rebuild`
+    dia_detalle = ('CAST(COALESCE(d.fecha_completado, d.created_at) AS DATE)'
+                   if op.get_bind().dialect.name == 'postgresql'
+                   else 'DATE(COALESCE(d.fecha_completado, d.created_at))')
+    dia_entrada = ('CAST(e.fech_entrada AS DATE)'
+                   if op.get_bind().dialect.name == 'postgresql'
+                   else 'DATE(e.fech_entrada)')
+    op.execute(f"""
+        INSERT INTO rollup_detalles_diarios (dia, ensayo_id, cliente_id, estado, cantidad)
+        SELECT {dia_detalle}, d.ensayo_id, e.cliente_id, d.estado, COUNT(d.id)
+        FROM detalles_ensayo d JOIN entradas e ON d.entrada_id = e.id
+        GROUP BY {dia_detalle}, d.ensayo_id, e.cliente_id, d.estado
+    """)
+    op.execute(f"""
+        INSERT INTO rollup_entradas_diarias (dia, cliente_id, rama_id, status, anulado, cantidad)
+        SELECT {dia_entrada}, e.cliente_id, COALESCE(e.rama_id, 0), e.status,
+               COALESCE(e.anulado, FALSE), COUNT(e.id)
+        FROM entradas e
+        GROUP BY {dia_entrada}, e.cliente_id, COALESCE(e.rama_id, 0), e.status,
+                 COALESCE(e.anulado, FALSE)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('rollup_entradas_diarias', schema=None) as batch_op:
+        batch_op.drop_index('ix_rollup_entradas_status_dia')
+    op.drop_table('rollup_entradas_diarias')
+
+    with op.batch_alter_table('rollup_detalles_diarios', schema=None) as batch_op:
+        batch_op.drop_index('ix_rollup_detalles_estado_dia')
+    op.drop_table('rollup_detalles_diarios')
@@ -0,0 +1,25 @@
+"""Add status_history (changed_at, to_status) index for status trends
+
+Revision ID: c7e2a9f4d1b6
+Revises: b4d8e1f6a2c3
+Create Date: 2026-10-18 17:41:09.302218
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a9f4d1b6'
+down_revision = 'b4d8e1f6a2c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('status_history', schema=None) as batch_op:
+        batch_op.create_index('ix_status_history_changed_at', ['changed_at', 'to_status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('status_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_status_history_changed_at')
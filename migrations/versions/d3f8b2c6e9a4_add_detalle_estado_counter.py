@@ -0,0 +1,38 @@
+"""Add ensayo x estado counter table for lab area stats
+
+Revision ID: d3f8b2c6e9a4
+Revises: c7e2a9f4d1b6
+Create Date: 2026-10-18 18:22:37.640915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f8b2c6e9a4'
+down_revision = 'c7e2a9f4d1b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'rollup_detalles_estado',
+        sa.Column('ensayo_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('ensayo_id', 'estado'),
+    )
+
+    # Backfill inicial: equivalente a `flask analytics-rollup rebuild`
+    op.execute("""
+        INSERT INTO rollup_detalles_estado (ensayo_id, estado, cantidad)
+        SELECT d.ensayo_id, d.estado, COUNT(d.id)
+        FROM detalles_ensayo d
+        GROUP BY d.ensayo_id, d.estado
+    """)
+
+
+def downgrade():
+    op.drop_table('rollup_detalles_estado')
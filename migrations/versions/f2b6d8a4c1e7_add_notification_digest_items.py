@@ -0,0 +1,45 @@
+"""Add notification digest items for per-user notification batching
+
+Revision ID: f2b6d8a4c1e7
+Revises: e5a1c7d9b3f2
+Create Date: 2026-10-18 21:14:48.902156
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d8a4c1e7'
+down_revision = 'e5a1c7d9b3f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'notification_digest_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('entity_type', sa.String(length=50), nullable=True),
+        sa.Column('entity_id', sa.Integer(), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=True),
+        sa.Column('in_app', sa.Boolean(), nullable=False),
+        sa.Column('email', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('notification_digest_items', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_digest_user_type',
+                              ['user_id', 'type', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification_digest_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_digest_user_type')
+
+    op.drop_table('notification_digest_items')